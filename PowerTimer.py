@@ -436,11 +436,13 @@ class PowerTimer(timer.Timer):
 			self.timer_list.remove(w)
 		except:
 			print('[PowerTimer] Remove list failed')
+		self.unscheduleEntry(w)
 
 		# did this timer reached the last state?
 		if w.state < PowerTimerEntry.StateEnded:
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.scheduleEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -6,6 +6,7 @@ from os import sys
 from enigma import eEPGCache, getBestPlayableServiceReference, eStreamServer, eServiceReference, iRecordableService, quitMainloop, eActionMap, setPreferredTuner, getBoxType
 
 from Components.config import config
+from Components.MovieIndex import movieIndex
 from Components.UsageConfig import defaultMoviePath
 from Components.SystemInfo import SystemInfo
 from Components.TimerSanityCheck import TimerSanityCheck
@@ -26,7 +27,7 @@ import NavigationInstance
 from ServiceReference import ServiceReference, isPlayableForCur
 
 from time import localtime, strftime, ctime, time
-from bisect import insort
+from bisect import insort, bisect_left, bisect_right
 from sys import maxint
 
 # ok, for descriptions etc we have:
@@ -652,9 +653,11 @@ class RecordTimerEntry(timer.TimerEntry, object):
 			self.log_tuner(12, "stop")
 			RecordingsState(-1)
 			if not self.justplay:
+				filename = self.Filename + self.record_service.getFilenameExtension()
 				NavigationInstance.instance.stopRecordService(self.record_service)
 				self.record_service = None
 				self.rec_ref = None
+				movieIndex.removeFile(filename)  # The recording and its meta data are complete now.
 			if not checkForRecordings():
 				if self.afterEvent == AFTEREVENT.DEEPSTANDBY or (wasRecTimerWakeup and self.afterEvent == AFTEREVENT.AUTO and Screens.Standby.inStandby or RecordTimerEntry.wasInStandby) and not config.misc.standbyCounter.value:
 					if not Screens.Standby.inTryQuitMainloop:
@@ -915,9 +918,107 @@ def createTimer(xml):
 
 	return entry
 
+def getTimerServiceKey(timer):
+	return ':'.join(timer.service_ref.ref.toString().split(':')[:11])
+
+# sorted (begin, end) windows of timers, searchable for overlaps with bisect.
+# maxlength is the longest window ever added, so everything starting before
+# begin - maxlength can be skipped when looking for overlapping windows.
+class TimerWindows:
+	def __init__(self):
+		self.windows = []
+		self.maxlength = 0
+
+	def add(self, begin, end, timer):
+		insort(self.windows, (begin, end, id(timer), timer))
+		if end - begin > self.maxlength:
+			self.maxlength = end - begin
+
+	def remove(self, begin, end, timer):
+		item = (begin, end, id(timer), timer)
+		i = bisect_left(self.windows, item)
+		if i < len(self.windows) and self.windows[i][2] == id(timer):
+			del self.windows[i]
+
+	def find(self, begin, end):
+		windows = self.windows
+		lo = bisect_left(windows, (begin - self.maxlength,))
+		hi = bisect_right(windows, (end, float("inf")))
+		return [x[3] for x in windows[lo:hi] if x[1] >= begin]
+
+# index of timers by their normalized (11 fields) service reference, used by
+# RecordTimer.isInTimer. Every timer is kept with its begin/end window (padded
+# for the margin and zap timer corrections done in isInTimer), repeated timers
+# are additionally kept as minute-of-week windows for every repeated day.
+# A lookup gives all timers which may match, the exact check is still done by
+# the caller.
+class TimerServiceIndex:
+	WEEK = 7 * 1440
+
+	def __init__(self):
+		self.timers = None
+		self.services = {}
+		self.entries = {}
+
+	def rebuild(self, timers):
+		self.timers = timers
+		self.services = {}
+		self.entries = {}
+		for x in timers:
+			self.add(x)
+
+	def add(self, timer):
+		self.remove(timer)
+		key = getTimerServiceKey(timer)
+		service = self.services.get(key)
+		if service is None:
+			service = self.services[key] = (TimerWindows(), TimerWindows())
+		absolute, weekly = service
+		windows = [(absolute, timer.begin - 60, max(timer.begin, timer.end) + 120)]
+		if timer.repeated:
+			xbt = localtime(timer.begin)
+			xbegin = xbt.tm_hour * 60 + xbt.tm_min
+			length = (timer.end + 60 - timer.begin) // 60
+			if length < 0:
+				length += 1440
+			for day in range(7):
+				if timer.repeated & (1 << day):
+					begin = day * 1440 + xbegin
+					end = begin + length + 1
+					windows.append((weekly, begin, end))
+					if end >= self.WEEK:
+						# sunday timer running into monday
+						windows.append((weekly, begin - self.WEEK, end - self.WEEK))
+		for (x, begin, end) in windows:
+			x.add(begin, end, timer)
+		self.entries[id(timer)] = windows
+
+	def remove(self, timer):
+		windows = self.entries.pop(id(timer), None)
+		if windows:
+			for (x, begin, end) in windows:
+				x.remove(begin, end, timer)
+
+	def find(self, key, begin, end):
+		service = self.services.get(key)
+		if service is None:
+			return []
+		absolute, weekly = service
+		timers = absolute.find(begin, end)
+		if weekly.windows:
+			bt = localtime(begin)
+			wbegin = bt.tm_wday * 1440 + bt.tm_hour * 60 + bt.tm_min
+			for x in weekly.find(wbegin, wbegin + (end - begin) // 60):
+				if x not in timers:
+					timers.append(x)
+		return timers
+
 class RecordTimer(timer.Timer):
 	def __init__(self):
+		self.timer_index = TimerServiceIndex()
+		self.fallback_timer_index = TimerServiceIndex()
 		timer.Timer.__init__(self)
+		self.timer_index.rebuild(self.timer_list)
 
 		self.Filename = Directories.resolveFilename(Directories.SCOPE_CONFIG, "timers.xml")
 		self.fallback_timer_list = []
@@ -940,11 +1041,13 @@ class RecordTimer(timer.Timer):
 				w.state += 1
 
 		self.timer_list.remove(w)
+		self.unscheduleEntry(w)
 
 		# did this timer reached the last state?
 		if w.state < RecordTimerEntry.StateEnded:
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.scheduleEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -964,8 +1067,20 @@ class RecordTimer(timer.Timer):
 					insort(self.processed_timers, w)
 					self.saveTimer()
 
+		self.updateTimerIndex(w)
 		self.stateChanged(w)
 
+	def addTimerEntry(self, entry, noRecalc=0):
+		timer.Timer.addTimerEntry(self, entry, noRecalc)
+		self.updateTimerIndex(entry)
+
+	# keep the service index in sync with timer_list, ended timers are in processed_timers
+	def updateTimerIndex(self, entry):
+		if entry.state == RecordTimerEntry.StateEnded:
+			self.timer_index.remove(entry)
+		else:
+			self.timer_index.add(entry)
+
 	def isRecTimerWakeup(self):
 		return wasRecTimerWakeup
 
@@ -1322,10 +1437,26 @@ class RecordTimer(timer.Timer):
 
 	def setFallbackTimerList(self, list):
 		self.fallback_timer_list = [timer for timer in list if timer.state != 3]
+		self.fallback_timer_index.rebuild(self.fallback_timer_list)
 
 	def getAllTimersList(self):
 		return self.timer_list + self.fallback_timer_list
 
+	# the timers of getAllTimersList() on service refstr which may overlap begin..end, in the same order
+	def getServiceTimersList(self, refstr, begin, end):
+		if self.timer_index.timers is not self.timer_list:
+			# the list was replaced from outside, e.g. by a plugin
+			self.timer_index.rebuild(self.timer_list)
+		if self.fallback_timer_index.timers is not self.fallback_timer_list:
+			self.fallback_timer_index.rebuild(self.fallback_timer_list)
+		timers = self.timer_index.find(refstr, begin, end)
+		if len(timers) > 1:
+			timers.sort(key=self.timer_list.index)
+		fallback_timers = self.fallback_timer_index.find(refstr, begin, end)
+		if len(fallback_timers) > 1:
+			fallback_timers.sort(key=self.fallback_timer_list.index)
+		return timers + fallback_timers
+
 	def isInTimer(self, eventid, begin, duration, service):
 		returnValue = None
 		type = 0
@@ -1334,93 +1465,70 @@ class RecordTimer(timer.Timer):
 		check_offset_time = not config.recording.margin_before.value and not config.recording.margin_after.value
 		end = begin + duration
 		refstr = ':'.join(service.split(':')[:11])
-		for x in self.getAllTimersList():
-			check = ':'.join(x.service_ref.ref.toString().split(':')[:11]) == refstr
-			if check:
-				timer_end = x.end
-				timer_begin = x.begin
-				type_offset = 0
-				if not x.repeated and check_offset_time:
-					if 0 < end - timer_end <= 59:
-						timer_end = end
-					elif 0 < timer_begin - begin <= 59:
-						timer_begin = begin
-				if x.justplay:
-					type_offset = 5
-					if (timer_end - x.begin) <= 1:
-						timer_end += 60
-					if x.pipzap:
-						type_offset = 30
-				if x.always_zap:
-					type_offset = 10
-
-				timer_repeat = x.repeated
-				# if set 'don't stop current event but disable coming events' for repeat timer
-				running_only_curevent = x.disabled and x.isRunning() and timer_repeat
-				if running_only_curevent:
-					timer_repeat = 0
-					type_offset += 15
-
-				if timer_repeat != 0:
-					type_offset += 15
-					if bt is None:
-						bt = localtime(begin)
-						bday = bt.tm_wday
-						begin2 = 1440 + bt.tm_hour * 60 + bt.tm_min
-						end2 = begin2 + duration / 60
-					xbt = localtime(x.begin)
-					xet = localtime(timer_end)
-					offset_day = False
-					checking_time = x.begin < begin or begin <= x.begin <= end
-					if xbt.tm_yday != xet.tm_yday:
-						oday = bday - 1
-						if oday == -1: oday = 6
-						offset_day = x.repeated & (1 << oday)
-					xbegin = 1440 + xbt.tm_hour * 60 + xbt.tm_min
-					xend = xbegin + ((timer_end - x.begin) / 60)
-					if xend < xbegin:
-						xend += 1440
-					if x.repeated & (1 << bday) and checking_time:
-						if begin2 < xbegin <= end2:
-							if xend < end2:
-								# recording within event
-								time_match = (xend - xbegin) * 60
-								type = type_offset + 3
-							else:
-								# recording last part of event
-								time_match = (end2 - xbegin) * 60
-								type = type_offset + 1
-						elif xbegin <= begin2 <= xend:
-							if xend < end2:
-								# recording first part of event
-								time_match = (xend - begin2) * 60
-								type = type_offset + 4
-							else:
-								# recording whole event
-								time_match = (end2 - begin2) * 60
-								type = type_offset + 2
-						elif offset_day:
-							xbegin -= 1440
-							xend -= 1440
-							if begin2 < xbegin <= end2:
-								if xend < end2:
-									# recording within event
-									time_match = (xend - xbegin) * 60
-									type = type_offset + 3
-								else:
-									# recording last part of event
-									time_match = (end2 - xbegin) * 60
-									type = type_offset + 1
-							elif xbegin <= begin2 <= xend:
-								if xend < end2:
-									# recording first part of event
-									time_match = (xend - begin2) * 60
-									type = type_offset + 4
-								else:
-									# recording whole event
-									time_match = (end2 - begin2) * 60
-									type = type_offset + 2
-					elif offset_day and checking_time:
+		for x in self.getServiceTimersList(refstr, begin, end):
+			timer_end = x.end
+			timer_begin = x.begin
+			type_offset = 0
+			if not x.repeated and check_offset_time:
+				if 0 < end - timer_end <= 59:
+					timer_end = end
+				elif 0 < timer_begin - begin <= 59:
+					timer_begin = begin
+			if x.justplay:
+				type_offset = 5
+				if (timer_end - x.begin) <= 1:
+					timer_end += 60
+				if x.pipzap:
+					type_offset = 30
+			if x.always_zap:
+				type_offset = 10
+
+			timer_repeat = x.repeated
+			# if set 'don't stop current event but disable coming events' for repeat timer
+			running_only_curevent = x.disabled and x.isRunning() and timer_repeat
+			if running_only_curevent:
+				timer_repeat = 0
+				type_offset += 15
+
+			if timer_repeat != 0:
+				type_offset += 15
+				if bt is None:
+					bt = localtime(begin)
+					bday = bt.tm_wday
+					begin2 = 1440 + bt.tm_hour * 60 + bt.tm_min
+					end2 = begin2 + duration / 60
+				xbt = localtime(x.begin)
+				xet = localtime(timer_end)
+				offset_day = False
+				checking_time = x.begin < begin or begin <= x.begin <= end
+				if xbt.tm_yday != xet.tm_yday:
+					oday = bday - 1
+					if oday == -1: oday = 6
+					offset_day = x.repeated & (1 << oday)
+				xbegin = 1440 + xbt.tm_hour * 60 + xbt.tm_min
+				xend = xbegin + ((timer_end - x.begin) / 60)
+				if xend < xbegin:
+					xend += 1440
+				if x.repeated & (1 << bday) and checking_time:
+					if begin2 < xbegin <= end2:
+						if xend < end2:
+							# recording within event
+							time_match = (xend - xbegin) * 60
+							type = type_offset + 3
+						else:
+							# recording last part of event
+							time_match = (end2 - xbegin) * 60
+							type = type_offset + 1
+					elif xbegin <= begin2 <= xend:
+						if xend < end2:
+							# recording first part of event
+							time_match = (xend - begin2) * 60
+							type = type_offset + 4
+						else:
+							# recording whole event
+							time_match = (end2 - begin2) * 60
+							type = type_offset + 2
+					elif offset_day:
 						xbegin -= 1440
 						xend -= 1440
 						if begin2 < xbegin <= end2:
@@ -1441,35 +1549,56 @@ class RecordTimer(timer.Timer):
 								# recording whole event
 								time_match = (end2 - begin2) * 60
 								type = type_offset + 2
-				else:
-					if begin < timer_begin <= end:
-						if timer_end < end:
+				elif offset_day and checking_time:
+					xbegin -= 1440
+					xend -= 1440
+					if begin2 < xbegin <= end2:
+						if xend < end2:
 							# recording within event
-							time_match = timer_end - timer_begin
+							time_match = (xend - xbegin) * 60
 							type = type_offset + 3
 						else:
 							# recording last part of event
-							time_match = end - timer_begin
+							time_match = (end2 - xbegin) * 60
 							type = type_offset + 1
-					elif timer_begin <= begin <= timer_end:
-						if timer_end < end:
+					elif xbegin <= begin2 <= xend:
+						if xend < end2:
 							# recording first part of event
-							time_match = timer_end - begin
+							time_match = (xend - begin2) * 60
 							type = type_offset + 4
 						else:
 							# recording whole event
-							time_match = end - begin
+							time_match = (end2 - begin2) * 60
 							type = type_offset + 2
-				if time_match:
-					if type in (2, 7, 12, 17, 22, 27, 32):
-						# When full recording do not look further
-						returnValue = (time_match, [type])
-						break
-					elif returnValue:
-						if type not in returnValue[1]:
-							returnValue[1].append(type)
+			else:
+				if begin < timer_begin <= end:
+					if timer_end < end:
+						# recording within event
+						time_match = timer_end - timer_begin
+						type = type_offset + 3
 					else:
-						returnValue = (time_match, [type])
+						# recording last part of event
+						time_match = end - timer_begin
+						type = type_offset + 1
+				elif timer_begin <= begin <= timer_end:
+					if timer_end < end:
+						# recording first part of event
+						time_match = timer_end - begin
+						type = type_offset + 4
+					else:
+						# recording whole event
+						time_match = end - begin
+						type = type_offset + 2
+			if time_match:
+				if type in (2, 7, 12, 17, 22, 27, 32):
+					# When full recording do not look further
+					returnValue = (time_match, [type])
+					break
+				elif returnValue:
+					if type not in returnValue[1]:
+						returnValue[1].append(type)
+				else:
+					returnValue = (time_match, [type])
 
 		return returnValue
 
@@ -1498,6 +1627,7 @@ class RecordTimer(timer.Timer):
 		if entry in self.processed_timers:
 			# now the timer should be in the processed_timers list. remove it from there.
 			self.processed_timers.remove(entry)
+		self.updateTimerIndex(entry)
 		self.saveTimer()
 
 	def shutdown(self):
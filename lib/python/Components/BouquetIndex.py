@@ -0,0 +1,163 @@
+import os
+from time import time
+from enigma import eServiceCenter, eServiceReference
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# Channel numbers and positions of the services in the bouquets, read once
+# per bouquet and kept until the bouquets change.  Number zapping, the number
+# offsets of the bouquet selectors and the channel number converters look
+# them up here instead of listing the bouquets again on every key press and
+# every refresh of a skin.
+#
+# Everything that edits the bouquets or makes eDVBDB reload them should call
+# bouquetIndex.invalidate() afterwards.  For everything else (service scans,
+# plugins and web interfaces that edit the bouquet files) the modification
+# times of the bouquet files are checked as well, at most every
+# CHECK_INTERVAL seconds.
+
+
+def isPlayable(service):
+	return not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory)) or bool(service.flags & eServiceReference.isNumberedMarker)
+
+
+def isService(service):
+	return not (service.flags & (eServiceReference.isMarker | eServiceReference.isDirectory))
+
+
+class Bouquet:
+	"""The entries of one bouquet.  numbers maps the channel numbers to the
+	first entry with that number, positions maps the services to their
+	position among the services of the bouquet, counted from 1 without
+	markers and sub directories."""
+
+	def __init__(self, ref, serviceHandler):
+		self.ref = ref
+		info = serviceHandler.info(ref)
+		self.name = info and info.getName(ref) or ""
+		self.numbers = {}
+		self.positions = {}
+		self.firstNumber = 0  # The first channel number in the bouquet, 0 if it has none.
+		self.count = 0
+		self.hasStreams = False
+		self.hasGroups = False
+		servicelist = serviceHandler.list(ref)
+		for service in servicelist and servicelist.getContent("R") or []:
+			number = service.getChannelNum()
+			if number > 0:
+				self.numbers.setdefault(number, service)
+				if not self.firstNumber:
+					self.firstNumber = number
+			if isService(service):
+				self.count += 1
+				self.positions.setdefault(service.toCompareString(), self.count)
+				if service.flags & eServiceReference.isGroup:
+					self.hasGroups = True
+				if "%3a//" in service.toString().lower():
+					self.hasStreams = True
+
+
+class BouquetRoot:
+	"""The bouquets in a list of bouquets, e.g. bouquets.tv, with the number
+	of services before each of them.  services maps the services to their
+	(position, bouquet) in all bouquets, in the order of the bouquets."""
+
+	def __init__(self, ref, index, serviceHandler):
+		self.ref = ref
+		self.bouquets = []  # (bouquet, visible, services before it)
+		self.services = {}
+		count = 0
+		servicelist = serviceHandler.list(ref)
+		for bouquetRef in servicelist and servicelist.getContent("R") or []:
+			if bouquetRef.flags & eServiceReference.isDirectory:
+				bouquet = index.getBouquet(bouquetRef)
+				self.bouquets.append((bouquet, not bouquetRef.flags & eServiceReference.isInvisible, count))
+				for key, position in bouquet.positions.iteritems():
+					self.services.setdefault(key, []).append((count + position, bouquet.ref))
+				count += bouquet.count
+		self.hasStreams = any(bouquet.hasStreams for bouquet, visible, before in self.bouquets)
+		self.hasGroups = any(bouquet.hasGroups for bouquet, visible, before in self.bouquets)
+
+	def findNumber(self, number, firstBouquetOnly=False):
+		"""Return the (entry, bouquet) with the channel number in the first
+		visible bouquet that has it, or only in the first visible bouquet."""
+		for bouquet, visible, before in self.bouquets:
+			if visible:
+				service = bouquet.numbers.get(number)
+				if service or firstBouquetOnly:
+					return service, bouquet.ref
+		return None, None
+
+	def getPosition(self, service, current=None):
+		"""Return the (position, bouquet) of the service counted over all
+		bouquets, in the current bouquet if it is in there, or None."""
+		entries = self.services.get(service.toCompareString())
+		if not entries:
+			return None
+		if current is not None:
+			current = current.toCompareString()
+			for position, bouquet in entries:
+				if bouquet.toCompareString() == current:
+					return position, bouquet
+		return entries[0]
+
+
+def getBouquetFilesStamp(path):
+	stamp = [os.stat(path).st_mtime]
+	for name in sorted(os.listdir(path)):
+		if name.startswith(("bouquets.", "userbouquet.")):
+			status = os.stat(os.path.join(path, name))
+			stamp.append((name, status.st_mtime, status.st_size))
+	return tuple(stamp)
+
+
+class BouquetIndex:
+	CHECK_INTERVAL = 2
+
+	def __init__(self):
+		self.bouquets = {}
+		self.roots = {}
+		self.path = resolveFilename(SCOPE_CONFIG)
+		self.stamp = None
+		self.lastCheck = 0
+
+	def invalidate(self):
+		self.bouquets.clear()
+		self.roots.clear()
+
+	def validate(self):
+		now = time()
+		if now - self.lastCheck < self.CHECK_INTERVAL and now >= self.lastCheck:
+			return
+		self.lastCheck = now
+		try:
+			stamp = getBouquetFilesStamp(self.path)
+		except OSError:
+			stamp = None
+		if stamp != self.stamp:
+			self.stamp = stamp
+			self.invalidate()
+			if stamp and max([stamp[0]] + [x[1] for x in stamp[1:]]) > now - self.CHECK_INTERVAL:
+				self.stamp = None  # Just written, eDVBDB may not have reloaded them yet.
+
+	def getBouquet(self, ref):
+		self.validate()
+		key = ref.toCompareString()
+		bouquet = self.bouquets.get(key)
+		if bouquet is None:
+			bouquet = self.bouquets[key] = Bouquet(eServiceReference(ref), eServiceCenter.getInstance())
+		return bouquet
+
+	def getRoot(self, ref):
+		self.validate()
+		key = ref.toCompareString()
+		root = self.roots.get(key)
+		if root is None:
+			root = self.roots[key] = BouquetRoot(eServiceReference(ref), self, eServiceCenter.getInstance())
+		return root
+
+	def getNumberOffset(self, ref):
+		"""The channel number before the first one in the bouquet."""
+		return max(self.getBouquet(ref).firstNumber - 1, 0)
+
+
+bouquetIndex = BouquetIndex()
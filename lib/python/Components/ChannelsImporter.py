@@ -1,4 +1,5 @@
 from __future__ import print_function
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config
 
 #for scheduler
@@ -6,8 +7,9 @@ from time import mktime, strftime, time, localtime
 from enigma import eTimer
 
 #for downloader
-import os, re, urllib2
+import os, re, shutil, tempfile, urllib2
 from enigma import eServiceReference, eDVBDB
+from Tools.BulkTransfer import DOWNLOADED, UNCHANGED, FTPFetcher, TransferError, swapFiles
 
 autoClientModeTimer = None
 def autostart():
@@ -136,34 +138,38 @@ class AutoClientModeTimer:
 class ChannelsImporter():
 	DIR_ENIGMA2 = '/etc/enigma2/'
 	DIR_TMP = '/tmp/'
+	CHANNEL_FILES = ("lamedb", "bouquets.", "userbouquet.")
 	def __init__(self):
-		self.fetchRemoteBouquets()
+		self.fetcher = FTPFetcher(self.getRemoteAddress(), config.clientmode.serverFTPPort.value, config.clientmode.serverFTPusername.value, config.clientmode.serverFTPpassword.value, self.DIR_ENIGMA2, config.clientmode.passive.value, timeout=5)
+		self.staging = None
+		try:
+			self.fetchRemoteBouquets()
+		finally:
+			if self.staging:
+				shutil.rmtree(self.staging, True)
+			self.fetcher.close()
 
 	def fetchRemoteBouquets(self):
 		print("[ChannelsImporter] Fetch bouquets.tv and bouquets.radio")
-		self.readIndex = 0
-		self.workList = []
-		self.workList.append('bouquets.tv')
-		self.workList.append('bouquets.radio')
+		# Everything is fetched next to the current channel list first and only
+		# moved into place once all of it was fetched.
+		self.staging = tempfile.mkdtemp(prefix=".import", dir=self.DIR_ENIGMA2)
+		self.workList = ['bouquets.tv', 'bouquets.radio']
 		print("[ChannelsImporter] fetchRemoteBouquets Downloading channel indexes...")
-		print("[ChannelsImporter] fetchRemoteBouquets %d/%d" % (self.readIndex + 1, len(self.workList)))
-		result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.workList[self.readIndex], self.workList[self.readIndex])
-		if result:
-			self.fetchRemoteBouquetsCallback()
+		if self.fetchFiles(self.workList):
+			self.readBouquets()
 		else:
 			print("[ChannelsImporter] fetchRemoteBouquets Error fetching. Stopping script.")
 
-	def fetchRemoteBouquetsCallback(self):
-		self.readIndex += 1
-		if self.readIndex < len(self.workList):
-			print("[ChannelsImporter] fetchRemoteBouquetsCallback %d/%d" % (self.readIndex + 1, len(self.workList)))
-			result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.workList[self.readIndex], self.workList[self.readIndex])
-			if result:
-				self.fetchRemoteBouquetsCallback()
-			else:
-				print("[ChannelsImporter] fetchRemoteBouquetsCallback Error fetching. Stopping script.")
-		else:
-			self.readBouquets()
+	def fetchFiles(self, files):
+		print("[ChannelsImporter] Downloading %d remote files" % len(files))
+		try:
+			results = self.fetcher.fetch(files, self.staging, self.DIR_ENIGMA2)
+		except TransferError as err:
+			print("[ChannelsImporter] fetchFiles Error:", err)
+			return False
+		print("[ChannelsImporter] fetchFiles %d downloaded, %d unchanged" % (results.values().count(DOWNLOADED), results.values().count(UNCHANGED)))
+		return True
 
 	def getBouquetsList(self, bouquetFilenameList, bouquetfile):
 		file = open(bouquetfile)
@@ -178,95 +184,46 @@ class ChannelsImporter():
 
 	def readBouquets(self):
 		bouquetFilenameList = []
-		self.getBouquetsList(bouquetFilenameList, self.DIR_TMP + 'bouquets.tv')
-		self.getBouquetsList(bouquetFilenameList, self.DIR_TMP + 'bouquets.radio')
-		self.readIndex = 0
-		self.workList = []
-		for listindex in range(len(bouquetFilenameList)):
-			self.workList.append(bouquetFilenameList[listindex])
-		self.workList.append('lamedb')
+		self.getBouquetsList(bouquetFilenameList, os.path.join(self.staging, 'bouquets.tv'))
+		self.getBouquetsList(bouquetFilenameList, os.path.join(self.staging, 'bouquets.radio'))
+		self.workList = bouquetFilenameList + ['lamedb']
 		print("[ChannelsImporter] readBouquets Downloading bouquets...")
-		print("[ChannelsImporter] readBouquets %d/%d" % (self.readIndex + 1, len(self.workList)))
-		result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.workList[self.readIndex], self.workList[self.readIndex])
-		if result:
-			self.readBouquetsCallback()
-		else:
+		if not self.fetchFiles(self.workList):
 			print("[ChannelsImporter] readBouquets Error fetching. Stopping script.")
-
-	def readBouquetsCallback(self):
-		self.readIndex += 1
-		if self.readIndex < len(self.workList):
-			print("[ChannelsImporter] readBouquetsCallback %d/%d" % (self.readIndex + 1, len(self.workList)))
-			result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.workList[self.readIndex], self.workList[self.readIndex])
-			if result:
-				self.readBouquetsCallback()
-			else:
-				print("[ChannelsImporter] readBouquetsCallback Error fetching. Stopping script.")
-		elif len(self.workList) > 0:
-			# Download alternatives files where services have alternatives
-			print("[ChannelsImporter] readBouquetsCallback Checking for alternatives...")
-			self.findAlternatives()
-			self.alternativesCounter = 0
-			if len(self.alternatives) > 0:
-				print("[ChannelsImporter] readBouquetsCallback Downloading alternatives...")
-				print("[ChannelsImporter] readBouquetsCallback %d/%d" % (self.alternativesCounter + 1, len(self.alternatives)))
-				result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.alternatives[self.alternativesCounter], self.alternatives[self.alternativesCounter])
-				if result:
-					self.downloadAlternativesCallback()
-				else:
-					print("[ChannelsImporter] readBouquetsCallback Error fetching. Stopping script.")
-					return
-			self.processFiles()
-		else:
-			print("[ChannelsImporter] readBouquetsCallback There were no remote bouquets to download")
-
-	def downloadAlternativesCallback(self):
-		self.alternativesCounter += 1
-		if self.alternativesCounter < len(self.alternatives):
-			print("[ChannelsImporter] downloadAlternativesCallback %d/%d" % (self.alternativesCounter + 1, len(self.alternatives)))
-			result = self.FTPdownloadFile(self.DIR_ENIGMA2, self.alternatives[self.alternativesCounter], self.alternatives[self.alternativesCounter])
-			if result:
-				self.downloadAlternativesCallback()
+			return
+		# Download alternatives files where services have alternatives
+		print("[ChannelsImporter] readBouquets Checking for alternatives...")
+		self.findAlternatives()
+		if self.alternatives:
+			print("[ChannelsImporter] readBouquets Downloading alternatives...")
+			if not self.fetchFiles(self.alternatives):
+				print("[ChannelsImporter] readBouquets Error fetching. Stopping script.")
+				return
+		self.processFiles()
 
 	def processFiles(self):
-		allFiles = self.workList + self.alternatives + ["bouquets.tv", "bouquets.radio"]
-		print("[ChannelsImporter] processFiles Removing current channel list...")
-		for target in ["lamedb", "bouquets.", "userbouquet."]:
-			self.removeFiles(self.DIR_ENIGMA2, target)
+		allFiles = set(self.workList + self.alternatives + ["bouquets.tv", "bouquets.radio"])
 		print("[ChannelsImporter] processFiles Loading new channel list...")
-		for filename in allFiles:
-			self.copyFile(self.DIR_TMP + filename, self.DIR_ENIGMA2 + filename)
-			self.removeFiles(self.DIR_TMP, filename)
+		swapFiles(self.staging, self.DIR_ENIGMA2, allFiles, self.CHANNEL_FILES)
 		db = eDVBDB.getInstance()
 		db.reloadServicelist()
 		db.reloadBouquets()
+		bouquetIndex.invalidate()
 		print("[ChannelsImporter] processFiles New channel list loaded.")
 		self.checkEPG()
 
 	def checkEPG(self):
 		print("[ChannelsImporter] checkEPG Force EPG save on remote receiver...")
 		self.forceSaveEPGonRemoteReceiver()
-		print("[ChannelsImporter] checkEPG Searching for epg.dat...")
-		result = self.FTPdownloadFile(self.DIR_ENIGMA2, "settings", "settings")
-		if result:
-			self.checkEPGCallback()
-		else:
-			print("[ChannelsImporter] checkEPG Error fetching 'settings' file. Stopping script.")
-
-	def checkEPGCallback(self):
-		file = open(self.DIR_TMP + "settings")
-		lines = file.readlines()
-		file.close()
 		self.remoteEPGpath = self.DIR_ENIGMA2
-		self.remoteEPGfile = "epg"
-		self.remoteEPGfile = "%s.dat" % self.remoteEPGfile.replace('.dat', '')
+		self.remoteEPGfile = "epg.dat"
 		print("[ChannelsImporter] Remote EPG filename. '%s%s'" % (self.remoteEPGpath, self.remoteEPGfile))
-		self.removeFiles(self.DIR_TMP, "settings")
-		result = self.FTPdownloadFile(self.remoteEPGpath, self.remoteEPGfile, "epg.dat")
-		if result:
-			self.importEPGCallback()
-		else:
-			print("[ChannelsImporter] checkEPGCallback Download epg.dat from remote receiver failed. Check file exists on remote receiver.")
+		try:
+			self.fetcher.fetch([(self.remoteEPGfile, "epg.dat")], self.DIR_TMP)
+		except TransferError as err:
+			print("[ChannelsImporter] checkEPG Download epg.dat from remote receiver failed. Check file exists on remote receiver.", err)
+			return
+		self.importEPGCallback()
 
 	def importEPGCallback(self):
 		print("[ChannelsImporter] importEPGCallback '%s%s' downloaded successfully. " % (self.remoteEPGpath, self.remoteEPGfile))
@@ -289,7 +246,7 @@ class ChannelsImporter():
 		for filename in self.workList:
 			if filename != "lamedb":
 				try:
-					lines = open(self.DIR_TMP + filename).readlines()
+					lines = open(os.path.join(self.staging, filename)).readlines()
 					for line in lines:
 						if '#SERVICE' in line and int(line.split()[1].split(":")[1]) & eServiceReference.mustDescent:
 							result = re.match("^.*FROM BOUQUET \"(.+)\" ORDER BY.*$", line) or re.match("[#]SERVICE[:] (?:[0-9a-f]+[:])+([^:]+[.](?:tv|radio))$", line, re.IGNORECASE)
@@ -307,7 +264,6 @@ class ChannelsImporter():
 					os.remove(os.path.join(root, name))
 
 	def copyFile(self, source, dest):
-		import shutil
 		shutil.copy2(source, dest)
 
 	def getRemoteAddress(self):
@@ -319,20 +275,9 @@ class ChannelsImporter():
 	def FTPdownloadFile(self, sourcefolder, sourcefile, destfile):
 		print("[ChannelsImporter] Downloading remote file '%s'" % sourcefile)
 		try:
-			from ftplib import FTP
-			ftp = FTP()
-			ftp.set_pasv(config.clientmode.passive.value)
-			ftp.connect(host=self.getRemoteAddress(), port=config.clientmode.serverFTPPort.value, timeout=5)
-			ftp.login(user=config.clientmode.serverFTPusername.value, passwd=config.clientmode.serverFTPpassword.value)
-			ftp.cwd(sourcefolder)
-			with open(self.DIR_TMP + destfile, 'wb') as f:
-				result = ftp.retrbinary('RETR %s' % sourcefile, f.write)
-				ftp.quit()
-				f.close()
-				if result.startswith("226"):
-					return True
-			return False
-		except Exception as err:
+			self.fetcher.fetch([(os.path.join(sourcefolder, sourcefile), destfile)], self.DIR_TMP)
+			return True
+		except TransferError as err:
 			print("[ChannelsImporter] FTPdownloadFile Error:", err)
 			return False
 
@@ -1,12 +1,8 @@
 from Components.Converter.Converter import Converter
 from enigma import iServiceInformation
-from Tools.Directories import fileExists
+from Tools.GetEcmInfo import ecmInfo
 from Components.Element import cached
 from Components.Converter.Poll import Poll
-import os
-
-info = {}
-old_ecm_mtime = None
 
 class CaidInfo2(Poll, Converter, object):
 	CAID = 0
@@ -314,7 +310,7 @@ class CaidInfo2(Poll, Converter, object):
 				self.poll_interval = self.my_interval
 				self.poll_enabled = True
 				ecm_info = self.ecmfile()
-				if fileExists("/tmp/ecm.info"):
+				if ecmInfo.getStamp(ecmInfo.getPath(service)):
 					try:
 						caid = "%0.4X" % int(ecm_info.get("caid"),16)
 						return "%s" % self.systemTxtCaids.get(caid[:2])
@@ -478,126 +474,24 @@ class CaidInfo2(Poll, Converter, object):
 	text = property(getText)
 
 	def ecmfile(self):
-		global info
-		global old_ecm_mtime
-		ecm = None
 		service = self.source.service
 		if service:
-			try:
-				ecm_mtime = os.stat("/tmp/ecm.info").st_mtime
-				if not os.stat("/tmp/ecm.info").st_size > 0:
-					info = {}
-				if ecm_mtime == old_ecm_mtime:
-					return info
-				old_ecm_mtime = ecm_mtime
-				ecmf = open("/tmp/ecm.info", "r")
-				ecm = ecmf.readlines()
-			except:
-				old_ecm_mtime = None
-				info = {}
-				return info
+			return ecmInfo.getRecord(ecmInfo.getPath(service))
+		return {}
 
-			if ecm:
-				for line in ecm:
-					x = line.lower().find("msec")
-					#ecm time for mgcamd and oscam
-					if x != -1:
-						info["ecm time"] = line[0:x+4]
-					else:
-						item = line.split(":", 1)
-						if len(item) > 1:
-							#wicard block
-							if item[0] == "Provider":
-								item[0] = "prov"
-								item[1] = item[1].strip()[2:]
-							elif item[0] == "ECM PID":
-								item[0] = "pid"
-							elif item[0] == "response time":
-								info["source"] = "net"
-								it_tmp = item[1].strip().split(" ")
-								info["ecm time"] = "%s msec" % it_tmp[0]
-								y = it_tmp[-1].find('[')
-								if y !=-1:
-									info["server"] = it_tmp[-1][:y]
-									info["protocol"] = it_tmp[-1][y+1:-1]
-								#item[0]="port"
-								#item[1] = ""
-								y = it_tmp[-1].find('(')
-								if y !=-1:
-									info["server"] = it_tmp[-1].split("(")[-1].split(":")[0]
-									info["port"] = it_tmp[-1].split("(")[-1].split(":")[-1].rstrip(")")
-								elif y == -1:
-									item[0] = "source"
-									item[1] = "sci"
-								#y = it_tmp[-1].find('emu')
-								if it_tmp[-1].find('emu') >-1 or it_tmp[-1].find('cache') > -1 or it_tmp[-1].find('card') > -1 or it_tmp[-1].find('biss') > -1:
-									item[0] = "source"
-									item[1] = "emu"
-							elif item[0] == "hops":
-								item[1] = item[1].strip("\n")
-							elif item[0] == "system":
-								item[1] = item[1].strip("\n")
-							elif item[0] == "provider":
-								item[1] = item[1].strip("\n")
-							elif item[0][:2] == 'cw'or item[0] =='ChID' or item[0] == "Service":
-								pass
-							#mgcamd new_oscam block
-							elif item[0] == "source":
-								if item[1].strip()[:3] == "net":
-									it_tmp = item[1].strip().split(" ")
-									info["protocol"] = it_tmp[1][1:]
-									info["server"] = it_tmp[-1].split(":",1)[0]
-									info["port"] = it_tmp[-1].split(':',1)[1][:-1]
-									item[1] = "net"
-							elif item[0] == "prov":
-								y = item[1].find(",")
-								if y != -1:
-									item[1] = item[1][:y]
-							#old oscam block
-							elif item[0] == "reader":
-								if item[1].strip() == "emu":
-									item[0] = "source"
-							elif item[0] == "from":
-								if item[1].strip() == "local":
-									item[1] = "sci"
-									item[0] = "source"
-								else:
-									info["source"] = "net"
-									item[0] = "server"
-							#cccam block
-							elif item[0] == "provid":
-								item[0] = "prov"
-							elif item[0] == "using":
-								if item[1].strip() == "emu" or item[1].strip() == "sci":
-									item[0] = "source"
-								else:
-									info["source"] = "net"
-									item[0] = "protocol"
-							elif item[0] == "address":
-								tt = item[1].find(":")
-								if tt != -1:
-									info["server"] = item[1][:tt].strip()
-									item[0] = "port"
-									item[1] = item[1][tt+1:]
-							info[item[0].strip().lower()] = item[1].strip()
-						else:
-							if not 'caid' in info or not 'CaID' in info:
-								x = line.lower().find("caid")
-								if x != -1:
-									y = line.find(",")
-									if y != -1:
-										info["caid"] = line[x+5:y]
-							if not 'pid' in info:
-								x = line.lower().find("pid")
-								if x != -1:
-									y = line.find(" =")
-									z = line.find(" *")
-									if y != -1:
-										info["pid"] = line[x+4:y]
-									elif z != -1:
-										info["pid"] = line[x+4:z]
-				ecmf.close()
-		return info
+	def ecmChanged(self, path):
+		self.changed((self.CHANGED_POLL,))
+
+	def doSuspend(self, suspended):
+		Poll.doSuspend(self, suspended)
+		if suspended:
+			ecmInfo.unsubscribe(self.ecmChanged)
+		else:
+			ecmInfo.subscribe(self.ecmChanged)
+
+	def destroy(self):
+		ecmInfo.unsubscribe(self.ecmChanged)
+		Poll.destroy(self)
 
 	def changed(self, what):
 		Converter.changed(self, (self.CHANGED_POLL,))
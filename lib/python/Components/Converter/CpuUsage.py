@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 from Components.Converter.Converter import Converter
-from Components.Converter.Poll import Poll
 from Components.Element import cached
+from Components.SystemSampler import systemSampler
 
 
 class CpuUsage(Converter, object):
@@ -42,7 +42,7 @@ class CpuUsage(Converter, object):
 			cpuUsageMonitor.connectCallback(self.gotPercentage)
 
 	def gotPercentage(self, list):
-		self.percentlist = list
+		self.percentlist = list or []
 		self.changed((self.CHANGED_POLL,))
 
 	@cached
@@ -72,64 +72,15 @@ class CpuUsage(Converter, object):
 	range = 100
 
 
-class CpuUsageMonitor(Poll, object):
-
-	def __init__(self):
-		Poll.__init__(self)
-		self.__callbacks = [ ]
-		self.__curr_info = self.getCpusInfo()
-		self.poll_interval = 500
-
+class CpuUsageMonitor(object):
 	def getCpusCount(self):
-		return len(self.__curr_info) - 1
-
-	def getCpusInfo(self):
-		res = []
-		try:
-			fd = open("/proc/stat", "r")
-			for l in fd:
-				if l.find("cpu") == 0:
-					total = busy = 0
-					# tmp = [cpu, usr, nic, sys, idle, iowait, irq, softirq, steal]
-					tmp = l.split()
-					for i in range(1, len(tmp)):
-						tmp[i] = int(tmp[i])
-						total += tmp[i]
-					# busy = total - idle - iowait
-					busy = total - tmp[4] - tmp[5]
-					# append [cpu, total, busy]
-					res.append([tmp[0], total, busy])
-			fd.close()
-		except:
-			pass
-		return res
-
-	def poll(self):
-		prev_info, self.__curr_info = self.__curr_info, self.getCpusInfo()
-		if len(self.__callbacks):
-			info = [ ]
-			for i in range(len(self.__curr_info)):
-				# xxx% = (cur_xxx - prev_xxx) / (cur_total - prev_total) * 100
-				try:
-					p = 100 * ( self.__curr_info[i][2] - prev_info[i][2] ) / ( self.__curr_info[i][1] - prev_info[i][1] )
-				except ZeroDivisionError:
-					p = 0
-				info.append(p)
-			for f in self.__callbacks:
-				f(info)
+		return len(systemSampler.get("cpu") or []) - 1
 
 	def connectCallback(self, func):
-		if not func in self.__callbacks:
-			self.__callbacks.append(func)
-		if not self.poll_enabled:
-			self.poll()
-			self.poll_enabled = True
+		systemSampler.subscribe("cpu", func)
 
 	def disconnectCallback(self, func):
-		if func in self.__callbacks:
-			self.__callbacks.remove(func)
-		if not len(self.__callbacks) and self.poll_enabled:
-			self.poll_enabled = False
+		systemSampler.unsubscribe("cpu", func)
 
 
 cpuUsageMonitor = CpuUsageMonitor()
@@ -7,6 +7,27 @@ from enigma import eServiceCenter, eServiceReference, iServiceInformation, eDVBF
 from string import upper
 import gettext
 from Components.Converter.Poll import Poll
+from Tools.GetEcmInfo import ecmInfo
+
+
+def parseEcmFile(lines):
+	info = {}
+	for line in lines:
+		x = line.lower().find('msec')
+		if x != -1:
+			info['ecm time'] = line[0:x + 4]
+		else:
+			item = line.split(':', 1)
+			if len(item) > 1:
+				info[item[0].strip().lower()] = item[1].strip()
+			elif not 'caid' in info:
+				x = line.lower().find('caid')
+				if x != -1:
+					y = line.find(',')
+					if y != -1:
+						info['caid'] = line[x + 5:y]
+	return info
+
 
 class ExtremeInfo(Poll, Converter, object):
 	TUNERINFO = 0
@@ -289,10 +310,7 @@ class ExtremeInfo(Poll, Converter, object):
 		return False
 
 	def getEmu(self):
-		try:
-			content = open("/tmp/ecm.info", "r").read()
-		except:
-			content = ''
+		content = self.ecmContent()
 
 		contentInfo = content.split('\n')
 		for line in contentInfo:
@@ -308,10 +326,7 @@ class ExtremeInfo(Poll, Converter, object):
 		return False
 
 	def getCrd(self):
-		try:
-			content = open("/tmp/ecm.info", "r").read()
-		except:
-			content = ''
+		content = self.ecmContent()
 
 		contentInfo = content.split('\n')
 		for line in contentInfo:
@@ -327,10 +342,7 @@ class ExtremeInfo(Poll, Converter, object):
 		return False
 
 	def getNet(self):
-		try:
-			content = open("/tmp/ecm.info", "r").read()
-		except:
-			content = ''
+		content = self.ecmContent()
 
 		contentInfo = content.split('\n')
 		for line in contentInfo:
@@ -351,10 +363,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -388,10 +397,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -425,10 +431,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -462,10 +465,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -499,10 +499,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -536,10 +533,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -573,10 +567,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -610,10 +601,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -647,10 +635,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -684,10 +669,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -721,10 +703,7 @@ class ExtremeInfo(Poll, Converter, object):
 		if service:
 			info = service and service.info()
 			if info:
-				try:
-					content = open("/tmp/ecm.info", "r").read()
-				except:
-					content = ''
+				content = self.ecmContent()
 
 				contentInfo = content.split('\n')
 				if content == '':
@@ -1105,38 +1084,13 @@ class ExtremeInfo(Poll, Converter, object):
 	def ecmfile(self):
 		self.poll_interval = 2000
 		self.poll_enabled = True
-		ecm = None
-		info = {}
 		service = self.source.service
-		if service:
-			frontendInfo = service.frontendInfo()
-			if frontendInfo:
-				try:
-					ecmpath = '/tmp/ecm%s.info' % frontendInfo.getAll(False).get('tuner_number')
-					ecm = open(ecmpath, 'rb').readlines()
-				except:
-					try:
-						ecm = open('/tmp/ecm.info', 'rb').readlines()
-					except:
-						pass
-
-			if ecm:
-				for line in ecm:
-					x = line.lower().find('msec')
-					if x != -1:
-						info['ecm time'] = line[0:x + 4]
-					else:
-						item = line.split(':', 1)
-						if len(item) > 1:
-							info[item[0].strip().lower()] = item[1].strip()
-						elif not 'caid' in info:
-							x = line.lower().find('caid')
-							if x != -1:
-								y = line.find(',')
-								if y != -1:
-									info['caid'] = line[x + 5:y]
-
-		return info
+		if service and service.frontendInfo():
+			return ecmInfo.getRecord(ecmInfo.getPath(service), parseEcmFile)
+		return {}
+
+	def ecmContent(self):
+		return ecmInfo.getContent(ecmInfo.getPath(self.source.service))
 
 	def parseEcmInfoLine(self, line):
 		if line.__contains__(':'):
@@ -1171,6 +1125,20 @@ class ExtremeInfo(Poll, Converter, object):
 	def changed(self, what):
 		Converter.changed(self, what)
 
+	def ecmChanged(self, path):
+		self.changed((self.CHANGED_POLL,))
+
+	def doSuspend(self, suspended):
+		Poll.doSuspend(self, suspended)
+		if suspended:
+			ecmInfo.unsubscribe(self.ecmChanged)
+		else:
+			ecmInfo.subscribe(self.ecmChanged)
+
+	def destroy(self):
+		ecmInfo.unsubscribe(self.ecmChanged)
+		Poll.destroy(self)
+
 	def getServiceNumber(self, name, ref):
 		list = []
 		if ref.startswith('1:0:2'):
@@ -1,22 +1,142 @@
+from time import time
+
 from enigma import eTimer
 
+# All Poll converters share one timer.  Converters with the same interval are
+# grouped, the groups are aligned to multiples of their interval so that e.g.
+# the 500ms and the 1000ms group fire in the same pass, and every pass polls a
+# converter at most once.  While the box is in standby nothing is polled,
+# except for converters that set poll_standby (front panel clocks and such).
+
+COALESCE = 20  # Milliseconds, groups due within this window fire together.
+
+
+class PollGroup:
+	def __init__(self, interval):
+		self.interval = interval
+		self.pollers = []
+		self.due = 0
+
+	def schedule(self, now):
+		interval = self.interval / 1000.0
+		self.due = (int(now / interval) + 1) * interval
+
+
+class PollScheduler:
+	def __init__(self):
+		self.groups = {}
+		self.timer = eTimer()
+		self.timer.callback.append(self.tick)
+		self.standby = False
+		self.standbyNotifier = False
+
+	def add(self, poller, interval):
+		group = self.groups.get(interval)
+		if group is None:
+			group = self.groups[interval] = PollGroup(interval)
+			group.schedule(time())
+		if poller not in group.pollers:
+			group.pollers.append(poller)
+		if not self.standbyNotifier:
+			self.addStandbyNotifier()
+		self.reschedule()
+
+	def remove(self, poller, interval):
+		group = self.groups.get(interval)
+		if group and poller in group.pollers:
+			group.pollers.remove(poller)
+			if not group.pollers:
+				del self.groups[interval]
+			self.reschedule()
+
+	def addStandbyNotifier(self):
+		from Components.config import config
+		if hasattr(config.misc, "standbyCounter"):
+			config.misc.standbyCounter.addNotifier(self.standbyCounterChanged, initial_call=False)
+			self.standbyNotifier = True
+
+	def standbyCounterChanged(self, configElement):
+		from Screens.Standby import inStandby
+		if inStandby and self.leaveStandby not in inStandby.onClose:
+			inStandby.onClose.append(self.leaveStandby)
+			self.standby = True
+
+	def leaveStandby(self):
+		self.standby = False
+		self.poll([group.pollers for group in self.groups.values()])
+		self.reschedule()
+
+	def reschedule(self):
+		if self.groups:
+			delay = min(group.due for group in self.groups.values()) - time()
+			self.timer.start(max(int(delay * 1000), 0), True)
+		else:
+			self.timer.stop()
+
+	def tick(self):
+		now = time()
+		due = []
+		for group in self.groups.values():
+			if group.due - now > group.interval / 1000.0:  # The clock was set back.
+				group.schedule(now)
+			elif group.due <= now + COALESCE / 1000.0:
+				due.append(group.pollers)
+				group.schedule(now)
+		self.poll(due)
+		self.reschedule()
+
+	def poll(self, groups):
+		batch = []
+		for pollers in groups:
+			for poller in pollers:
+				if poller.poll_standby or not self.standby:
+					batch.append(poller)
+		members = set(batch)
+		seen = set()
+		for poller in batch:
+			if poller in seen:
+				continue
+			seen.add(poller)
+			# A converter further up the chain passes its poll down anyway,
+			# unless this one does more than that on a poll (ConverterRotator).
+			source = None
+			if getattr(poller.poll, "__func__", None) is Poll.__dict__["poll"]:
+				source = getattr(poller, "source", None)
+				while source is not None and source not in members:
+					source = getattr(source, "source", None)
+			if source is None:
+				poller.poll()
+
+
+pollScheduler = PollScheduler()
+
+
 class Poll(object):
+	poll_standby = False
+
 	def __init__(self):
-		self.__poll_timer = eTimer()
-		self.__poll_timer.callback.append(self.poll)
 		self.__interval = 1000
 		self.__enabled = False
+		self.__suspended = False
+		self.__active = False
 
 	def __setInterval(self, interval):
+		if self.__active and interval != self.__interval:
+			pollScheduler.remove(self, self.__interval)
+			self.__active = False
 		self.__interval = interval
-		if self.__enabled:
-			self.__poll_timer.start(self.__interval)
-		else:
-			self.__poll_timer.stop()
+		self.__setActive(self.__enabled and not self.__suspended)
 
 	def __setEnable(self, enabled):
 		self.__enabled = enabled
-		self.poll_interval = self.__interval
+		self.__setActive(enabled and not self.__suspended)
+
+	def __setActive(self, active):
+		if active and not self.__active:
+			pollScheduler.add(self, self.__interval)
+		elif self.__active and not active:
+			pollScheduler.remove(self, self.__interval)
+		self.__active = active
 
 	poll_interval = property(lambda self: self.__interval, __setInterval)
 	poll_enabled = property(lambda self: self.__enabled, __setEnable)
@@ -25,12 +145,13 @@ class Poll(object):
 		self.changed((self.CHANGED_POLL,))
 
 	def doSuspend(self, suspended):
+		self.__suspended = suspended
 		if self.__enabled:
 			if suspended:
-				self.__poll_timer.stop()
+				self.__setActive(False)
 			else:
 				self.poll()
-				self.poll_enabled = True
+				self.__setActive(True)
 
 	def destroy(self):
-		self.__poll_timer.callback.remove(self.poll)
+		self.__setActive(False)
@@ -3,6 +3,7 @@ from Components.Converter.Converter import Converter
 from enigma import iServiceInformation, iPlayableService, iPlayableServicePtr, eServiceReference, eServiceCenter, eTimer, getBestPlayableServiceReference
 from Components.Element import cached
 from Components.config import config
+from Components.BouquetIndex import bouquetIndex
 import NavigationInstance
 try:
 	from Components.Renderer.ChannelNumber import ChannelNumberClasses
@@ -57,57 +58,14 @@ class ServiceName2(Converter, object):
 		self.AlternativeControl = self.isAdditionalService(type=1)
 
 	def isAdditionalService(self, type=0):
-		def searchService(serviceHandler, bouquet):
-			istype = False
-			servicelist = serviceHandler.list(bouquet)
-			if not servicelist is None:
-				while True:
-					s = servicelist.getNext()
-					if not s.valid(): break
-					if not (s.flags & (eServiceReference.isMarker|eServiceReference.isDirectory)):
-						if type:
-							if s.flags & eServiceReference.isGroup:
-								istype = True
-								return istype
-						else:
-							if "%3a//" in s.toString().lower():
-								istype = True
-								return istype
-			return istype
-
-		isService = False
-		serviceHandler = eServiceCenter.getInstance()
 		if not config.usage.multibouquet.value:
 			service_types_tv = '1:7:1:0:0:0:0:0:0:0:(type == 1) || (type == 17) || (type == 22) || (type == 25) || (type == 134) || (type == 195)'
-			rootstr = '%s FROM BOUQUET "userbouquet.favourites.tv" ORDER BY bouquet'%(service_types_tv)
-		else:
-			rootstr = '1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'
-		bouquet = eServiceReference(rootstr)
-		if not config.usage.multibouquet.value:
-			isService = searchService(serviceHandler, bouquet)
+			bouquet = bouquetIndex.getBouquet(eServiceReference('%s FROM BOUQUET "userbouquet.favourites.tv" ORDER BY bouquet' % service_types_tv))
 		else:
-			bouquetlist = serviceHandler.list(bouquet)
-			if not bouquetlist is None:
-				while True:
-					bouquet = bouquetlist.getNext()
-					if not bouquet.valid(): break
-					if bouquet.flags & eServiceReference.isDirectory:
-						isService = searchService(serviceHandler, bouquet)
-						if isService: break
-		return isService
+			bouquet = bouquetIndex.getRoot(eServiceReference('1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'))
+		return bouquet.hasGroups if type else bouquet.hasStreams
 
 	def getServiceNumber(self, ref):
-		def searchHelper(serviceHandler, num, bouquet):
-			servicelist = serviceHandler.list(bouquet)
-			if not servicelist is None:
-				while True:
-					s = servicelist.getNext()
-					if not s.valid(): break
-					if not (s.flags & (eServiceReference.isMarker|eServiceReference.isDirectory)):
-						num += 1
-						if s == ref: return s, num
-			return None, num
-
 		if isinstance(ref, eServiceReference):
 			isRadioService = ref.getData(0) in (2, 10)
 			lastpath = isRadioService and config.radio.lastroot.value or config.tv.lastroot.value
@@ -126,30 +84,20 @@ class ServiceName2(Converter, object):
 			rootstr = ''
 			for x in lastpath.split(';'):
 				if x != '': rootstr = x
-			serviceHandler = eServiceCenter.getInstance()
 			if acount is True or not config.usage.multibouquet.value:
-				bouquet = eServiceReference(rootstr)
-				service, number = searchHelper(serviceHandler, 0, bouquet)
+				bouquet = bouquetIndex.getBouquet(eServiceReference(rootstr))
+				number = bouquet.positions.get(ref.toCompareString())
+				if number:
+					return number, bouquet.name
 			else:
 				if isRadioService:
 					bqrootstr = '1:7:2:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.radio" ORDER BY bouquet'
 				else:
 					bqrootstr = '1:7:1:0:0:0:0:0:0:0:FROM BOUQUET "bouquets.tv" ORDER BY bouquet'
-				number = 0
-				cur = eServiceReference(rootstr)
-				bouquet = eServiceReference(bqrootstr)
-				bouquetlist = serviceHandler.list(bouquet)
-				if not bouquetlist is None:
-					while True:
-						bouquet = bouquetlist.getNext()
-						if not bouquet.valid(): break
-						if bouquet.flags & eServiceReference.isDirectory:
-							service, number = searchHelper(serviceHandler, number, bouquet)
-							if not service is None and cur == bouquet: break
-			if not service is None:
-				info = serviceHandler.info(bouquet)
-				name = info and info.getName(bouquet) or ''
-				return number, name
+				found = bouquetIndex.getRoot(eServiceReference(bqrootstr)).getPosition(ref, eServiceReference(rootstr))
+				if found:
+					number, bouquet = found
+					return number, bouquetIndex.getBouquet(bouquet).name
 		return 0, ''
 
 	def getProviderName(self, ref):
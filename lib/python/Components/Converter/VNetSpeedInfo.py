@@ -3,9 +3,9 @@
 from Components.Label import Label
 from Components.Converter.Converter import Converter
 from Components.Element import cached
-from Components.Converter.Poll import Poll
+from Components.SystemSampler import systemSampler
 
-class VNetSpeedInfo(Poll, Converter, object):
+class VNetSpeedInfo(Converter, object):
 	RCL = 0
 	TML = 1
 	RCW = 2
@@ -35,9 +35,6 @@ class VNetSpeedInfo(Poll, Converter, object):
 	DRO_TMW = 26
 
 	def __init__(self, type, update_interval = 1000):
-		Poll.__init__(self)
-		self.poll_interval = 1500
-		self.poll_enabled = True
 		self.lanreceivetotal = 0
 		self.lanreceivetotalout = 0
 		self.lanreceive = 0
@@ -59,6 +56,9 @@ class VNetSpeedInfo(Poll, Converter, object):
 		self.transmittotal = 0
 		self.transmit = 0
 		self.receivemb = 0
+		self.transmitmb = 0
+		self.receivetotalout = 0
+		self.transmittotalout = 0
 		self.nettyp = 'NONE'
 		self.error_lanreceive = 0
 		self.drop_lanreceive = 0
@@ -137,93 +137,38 @@ class VNetSpeedInfo(Poll, Converter, object):
 	def updateNetSpeedInfoStatus(self):
 		flaglan = 0
 		flagwlan = 0
-		bwm = open('/proc/net/dev')
-		bw = bwm.readline()
-		bw = bwm.readline()
-		sp = []
-		while bw:
-			bw = bwm.readline()
-			while bw.find('  ') is not -1:
-				bw = bw.replace('  ', ' ')
-
-			if bw.find('eth') is not -1:
+		for name, data in sorted((systemSampler.get("net") or {}).items()):
+			if name.find('eth') is not -1:
 				flaglan = 1
-				sp = bw.split(':')
-				bw = sp[1].lstrip()
-				sp = bw.split(' ')
-				if len(sp[0]) is 0:
-					sp[0] = '0'
-				if len(sp[2]) is 0:
-					sp[2] = '0'
-				if len(sp[3]) is 0:
-					sp[3] = '0'
-				if len(sp[8]) is 0:
-					sp[8] = '0'
-				if len(sp[10]) is 0:
-					sp[10] = '0'
-				if len(sp[11]) is 0:
-					sp[11] = '0'
-				newlanreceive = int(sp[0]) / 1024
-				self.error_lanrecive = int(sp[2])
-				self.drop_lanreceive = int(sp[3])
-				if self.lanreceivetotal > 0:
-					self.lanreceive = float(newlanreceive - self.lanreceivetotal) * 8 / 1024
-					self.lanreceivemb = float(newlanreceive - self.lanreceivetotal) / 1024
-				else:
-					self.lanreceive = 0
-				self.lanreceivetotal = newlanreceive
-				self.lanreceivetotalout = newlanreceive / 1024
-				newlantransmit = int(sp[8]) / 1024
-				self.error_lantransmite = int(sp[10])
-				self.drop_lantransmite = int(sp[11])
-				if self.lantransmittotal > 0:
-					self.lantransmit = float(newlantransmit - self.lantransmittotal) * 8 / 1024
-					self.lantransmitmb = float(newlantransmit - self.lantransmittotal) / 1024
-				else:
-					self.lantransmit = 0
-				self.lantransmittotal = newlantransmit
-				self.lantransmittotalout = newlantransmit / 1024
+				self.error_lanreceive = data["rxErrors"]
+				self.drop_lanreceive = data["rxDrops"]
+				self.lanreceive = float(data["rxRate"]) * 8 / 1048576
+				self.lanreceivemb = float(data["rxRate"]) / 1048576
+				self.lanreceivetotal = data["rx"] / 1024
+				self.lanreceivetotalout = self.lanreceivetotal / 1024
+				self.error_lantransmite = data["txErrors"]
+				self.drop_lantransmite = data["txDrops"]
+				self.lantransmit = float(data["txRate"]) * 8 / 1048576
+				self.lantransmitmb = float(data["txRate"]) / 1048576
+				self.lantransmittotal = data["tx"] / 1024
+				self.lantransmittotalout = self.lantransmittotal / 1024
 				if self.lantransmittotal + self.lanreceivetotal == 0:
 					flaglan = 0
-			if bw.find('ra') is not -1 or bw.find('wlan') is not -1 or bw.find('wifi') is not -1:
+			if name.find('ra') is not -1 or name.find('wlan') is not -1 or name.find('wifi') is not -1:
 				flagwlan = 1
-				sp = bw.split(':')
-				bw = sp[1].lstrip()
-				sp = bw.split(' ')
-				if len(sp[0]) is 0:
-					sp[0] = '0'
-				if len(sp[2]) is 0:
-					sp[2] = '0'
-				if len(sp[3]) is 0:
-					sp[3] = '0'
-				if len(sp[8]) is 0:
-					sp[8] = '0'
-				if len(sp[10]) is 0:
-					sp[10] = '0'
-				if len(sp[11]) is 0:
-					sp[11] = '0'
-				newwlanreceive = int(sp[0]) / 1024
-				self.error_wlanrecive = int(sp[2])
-				self.drop_wlanreceive = int(sp[3])
-				if self.wlanreceivetotal > 0:
-					self.wlanreceive = float(newwlanreceive - self.wlanreceivetotal) * 8 / 1024
-					self.wlanreceivemb = float(newwlanreceive - self.wlanreceivetotal) / 1024
-				else:
-					self.wlanreceive = 0
-				self.wlanreceivetotal = newwlanreceive
-				self.wlanreceivetotalout = newwlanreceive / 1024
-				newwlantransmit = int(sp[8]) / 1024
-				self.error_wlantransmite = int(sp[10])
-				self.drop_wlantransmite = int(sp[11])
-				if self.wlantransmittotal > 0:
-					self.wlantransmit = float(newwlantransmit - self.wlantransmittotal) * 8 / 1024
-					self.wlantransmitmb = float(newwlantransmit - self.wlantransmittotal) / 1024
-				else:
-					self.wlantransmit = 0
-				self.wlantransmittotal = newwlantransmit
-				self.wlantransmittotalout = newwlantransmit / 1024
+				self.error_wlanreceive = data["rxErrors"]
+				self.drop_wlanreceive = data["rxDrops"]
+				self.wlanreceive = float(data["rxRate"]) * 8 / 1048576
+				self.wlanreceivemb = float(data["rxRate"]) / 1048576
+				self.wlanreceivetotal = data["rx"] / 1024
+				self.wlanreceivetotalout = self.wlanreceivetotal / 1024
+				self.error_wlantransmite = data["txErrors"]
+				self.drop_wlantransmite = data["txDrops"]
+				self.wlantransmit = float(data["txRate"]) * 8 / 1048576
+				self.wlantransmitmb = float(data["txRate"]) / 1048576
+				self.wlantransmittotal = data["tx"] / 1024
+				self.wlantransmittotalout = self.wlantransmittotal / 1024
 
-		bwm.close()
 		if flaglan == 1:
 			self.receive = self.lanreceive
 			self.transmit = self.lantransmit
@@ -239,6 +184,8 @@ class VNetSpeedInfo(Poll, Converter, object):
 			self.receivetotal = self.wlanreceivetotal
 			self.transmittotal = self.wlantransmittotal
 			self.nettyp = 'WLAN'
+		self.receivetotalout = self.receivetotal / 1024
+		self.transmittotalout = self.transmittotal / 1024
 		if flaglan == 1 or flagwlan == 1:
 			self.receivemb = self.receive / 8
 			self.transmitmb = self.transmit / 8
@@ -297,6 +244,15 @@ class VNetSpeedInfo(Poll, Converter, object):
 		if self.type == self.DRO_TMW:
 			return '%d' % self.drop_wlantransmite
 
+	def doSuspend(self, suspended):
+		if suspended:
+			systemSampler.unsubscribe("net", self.gotNetInfo)
+		else:
+			systemSampler.subscribe("net", self.gotNetInfo)
+
+	def gotNetInfo(self, net):
+		self.changed((self.CHANGED_POLL,))
+
 	def changed(self, what):
 		if what[0] == self.CHANGED_POLL:
 			Converter.changed(self, what)
@@ -5,6 +5,8 @@ from Components.Element import cached
 
 
 class VfdDisplay(Poll, Converter, object):
+	poll_standby = True  # Shows the clock in the standby summary.
+
 	def __init__(self, type):
 		Converter.__init__(self, type)
 		Poll.__init__(self)
@@ -1,6 +1,7 @@
 from Components.Converter.Converter import Converter
 from Components.Element import cached
 from Components.Converter.Poll import Poll
+from Components.SystemSampler import systemSampler
 
 class VtiTempFan(Poll, Converter, object):
 	TEMPINFO = 1
@@ -32,24 +33,14 @@ class VtiTempFan(Poll, Converter, object):
 	text = property(getText)
 
 	def tempfile(self):
-		temp = ''
-		unit = ''
-		try:
-			temp = open("/proc/stb/sensors/temp0/value", "rb").readline().strip()
-			unit = open("/proc/stb/sensors/temp0/unit", "rb").readline().strip()
-			tempinfo = 'TEMP: ' + str(temp) + ' \xc2\xb0' + str(unit)
-			return tempinfo
-		except:
-			pass
+		sensor = (systemSampler.get("sensors") or {}).get("temp0")
+		if sensor:
+			return 'TEMP: ' + str(sensor[0]) + ' \xc2\xb0' + str(sensor[1])
 
 	def fanfile(self):
-		fan = ''
-		try:
-			fan = open("/proc/stb/fp/fan_speed", "rb").readline().strip()
-			faninfo = 'FAN: ' + str(fan)
-			return faninfo
-		except:
-			pass
+		fan = systemSampler.get("fan")
+		if fan is not None:
+			return 'FAN: ' + str(fan)
 
 	def changed(self, what):
 		if what[0] == self.CHANGED_POLL:
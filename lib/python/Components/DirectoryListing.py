@@ -0,0 +1,116 @@
+from __future__ import print_function
+import os
+import stat
+import time
+from collections import OrderedDict
+
+# The listings of the directories the file lists show.  A directory is read
+# with scandir(), which takes the type of the entries from the directory
+# itself (d_type) on most file systems instead of a stat() per entry, and its
+# listing is kept until the modification time of the directory changes, so
+# going back to a directory or refreshing a file list does not read it again.
+#
+# Listings of directories that were modified in the last seconds are not
+# kept, a change within the same second (two on FAT) would not change the
+# modification time.
+
+try:
+	from os import scandir
+except ImportError:
+	try:
+		from scandir import scandir
+	except ImportError:
+		scandir = None
+
+MAX_LISTINGS = 16
+RECENT = 2  # Seconds.
+
+
+class Entry:
+	"""The part of os.DirEntry the listings use, for Pythons without
+	scandir().  One lstat() per entry, a stat() more for symbolic links."""
+
+	def __init__(self, directory, name):
+		self.name = name
+		self.path = os.path.join(directory, name)
+		self.mode = None
+
+	def is_symlink(self):
+		if self.mode is None:
+			self.mode = os.lstat(self.path).st_mode
+		return stat.S_ISLNK(self.mode)
+
+	def is_dir(self):
+		if self.is_symlink():
+			return os.path.isdir(self.path)
+		return stat.S_ISDIR(self.mode)
+
+
+def listEntries(directory):
+	if scandir is not None:
+		return scandir(directory)
+	return [Entry(directory, name) for name in os.listdir(directory)]
+
+
+class Listing:
+	"""The sorted names of the sub directories and of the other entries of a
+	directory.  links are the names of the sub directories that are symbolic
+	links, their real paths are not below the real path of the directory."""
+
+	def __init__(self, directory, status):
+		self.directory = directory
+		self.key = (status.st_mtime, status.st_ino, status.st_dev)
+		self.directories = []
+		self.files = []
+		self.links = set()
+		self.matches = {}
+		for entry in listEntries(directory):
+			try:
+				if entry.is_dir():
+					self.directories.append(entry.name)
+					if entry.is_symlink():
+						self.links.add(entry.name)
+					continue
+			except OSError:  # Gone, or a dangling link.
+				pass
+			self.files.append(entry.name)
+		self.directories.sort()
+		self.files.sort()
+
+	def getFiles(self, pattern=None):
+		"""Return the files whose paths match the compiled pattern."""
+		if pattern is None:
+			return self.files
+		files = self.matches.get(pattern)
+		if files is None:
+			directory = self.directory
+			files = self.matches[pattern] = [x for x in self.files if pattern.search(directory + x)]
+		return files
+
+
+class DirectoryCache:
+	def __init__(self, size=MAX_LISTINGS):
+		self.size = size
+		self.listings = OrderedDict()  # The least recently used first.
+
+	def getListing(self, directory):
+		"""Return the Listing of directory, which ends with a "/".  Raises
+		OSError when it can not be read."""
+		status = os.stat(directory)
+		listing = self.listings.pop(directory, None)
+		if listing is None or listing.key != (status.st_mtime, status.st_ino, status.st_dev):
+			listing = Listing(directory, status)
+		if time.time() - status.st_mtime >= RECENT:
+			self.listings[directory] = listing
+			while len(self.listings) > self.size:
+				self.listings.popitem(last=False)
+		return listing
+
+	def invalidate(self, directory=None):
+		if directory is None:
+			self.listings.clear()
+		else:
+			self.listings.pop(directory, None)
+
+
+directoryCache = DirectoryCache()
@@ -1,10 +1,11 @@
 from __future__ import print_function
 import os
 import re
+from Components.DirectoryListing import directoryCache
 from Components.MenuList import MenuList
 from Components.Harddisk import harddiskmanager
-from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename, fileExists
-from enigma import RT_HALIGN_LEFT, eListboxPythonMultiContent, eServiceReference, eServiceCenter, gFont
+from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename
+from enigma import RT_HALIGN_LEFT, eListboxPythonMultiContent, eServiceReference, eServiceCenter, eTimer, gFont
 from Tools.LoadPixmap import LoadPixmap
 import skin
 
@@ -64,6 +65,11 @@ EXTENSIONS = {
 		"wtv": "movie",
 	}
 
+# The entries of large directories are built in steps, the first page is shown
+# at once and the rest is added while the user can already move around.
+FIRST_PAGE = 100
+POPULATE_STEP = 500
+
 def FileEntryComponent(name, absolute = None, isDir = False):
 	res = [ (absolute, isDir) ]
 	x, y, w, h = skin.parameters.get("FileListName", (35, 1, 600, 20))
@@ -84,6 +90,8 @@ def FileEntryComponent(name, absolute = None, isDir = False):
 	return res
 
 class FileList(MenuList):
+	showNothingConnected = True
+
 	def __init__(self, directory, showDirectories = True, showFiles = True, showMountpoints = True, matchingPattern = None, useServiceRef = False, inhibitDirs = False, inhibitMounts = False, isTop = False, enableWrapAround = False, additionalExtensions = None):
 		MenuList.__init__(self, list, enableWrapAround, eListboxPythonMultiContent)
 		self.additional_extensions = additionalExtensions
@@ -105,6 +113,10 @@ class FileList(MenuList):
 			self.matchingPattern = None
 		self.inhibitDirs = inhibitDirs or []
 		self.inhibitMounts = inhibitMounts or []
+		self.pending = []  # (name, absolute, isDir) of the entries not built yet.
+		self.pendingIndex = 0
+		self.populateTimer = eTimer()
+		self.populateTimer.callback.append(self.populateMore)
 
 		self.refreshMountpoints()
 		self.changeDir(directory)
@@ -118,7 +130,9 @@ class FileList(MenuList):
 		self.mountpoints.sort(reverse = True)
 
 	def getMountpoint(self, file):
-		file = os.path.join(os.path.realpath(file), "")
+		return self.getRealMountpoint(os.path.join(os.path.realpath(file), ""))
+
+	def getRealMountpoint(self, file):
 		for m in self.mountpoints:
 			if file.startswith(m):
 				return m
@@ -151,16 +165,52 @@ class FileList(MenuList):
 			return self.serviceHandler.info(l[0][0]).getEvent(l[0][0])
 
 	def getFileList(self):
+		if self.pending:
+			self.populate(len(self.pending))
+			self.l.setList(self.list)
 		return self.list
 
 	def inParentDirs(self, dir, parents):
-		dir = os.path.realpath(dir)
+		return self.inRealParentDirs(os.path.realpath(dir), parents)
+
+	def inRealParentDirs(self, dir, parents):
 		for p in parents:
 			if dir.startswith(p):
 				return True
 		return False
 
+	def isInhibited(self, path, realPath=None):
+		# realPath is that of path without the trailing "/", if it is known.
+		if not self.inhibitMounts and not self.inhibitDirs:
+			return False
+		if realPath is None:
+			realPath = os.path.realpath(path)
+		return bool(self.inhibitMounts and self.getRealMountpoint(os.path.join(realPath, "")) in self.inhibitMounts or self.inRealParentDirs(realPath, self.inhibitDirs))
+
+	def buildEntry(self, name, absolute, isDir):
+		return FileEntryComponent(name = name, absolute = absolute, isDir = isDir)
+
+	def populate(self, count):
+		end = min(self.pendingIndex + count, len(self.pending))
+		self.list.extend([self.buildEntry(*x) for x in self.pending[self.pendingIndex:end]])
+		self.pendingIndex = end
+		if end == len(self.pending):
+			self.pending = []
+			self.pendingIndex = 0
+
+	def populateMore(self):
+		self.populate(POPULATE_STEP)
+		self.l.setList(self.list)
+		if self.pending:
+			self.populateTimer.start(0, True)
+
+	def stopPopulating(self):
+		self.populateTimer.stop()
+		self.pending = []
+		self.pendingIndex = 0
+
 	def changeDir(self, directory, select = None):
+		self.stopPopulating()
 		self.list = []
 
 		# if we are just entering from the list of mount points:
@@ -172,17 +222,15 @@ class FileList(MenuList):
 		self.current_directory = directory
 		directories = []
 		files = []
+		entries = []
 
 		if directory is None and self.showMountpoints: # present available mountpoints
 			for p in harddiskmanager.getMountedPartitions():
 				path = os.path.join(p.mountpoint, "")
 				if path not in self.inhibitMounts and not self.inParentDirs(path, self.inhibitDirs):
-					self.list.append(FileEntryComponent(name = p.description, absolute = path, isDir = True))
-			files = [ ]
-			directories = [ ]
+					entries.append((p.description, path, True))
 		elif directory is None:
-			files = [ ]
-			directories = [ ]
+			pass
 		elif self.useServiceRef:
 			# we should not use the 'eServiceReference(string)' constructor, because it doesn't allow ':' in the directoryname
 			root = eServiceReference(2, 0, directory)
@@ -197,23 +245,30 @@ class FileList(MenuList):
 					del list
 					break
 				if s.flags & s.mustDescent:
-					directories.append(s.getPath())
-				else:
+					if self.showDirectories and not self.isInhibited(s.getPath()):
+						directories.append(s.getPath())
+				elif self.showFiles and (self.matchingPattern is None or self.matchingPattern.search(s.getPath())):
 					files.append(s)
 			directories.sort()
 			files.sort()
+			entries = [(x.split('/')[-2], x, True) for x in directories] + [(x.getPath().split('/')[-1], x, False) for x in files]
 		else:
-			if fileExists(directory):
-				try:
-					files = os.listdir(directory)
-				except:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if os.path.isdir(directory + x):
-						directories.append(directory + x + "/")
-						files.remove(x)
+			try:
+				listing = directoryCache.getListing(directory)
+			except OSError as err:
+				print("[FileList] Error: Unable to list '%s'! (%s)" % (directory, err))
+				listing = None
+			if listing and self.showDirectories:
+				realDirectory = os.path.join(os.path.realpath(directory), "")
+				for x in listing.directories:
+					if x in listing.links:
+						inhibited = self.isInhibited(directory + x)
+					else:
+						inhibited = self.isInhibited(directory + x, realDirectory + x)
+					if not inhibited:
+						entries.append((x, directory + x + "/", True))
+			if listing and self.showFiles:
+				entries += [(x, x, False) for x in listing.getFiles(self.matchingPattern)]
 
 		if self.showDirectories:
 			if directory:
@@ -221,40 +276,27 @@ class FileList(MenuList):
 					self.list.append(FileEntryComponent(name = "<" +_("List of storage devices") + ">", absolute = None, isDir = True))
 				elif (directory != self.topDirectory) and not (self.inhibitMounts and self.getMountpoint(directory) in self.inhibitMounts):
 					self.list.append(FileEntryComponent(name = "<" +_("Parent directory") + ">", absolute = '/'.join(directory.split('/')[:-2]) + '/', isDir = True))
-			for x in directories:
-				if not (self.inhibitMounts and self.getMountpoint(x) in self.inhibitMounts) and not self.inParentDirs(x, self.inhibitDirs):
-					name = x.split('/')[-2]
-					self.list.append(FileEntryComponent(name = name, absolute = x, isDir = True))
-
-		if self.showFiles:
-			for x in files:
-				if self.useServiceRef:
-					path = x.getPath()
-					name = path.split('/')[-1]
-				else:
-					path = directory + x
-					name = x
-
-				if (self.matchingPattern is None) or self.matchingPattern.search(path):
-					self.list.append(FileEntryComponent(name = name, absolute = x, isDir = False))
-
-		if self.showMountpoints and len(self.list) == 0:
-			self.list.append(FileEntryComponent(name = _("nothing connected"), absolute = None, isDir = False))
 
-		self.l.setList(self.list)
+		if self.showNothingConnected and self.showMountpoints and not self.list and not entries:
+			self.list.append(FileEntryComponent(name = _("nothing connected"), absolute = None, isDir = False))
 
+		index = None
 		if select is not None:
-			i = 0
-			self.moveToIndex(0)
-			for x in self.list:
-				p = x[0][0]
-
+			paths = [x[0][0] for x in self.list] + [x[1] for x in entries]
+			for i, p in enumerate(paths):
 				if isinstance(p, eServiceReference):
 					p = p.getPath()
-
 				if p == select:
-					self.moveToIndex(i)
-				i += 1
+					index = i
+					break
+
+		self.pending = entries
+		self.populate(max(FIRST_PAGE, (index or 0) + FIRST_PAGE))
+		self.l.setList(self.list)
+		if select is not None:
+			self.moveToIndex(index or 0)
+		if self.pending:
+			self.populateTimer.start(0, True)
 
 	def getCurrentDirectory(self):
 		return self.current_directory
@@ -287,9 +329,12 @@ class FileList(MenuList):
 
 	def execBegin(self):
 		harddiskmanager.on_partition_list_change.append(self.partitionListChanged)
+		if self.pending:
+			self.populateTimer.start(0, True)
 
 	def execEnd(self):
 		harddiskmanager.on_partition_list_change.remove(self.partitionListChanged)
+		self.populateTimer.stop()
 
 	def refresh(self):
 		self.changeDir(self.current_directory, self.getFilename())
@@ -327,13 +372,14 @@ def MultiFileSelectEntryComponent(name, absolute = None, isDir = False, selected
 
 
 class MultiFileSelectList(FileList):
+	showNothingConnected = False  # Its entries are all selectable.
+
 	def __init__(self, preselectedFiles, directory, showMountpoints = False, matchingPattern = None, showDirectories = True, showFiles = True,  useServiceRef = False, inhibitDirs = False, inhibitMounts = False, isTop = False, enableWrapAround = False, additionalExtensions = None):
 		if preselectedFiles is None:
 			self.selectedFiles = []
 		else:
 			self.selectedFiles = preselectedFiles
 		FileList.__init__(self, directory, showMountpoints = showMountpoints, matchingPattern = matchingPattern, showDirectories = showDirectories, showFiles = showFiles,  useServiceRef = useServiceRef, inhibitDirs = inhibitDirs, inhibitMounts = inhibitMounts, isTop = isTop, enableWrapAround = enableWrapAround, additionalExtensions = additionalExtensions)
-		self.changeDir(directory)
 		font = skin.fonts.get("FileListMulti", ("Regular", 20, 25))
 		self.l.setFont(0, gFont(font[0], font[1]))
 		self.l.setItemHeight(font[2])
@@ -373,97 +419,13 @@ class MultiFileSelectList(FileList):
 		return self.selectedFiles
 
 	def changeDir(self, directory, select = None):
-		self.list = []
-
-		# if we are just entering from the list of mount points:
-		if self.current_directory is None:
-			if directory and self.showMountpoints:
-				self.current_mountpoint = self.getMountpointLink(directory)
-			else:
-				self.current_mountpoint = None
-		self.current_directory = directory
-		directories = []
-		files = []
-
-		if directory is None and self.showMountpoints: # present available mountpoints
-			for p in harddiskmanager.getMountedPartitions():
-				path = os.path.join(p.mountpoint, "")
-				if path not in self.inhibitMounts and not self.inParentDirs(path, self.inhibitDirs):
-					self.list.append(MultiFileSelectEntryComponent(name = p.description, absolute = path, isDir = True))
-			files = [ ]
-			directories = [ ]
-		elif directory is None:
-			files = [ ]
-			directories = [ ]
-		elif self.useServiceRef:
-			root = eServiceReference("2:0:1:0:0:0:0:0:0:0:" + directory)
-			if self.additional_extensions:
-				root.setName(self.additional_extensions)
-			serviceHandler = eServiceCenter.getInstance()
-			list = serviceHandler.list(root)
+		self.selectedPaths = set(self.selectedFiles)
+		self.selectedNames = set([os.path.basename(x) for x in self.selectedFiles])
+		FileList.changeDir(self, directory, select)
 
-			while 1:
-				s = list.getNext()
-				if not s.valid():
-					del list
-					break
-				if s.flags & s.mustDescent:
-					directories.append(s.getPath())
-				else:
-					files.append(s)
-			directories.sort()
-			files.sort()
+	def buildEntry(self, name, absolute, isDir):
+		if isDir:
+			alreadySelected = (absolute in self.selectedPaths) or (os.path.normpath(absolute) in self.selectedPaths)
 		else:
-			if fileExists(directory):
-				try:
-					files = os.listdir(directory)
-				except:
-					files = []
-				files.sort()
-				tmpfiles = files[:]
-				for x in tmpfiles:
-					if os.path.isdir(directory + x):
-						directories.append(directory + x + "/")
-						files.remove(x)
-
-		if self.showDirectories:
-			if directory:
-				if self.showMountpoints and directory == self.current_mountpoint:
-					self.list.append(FileEntryComponent(name = "<" +_("List of storage devices") + ">", absolute = None, isDir = True))
-				elif (directory != self.topDirectory) and not (self.inhibitMounts and self.getMountpoint(directory) in self.inhibitMounts):
-					self.list.append(FileEntryComponent(name = "<" +_("Parent directory") + ">", absolute = '/'.join(directory.split('/')[:-2]) + '/', isDir = True))
-			for x in directories:
-				if not (self.inhibitMounts and self.getMountpoint(x) in self.inhibitMounts) and not self.inParentDirs(x, self.inhibitDirs):
-					name = x.split('/')[-2]
-					alreadySelected = (x in self.selectedFiles) or (os.path.normpath(x) in self.selectedFiles)
-					self.list.append(MultiFileSelectEntryComponent(name = name, absolute = x, isDir = True, selected = alreadySelected))
-
-		if self.showFiles:
-			for x in files:
-				if self.useServiceRef:
-					path = x.getPath()
-					name = path.split('/')[-1]
-				else:
-					path = directory + x
-					name = x
-				if (self.matchingPattern is None) or self.matchingPattern.search(path):
-					alreadySelected = False
-					for entry in self.selectedFiles:
-						if os.path.basename(entry) == x:
-							alreadySelected = True
-					self.list.append(MultiFileSelectEntryComponent(name = name, absolute = x, isDir = False, selected = alreadySelected))
-
-		self.l.setList(self.list)
-
-		if select is not None:
-			i = 0
-			self.moveToIndex(0)
-			for x in self.list:
-				p = x[0][0]
-
-				if isinstance(p, eServiceReference):
-					p = p.getPath()
-
-				if p == select:
-					self.moveToIndex(i)
-				i += 1
+			alreadySelected = not isinstance(absolute, eServiceReference) and absolute in self.selectedNames
+		return MultiFileSelectEntryComponent(name = name, absolute = absolute, isDir = isDir, selected = alreadySelected)
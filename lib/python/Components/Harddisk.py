@@ -1,9 +1,15 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 import os
+import select
+import struct
 import time
+from ctypes import Structure, addressof, c_int, c_ubyte, c_uint, c_ushort, c_void_p, create_string_buffer
+from fcntl import ioctl
 from Tools.CList import CList
+from Tools.Directories import clearResolveCache
 from Components.SystemInfo import SystemInfo
+from Components.SystemSampler import readDisk, systemSampler
 from Components.Console import Console
 from Components import Task
 from Tools.StbHardware import getBoxProc
@@ -18,17 +24,74 @@ def readFile(filename):
 	file.close()
 	return data
 
+# The mount table is parsed once and only read again when the kernel flags a
+# change on /proc/self/mounts (it reports POLLERR | POLLPRI after every mount
+# and unmount), or when a hotplug event invalidated it.
+#
+class MountTable:
+	def __init__(self):
+		self.mounts = None
+		self.mountpoints = {}
+		try:
+			self.fd = open("/proc/self/mounts", "r")
+			self.poller = select.poll()
+			self.poller.register(self.fd, select.POLLERR | select.POLLPRI)
+		except (IOError, OSError) as err:
+			print("[Harddisk] Unable to watch the mount table, it is read on every use! (%s)" % err)
+			self.fd = None
+			self.poller = None
+
+	def invalidate(self):
+		self.mounts = None
+
+	def getMounts(self):
+		if self.mounts is None or self.poller is None or self.poller.poll(0):
+			self.read()
+		return self.mounts
+
+	def read(self):
+		try:
+			if self.fd:
+				self.fd.seek(0)
+				lines = self.fd.readlines()
+			else:
+				with open("/proc/mounts", "r") as fd:
+					lines = fd.readlines()
+		except IOError as ex:
+			print("[Harddisk] Failed to open /proc/mounts", ex)
+			self.mounts = None
+			self.mountpoints = {}
+			return
+		mounts = [line.strip().split(' ') for line in lines]
+		for item in mounts:
+			# Spaces are encoded as \040 in mounts
+			item[1] = item[1].replace('\\040', ' ')
+		self.mounts = mounts
+		self.mountpoints = dict((item[1], item) for item in mounts)  # A later mount on the same mountpoint hides the earlier one.
+
+	def getMount(self, path):
+		"""Return the fields of the mount path is on, looking up one directory level at a time."""
+		if self.getMounts() is None:
+			return None
+		path = os.path.abspath(path)
+		while path not in self.mountpoints:
+			parent = os.path.dirname(path)
+			if parent == path:
+				return None
+			path = parent
+		return self.mountpoints[path]
+
+	def isMount(self, path):
+		return self.getMounts() is not None and os.path.normpath(path) in self.mountpoints
+
+	def getFileSystem(self, mountpoint):
+		mount = self.getMounts() is not None and self.mountpoints.get(os.path.normpath(mountpoint))
+		return mount and mount[2] or ''
+
+mountTable = MountTable()
+
 def getProcMounts():
-	try:
-		mounts = open("/proc/mounts", 'r')
-	except IOError as ex:
-		print("[Harddisk] Failed to open /proc/mounts", ex)
-		return []
-	result = [line.strip().split(' ') for line in mounts]
-	for item in result:
-		# Spaces are encoded as \040 in mounts
-		item[1] = item[1].replace('\\040', ' ')
-	return result
+	return [item[:] for item in mountTable.getMounts() or []]
 
 def isFileSystemSupported(filesystem):
 	try:
@@ -41,6 +104,9 @@ def isFileSystemSupported(filesystem):
 
 def findMountPoint(path):
 	'Example: findMountPoint("/media/hdd/some/file") returns "/media/hdd"'
+	mount = mountTable.getMount(path)
+	if mount:
+		return mount[1]
 	path = os.path.abspath(path)
 	while not os.path.ismount(path):
 		path = os.path.dirname(path)
@@ -55,7 +121,7 @@ class Harddisk:
 		self.idle_running = False
 		self.last_access = time.time()
 		self.last_stat = 0
-		self.timer = None
+		self.io_rate = 0
 		self.is_sleeping = False
 
 		self.dev_path = ''
@@ -114,9 +180,7 @@ class Harddisk:
 		return os.path.join('/sys/block/', self.device, filename)
 
 	def stop(self):
-		if self.timer:
-			self.timer.stop()
-			self.timer.callback.remove(self.runIdle)
+		diskMonitor.remove(self)
 
 	def bus(self):
 		ret = _("External")
@@ -447,53 +511,35 @@ class Harddisk:
 	def getDeviceName(self):
 		return self.disk_path
 
-	# the HDD idle poll daemon.
+	# the HDD idle daemon.
 	# as some harddrives have a buggy standby timer, we are doing this by hand here.
-	# first, we disable the hardware timer. then, we check every now and then if
+	# first, we disable the hardware timer. then, diskMonitor checks now and then if
 	# any access has been made to the disc. If there has been no access over a specifed time,
 	# we set the hdd into standby.
 	def readStats(self):
-		try:
-			l = open("/sys/block/%s/stat" % self.device).read()
-		except IOError:
+		stats = (systemSampler.get("disk") or {}).get(self.device)
+		if stats is None:
 			return -1, -1
-		data = l.split(None, 5)
-		return (int(data[0]), int(data[4]))
+		return stats["reads"], stats["writes"]
 
 	def startIdle(self):
-		from enigma import eTimer
-
 		# disable HDD standby timer
 		if self.bus() == _("External"):
 			Console().ePopen(("sdparm", "sdparm", "--set=SCT=0", self.disk_path))
 		else:
 			Console().ePopen(("hdparm", "hdparm", "-S0", self.disk_path))
-		self.timer = eTimer()
-		self.timer.callback.append(self.runIdle)
 		self.idle_running = True
-		self.setIdleTime(self.max_idle_time) # kick the idle polling loop
-
-	def runIdle(self):
-		if not self.max_idle_time:
-			return
-		t = time.time()
-
-		idle_time = t - self.last_access
-
-		stats = self.readStats()
-		l = sum(stats)
-
-		if l != self.last_stat and l >= 0: # access
-			self.last_stat = l
-			self.last_access = t
-			idle_time = 0
-			self.is_sleeping = False
-
-		if idle_time >= self.max_idle_time and not self.is_sleeping:
-			self.setSleep()
-			self.is_sleeping = True
+		self.setIdleTime(self.max_idle_time) # start watching the disk
 
 	def setSleep(self):
+		try:
+			if self.bus() == _("External"):
+				scsiStandby(self.disk_path)
+			else:
+				ataStandby(self.disk_path)
+			return
+		except (IOError, OSError) as err:
+			print("[Harddisk] Unable to send '%s' to standby, trying the tools! (%s)" % (self.disk_path, err))
 		if self.bus() == _("External"):
 			Console().ePopen(("sdparm", "sdparm", "--flexible", "--readonly", "--command=stop", self.disk_path))
 		else:
@@ -502,14 +548,165 @@ class Harddisk:
 	def setIdleTime(self, idle):
 		self.max_idle_time = idle
 		if self.idle_running:
-			if not idle:
-				self.timer.stop()
-			else:
-				self.timer.start(idle * 100, False)  # poll 10 times per period.
+			diskMonitor.add(self)
 
 	def isSleeping(self):
 		return self.is_sleeping
 
+	def getIdleTime(self):
+		"""Seconds since diskMonitor last saw an access to the disk."""
+		return max(time.time() - self.last_access, 0)
+
+	def getIORate(self):
+		"""Bytes per second read and written between the last two samples."""
+		return self.io_rate
+
+HDIO_DRIVE_CMD = 0x031f
+ATA_OP_STANDBYNOW1 = 0xe0
+ATA_OP_STANDBYNOW2 = 0x94  # For old drives.
+SG_IO = 0x2285
+SG_DXFER_NONE = -1
+START_STOP_UNIT = 0x1b
+SENSE_SIZE = 32
+SG_TIMEOUT = 30000  # Milliseconds.
+
+class SgIoHdr(Structure):  # struct sg_io_hdr from <scsi/sg.h>.
+	_fields_ = [
+		("interface_id", c_int),
+		("dxfer_direction", c_int),
+		("cmd_len", c_ubyte),
+		("mx_sb_len", c_ubyte),
+		("iovec_count", c_ushort),
+		("dxfer_len", c_uint),
+		("dxferp", c_void_p),
+		("cmdp", c_void_p),
+		("sbp", c_void_p),
+		("timeout", c_uint),
+		("flags", c_uint),
+		("pack_id", c_int),
+		("usr_ptr", c_void_p),
+		("status", c_ubyte),
+		("masked_status", c_ubyte),
+		("msg_status", c_ubyte),
+		("sb_len_wr", c_ubyte),
+		("host_status", c_ushort),
+		("driver_status", c_ushort),
+		("resid", c_int),
+		("duration", c_uint),
+		("info", c_uint)
+	]
+
+def ataStandby(path):
+	# What hdparm -y does: STANDBY IMMEDIATE through HDIO_DRIVE_CMD, which libata passes on to SATA drives as well.
+	fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+	try:
+		try:
+			ioctl(fd, HDIO_DRIVE_CMD, struct.pack("4B", ATA_OP_STANDBYNOW1, 0, 0, 0))
+		except IOError:
+			ioctl(fd, HDIO_DRIVE_CMD, struct.pack("4B", ATA_OP_STANDBYNOW2, 0, 0, 0))
+	finally:
+		os.close(fd)
+
+def scsiStandby(path):
+	# What sdparm --command=stop does: START STOP UNIT with START cleared, through SG_IO.
+	cdb = create_string_buffer(struct.pack("6B", START_STOP_UNIT, 0, 0, 0, 0, 0), 6)
+	sense = create_string_buffer(SENSE_SIZE)
+	header = SgIoHdr(interface_id=ord("S"), dxfer_direction=SG_DXFER_NONE, cmd_len=6, mx_sb_len=SENSE_SIZE, cmdp=addressof(cdb), sbp=addressof(sense), timeout=SG_TIMEOUT)
+	fd = os.open(path, os.O_RDONLY | os.O_NONBLOCK)
+	try:
+		ioctl(fd, SG_IO, header)
+	finally:
+		os.close(fd)
+	if header.status or header.host_status or header.driver_status:
+		raise IOError("START STOP UNIT failed, status 0x%02x, host 0x%02x, driver 0x%02x" % (header.status, header.host_status, header.driver_status))
+
+# Watches the activity of all harddisks that are put into standby by enigma2
+# with one timer.  The counters of all block devices are read from
+# /proc/diskstats in one go, and only as often as needed: the further away the
+# idle time of a disk is, the less often it is looked at.  Disks in standby
+# are looked at as often as a busy disk, at most every SLEEP_INTERVAL seconds,
+# to notice soon that they woke up.  A disk goes into standby at most a
+# quarter of its idle time late.
+#
+class DiskActivityMonitor:
+	MIN_INTERVAL = 5  # Seconds.
+	SLEEP_INTERVAL = 30  # Seconds.
+	SAMPLES_PER_PERIOD = 4  # At most, while a disk is busy.
+
+	def __init__(self):
+		self.disks = []
+		self.timer = None
+		self.raw = None
+		self.sampled = None
+		self.onStateChange = CList()  # Called with the harddisk that went into or woke up from standby.
+
+	def add(self, hdd):
+		if hdd not in self.disks:
+			self.disks.append(hdd)
+		self.run()
+
+	def remove(self, hdd):
+		if hdd in self.disks:
+			self.disks.remove(hdd)
+			self.schedule(time.time())
+
+	def sample(self):
+		now = time.time()
+		try:
+			self.raw, stats = readDisk(self.raw, self.sampled and now - self.sampled or 0)
+		except (IOError, OSError, ValueError, IndexError) as err:
+			print("[Harddisk] Error: Unable to read the disk statistics! (%s)" % err)
+			return now, {}
+		self.sampled = now
+		return now, stats
+
+	def run(self):
+		now, stats = self.sample()
+		changed = []
+		for hdd in self.disks[:]:
+			data = stats.get(hdd.device)
+			if data is None or not hdd.max_idle_time:
+				continue
+			stat = data["reads"] + data["writes"]
+			hdd.io_rate = data["readRate"] + data["writeRate"]
+			if stat != hdd.last_stat: # access
+				hdd.last_stat = stat
+				hdd.last_access = now
+				if hdd.is_sleeping:
+					hdd.is_sleeping = False
+					changed.append(hdd)
+			elif not hdd.is_sleeping and now - hdd.last_access >= hdd.max_idle_time:
+				hdd.setSleep()
+				hdd.is_sleeping = True
+				changed.append(hdd)
+		self.schedule(now)
+		for hdd in changed:
+			self.onStateChange(hdd)
+
+	def schedule(self, now):
+		delay = None
+		for hdd in self.disks:
+			idle = hdd.max_idle_time
+			if not idle:
+				continue
+			if hdd.is_sleeping:
+				wait = max(min(float(idle) / self.SAMPLES_PER_PERIOD, self.SLEEP_INTERVAL), self.MIN_INTERVAL)
+			else:
+				remaining = hdd.last_access + idle - now
+				wait = min(max(remaining / 2.0, self.MIN_INTERVAL), remaining, float(idle) / self.SAMPLES_PER_PERIOD)
+			if delay is None or wait < delay:
+				delay = wait
+		if self.timer is None:
+			from enigma import eTimer
+			self.timer = eTimer()
+			self.timer.callback.append(self.run)
+		if delay is None:
+			self.timer.stop()
+		else:
+			self.timer.start(int(max(delay, 0.1) * 1000), True)
+
+diskMonitor = DiskActivityMonitor()
+
 class Partition:
 	# for backward compatibility, force_mounted actually means "hotplug"
 	def __init__(self, mountpoint, device = None, description = "", force_mounted = False):
@@ -554,7 +751,7 @@ class Partition:
 			return True
 		if self.mountpoint:
 			if mounts is None:
-				mounts = getProcMounts()
+				mounts = mountTable.getMounts() or []
 			for parts in mounts:
 				if self.mountpoint.startswith(parts[1]): # use startswith so a mount not ending with '/' is also detected.
 					return True
@@ -563,7 +760,7 @@ class Partition:
 	def filesystem(self, mounts = None):
 		if self.mountpoint:
 			if mounts is None:
-				mounts = getProcMounts()
+				return mountTable.getFileSystem(self.mountpoint)
 			for fields in mounts:
 				if self.mountpoint.endswith('/') and not self.mountpoint == '/':
 					if fields[1] + '/' == self.mountpoint:
@@ -607,7 +804,7 @@ class HarddiskManager:
 		)
 		known = set([os.path.normpath(a.mountpoint) for a in self.partitions if a.mountpoint])
 		for m, d in p:
-			if (m not in known) and os.path.ismount(m):
+			if (m not in known) and mountTable.isMount(m):
 				self.partitions.append(Partition(mountpoint=m, description=d))
 
 	def getBlockDevInfo(self, blockdev):
@@ -689,16 +886,16 @@ class HarddiskManager:
 		netmount = (os.path.exists('/media/net') and os.listdir('/media/net')) or ""
 		if len(netmount) > 0:
 			for fil in netmount:
-				if os.path.ismount('/media/net/' + fil):
+				if mountTable.isMount('/media/net/' + fil):
 					print("[Harddisk] new Network Mount", fil, '->', os.path.join('/media/net/', fil))
 					self.partitions.append(Partition(mountpoint = os.path.join('/media/net/', fil + '/'), description = fil))
 		autofsmount = (os.path.exists('/media/autofs') and os.listdir('/media/autofs')) or ""
 		if len(autofsmount) > 0:
 			for fil in autofsmount:
-				if os.path.ismount('/media/autofs/' + fil) or os.path.exists('/media/autofs/' + fil):
+				if mountTable.isMount('/media/autofs/' + fil) or os.path.exists('/media/autofs/' + fil):
 					print("[Harddisk] new Network Mount", fil, '->', os.path.join('/media/autofs/', fil))
 					self.partitions.append(Partition(mountpoint = os.path.join('/media/autofs/', fil + '/'), description = fil))
-		if os.path.ismount('/media/hdd') and '/media/hdd/' not in [p.mountpoint for p in self.partitions]:
+		if mountTable.isMount('/media/hdd') and '/media/hdd/' not in [p.mountpoint for p in self.partitions]:
 			print("[Harddisk] new Network Mount being used as HDD replacement -> /media/hdd/")
 			self.partitions.append(Partition(mountpoint = '/media/hdd/', description = '/media/hdd'))
 
@@ -718,6 +915,7 @@ class HarddiskManager:
 	def addHotplugPartition(self, device, physdev = None):
 		# device is the device name, without /dev
 		# physdev is the physical device path, which we (might) use to determine the userfriendly name
+		mountTable.invalidate()
 		if not physdev:
 			dev, part = self.splitDeviceName(device)
 			try:
@@ -745,6 +943,7 @@ class HarddiskManager:
 	def addHotplugAudiocd(self, device, physdev = None):
 		# device is the device name, without /dev
 		# physdev is the physical device path, which we (might) use to determine the userfriendly name
+		mountTable.invalidate()
 		if not physdev:
 			dev, part = self.splitDeviceName(device)
 			try:
@@ -762,6 +961,7 @@ class HarddiskManager:
 		return error, blacklisted, removable, is_cdrom, partitions, medium_found
 
 	def removeHotplugPartition(self, device):
+		mountTable.invalidate()
 		for x in self.partitions[:]:
 			if x.device == device:
 				self.partitions.remove(x)
@@ -794,7 +994,7 @@ class HarddiskManager:
 
 	def getMountedPartitions(self, onlyhotplug = False, mounts=None):
 		if mounts is None:
-			mounts = getProcMounts()
+			mounts = mountTable.getMounts() or []
 		parts = [x for x in self.partitions if (x.is_hotplug or not onlyhotplug) and x.mounted(mounts)]
 		devs = set([x.device for x in parts])
 		for devname in devs.copy():
@@ -953,6 +1153,7 @@ class MkfsTask(Task.LoggingTask):
 
 
 harddiskmanager = HarddiskManager()
+harddiskmanager.on_partition_list_change.append(clearResolveCache)  # Files may be resolved on the new partition.
 
 def isSleepStateDevice(device):
 	ret = os.popen("hdparm -C %s" % device).read()
@@ -9,6 +9,7 @@ from Components.config import config, ConfigText
 from Tools import Notifications
 from base64 import encodestring
 import xml.etree.ElementTree as et
+from Tools.BulkTransfer import HTTPFetcher, TransferError, swapFiles
 
 settingfiles = ('lamedb', 'bouquets.', 'userbouquet.', 'blacklist', 'whitelist', 'alternatives.')
 
@@ -91,27 +92,26 @@ class ImportChannels():
 				self.ImportChannelsDone(False, _("No epg.dat file found server"))
 		if "channels" in config.usage.remote_fallback_import.value:
 			print("[ImportChannels] reading dir")
+			fetcher = HTTPFetcher(self.url, self.header and {"Authorization": self.header}, timeout=5)
+			staging = tempfile.mkdtemp(prefix=".import", dir="/etc/enigma2")
 			try:
-				files = [file for file in loads(self.getUrl("%s/file?dir=/etc/enigma2" % self.url).read())["files"] if os.path.basename(file).startswith(settingfiles)]
-				for file in files:
-					file = file.encode("UTF-8")
-					print("[ImportChannels] Downloading %s" % file)
-					try:
-						open(os.path.join(self.tmp_dir, os.path.basename(file)), "wb").write(self.getUrl("%s/file?file=%s" % (self.url, file)).read())
-					except:
-						self.ImportChannelsDone(False, _("ERROR downloading file %s") % file)
-						return
-			except:
-				self.ImportChannelsDone(False, _("Error %s") % self.url)
-				return
-			print("[ImportChannels] Removing files...")
-			files = [file for file in os.listdir("/etc/enigma2") if file.startswith(settingfiles)]
-			for file in files:
-				os.remove(os.path.join("/etc/enigma2", file))
-			print("[ImportChannels] copying files...")
-			files = [x for x in os.listdir(self.tmp_dir) if x.startswith(settingfiles)]
-			for file in files:
-				shutil.move(os.path.join(self.tmp_dir, file), os.path.join("/etc/enigma2", file))
+				try:
+					files = [file.encode("UTF-8") for file in loads(fetcher.get("/file?dir=/etc/enigma2"))["files"] if os.path.basename(file).startswith(settingfiles)]
+				except Exception:
+					self.ImportChannelsDone(False, _("Error %s") % self.url)
+					return
+				print("[ImportChannels] Downloading %d files" % len(files))
+				try:
+					fetcher.fetch([("/file?file=%s" % file, os.path.basename(file)) for file in files], staging, "/etc/enigma2")
+				except TransferError as err:
+					print("[ImportChannels] %s" % err)
+					self.ImportChannelsDone(False, _("ERROR downloading file %s") % err)
+					return
+				print("[ImportChannels] Replacing files...")
+				swapFiles(staging, "/etc/enigma2", [os.path.basename(file) for file in files], settingfiles)
+			finally:
+				fetcher.close()
+				shutil.rmtree(staging, True)
 		self.ImportChannelsDone(True, {"channels": _("Channels"), "epg": _("EPG"), "channels_epg": _("Channels and EPG")}[config.usage.remote_fallback_import.value])
 
 	def ImportChannelsDone(self, flag, message=None):
@@ -0,0 +1,263 @@
+from __future__ import print_function
+import marshal
+import os
+import struct
+
+from enigma import eServiceCenter, eTimer, iServiceInformation
+
+# Every recording directory gets a small index file that holds the data the
+# movie list needs for each recording.  An entry is only used as long as the
+# modification times and the sizes of the recording and its .meta file match
+# (renaming and editing the tags only rewrite the .meta file), otherwise it
+# is built again from the service information.  The last play position is
+# taken from the .cuts file and is checked separately.
+
+INDEX_NAME = ".e2movieindex"
+INDEX_VERSION = 2
+SAVE_DELAY = 5000  # Milliseconds.
+
+cutsParser = struct.Struct(">QI")  # Big-endian, 64-bit PTS and 32-bit type.
+
+# Fields of an index entry.
+MTIME = 0
+SIZE = 1
+NAME = 2
+BEGIN = 3
+TAGS = 4
+SERVICEREF = 5
+DESCRIPTION = 6
+LENGTH = 7
+CUTS = 8  # (mtime, size) of the .cuts file.
+LASTPOSITION = 9
+META = 10  # (mtime, size) of the .meta file, None if there is none.
+
+
+def getMetaStamp(path):
+	try:
+		status = os.stat("%s.meta" % path)
+	except OSError:
+		return None
+	return status.st_mtime, status.st_size
+
+
+def readLastPosition(cutsFileName):
+	with open(cutsFileName, "rb") as fd:
+		data = fd.read()
+	lastPosition = None
+	for offset in range(0, len(data) - cutsParser.size + 1, cutsParser.size):
+		cut, cutType = cutsParser.unpack_from(data, offset)
+		if cutType == 3:  # Undocumented, but 3 appears to be the stop.
+			lastPosition = cut
+	return lastPosition
+
+
+# iStaticServiceInformation answering from the index.  Everything that is not
+# indexed is passed on to the service information of the recording, which is
+# only created when it is needed.
+#
+class MovieInfo(object):
+	def __init__(self, serviceref, entry, info=None):
+		self.serviceref = serviceref
+		self.entry = entry
+		self.info = info
+
+	def __getattr__(self, name):
+		return getattr(self.getServiceInfo(), name)
+
+	def getServiceInfo(self):
+		if self.info is None:
+			self.info = eServiceCenter.getInstance().info(self.serviceref)
+			if self.info is None:
+				from Components.MovieList import justStubInfo
+				self.info = justStubInfo
+		return self.info
+
+	def getName(self, serviceref):
+		return self.entry[NAME]
+
+	def getLength(self, serviceref):
+		length = self.entry[LENGTH]
+		if length is None:
+			length = self.getServiceInfo().getLength(serviceref)
+			movieIndex.updateEntry(serviceref.getPath(), LENGTH, length)
+		return length
+
+	def getInfo(self, serviceref, w):
+		if w == iServiceInformation.sTimeCreate:
+			return self.entry[BEGIN]
+		return self.getServiceInfo().getInfo(serviceref, w)
+
+	def getInfoString(self, serviceref, w):
+		if w == iServiceInformation.sTags:
+			return self.entry[TAGS]
+		if w == iServiceInformation.sServiceref:
+			return self.entry[SERVICEREF]
+		if w == iServiceInformation.sDescription:
+			return self.entry[DESCRIPTION]
+		return self.getServiceInfo().getInfoString(serviceref, w)
+
+
+class MovieDirectoryIndex:
+	def __init__(self, directory):
+		self.directory = directory
+		self.filename = os.path.join(directory, INDEX_NAME)
+		self.entries = {}
+		self.stamp = None
+		self.dirty = False
+		self.readOnly = False
+
+	def load(self):
+		try:
+			status = os.stat(self.filename)
+		except OSError:
+			self.stamp = None
+			return
+		stamp = (status.st_mtime, status.st_size)
+		if stamp == self.stamp:
+			return
+		self.stamp = stamp
+		try:
+			with open(self.filename, "rb") as fd:
+				version, entries = marshal.load(fd)
+			if version == INDEX_VERSION:
+				self.entries = entries
+		except Exception as err:
+			print("[MovieIndex] Error: Unable to read movie index '%s'! (%s)" % (self.filename, err))
+
+	def save(self):
+		if not self.dirty or self.readOnly:
+			return
+		self.dirty = False
+		try:
+			with open("%s.tmp" % self.filename, "wb") as fd:
+				marshal.dump((INDEX_VERSION, self.entries), fd)
+			os.rename("%s.tmp" % self.filename, self.filename)
+			status = os.stat(self.filename)
+			self.stamp = (status.st_mtime, status.st_size)
+		except (IOError, OSError) as err:
+			print("[MovieIndex] Error %d: Unable to write movie index '%s'! (%s)" % (err.errno, self.filename, err.strerror))
+			self.readOnly = True
+
+
+class MovieIndex:
+	def __init__(self):
+		self.directories = {}
+		self.saveTimer = eTimer()
+		self.saveTimer.callback.append(self.save)
+
+	def getDirectory(self, directory, load=True):
+		directory = os.path.normpath(directory)
+		index = self.directories.get(directory)
+		if index is None:
+			if not load:
+				return None
+			index = self.directories[directory] = MovieDirectoryIndex(directory)
+		if load and not index.dirty:
+			index.load()  # Only reads the file again when somebody else changed it.
+		return index
+
+	def getInfo(self, serviceref):
+		path = serviceref.getPath()
+		directory, name = os.path.split(path)
+		try:
+			status = os.stat(path)
+		except OSError:
+			return eServiceCenter.getInstance().info(serviceref)
+		index = self.getDirectory(directory, load=False) or self.getDirectory(directory)
+		entry = index.entries.get(name)
+		meta = getMetaStamp(path)
+		if entry and entry[MTIME] == status.st_mtime and entry[SIZE] == status.st_size and entry[META] == meta:
+			return MovieInfo(serviceref, entry)
+		info = eServiceCenter.getInstance().info(serviceref)
+		if info is None:
+			return None
+		entry = index.entries[name] = (
+			status.st_mtime,
+			status.st_size,
+			info.getName(serviceref),
+			info.getInfo(serviceref, iServiceInformation.sTimeCreate),
+			info.getInfoString(serviceref, iServiceInformation.sTags),
+			info.getInfoString(serviceref, iServiceInformation.sServiceref),
+			info.getInfoString(serviceref, iServiceInformation.sDescription),
+			None,
+			None,
+			None,
+			meta
+		)
+		self.setDirty(index)
+		return MovieInfo(serviceref, entry, info)
+
+	def getLastPosition(self, cutsFileName):
+		path = cutsFileName[:-5]  # Strip ".cuts".
+		directory, name = os.path.split(path)
+		index = self.getDirectory(directory, load=False)
+		entry = index and index.entries.get(name)
+		if not entry:
+			return readLastPosition(cutsFileName)
+		status = os.stat(cutsFileName)
+		stamp = (status.st_mtime, status.st_size)
+		if entry[CUTS] != stamp:
+			lastPosition = readLastPosition(cutsFileName)
+			self.updateEntry(path, CUTS, stamp, LASTPOSITION, lastPosition)
+			return lastPosition
+		return entry[LASTPOSITION]
+
+	def updateEntry(self, path, *fields):
+		directory, name = os.path.split(path)
+		index = self.getDirectory(directory, load=False)
+		entry = index and index.entries.get(name)
+		if entry:
+			entry = list(entry)
+			for field, value in zip(fields[::2], fields[1::2]):
+				entry[field] = value
+			index.entries[name] = tuple(entry)
+			self.setDirty(index)
+
+	def prune(self, directory, names):
+		index = self.getDirectory(directory, load=False)
+		if index:
+			for name in [x for x in index.entries if x not in names]:
+				del index.entries[name]
+				self.setDirty(index)
+
+	def removeFile(self, path):
+		directory, name = os.path.split(path)
+		index = self.getDirectory(directory)
+		if name in index.entries:
+			del index.entries[name]
+			self.setDirty(index)
+
+	def moveFile(self, src, dst, copy=False):
+		if os.path.isdir(dst):
+			dst = os.path.join(dst, os.path.basename(src))
+		directory, name = os.path.split(src)
+		index = self.getDirectory(directory)
+		entry = index.entries.get(name)
+		if entry is None:
+			return
+		if not copy:
+			del index.entries[name]
+			self.setDirty(index)
+		try:
+			status = os.stat(dst)
+		except OSError:
+			return
+		directory, name = os.path.split(dst)
+		index = self.getDirectory(directory)
+		index.entries[name] = (status.st_mtime, status.st_size) + entry[NAME:CUTS] + (None, None, getMetaStamp(dst))
+		self.setDirty(index)
+
+	def copyFile(self, src, dst):
+		self.moveFile(src, dst, copy=True)
+
+	def setDirty(self, index):
+		index.dirty = True
+		if not self.saveTimer.isActive():
+			self.saveTimer.start(SAVE_DELAY, True)
+
+	def save(self):
+		for index in self.directories.values():
+			index.save()
+
+
+movieIndex = MovieIndex()
@@ -9,6 +9,7 @@ from Components.GUIComponent import GUIComponent
 from Tools.FuzzyDate import FuzzyTime
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaBlend, MultiContentEntryProgress
 from Components.config import config
+from Components.MovieIndex import movieIndex
 from Components.Renderer.Picon import getPiconName
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename
@@ -66,17 +67,8 @@ def lastPlayPosFromCache(ref):
 def moviePlayState(cutsFileName, ref, length):
 	'''Returns None, 0..100 for percentage'''
 	try:
-		# read the cuts file first
-		f = open(cutsFileName, 'rb')
-		lastPosition = None
-		while 1:
-			data = f.read(cutsParser.size)
-			if len(data) < cutsParser.size:
-				break
-			cut, cutType = cutsParser.unpack(data)
-			if cutType == 3: # undocumented, but 3 appears to be the stop
-				lastPosition = cut
-		f.close()
+		# read the cuts file first (the movie index remembers the stop position)
+		lastPosition = movieIndex.getLastPosition(cutsFileName)
 		# See what we have in RAM (it might help)
 		last = lastPlayPosFromCache(ref)
 		if last:
@@ -628,15 +620,23 @@ class MovieList(GUIComponent):
 			elif (config.usage.trashsort_deltime.value == "show delete time"):
 				MovieList.UsingTrashSort = MovieList.TRASHSORT_SHOWDELETE
 
+		movieIndex.getDirectory(rootPath)
+		indexed = set()
 		while 1:
 			serviceref = reflist.getNext()
 			if not serviceref.valid():
 				break
+			useIndex = False
+			if not serviceref.flags & eServiceReference.mustDescent:
+				fileName = os.path.split(serviceref.getPath())[1]
+				indexed.add(fileName)
+				# recordings in progress change all the time, don't index them
+				useIndex = fileName not in self.runningTimers
 			if config.ParentalControl.servicepinactive.value and config.ParentalControl.storeservicepin.value != "never":
 				from Components.ParentalControl import parentalControl
 				if not parentalControl.sessionPinCached and parentalControl.isProtected(serviceref):
 					continue
-			info = serviceHandler.info(serviceref)
+			info = movieIndex.getInfo(serviceref) if useIndex else serviceHandler.info(serviceref)
 			if info is None:
 				info = justStubInfo
 			begin = info.getInfo(serviceref, iServiceInformation.sTimeCreate)
@@ -689,6 +689,8 @@ class MovieList(GUIComponent):
 			else:
 				self.list.append((serviceref, info, begin, -1))
 
+		movieIndex.prune(rootPath, indexed)
+
 		self.firstFileEntry = numberOfDirs
 		self.parentDirectory = 0
 
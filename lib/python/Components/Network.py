@@ -4,11 +4,14 @@ from __future__ import print_function
 import os
 import re
 import netifaces as ni
+import six
 from socket import *
 from Components.Console import Console
+from Components.NetworkProbe import networkProber
 from Components.PluginComponent import plugins
 from Plugins.Plugin import PluginDescriptor
 from Components.config import config
+from Tools.BoundFunction import boundFunction
 
 class Network:
 	def __init__(self):
@@ -17,28 +20,23 @@ class Network:
 		self.NetworkState = 0
 		self.DnsState = 0
 		self.nameservers = []
-		self.ethtool_bin = "/usr/sbin/ethtool"
 		self.ip_bin = "/sbin/ip"
 		self.ifconfig_bin = "/sbin/ifconfig"
 		self.ifdown_bin = "/sbin/ifdown"
 		self.ifup_bin = "/sbin/ifup"
-		self.ping_bin = "/bin/ping"
-		self.nslookup_bin = "/usr/bin/nslookup"
 		self.avahi_daemon = "/etc/init.d/avahi-daemon"
 		self.networking_initd = "/etc/init.d/networking"
 		self.console = Console()
-		self.linkConsole = Console()
 		self.restartConsole = Console()
 		self.deactivateInterfaceConsole = Console()
 		self.activateInterfaceConsole = Console()
 		self.resetNetworkConsole = Console()
-		self.dnsConsole = Console()
-		self.pingConsole = Console()
 		self.config_ready = None
 		self.friendlyNames = {}
 		self.lan_interfaces = []
 		self.wlan_interfaces = []
 		self.remoteRootFS = None
+		self.linkStateCall = None
 		self.getInterfaces()
 
 	def onRemoteRootFS(self):
@@ -132,6 +130,7 @@ class Network:
 		self.writeNameserverConfig()
 
 	def writeNameserverConfig(self):
+		networkProber.invalidate()
 		try:
 			Console().ePopen('rm -f /etc/resolv.conf')
 			fp = open('/etc/resolv.conf', 'w')
@@ -414,24 +413,16 @@ class Network:
 				callback(True, mode)
 
 	def checkNetworkState(self, statecallback):
-		self.NetworkState = 0
-		self.pingConsole = Console()
-		for server in ("www.google.com", "www.bing.com", "www.microsoft.com"):
-			self.pingConsole.ePopen((self.ping_bin, self.ping_bin, "-c", "1", server), self.checkNetworkStateFinished, statecallback)
-
-	def checkNetworkStateFinished(self, result, retval, extra_args):
-		(statecallback) = extra_args
-		if self.pingConsole is not None:
-			if retval == 0:
-				self.pingConsole = None
-				statecallback(self.NetworkState)
-			else:
-				self.NetworkState += 1
-				if not self.pingConsole.appContainers:
-					statecallback(self.NetworkState)
+		# Calls back with the number of test hosts that could not be reached, 3 when none could.
+		networkProber.checkReachability(boundFunction(self.checkNetworkStateFinished, statecallback))
+
+	def checkNetworkStateFinished(self, statecallback, failed):
+		self.NetworkState = failed
+		statecallback(failed)
 
 	def restartNetwork(self,callback = None):
 		self.config_ready = False
+		networkProber.invalidate()
 		self.msgPlugins()
 		self.commands = []
 		self.commands.append(self.avahi_daemon + " stop")
@@ -455,23 +446,29 @@ class Network:
 				pass
 
 	def getLinkState(self, iface, callback):
-		self.linkConsole.ePopen((self.ethtool_bin, self.ethtool_bin, iface), self.getLinkStateFinished, callback)
-
-	def getLinkStateFinished(self, result, retval, extra_args):
-		(callback) = extra_args
-		if not self.linkConsole.appContainers:
-			callback(result)
+		# The callback gets the lines of the ethtool output the screens look at.
+		info = networkProber.getLinkInfo(iface)
+		result = ["Settings for %s:" % iface]
+		if info["speed"]:
+			result.append("\tSpeed: %dMb/s" % info["speed"])
+		if info["duplex"]:
+			result.append("\tDuplex: %s" % info["duplex"].capitalize())
+		if info["link"] is not None:
+			result.append("\tLink detected: %s" % (info["link"] and "yes" or "no"))
+		result = "\n".join(result) + "\n"
+		from twisted.internet import reactor
+		self.linkStateCall = reactor.callLater(0, callback, six.PY2 and result or result.encode())
 
 	def stopPingConsole(self):
-		if self.pingConsole is not None:
-			self.pingConsole.killAll()
+		networkProber.reachability.cancel()
 
 	def stopLinkStateConsole(self):
-		self.linkConsole.killAll()
+		if self.linkStateCall and self.linkStateCall.active():
+			self.linkStateCall.cancel()
+		self.linkStateCall = None
 
 	def stopDNSConsole(self):
-		if self.dnsConsole is not None:
-			self.dnsConsole.killAll()
+		networkProber.dns.cancel()
 
 	def stopRestartConsole(self):
 		self.restartConsole.killAll()
@@ -497,24 +494,16 @@ class Network:
 				return False
 
 	def checkDNSLookup(self, statecallback):
-		self.DnsState = 0
-		self.dnsConsole = Console()
-		for server in ("www.google.com", "www.bing.com", "www.microsoft.com"):
-			self.dnsConsole.ePopen((self.nslookup_bin, self.nslookup_bin, server), self.checkDNSLookupFinished, statecallback)
-
-	def checkDNSLookupFinished(self, result, retval, extra_args):
-		(statecallback) = extra_args
-		if self.dnsConsole is not None:
-			if retval == 0:
-				self.dnsConsole = None
-				statecallback(self.DnsState)
-			else:
-				self.DnsState += 1
-				if not self.dnsConsole.appContainers:
-					statecallback(self.DnsState)
+		# Calls back with the number of test hosts that could not be resolved, 3 when none could.
+		networkProber.checkDNS(boundFunction(self.checkDNSLookupFinished, statecallback))
+
+	def checkDNSLookupFinished(self, statecallback, failed):
+		self.DnsState = failed
+		statecallback(failed)
 
 	def deactivateInterface(self,ifaces,callback = None):
 		self.config_ready = False
+		networkProber.invalidate()
 		self.msgPlugins()
 		commands = []
 		def buildCommands(iface):
@@ -543,6 +532,7 @@ class Network:
 				callback(True)
 
 	def activateInterface(self,iface,callback = None):
+		networkProber.invalidate()
 		if self.config_ready:
 			self.config_ready = False
 			self.msgPlugins()
@@ -664,6 +654,7 @@ class Network:
 		interface = event['INTERFACE']
 		if self.isBlacklisted(interface):
 			return
+		networkProber.invalidate()
 		action = event['ACTION']
 		if action == "add":
 			print("[Network] Add new interface:", interface)
@@ -0,0 +1,162 @@
+from __future__ import print_function
+from time import time
+
+from twisted.internet.protocol import ClientFactory, Protocol
+
+# Link state, name resolution and reachability checks for the network setup
+# screens, done in enigma2 itself instead of starting ethtool, nslookup and
+# ping for every check.  The link state is read from sysfs, names are resolved
+# by the reactor (in its resolver thread pool) and a host counts as reachable
+# when a TCP connection to it can be opened.  Results are kept for a few
+# seconds and callers that ask while a check is running share its result.
+#
+# The reactor is imported when it is used, this module is imported before
+# mytest.py installed e2reactor.
+
+PROBE_HOSTS = ("www.google.com", "www.bing.com", "www.microsoft.com")
+PROBE_PORT = 80
+TIMEOUT = 5  # Seconds.
+LINK_TTL = 2  # Seconds.
+RESULT_TTL = 15  # Seconds.
+
+
+def readSysfs(iface, name):
+	with open("/sys/class/net/%s/%s" % (iface, name), "r") as fd:
+		return fd.read().strip()
+
+
+def getLinkInfo(iface):
+	"""Return a dictionary with "link" (True, False or None if the interface
+	does not exist), "operstate", "speed" (Mb/s or None) and "duplex"."""
+	info = {"link": None, "operstate": None, "speed": None, "duplex": None}
+	try:
+		info["operstate"] = readSysfs(iface, "operstate")
+	except (IOError, OSError):
+		return info
+	try:
+		info["link"] = readSysfs(iface, "carrier") == "1"
+	except (IOError, OSError):  # Can not be read while the interface is down.
+		info["link"] = False
+	if info["link"]:
+		try:
+			speed = int(readSysfs(iface, "speed"))
+			info["speed"] = speed > 0 and speed or None  # Wireless and virtual interfaces report -1 or fail.
+			info["duplex"] = readSysfs(iface, "duplex")
+		except (IOError, OSError, ValueError):
+			pass
+	return info
+
+
+class ConnectProbe(ClientFactory):
+	protocol = Protocol
+	noisy = False
+
+	def __init__(self, callback):
+		self.callback = callback
+
+	def buildProtocol(self, addr):
+		self.done(True)
+		return None  # Closes the connection right away.
+
+	def clientConnectionFailed(self, connector, reason):
+		self.done(False)
+
+	def done(self, result):
+		if self.callback:
+			callback, self.callback = self.callback, None
+			callback(result)
+
+
+class ProbeCheck:
+	"""Checks all hosts at the same time and calls back with the number of
+	hosts that failed before the first one succeeded, or with the number of
+	hosts if none did, as ping and nslookup did."""
+
+	def __init__(self, hosts, probe):
+		self.hosts = hosts
+		self.probe = probe
+		self.callbacks = []
+		self.failed = 0
+		self.result = None
+		self.finished = None
+		self.running = False
+		self.generation = 0  # Answers to an earlier run are ignored.
+
+	def check(self, callback):
+		if self.result is not None and 0 <= time() - self.finished < RESULT_TTL:
+			from twisted.internet import reactor
+			reactor.callLater(0, self.deliver, callback)
+			return
+		self.callbacks.append(callback)
+		if not self.running:
+			self.running = True
+			self.failed = 0
+			self.result = None
+			self.generation += 1
+			for host in self.hosts:
+				self.probe(host, lambda success, generation=self.generation: self.probed(generation, success))
+
+	def deliver(self, callback):
+		callback(self.result)
+
+	def probed(self, generation, success):
+		if not self.running or generation != self.generation:
+			return
+		if not success:
+			self.failed += 1
+		if success or self.failed == len(self.hosts):
+			self.running = False
+			self.result = self.failed
+			self.finished = time()
+			callbacks, self.callbacks = self.callbacks, []
+			for callback in callbacks:
+				callback(self.result)
+
+	def cancel(self):
+		# Like killing the ping processes, nobody gets called back.
+		del self.callbacks[:]
+
+	def invalidate(self):
+		self.result = None
+
+
+class NetworkProber:
+	def __init__(self, hosts=PROBE_HOSTS, port=PROBE_PORT, timeout=TIMEOUT):
+		self.port = port
+		self.timeout = timeout
+		self.links = {}  # iface: (time, info)
+		self.dns = ProbeCheck(hosts, self.resolve)
+		self.reachability = ProbeCheck(hosts, self.connect)
+
+	def getLinkInfo(self, iface):
+		cached = self.links.get(iface)
+		if cached and 0 <= time() - cached[0] < LINK_TTL:
+			return cached[1]
+		info = getLinkInfo(iface)
+		self.links[iface] = (time(), info)
+		return info
+
+	def resolve(self, host, callback):
+		from twisted.internet import reactor
+		deferred = reactor.resolve(host, timeout=(self.timeout,))
+		deferred.addCallbacks(lambda address: callback(True), lambda failure: callback(False))
+
+	def connect(self, host, callback):
+		# reactor.connectTCP() resolves the name first, so this checks DNS too.
+		from twisted.internet import reactor
+		reactor.connectTCP(host, self.port, ConnectProbe(callback), timeout=self.timeout)
+
+	def checkDNS(self, callback):
+		self.dns.check(callback)
+
+	def checkReachability(self, callback):
+		self.reachability.check(callback)
+
+	def invalidate(self):
+		"""Forget all results, e.g. after the network configuration changed."""
+		self.links.clear()
+		self.dns.invalidate()
+		self.reachability.invalidate()
+
+
+networkProber = NetworkProber()
@@ -3,11 +3,13 @@ import os
 from enigma import eConsoleAppContainer
 from Components.config import config
 from Components.Harddisk import harddiskmanager
+from Components.PackageIndex import listsDirPath, packageIndex
 from Tools.Directories import resolveFilename, SCOPE_LIBDIR
 import six
 
 opkgDestinations = []
 opkgStatusPath = ''
+packageIndex.destinations = opkgDestinations  # Their status files are read as well.
 
 def opkgExtraDestinations():
 	global opkgDestinations
@@ -52,53 +54,21 @@ def enumFeeds():
 				pass
 
 def enumPlugins(filter_start=''):
-	list_dir = listsDirPath()
-	for feed in enumFeeds():
-		package = None
-		try:
-			for line in open(os.path.join(list_dir, feed), 'r'):
-				if line.startswith('Package:'):
-					package = line.split(":", 1)[1].strip()
-					version = ''
-					description = ''
-					if config.misc.extraopkgpackages.value is True:
-						if package.startswith(filter_start) and not package.endswith('--pycache--'):
-							continue
-					else:
-						if package.startswith(filter_start) and not package.endswith('-dev') and not package.endswith('-staticdev') and not package.endswith('-dbg') and not package.endswith('-doc') and not package.endswith('-src') and not package.endswith('-po') and not package.endswith('--pycache--'):
-							continue
-					package = None
-				if package is None:
-					continue
-				if line.startswith('Version:'):
-					version = line.split(":", 1)[1].strip()
-				elif line.startswith('Description:'):
-					description = line.split(":", 1)[1].strip()
-				elif description and line.startswith(' '):
-					description += line[:-1]
-				elif len(line) <= 1:
-					d = description.split(' ', 3)
-					if len(d) > 3:
-						# Get rid of annoying "version" and package repeating strings
-						if d[1] == 'version':
-							description = d[3]
-						if description.startswith('gitAUTOINC'):
-							description = description.split(' ', 1)[1]
-					yield package, version, description.strip()
-					package = None
-		except IOError:
-			pass
-
-def listsDirPath():
-	try:
-		for line in open('/etc/opkg/opkg.conf', "r"):
-			if line.startswith('option'):
-				line = line.split(' ', 2)
-				if len(line) > 2 and line[1] == ('lists_dir'):
-					return line[2].strip()
-	except Exception as ex:
-		print("[Opkg]", ex)
-	return '/var/lib/opkg/lists'
+	for package, version, description in packageIndex.getPackages(filter_start):
+		if config.misc.extraopkgpackages.value is True:
+			if package.endswith('--pycache--'):
+				continue
+		else:
+			if package.endswith('-dev') or package.endswith('-staticdev') or package.endswith('-dbg') or package.endswith('-doc') or package.endswith('-src') or package.endswith('-po') or package.endswith('--pycache--'):
+				continue
+		d = description.split(' ', 3)
+		if len(d) > 3:
+			# Get rid of annoying "version" and package repeating strings
+			if d[1] == 'version':
+				description = d[3]
+			if description.startswith('gitAUTOINC'):
+				description = description.split(' ', 1)[1]
+		yield package, version, description.strip()
 
 if __name__ == '__main__':
 	for p in enumPlugins('enigma'):
@@ -0,0 +1,257 @@
+from __future__ import print_function
+import os
+from bisect import bisect_left
+import six
+from six.moves import cPickle
+
+# The packages in the opkg feed lists and in the opkg status files, read by
+# enigma2 itself instead of running "opkg list", "opkg list_installed" and
+# "opkg list-upgradable" and parsing their output.  The feed lists are only
+# parsed again when one of them changed, in between the packages are read
+# from a compact index on disk, so a box with tens of thousands of feed
+# entries does not parse them every time the plugin browser or the package
+# manager is opened.
+
+INDEX_FILE = "/tmp/enigma2-packages.index"
+INDEX_VERSION = 1
+STATUS_FILE = "/var/lib/opkg/status"
+
+
+def listsDirPath():
+	try:
+		for line in open('/etc/opkg/opkg.conf', "r"):
+			if line.startswith('option'):
+				line = line.split(' ', 2)
+				if len(line) > 2 and line[1] == ('lists_dir'):
+					return line[2].strip()
+	except Exception as ex:
+		print("[PackageIndex]", ex)
+	return '/var/lib/opkg/lists'
+
+
+def parseControlFile(path):
+	"""Yield (package, version, description, status) for the paragraphs of
+	an opkg control file, a feed list or a status file."""
+	package = version = status = None
+	description = []
+	inDescription = False
+	with open(path, "r") as fd:
+		for line in fd:
+			if line[:1] in (" ", "\t"):
+				if inDescription:
+					description.append(line.rstrip("\n"))
+				continue
+			inDescription = False
+			if line.startswith("Package:"):
+				package = line[8:].strip()
+			elif line.startswith("Version:"):
+				version = line[8:].strip()
+			elif line.startswith("Description:"):
+				description = [line[12:].strip()]
+				inDescription = True
+			elif line.startswith("Status:"):
+				status = line[7:].split()
+			elif not line.strip():
+				if package:
+					yield package, version or "", "".join(description), status
+				package = version = status = None
+				description = []
+	if package:
+		yield package, version or "", "".join(description), status
+
+
+def order(char):
+	if char == "~":
+		return -1
+	if char.isdigit():
+		return 0
+	if char.isalpha():
+		return ord(char)
+	return ord(char) + 256
+
+
+def compareParts(a, b):
+	# The comparison of dpkg and opkg: non digits character by character with
+	# "~" before everything, digits as numbers.
+	i = j = 0
+	while i < len(a) or j < len(b):
+		difference = 0
+		while (i < len(a) and not a[i].isdigit()) or (j < len(b) and not b[j].isdigit()):
+			x = i < len(a) and order(a[i]) or 0
+			y = j < len(b) and order(b[j]) or 0
+			if x != y:
+				return x - y
+			i += 1
+			j += 1
+		while i < len(a) and a[i] == "0":
+			i += 1
+		while j < len(b) and b[j] == "0":
+			j += 1
+		while i < len(a) and a[i].isdigit() and j < len(b) and b[j].isdigit():
+			if not difference:
+				difference = ord(a[i]) - ord(b[j])
+			i += 1
+			j += 1
+		if i < len(a) and a[i].isdigit():
+			return 1
+		if j < len(b) and b[j].isdigit():
+			return -1
+		if difference:
+			return difference
+	return 0
+
+
+def splitVersion(version):
+	epoch, colon, rest = version.partition(":")
+	if not colon:
+		epoch, rest = "0", version
+	upstream, dash, revision = rest.rpartition("-")
+	if not dash:
+		upstream, revision = rest, ""
+	return int(epoch) if epoch.isdigit() else 0, upstream, revision
+
+
+def compareVersions(a, b):
+	"""Compare two package versions like opkg does, negative if a is older
+	than b, 0 if they are the same and positive if a is newer."""
+	a = splitVersion(a)
+	b = splitVersion(b)
+	if a[0] != b[0]:
+		return a[0] - b[0]
+	return compareParts(a[1], b[1]) or compareParts(a[2], b[2])
+
+
+class PackageIndex:
+	def __init__(self, listsDir=None, statusFiles=None, indexFile=INDEX_FILE):
+		self.listsDir = listsDir
+		self.statusFiles = statusFiles
+		self.indexFile = indexFile
+		self.destinations = []  # Mount points with an opkg status of their own.
+		self.listsKey = None
+		self.names = []  # Sorted.
+		self.versions = []
+		self.descriptions = []
+		self.statusKey = None
+		self.installed = {}
+
+	def getListFiles(self):
+		directory = self.listsDir or listsDirPath()
+		try:
+			names = sorted(os.listdir(directory))
+		except OSError:
+			return []
+		return [os.path.join(directory, name) for name in names if not name.startswith(".")]
+
+	def getStatusFiles(self):
+		if self.statusFiles is not None:
+			return self.statusFiles
+		return [STATUS_FILE] + [os.path.join(x, STATUS_FILE.lstrip("/")) for x in self.destinations]
+
+	def getKey(self, paths):
+		key = []
+		for path in paths:
+			try:
+				status = os.stat(path)
+			except OSError:
+				continue
+			if os.path.isfile(path):
+				key.append((path, status.st_mtime, status.st_size))
+		return tuple(key)
+
+	def refresh(self):
+		"""Read what changed since the last call."""
+		key = self.getKey(self.getListFiles())
+		if key != self.listsKey:
+			self.listsKey = key
+			if not self.loadIndex(key):
+				self.buildIndex(key)
+		key = self.getKey(self.getStatusFiles())
+		if key != self.statusKey:
+			self.statusKey = key
+			self.installed = {}
+			for path, mtime, size in key:
+				try:
+					for package, version, description, status in parseControlFile(path):
+						if status and status[-1] == "installed":
+							self.installed[package] = version
+				except (IOError, OSError) as err:
+					print("[PackageIndex] Error: Unable to read '%s'! (%s)" % (path, err))
+
+	def loadIndex(self, key):
+		try:
+			with open(self.indexFile, "rb") as fd:
+				data = cPickle.load(fd)
+			if data[0] != INDEX_VERSION or data[1] != key:
+				return False
+			self.names, self.versions, self.descriptions = data[2:]
+			return True
+		except Exception:
+			return False
+
+	def buildIndex(self, key):
+		packages = {}
+		for path, mtime, size in key:
+			try:
+				for package, version, description, status in parseControlFile(path):
+					known = packages.get(package)
+					if known is None or compareVersions(version, known[0]) > 0:
+						packages[package] = (version, description)
+			except (IOError, OSError) as err:
+				print("[PackageIndex] Error: Unable to read '%s'! (%s)" % (path, err))
+		self.names = sorted(packages)
+		self.versions = [packages[x][0] for x in self.names]
+		self.descriptions = [packages[x][1] for x in self.names]
+		print("[PackageIndex] %d packages in %d feed lists." % (len(self.names), len(key)))
+		try:
+			with open(self.indexFile + ".tmp", "wb") as fd:
+				cPickle.dump((INDEX_VERSION, key, self.names, self.versions, self.descriptions), fd, cPickle.HIGHEST_PROTOCOL)
+			os.rename(self.indexFile + ".tmp", self.indexFile)
+		except (IOError, OSError) as err:
+			print("[PackageIndex] Error: Unable to write '%s'! (%s)" % (self.indexFile, err))
+
+	def getPackages(self, prefix=""):
+		"""Return a list of (package, version, description) of the available
+		packages whose names start with prefix, sorted by name."""
+		self.refresh()
+		packages = []
+		x = bisect_left(self.names, prefix)
+		while x < len(self.names) and self.names[x].startswith(prefix):
+			packages.append((self.names[x], self.versions[x], self.descriptions[x]))
+			x += 1
+		return packages
+
+	def search(self, text, descriptions=False):
+		"""Return the (package, version, description) of the available
+		packages with text in their names, or descriptions, ignoring case."""
+		self.refresh()
+		text = text.lower()
+		return [(name, self.versions[x], self.descriptions[x]) for x, name in enumerate(self.names) if text in name.lower() or descriptions and text in self.descriptions[x].lower()]
+
+	def getAvailable(self, package):
+		"""Return (version, description) of the available package or None."""
+		self.refresh()
+		x = bisect_left(self.names, package)
+		if x < len(self.names) and self.names[x] == package:
+			return self.versions[x], self.descriptions[x]
+		return None
+
+	def getInstalled(self, prefix=""):
+		"""Return a dictionary of the installed packages and their versions."""
+		self.refresh()
+		if not prefix:
+			return dict(self.installed)
+		return dict([(x, y) for x, y in six.iteritems(self.installed) if x.startswith(prefix)])
+
+	def getUpgradable(self):
+		"""Return a dictionary of the installed packages that have a newer
+		version in the feeds, with (installed version, available version)."""
+		self.refresh()
+		upgradable = {}
+		for package, version in six.iteritems(self.installed):
+			available = self.getAvailable(package)
+			if available and compareVersions(available[0], version) > 0:
+				upgradable[package] = (version, available[0])
+		return upgradable
+
+
+packageIndex = PackageIndex()
@@ -1,5 +1,6 @@
 import xml.sax
 from Tools.Directories import crawlDirectory, resolveFilename, SCOPE_CONFIG, SCOPE_SKIN, copyfile, copytree
+from Components.BouquetIndex import bouquetIndex
 from Components.Console import Console
 from Components.NimManager import nimmanager
 from Components.Opkg import OpkgComponent
@@ -302,6 +303,7 @@ class PackageInfoHandler:
 		if self.reloadFavourites:
 			self.reloadFavourites = False
 			db = eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 
 		self.currentIndex += 1
 		attributes = self.installingAttributes
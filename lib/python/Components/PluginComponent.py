@@ -1,12 +1,104 @@
 from __future__ import print_function
+import marshal
 import os
+import sys
 from bisect import insort
-from Tools.Directories import fileExists, resolveFilename, SCOPE_PLUGINS
+from enigma import eTimer
+from Components.config import ConfigSubsection, config
+from Tools.Directories import fileExists, pluginContext, resolveFilename, SCOPE_CONFIG, SCOPE_PLUGINS
 from Tools.Import import my_import
 from Tools.Profile import profile
 from Plugins.Plugin import PluginDescriptor
 import keymapparser
 
+# Importing every plugin at startup is slow, most of them are only needed when
+# they are selected from a menu.  The descriptors of each plugin are kept in a
+# manifest, together with the modification times of the plugin files.  As long
+# as these did not change the plugin is represented by LazyPluginDescriptors
+# and only imported when one of them is called (menu plugins whenever a menu
+# is built) or when somebody uses its config.plugins settings.
+# Plugins that have to run during startup (autostart, session start, wizards,
+# wakeup times) or whose descriptors can not be stored are always imported.
+# So are plugins whose Plugins() returned nothing or looked at settings other
+# than their own config.plugins ones, their descriptors can change without
+# the plugin files changing.
+
+MANIFEST_FILE = resolveFilename(SCOPE_CONFIG, "plugins.manifest")
+MANIFEST_VERSION = 3
+MANIFEST_SAVE_DELAY = 5000  # Milliseconds.
+
+EAGER_WHERE = (PluginDescriptor.WHERE_AUTOSTART, PluginDescriptor.WHERE_SESSIONSTART, PluginDescriptor.WHERE_WIZARD)
+
+# Fields of a manifest entry.
+STAMP = 0
+CONFIG = 1
+DESCRIPTORS = 2  # None when the plugin is always imported.
+
+
+def getPluginStamp(path):
+	# Installing, updating and compiling a plugin changes the directory or one of its files.
+	stamp = [int(os.stat(path).st_mtime)]
+	for name in sorted(os.listdir(path)):
+		if name.endswith((".py", ".pyo", ".pyc", ".so", ".xml")):
+			status = os.stat(os.path.join(path, name))
+			stamp.append((name, int(status.st_mtime), status.st_size))
+	return tuple(stamp)
+
+
+def callPlugins(plugin, path):
+	"""Call plugin.Plugins() and return its result and the names of the config sections it read."""
+	reads = set()
+	original = ConfigSubsection.__getattr__
+
+	def recordRead(self, name):
+		if self is config and name != "plugins":
+			reads.add(name)
+		return original(self, name)
+
+	ConfigSubsection.__getattr__ = recordRead
+	try:
+		return plugin.Plugins(path=path), reads
+	finally:
+		ConfigSubsection.__getattr__ = original
+
+
+def describePlugins(plugins):
+	if not plugins:  # Might describe itself when the settings change.
+		return None
+	descriptors = []
+	for p in plugins:
+		if type(p) is not PluginDescriptor or p.wakeupfnc or p._icon is not None or not callable(p.__call__) or [x for x in p.where if x in EAGER_WHERE]:
+			return None
+		descriptor = [p.name, p.description, list(p.where), p.iconstr, p.weight, p.internal, p.needsRestart]
+		try:
+			marshal.dumps(descriptor)
+		except ValueError:  # E.g. a name that is not a string.
+			return None
+		descriptors.append(descriptor)
+	return descriptors
+
+
+class LazyPluginDescriptor(PluginDescriptor):
+	def __init__(self, key, path, descriptor):
+		name, description, where, icon, weight, internal, needsRestart = descriptor
+		PluginDescriptor.__init__(self, name=name, where=where, description=description, icon=icon, needsRestart=needsRestart, internal=internal, weight=weight)
+		self.key = key
+		self.loaded = False
+		self.updateIcon(path)
+		self.__call__ = self.load
+
+	def load(self, *args, **kwargs):
+		plugins.loadPlugin(self.key)
+		if self.loaded:
+			return self.__call__(*args, **kwargs)
+		print("[PluginComponent] Plugin %s '%s' is not available." % (self.key, self.name))
+		return None
+
+	def resolve(self, plugin):
+		self.__call__ = plugin.__call__
+		self.loaded = True
+
+
 class PluginComponent:
 	firstRun = True
 	restartRequired = False
@@ -17,6 +109,12 @@ class PluginComponent:
 		self.installedPluginList = [ ]
 		self.setPluginPrefix("Plugins.")
 		self.resetWarnings()
+		self.lazyPlugins = {}
+		self.manifest = None
+		self.manifestDirty = False
+		self.configOwners = {}
+		self.manifestTimer = eTimer()
+		self.manifestTimer.callback.append(self.saveManifest)
 
 	def setPluginPrefix(self, prefix):
 		self.prefix = prefix
@@ -27,7 +125,11 @@ class PluginComponent:
 			for x in plugin.where:
 				insort(self.plugins.setdefault(x, []), plugin)
 				if x == PluginDescriptor.WHERE_AUTOSTART:
-					plugin.__call__(reason=0)
+					pluginContext.append(plugin.path)
+					try:
+						plugin.__call__(reason=0)
+					finally:
+						pluginContext.pop()
 		else:
 			self.restartRequired = True
 
@@ -38,8 +140,142 @@ class PluginComponent:
 			if x == PluginDescriptor.WHERE_AUTOSTART:
 				plugin(reason=1)
 
+	def readManifest(self):
+		self.manifest = {}
+		self.manifestDirty = False
+		try:
+			with open(MANIFEST_FILE, "rb") as fd:
+				version, language, manifest = marshal.load(fd)
+			if version == MANIFEST_VERSION and language == self.getLanguage():
+				self.manifest = manifest
+		except (IOError, OSError):
+			pass
+		except Exception as err:
+			print("[PluginComponent] Error: Unable to read plugin manifest '%s'! (%s)" % (MANIFEST_FILE, err))
+		self.updateConfigOwners()
+
+	def saveManifest(self):
+		if not self.manifestDirty:
+			return
+		self.manifestDirty = False
+		try:
+			with open("%s.tmp" % MANIFEST_FILE, "wb") as fd:
+				marshal.dump((MANIFEST_VERSION, self.getLanguage(), self.manifest), fd)
+			os.rename("%s.tmp" % MANIFEST_FILE, MANIFEST_FILE)
+		except (IOError, OSError) as err:
+			print("[PluginComponent] Error %d: Unable to write plugin manifest '%s'! (%s)" % (err.errno, MANIFEST_FILE, err.strerror))
+
+	def setManifestDirty(self):
+		self.manifestDirty = True
+		if not self.manifestTimer.isActive():
+			self.manifestTimer.start(MANIFEST_SAVE_DELAY, True)
+
+	def getLanguage(self):
+		# The names and descriptions in the manifest are translated.
+		from Components.Language import language
+		return language.getLanguage()
+
+	def updateConfigOwners(self):
+		self.configOwners = {}
+		for key, entry in self.manifest.items():
+			for name in entry[CONFIG]:
+				self.configOwners[name] = key
+
+	def updateManifest(self, key, path, plugins, configNames, configReads):
+		try:
+			stamp = getPluginStamp(path)
+		except OSError:
+			return
+		descriptors = None if configReads else describePlugins(plugins)
+		entry = self.manifest.get(key)
+		configNames = sorted(set(configNames).union(entry and entry[CONFIG] or []))
+		if entry != (stamp, configNames, descriptors):
+			self.manifest[key] = (stamp, configNames, descriptors)
+			self.updateConfigOwners()
+			self.manifestDirty = True
+
+	def importPlugin(self, category, pluginname, path):
+		"""Import a plugin and return its descriptors, or None if that failed."""
+		configNames = set(config.plugins.content.items)
+		try:
+			# let resolveFilename() know which plugin is being loaded
+			pluginContext.append(path)
+			try:
+				plugin = my_import('.'.join(["Plugins", category, pluginname, "plugin"]))
+				plugins, configReads = callPlugins(plugin, path)
+			finally:
+				pluginContext.pop()
+		except Exception as exc:
+			print("[PluginComponent] Plugin ", category + "/" + pluginname, "failed to load:", exc)
+			# supress errors due to missing plugin.py* files (badly removed plugin)
+			for fn in ('plugin.py', 'plugin.pyo'):
+				if os.path.exists(os.path.join(path, fn)):
+					self.warnings.append( (category + "/" + pluginname, str(exc)) )
+					from traceback import print_exc
+					print_exc()
+					break
+			else:
+				print("[PluginComponent] Plugin probably removed, but not cleanly in", path)
+				try:
+					os.rmdir(path)
+				except:
+					pass
+			if self.manifest.pop(category + "/" + pluginname, None):
+				self.updateConfigOwners()
+				self.manifestDirty = True
+			return None
+
+		# allow single entry not to be a list
+		if not isinstance(plugins, list):
+			plugins = [ plugins ]
+
+		for p in plugins:
+			p.path = path
+			p.updateIcon(path)
+		self.updateManifest(category + "/" + pluginname, path, plugins, set(config.plugins.content.items) - configNames, configReads)
+		return plugins
+
+	def getLazyPlugins(self, key, path, entry):
+		lazy = self.lazyPlugins.get(key)
+		if lazy is None or lazy[0] != entry[STAMP]:
+			# The same objects on every reload, LazyPluginDescriptors only equal themselves.
+			lazy = self.lazyPlugins[key] = (entry[STAMP], [LazyPluginDescriptor(key, path, x) for x in entry[DESCRIPTORS]])
+		return lazy[1][:]
+
+	def loadPlugin(self, key):
+		"""Import a plugin that is represented by LazyPluginDescriptors."""
+		lazy = self.lazyPlugins.pop(key, None)
+		if lazy is None:
+			return
+		proxies = lazy[1]
+		category, pluginname = key.split("/", 1)
+		print("[PluginComponent] Loading plugin %s." % key)
+		plugins = self.importPlugin(category, pluginname, proxies[0].path)
+		if plugins and [(p.name, p.where) for p in plugins] == [(p.name, p.where) for p in proxies]:
+			for proxy, p in zip(proxies, plugins):
+				proxy.resolve(p)
+		else:
+			# The plugin describes itself differently now, replace the proxies.
+			for p in proxies:
+				if p in self.pluginList:
+					self.removePlugin(p)
+			for p in plugins or []:
+				self.addPlugin(p)
+		if self.manifestDirty:
+			self.setManifestDirty()
+
+	def loadPluginConfig(self, name):
+		"""Import the plugin that adds config.plugins.<name>, if it was not imported yet."""
+		key = self.configOwners.get(name)
+		if key in self.lazyPlugins:
+			self.loadPlugin(key)
+			return True
+		return False
+
 	def readPluginList(self, directory):
 		"""enumerates plugins"""
+		if self.manifest is None:
+			self.readManifest()
 		new_plugins = []
 		for c in os.listdir(directory):
 			directory_category = os.path.join(directory, c)
@@ -50,35 +286,22 @@ class PluginComponent:
 					continue
 				path = os.path.join(directory_category, pluginname)
 				if os.path.isdir(path):
-						profile('plugin '+pluginname)
-						try:
-							plugin = my_import('.'.join(["Plugins", c, pluginname, "plugin"]))
-							plugins = plugin.Plugins(path=path)
-						except Exception as exc:
-							print("[PluginComponent] Plugin ", c + "/" + pluginname, "failed to load:", exc)
-							# supress errors due to missing plugin.py* files (badly removed plugin)
-							for fn in ('plugin.py', 'plugin.pyo'):
-								if os.path.exists(os.path.join(path, fn)):
-									self.warnings.append( (c + "/" + pluginname, str(exc)) )
-									from traceback import print_exc
-									print_exc()
-									break
-							else:
-								print("[PluginComponent] Plugin probably removed, but not cleanly in", path)
-								try:
-									os.rmdir(path)
-								except:
-									pass
-							continue
-
-						# allow single entry not to be a list
-						if not isinstance(plugins, list):
-							plugins = [ plugins ]
-
-						for p in plugins:
-							p.path = path
-							p.updateIcon(path)
-							new_plugins.append(p)
+						key = c + "/" + pluginname
+						entry = self.manifest.get(key)
+						plugins = None
+						if entry and entry[DESCRIPTORS] is not None and ".".join(["Plugins", c, pluginname, "plugin"]) not in sys.modules:
+							try:
+								if getPluginStamp(path) == entry[STAMP]:
+									plugins = self.getLazyPlugins(key, path, entry)
+							except OSError:
+								pass
+						if plugins is None:
+							profile('plugin '+pluginname)
+							plugins = self.importPlugin(c, pluginname, path)
+							if plugins is None:
+								continue
+
+						new_plugins.extend(plugins)
 
 						keymap = os.path.join(path, "keymap.xml")
 						if fileExists(keymap):
@@ -116,6 +339,8 @@ class PluginComponent:
 			self.firstRun = False
 			self.installedPluginList = self.pluginList
 
+		self.saveManifest()
+
 	def getPlugins(self, where):
 		"""Get list of plugins in a specific category"""
 		if not isinstance(where, list):
@@ -133,7 +358,8 @@ class PluginComponent:
 	def getPluginsForMenu(self, menuid):
 		res = [ ]
 		for p in self.getPlugins(PluginDescriptor.WHERE_MENU):
-			res += p.__call__(menuid)
+			# What a menu plugin offers depends on settings and the hardware, so it is always asked.
+			res += p.__call__(menuid) or []
 		return res
 
 	def clearPluginList(self):
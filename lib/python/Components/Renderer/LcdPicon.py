@@ -1,10 +1,10 @@
 import os
 from Components.Renderer.Renderer import Renderer
 from enigma import ePixmap, ePicLoad
-from Tools.Directories import pathExists, SCOPE_CURRENT_SKIN, resolveFilename
+from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename
 from boxbranding import getDisplayType
 from Components.config import config
-from Components.Renderer.Picon import PiconLocator
+from Components.Renderer.Picon import PiconLocator, piconIndex
 
 def useLcdPicons():
 	return getDisplayType() in ("bwlcd255", "bwlcd140", "bwlcd128") or config.lcd.picon_pack.value
@@ -63,7 +63,7 @@ class LcdPicon(Renderer):
 		if self.instance:
 			if what[0] in (self.CHANGED_DEFAULT, self.CHANGED_ALL, self.CHANGED_SPECIFIC):
 				pngname = lcdPiconLocator.getPiconName(self.source.text)
-				if not pathExists(pngname): # no picon for service found
+				if not piconIndex.exists(pngname): # no picon for service found
 					pngname = self.defaultpngname
 				if self.pngname != pngname:
 					if pngname:
@@ -1,5 +1,7 @@
 from __future__ import print_function
 import os, re, unicodedata
+from collections import OrderedDict
+from time import time
 from Components.Renderer.Renderer import Renderer
 from enigma import ePixmap
 from Tools.Alternatives import GetWithAlternative
@@ -7,6 +9,66 @@ from Tools.Directories import pathExists, SCOPE_CURRENT_SKIN, resolveFilename
 from Components.Harddisk import harddiskmanager
 from ServiceReference import ServiceReference
 
+# Index of the picon directories shared by all picon renderers.  Every
+# directory is listed once and the names are kept in a set, the directory is
+# only listed again when its modification time has changed (checked at most
+# every CHECK_INTERVAL seconds) or when a partition is added or removed.  The
+# resolved picon names are kept in a LRU cache.
+#
+class PiconIndex:
+	CHECK_INTERVAL = 30
+	CACHE_SIZE = 512
+
+	def __init__(self):
+		self.directories = {}
+		self.cache = OrderedDict()
+		harddiskmanager.on_partition_list_change.append(self.clear)
+
+	def clear(self, *args):
+		self.directories.clear()
+		self.cache.clear()
+
+	def getDirectory(self, path):
+		now = time()
+		entry = self.directories.get(path)
+		if entry is not None and now - entry[2] < self.CHECK_INTERVAL:
+			return entry[0]
+		try:
+			mtime = os.stat(path).st_mtime
+		except OSError:
+			mtime = None
+		if entry is None or entry[1] != mtime:
+			try:
+				names = frozenset(os.listdir(path)) if mtime is not None else frozenset()
+			except OSError:
+				names = frozenset()
+			if entry is not None:
+				self.cache.clear()  # Picons have been added or removed.
+			entry = [names, mtime, now]
+			self.directories[path] = entry
+		entry[2] = now
+		return entry[0]
+
+	def exists(self, filename):
+		path, name = os.path.split(filename)
+		return bool(name) and name in self.getDirectory(path)
+
+	def get(self, key, default=None):
+		try:
+			value = self.cache.pop(key)
+		except KeyError:
+			return default
+		self.cache[key] = value  # Most recently used entries are at the end.
+		return value
+
+	def put(self, key, value):
+		self.cache.pop(key, None)
+		self.cache[key] = value
+		if len(self.cache) > self.CACHE_SIZE:
+			self.cache.popitem(last=False)
+
+piconIndex = PiconIndex()
+
 class PiconLocator:
 	def __init__(self, piconDirectories = ['picon']):
 		harddiskmanager.on_partition_list_change.append(self.__onPartitionChange)
@@ -23,7 +85,7 @@ class PiconLocator:
 			try:
 				path = os.path.join(mountpoint, piconDirectory) + '/'
 				if os.path.isdir(path) and path not in self.searchPaths:
-					for fn in os.listdir(path):
+					for fn in piconIndex.getDirectory(path):
 						if fn.endswith('.png'):
 							print("[Picon] adding path:", path)
 							self.searchPaths.append(path)
@@ -33,9 +95,11 @@ class PiconLocator:
 
 	def __onMountpointRemoved(self, mountpoint):
 		for piconDirectory in self.piconDirectories:
-			path = os.path.join(mountpoint, self.piconDirectories) + '/'
+			path = os.path.join(mountpoint, piconDirectory) + '/'
 			try:
 				self.searchPaths.remove(path)
+				if self.activePiconPath == path:
+					self.activePiconPath = None
 				print("[Picon] removed path:", path)
 			except:
 				pass
@@ -48,15 +112,13 @@ class PiconLocator:
 
 	def findPicon(self, serviceName):
 		if self.activePiconPath is not None:
-			pngname = self.activePiconPath + serviceName + ".png"
-			if pathExists(pngname):
-				return pngname
+			if serviceName + ".png" in piconIndex.getDirectory(self.activePiconPath):
+				return self.activePiconPath + serviceName + ".png"
 		else:
 			for path in self.searchPaths:
-				pngname = path + serviceName + ".png"
-				if pathExists(pngname):
+				if serviceName + ".png" in piconIndex.getDirectory(path):
 					self.activePiconPath = path
-					return pngname
+					return path + serviceName + ".png"
 		return ""
 
 	def addSearchPath(self, value):
@@ -65,8 +127,20 @@ class PiconLocator:
 				value += '/'
 			if not value.startswith('/media/net') and not value.startswith('/media/autofs') and	value not in self.searchPaths:
 				self.searchPaths.append(value)
+				piconIndex.cache.clear()
 
 	def getPiconName(self, serviceName):
+		# Looking at the directories first clears the cache when picons have been added or removed.
+		for path in [self.activePiconPath] if self.activePiconPath is not None else self.searchPaths:
+			piconIndex.getDirectory(path)
+		key = (self, serviceName)
+		pngname = piconIndex.get(key)
+		if pngname is None:
+			pngname = self.resolvePiconName(serviceName)
+			piconIndex.put(key, pngname)
+		return pngname
+
+	def resolvePiconName(self, serviceName):
 		#remove the path and name fields, and replace ':' by '_'
 		fields = GetWithAlternative(serviceName).split(':', 10)[:10]
 		if not fields or len(fields) < 10:
@@ -98,10 +172,10 @@ class PiconLocator:
 		if not pngname: # picon default
 			tmp = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png') # picon_default in current active skin
 			tmp2 = self.findPicon("picon_default") # picon_default in picon folder
-			if pathExists(tmp2):
+			if tmp2:
 				pngname = tmp2
 			else:
-				if pathExists(tmp):
+				if piconIndex.exists(tmp):
 					pngname = tmp
 				else:
 					pngname = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png')
@@ -140,7 +214,7 @@ class Picon(Renderer):
 		if self.instance:
 			if what[0] in (self.CHANGED_DEFAULT, self.CHANGED_ALL, self.CHANGED_SPECIFIC):
 				pngname = piconLocator.getPiconName(self.source.text)
-				if not pathExists(pngname): # no picon for service found
+				if not piconIndex.exists(pngname): # no picon for service found
 					pngname = self.defaultpngname
 				if self.pngname != pngname:
 					if pngname:
@@ -1,5 +1,6 @@
 from __future__ import print_function
 from Components.Renderer.Renderer import Renderer
+from Components.Renderer.Picon import piconIndex
 from enigma import ePixmap
 from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename, SCOPE_PLUGINS
 import os
@@ -22,7 +23,6 @@ class PiconUni(Renderer):
 		Renderer.__init__(self)
 		self.path = 'piconUni'
 		self.scale = '0'
-		self.nameCache = {}
 		self.pngname = ''
 
 	def applySkin(self, desktop, parent):
@@ -51,20 +51,20 @@ class PiconUni(Renderer):
 					sname = sname.replace('4097', '1', 1).replace('5001', '1', 1).replace('5002', '1', 1)
 				if ':' in sname:
 					sname = '_'.join(sname.split(':')[:10])
-				pngname = self.nameCache.get(sname, '')
-				if pngname is '':
+				self.checkDirectories()
+				pngname = piconIndex.get(('PiconUni', self.path, sname))
+				if pngname is None:
 					pngname = self.findPicon(sname)
-					if not pngname is '':
-						self.nameCache[sname] = pngname
+					piconIndex.put(('PiconUni', self.path, sname), pngname)
 			if pngname is '':
-				pngname = self.nameCache.get('default', '')
-				if pngname is '':
+				pngname = piconIndex.get(('PiconUni', self.path, 'default'))
+				if pngname is None:
 					pngname = self.findPicon('picon_default')
 					if pngname is '':
 						tmp = resolveFilename(SCOPE_CURRENT_SKIN, 'picon_default.png')
-						if os.path.isfile(tmp):
+						if piconIndex.exists(tmp):
 							pngname = tmp
-					self.nameCache['default'] = pngname
+					piconIndex.put(('PiconUni', self.path, 'default'), pngname)
 			if not self.pngname is pngname:
 				if self.scale is '0':
 					if pngname:
@@ -78,14 +78,19 @@ class PiconUni(Renderer):
 						self.instance.setPixmapFromFile(pngname)
 				self.pngname = pngname
 
+	def checkDirectories(self):
+		# Clears the cached names when picons have been added or removed.
+		for path in searchPaths:
+			for dirName in self.path.split(','):
+				piconIndex.getDirectory(path % dirName)
+
 	def findPicon(self, serviceName):
 		global searchPaths
 		pathtmp = self.path.split(',')
 		for path in searchPaths:
 			for dirName in pathtmp:
-				pngname = (path % dirName) + serviceName + '.png'
-				if os.path.isfile(pngname):
-					return pngname
+				if serviceName + '.png' in piconIndex.getDirectory(path % dirName):
+					return (path % dirName) + serviceName + '.png'
 		return ''
 
 initPiconPaths()
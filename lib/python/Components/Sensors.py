@@ -1,4 +1,7 @@
+import os
+
 from Components.FanControl import fancontrol
+from Components.SystemSampler import systemSampler
 
 class Sensors:
 	# (type, name, unit, directory)
@@ -41,7 +44,7 @@ class Sensors:
 		value = -1
 		sensor = self.sensors_list[sensorid]
 		if sensor[0] == self.TYPE_TEMPERATURE:
-			value = int(open("%s/value" % sensor[3], "r").readline().strip())
+			value = (systemSampler.get("sensors") or {}).get(os.path.basename(sensor[3]), (value,))[0]
 		elif sensor[0] == self.TYPE_FAN_RPM:
 			value = fancontrol.getFanSpeed(sensor[3])
 		return value
@@ -50,7 +53,6 @@ class Sensors:
 		return self.sensors_list[sensorid][2]
 
 	def addSensors(self):
-		import os
 		if os.path.exists("/proc/stb/sensors"):
 			for dirname in os.listdir("/proc/stb/sensors"):
 				if dirname.find("temp", 0, 4) == 0:
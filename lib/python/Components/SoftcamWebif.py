@@ -0,0 +1,369 @@
+from __future__ import print_function
+from base64 import b64encode
+from hashlib import md5
+from os import urandom
+import re
+from urlparse import urlsplit
+from xml.etree.ElementTree import TreeBuilder, XMLParser
+
+from twisted.internet.defer import Deferred
+from twisted.internet.protocol import Protocol
+from twisted.web.client import Agent, HTTPConnectionPool, ResponseDone
+from twisted.web.http import PotentialDataLoss
+from twisted.web.http_headers import Headers
+
+# Client for the web interfaces of the softcams (OScam, NCam and CCcam) that
+# the softcam info screens show.  Requests go through the reactor over kept
+# alive connections, one pool and one authentication per web interface, so a
+# slow softcam no longer blocks the GUI and the digest authentication is not
+# negotiated again for every request.  XML answers are parsed while they are
+# received, only the elements the caller asked for are kept as trees.
+#
+# Screens that show live data subscribe to a page: it is fetched once per
+# interval for all of them and a subscriber is only called when what it
+# takes from the page changed.
+#
+# The reactor is imported when it is used, this module is imported before
+# mytest.py installed e2reactor.
+
+TIMEOUT = 10  # Seconds.
+MAX_CONNECTIONS = 2  # Per web interface.
+
+
+class WebifError(Exception):
+	pass
+
+
+def parseChallenge(header):
+	scheme, dummy, parameters = header.strip().partition(" ")
+	values = {}
+	for name, quoted, plain in re.findall(r'(\w+)\s*=\s*(?:"([^"]*)"|([^,\s]*))', parameters):
+		values[name.lower()] = quoted or plain
+	return scheme.lower(), values
+
+
+class Authentication:
+	"""Basic or digest authentication, whichever the server asked for last.
+	The digest challenge is kept and used for the following requests with a
+	new nonce count, until the server sends a new one."""
+
+	def __init__(self, username, password):
+		self.username = username or ""
+		self.password = password or ""
+		self.scheme = None
+		self.challenge = {}
+		self.count = 0
+
+	def setChallenge(self, header):
+		self.scheme, self.challenge = parseChallenge(header)
+		self.count = 0
+
+	def getHeader(self, method, uri):
+		if not self.username or self.scheme is None:
+			return None
+		if self.scheme == "basic":
+			return "Basic %s" % b64encode("%s:%s" % (self.username, self.password))
+		challenge = self.challenge
+		ha1 = md5("%s:%s:%s" % (self.username, challenge.get("realm", ""), self.password)).hexdigest()
+		ha2 = md5("%s:%s" % (method, uri)).hexdigest()
+		fields = [("username", self.username), ("realm", challenge.get("realm", "")), ("nonce", challenge.get("nonce", "")), ("uri", uri)]
+		if "auth" in challenge.get("qop", "").split(","):
+			self.count += 1
+			count = "%08x" % self.count
+			cnonce = urandom(8).encode("hex")
+			response = md5("%s:%s:%s:%s:auth:%s" % (ha1, challenge.get("nonce", ""), count, cnonce, ha2)).hexdigest()
+			fields += [("qop", "auth"), ("nc", count), ("cnonce", cnonce)]
+		else:
+			response = md5("%s:%s:%s" % (ha1, challenge.get("nonce", ""), ha2)).hexdigest()
+		fields.append(("response", response))
+		if "opaque" in challenge:
+			fields.append(("opaque", challenge["opaque"]))
+		if "algorithm" in challenge:
+			fields.append(("algorithm", challenge["algorithm"]))
+		return "Digest " + ", ".join(['%s=%s' % (name, name in ("qop", "nc", "algorithm") and value or '"%s"' % value) for name, value in fields])
+
+
+class WebifDocument:
+	"""ElementTree parser target.  Elements named in records are built as
+	trees and collected in records[tag] when they are complete, the
+	attributes of all other elements are kept in attributes[tag] (the first
+	element of that name) and the text of the elements named in texts in
+	texts[tag], root has the attributes of the root element.  Nothing else of
+	the document is kept."""
+
+	def __init__(self, records=(), texts=()):
+		self.records = dict([(tag, []) for tag in records])
+		self.root = None
+		self.attributes = {}
+		self.texts = dict([(tag, []) for tag in texts])
+		self.builder = None
+		self.depth = 0
+		self.text = None
+
+	def start(self, tag, attrib):
+		if self.root is None:
+			self.root = dict(attrib)
+		if self.builder is not None:
+			self.depth += 1
+			self.builder.start(tag, attrib)
+		elif tag in self.records:
+			self.builder = TreeBuilder()
+			self.depth = 1
+			self.builder.start(tag, attrib)
+		else:
+			self.attributes.setdefault(tag, dict(attrib))
+			if tag in self.texts:
+				self.text = self.texts[tag]
+
+	def end(self, tag):
+		if self.builder is not None:
+			self.builder.end(tag)
+			self.depth -= 1
+			if not self.depth:
+				self.records[tag].append(self.builder.close())
+				self.builder = None
+		elif tag in self.texts:
+			self.text = None
+
+	def data(self, data):
+		if self.builder is not None:
+			self.builder.data(data)
+		elif self.text is not None:
+			self.text.append(data)
+
+	def close(self):
+		if self.root is None:
+			self.root = {}
+		for tag, text in self.texts.items():
+			self.texts[tag] = "".join(text)
+		return self
+
+	def getText(self, tag):
+		return self.texts.get(tag, "")
+
+
+class BodyReceiver(Protocol):
+	def __init__(self, document):
+		self.finished = None
+		self.chunks = []
+		self.parser = None
+		self.error = None
+		if document is not None:
+			self.parser = XMLParser(target=document)
+
+	def dataReceived(self, data):
+		self.chunks.append(data)
+		if self.parser is not None and self.error is None:
+			try:
+				self.parser.feed(data)
+			except Exception as err:
+				self.error = err  # The rest of the body is still read, the connection stays usable.
+
+	def cancel(self, finished):
+		self.transport.stopProducing()  # Closes the connection, it is not reused.
+
+	def connectionLost(self, reason):
+		if self.finished.called:  # Cancelled.
+			return
+		if not reason.check(ResponseDone, PotentialDataLoss):
+			self.finished.errback(reason)
+			return
+		body = "".join(self.chunks)
+		if self.parser is None:
+			self.finished.callback(body)
+			return
+		try:
+			if self.error is not None:
+				raise self.error
+			self.finished.callback(self.parser.close())
+		except Exception as err:
+			self.finished.errback(WebifError("Invalid answer! (%s)" % err))
+
+
+class WebifPoll:
+	"""One page that is fetched once per interval for its subscribers."""
+
+	def __init__(self, client, path, records, texts, interval):
+		self.client = client
+		self.path = path
+		self.records = records
+		self.texts = texts
+		self.interval = interval
+		self.subscribers = []  # [callback, errback, convert, last value]
+		self.document = None
+		self.running = False
+		self.call = None
+
+	def add(self, callback, errback, convert):
+		self.subscribers.append([callback, errback, convert, None])
+		if self.document is not None:
+			self.deliver(self.subscribers[-1])
+		if not self.running and self.call is None:
+			self.run()
+
+	def remove(self, callback):
+		self.subscribers = [x for x in self.subscribers if x[0] != callback]
+		if not self.subscribers and self.call is not None:
+			self.call.cancel()
+			self.call = None
+
+	def refresh(self):
+		"""Fetch the page now, e.g. when the user asked for it."""
+		if self.call is not None:
+			self.call.cancel()
+			self.call = None
+		if not self.running:
+			self.run()
+
+	def run(self):
+		self.call = None
+		if not self.subscribers:
+			return
+		self.running = True
+		deferred = self.client.request(self.path, self.records, self.texts)
+		deferred.addCallbacks(self.received, self.failed)
+
+	def received(self, document):
+		self.running = False
+		self.document = document
+		for subscriber in self.subscribers[:]:
+			self.deliver(subscriber)
+		self.schedule()
+
+	def deliver(self, subscriber):
+		callback, errback, convert, last = subscriber
+		value = convert(self.document) if convert else self.document
+		if convert is None or value != last:
+			subscriber[3] = value
+			callback(value)
+
+	def failed(self, failure):
+		self.running = False
+		self.document = None
+		error = failure.getErrorMessage()
+		print("[SoftcamWebif] Error: Unable to get '%s'! (%s)" % (self.path, error))
+		for subscriber in self.subscribers[:]:
+			subscriber[3] = None  # The next answer is shown again.
+			if subscriber[1]:
+				subscriber[1](error)
+		self.schedule()
+
+	def schedule(self):
+		if self.subscribers and self.interval > 0:
+			from twisted.internet import reactor
+			self.call = reactor.callLater(self.interval, self.run)
+
+
+class WebifClient:
+	def __init__(self, url, username="", password="", timeout=TIMEOUT):
+		self.url = url.rstrip("/")
+		self.authentication = Authentication(username, password)
+		self.timeout = timeout
+		self.agent = None
+		self.polls = {}
+
+	def getAgent(self):
+		if self.agent is None:
+			from twisted.internet import reactor
+			pool = HTTPConnectionPool(reactor, persistent=True)
+			pool.maxPersistentPerHost = MAX_CONNECTIONS
+			pool.retryAutomatically = True  # A kept alive connection the server closed is retried on a new one.
+			self.agent = Agent(reactor, connectTimeout=self.timeout, pool=pool)
+		return self.agent
+
+	def request(self, path, records=None, texts=()):
+		"""Return a Deferred that fires with the body of path, or with a
+		WebifDocument of it when records or texts are given."""
+		document = None
+		if records is not None or texts:
+			document = (records or (), texts)
+		return self.send(path, document, True)
+
+	def send(self, path, document, retry):
+		from twisted.internet import reactor
+		headers = Headers()
+		authorization = self.authentication.getHeader("GET", path)
+		if authorization:
+			headers.addRawHeader("Authorization", authorization)
+		deferred = self.getAgent().request("GET", self.url + path, headers)
+		timeout = reactor.callLater(self.timeout, deferred.cancel)
+		deferred.addCallback(self.gotResponse, path, document, retry)
+
+		def stopTimeout(result):
+			if timeout.active():
+				timeout.cancel()
+			return result
+		deferred.addBoth(stopTimeout)
+		return deferred
+
+	def gotResponse(self, response, path, document, retry):
+		if response.code == 401 and retry and self.authentication.username:
+			challenge = response.headers.getRawHeaders("www-authenticate")
+			if challenge:
+				self.authentication.setChallenge(challenge[0])
+				discarded = self.receive(response, None)
+				discarded.addCallback(lambda result: self.send(path, document, False))
+				return discarded
+		if response.code != 200:
+			discarded = self.receive(response, None)  # Read it, so the connection can be reused.
+			discarded.addCallback(lambda result: self.fail(response))
+			return discarded
+		return self.receive(response, document and WebifDocument(*document))
+
+	def receive(self, response, document):
+		receiver = BodyReceiver(document)
+		receiver.finished = Deferred(receiver.cancel)
+		response.deliverBody(receiver)
+		return receiver.finished
+
+	def fail(self, response):
+		raise WebifError("HTTP %d %s" % (response.code, response.phrase))
+
+	def subscribe(self, path, callback, errback=None, convert=None, interval=0, records=(), texts=()):
+		"""Call callback with convert(document) of path whenever that changed,
+		checked every interval seconds, or once for an interval of 0."""
+		poll = self.polls.get(path)
+		if poll is None:
+			poll = self.polls[path] = WebifPoll(self, path, records, texts, interval)
+		poll.interval = interval
+		poll.add(callback, errback, convert)
+		return poll
+
+	def unsubscribe(self, path, callback):
+		poll = self.polls.get(path)
+		if poll:
+			poll.remove(callback)
+			if not poll.subscribers:
+				del self.polls[path]
+
+	def refresh(self, path):
+		poll = self.polls.get(path)
+		if poll:
+			poll.refresh()
+
+
+clients = {}
+
+
+def getWebifClient(url, username="", password=""):
+	"""The shared client for the web interface at url, e.g.
+	http://127.0.0.1:8888."""
+	key = (url.rstrip("/"), username or "", password or "")
+	client = clients.get(key)
+	if client is None:
+		client = clients[key] = WebifClient(url, username, password)
+	return client
+
+
+def getPage(url):
+	"""Return a Deferred that fires with the body of url, user name and
+	password may be part of it."""
+	url = urlsplit(url.strip())
+	host = url.hostname or ""
+	if ":" in host:
+		host = "[%s]" % host
+	base = "%s://%s%s" % (url.scheme, host, url.port and ":%d" % url.port or "")
+	path = url.path or "/"
+	if url.query:
+		path += "?" + url.query
+	return getWebifClient(base, url.username, url.password).request(path)
@@ -1,8 +1,7 @@
 from Components.Sources.Source import Source
 from Components.Element import cached
-from Components.Harddisk import harddiskmanager
+from Components.Harddisk import diskMonitor, harddiskmanager
 from Components.config import config
-from enigma import eTimer
 from Components.SystemInfo import SystemInfo
 
 class HddState(Source):
@@ -31,20 +30,24 @@ class HddState(Source):
 		self.diskName = diskName
 		self.allVisible = allVisible
 		self.standby_time = poll
-		self.timer = eTimer()
-		self.timer.callback.append(self.updateHddState)
 		self.idle_time = int(config.usage.hdd_standby.value)
 		config.usage.hdd_standby.addNotifier(self.setStandbyTime, initial_call=False)
 		if self.hdd_list:
 			self.updateHddState(force=True)
 		if self.onPartitionAddRemove not in harddiskmanager.on_partition_list_change:
 			harddiskmanager.on_partition_list_change.append(self.onPartitionAddRemove)
+		if self.onDiskStateChange not in diskMonitor.onStateChange:
+			diskMonitor.onStateChange.append(self.onDiskStateChange)
 
 	def onPartitionAddRemove(self, state, part):
-		self.timer.stop()
 		self.isHDD()
 		self.updateHddState(force=True)
 
+	def onDiskStateChange(self, hdd):
+		# diskMonitor tells when a disk went into or woke up from standby, nothing needs to be polled.
+		if hdd in [x[1] for x in self.hdd_list]:
+			self.updateHddState()
+
 	def updateHddState(self, force=False):
 		prev_state = self.isSleeping
 		string = ""
@@ -76,10 +79,6 @@ class HddState(Source):
 					string = "\c0000??00"
 					string += "active"
 				self.isSleeping = True
-				idle = self.idle_time
-			if self.idle_time:
-				timeout = len(self.hdd_list) > 1 and self.standby_time or idle
-				self.timer.start(timeout * 100, True)
 		else:
 			self.isSleeping = False
 		if string:
@@ -91,7 +90,6 @@ class HddState(Source):
 			self.changed((self.CHANGED_ALL,))
 
 	def setStandbyTime(self, cfgElem):
-		self.timer.stop()
 		self.idle_time = int(cfgElem.value)
 		self.updateHddState(force=True)
 
@@ -132,3 +130,15 @@ class HddState(Source):
 	def getValue(self):
 		return self.isSleeping
 	value = property(getValue)
+
+	def getDisks(self):
+		# Not cached, the idle time and the I/O rate change all the time.
+		return [{
+			"name": hdd[0],
+			"internal": hdd[1].internal,
+			"rotational": hdd[1].rotational,
+			"sleeping": hdd[1].isSleeping(),
+			"idle": hdd[1].getIdleTime(),  # Seconds.
+			"rate": hdd[1].getIORate()  # Bytes per second.
+		} for hdd in self.hdd_list]
+	disks = property(getDisks)
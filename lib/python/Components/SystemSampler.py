@@ -0,0 +1,194 @@
+from __future__ import print_function
+from collections import deque
+from os import listdir
+from time import time
+
+from Components.Converter.Poll import Poll
+
+# Readers for the /proc and sysfs files the system information converters
+# show.  Every metric is read once per interval for all of its subscribers,
+# counters are turned into rates and the last HISTORY_SIZE samples are kept
+# for graphs.  Metrics nobody subscribed to are only read when asked for with
+# get(), and then at most once per interval as well.
+
+HISTORY_SIZE = 60
+SECTOR_SIZE = 512  # /proc/diskstats always counts in 512 byte sectors.
+
+
+def readCpu(previous, elapsed):
+	# Returns the busy percentage of all CPUs followed by the one of every CPU.
+	raw = []
+	with open("/proc/stat", "r") as fd:
+		for line in fd:
+			if line.startswith("cpu"):
+				data = [int(x) for x in line.split()[1:]]
+				total = sum(data)
+				raw.append((total, total - data[3] - data[4]))  # Busy is everything but idle and iowait.
+	if not previous or len(previous) != len(raw):
+		previous = [(0, 0)] * len(raw)
+	value = []
+	for (total, busy), (prevTotal, prevBusy) in zip(raw, previous):
+		try:
+			value.append(100 * (busy - prevBusy) / (total - prevTotal))
+		except ZeroDivisionError:
+			value.append(0)
+	return raw, value
+
+
+def readNet(previous, elapsed):
+	raw = {}
+	value = {}
+	with open("/proc/net/dev", "r") as fd:
+		for line in fd.readlines()[2:]:
+			name, data = line.split(":", 1)
+			name = name.strip()
+			data = [int(x) for x in data.split()]
+			raw[name] = (data[0], data[8])
+			rxRate = txRate = 0
+			if previous and name in previous and elapsed > 0:
+				rxRate = max(data[0] - previous[name][0], 0) / elapsed
+				txRate = max(data[8] - previous[name][1], 0) / elapsed
+			value[name] = {
+				"rx": data[0],
+				"rxErrors": data[2],
+				"rxDrops": data[3],
+				"tx": data[8],
+				"txErrors": data[10],
+				"txDrops": data[11],
+				"rxRate": rxRate,  # Bytes per second.
+				"txRate": txRate
+			}
+	return raw, value
+
+
+def readDisk(previous, elapsed):
+	raw = {}
+	value = {}
+	with open("/proc/diskstats", "r") as fd:
+		for line in fd:
+			data = line.split()
+			if len(data) < 10:
+				continue
+			name = data[2]
+			reads, readSectors, writes, writeSectors = int(data[3]), int(data[5]), int(data[7]), int(data[9])
+			raw[name] = (readSectors, writeSectors)
+			readRate = writeRate = 0
+			if previous and name in previous and elapsed > 0:
+				readRate = max(readSectors - previous[name][0], 0) * SECTOR_SIZE / elapsed
+				writeRate = max(writeSectors - previous[name][1], 0) * SECTOR_SIZE / elapsed
+			value[name] = {
+				"reads": reads,
+				"writes": writes,
+				"readBytes": readSectors * SECTOR_SIZE,
+				"writeBytes": writeSectors * SECTOR_SIZE,
+				"readRate": readRate,  # Bytes per second.
+				"writeRate": writeRate
+			}
+	return raw, value
+
+
+sensorUnits = {}
+
+
+def readSensors(previous, elapsed):
+	# Returns (value, unit) of every /proc/stb/sensors/temp* sensor.
+	value = {}
+	try:
+		names = [x for x in listdir("/proc/stb/sensors") if x.startswith("temp")]
+	except OSError:
+		names = []
+	for name in names:
+		path = "/proc/stb/sensors/%s" % name
+		try:
+			with open("%s/value" % path, "r") as fd:
+				data = int(fd.readline().strip())
+			if name not in sensorUnits:
+				with open("%s/unit" % path, "r") as fd:
+					sensorUnits[name] = fd.readline().strip()
+		except (IOError, OSError, ValueError):
+			continue
+		value[name] = (data, sensorUnits[name])
+	return None, value
+
+
+def readFan(previous, elapsed):
+	with open("/proc/stb/fp/fan_speed", "r") as fd:
+		return None, fd.readline().strip()
+
+
+class Metric(Poll, object):
+	def __init__(self, name, interval, reader):
+		Poll.__init__(self)
+		self.name = name
+		self.reader = reader
+		self.poll_interval = interval
+		self.callbacks = []
+		self.history = deque(maxlen=HISTORY_SIZE)
+		self.raw = None
+		self.value = None
+		self.sampled = None
+
+	def sample(self):
+		now = time()
+		elapsed = self.sampled and now - self.sampled or 0
+		try:
+			self.raw, self.value = self.reader(self.raw, elapsed)
+		except (IOError, OSError, ValueError, IndexError) as err:
+			if self.sampled is None:
+				print("[SystemSampler] Error: Unable to sample '%s'! (%s)" % (self.name, err))
+			self.raw = self.value = None
+		self.sampled = now
+		self.history.append((now, self.value))
+
+	def get(self):
+		if self.sampled is None or not 0 <= time() - self.sampled < self.poll_interval / 1000.0:
+			self.sample()
+		return self.value
+
+	def poll(self):
+		if self.sampled is None or not 0 <= time() - self.sampled < self.poll_interval / 2000.0:
+			self.sample()  # Unless get() just did.
+		for callback in self.callbacks[:]:
+			callback(self.value)
+
+	def subscribe(self, callback):
+		if callback not in self.callbacks:
+			self.callbacks.append(callback)
+		self.poll_enabled = True
+		callback(self.get())
+
+	def unsubscribe(self, callback):
+		if callback in self.callbacks:
+			self.callbacks.remove(callback)
+		if not self.callbacks and self.poll_enabled:
+			self.poll_enabled = False
+
+
+class SystemSampler:
+	def __init__(self):
+		self.metrics = {}
+		self.addMetric("cpu", 500, readCpu)
+		self.addMetric("net", 1000, readNet)
+		self.addMetric("disk", 1000, readDisk)
+		self.addMetric("sensors", 5000, readSensors)
+		self.addMetric("fan", 5000, readFan)
+
+	def addMetric(self, name, interval, reader):
+		self.metrics[name] = Metric(name, interval, reader)
+
+	def get(self, name):
+		return self.metrics[name].get()
+
+	def getHistory(self, name):
+		"""Return the last samples as a list of (time, value) tuples."""
+		return list(self.metrics[name].history)
+
+	def subscribe(self, name, callback):
+		"""Call callback(value) now and every time the metric was sampled."""
+		self.metrics[name].subscribe(callback)
+
+	def unsubscribe(self, name, callback):
+		self.metrics[name].unsubscribe(callback)
+
+
+systemSampler = SystemSampler()
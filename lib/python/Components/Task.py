@@ -3,10 +3,13 @@ from __future__ import print_function
 # A Job consists of many "Tasks".
 # A task is the run of an external tool, with proper methods for failure handling
 from __future__ import print_function
+import os
+from time import time
 from Tools.CList import CList
 
 class Job(object):
 	NOT_STARTED, IN_PROGRESS, FINISHED, FAILED = range(4)
+	PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH = -10, 0, 10
 	def __init__(self, name):
 		self.tasks = [ ]
 		self.resident_tasks = [ ]
@@ -22,6 +25,9 @@ class Job(object):
 		self.state_changed = CList()
 		self.status = self.NOT_STARTED
 		self.onSuccess = None
+		self.priority = self.PRIORITY_NORMAL
+		self.resources = None  # The lanes of the job manager the job runs in, see JobManager.getResources().
+		self.started = None
 
 	# description is a dict
 	def fromDescription(self, description):
@@ -39,6 +45,19 @@ class Job(object):
 
 	progress = property(getProgress)
 
+	def getTransfer(self):
+		"""Return the bytes done and the bytes to do by all tasks."""
+		return sum([task.bytes_done for task in self.tasks]), sum([task.bytes_total for task in self.tasks])
+
+	def getThroughput(self):
+		"""Return the bytes per second since the job started and the seconds it still needs, or None."""
+		done, total = self.getTransfer()
+		elapsed = self.started and time() - self.started
+		if not done or not elapsed or elapsed <= 0:
+			return 0, None
+		rate = done / elapsed
+		return rate, max(total - done, 0) / rate
+
 	def getStatustext(self):
 		return { self.NOT_STARTED: _("Waiting"), self.IN_PROGRESS: _("In progress"), self.FINISHED: _("Finished"), self.FAILED: _("Failed") }[self.status]
 
@@ -53,6 +72,7 @@ class Job(object):
 	def start(self, callback):
 		assert self.callback is None
 		self.callback = callback
+		self.started = time()
 		self.restart()
 
 	def restart(self):
@@ -132,6 +152,8 @@ class Task(object):
 		self.cmdline = None
 		self.task_progress_changed = None
 		self.output_line = ""
+		self.bytes_done = 0  # Set by tasks that move data, for the throughput of the job.
+		self.bytes_total = 0
 		job.addTask(self)
 		self.container = None
 
@@ -334,40 +356,110 @@ class ConditionTask(Task):
 		if res:
 			self.finish()
 
-# The jobmanager will execute multiple jobs, each after another.
+# The jobmanager executes the jobs in lanes: every job needs one or more
+# resources (its lanes), and only as many jobs as the limit of a resource
+# allows use it at the same time.  Jobs that copy or move files run in the
+# lane of the mount they write to, jobs that only have PythonTasks in the
+# "python" lane and everything else in the "default" lane, one after another
+# as all jobs used to run.  A job that waits for a free lane does not hold up
+# the jobs behind it in other lanes, and of the jobs that can start the one
+# with the highest priority starts first.
 # later, it will also support suspending jobs (and continuing them after reboot etc)
 # It also supports a notification when some error occurred, and possibly a retry.
+def getMountResource(path):
+	from Components.Harddisk import findMountPoint
+	return "mount:%s" % findMountPoint(os.path.realpath(path))
+
 class JobManager:
+	MAX_JOBS = 4
+	LIMITS = {
+		"default": 1,
+		"python": 2,
+		"mount": 1  # Per mount, two copies to the same disk only make both slower.
+	}
+
 	def __init__(self):
-		self.active_jobs = [ ]
+		self.active_jobs = [ ]  # Waiting to be started.
+		self.running_jobs = [ ]  # Started, including failed jobs that wait for a retry.
 		self.failed_jobs = [ ]
 		self.job_classes = [ ]
 		self.in_background = False
 		self.visible = False
-		self.active_job = None
+		self.limits = dict(self.LIMITS)
+		self.max_jobs = self.MAX_JOBS
+		self.usage = { }
+
+	def getActiveJob(self):
+		return self.running_jobs and self.running_jobs[0] or None
+
+	active_job = property(getActiveJob)
+
+	def setLimit(self, resource, limit):
+		"""Set how many jobs may use resource ("default", "python", "mount" for
+		every mount or "mount:<path>" for one) at the same time."""
+		self.limits[resource] = max(limit, 1)
+		self.kick()
+
+	def getLimit(self, resource):
+		limit = self.limits.get(resource)
+		if limit is None:
+			limit = self.limits.get(resource.split(":", 1)[0], 1)
+		return limit
+
+	def getResources(self, job):
+		if job.resources:
+			return tuple(job.resources)
+		if job.tasks and not [task for task in job.tasks if not isinstance(task, PythonTask)]:
+			return ("python",)
+		return ("default",)
 
 	# Set onSuccess to popupTaskView to get a visible notification.
 	# onFail defaults to notifyFailed which tells the user that it went south.
-	def AddJob(self, job, onSuccess=None, onFail=None):
+	def AddJob(self, job, onSuccess=None, onFail=None, priority=None):
 		job.onSuccess = onSuccess
 		if onFail is None:
 			job.onFail = self.notifyFailed
 		else:
 			job.onFail = onFail
+		if priority is not None:
+			job.priority = priority
 		self.active_jobs.append(job)
 		self.kick()
 
+	def canStart(self, job):
+		if len(self.running_jobs) >= self.max_jobs:
+			return False
+		for resource in self.getResources(job):
+			if self.usage.get(resource, 0) >= self.getLimit(resource):
+				return False
+		return True
+
 	def kick(self):
-		if self.active_job is None:
-			if self.active_jobs:
-				self.active_job = self.active_jobs.pop(0)
-				self.active_job.start(self.jobDone)
+		while True:
+			startable = [job for job in self.active_jobs if self.canStart(job)]
+			if not startable:
+				break
+			job = max(startable, key=lambda job: job.priority)  # The first one of the highest priority.
+			self.active_jobs.remove(job)
+			self.running_jobs.append(job)
+			job.manager_resources = self.getResources(job)
+			for resource in job.manager_resources:
+				self.usage[resource] = self.usage.get(resource, 0) + 1
+			job.start(self.jobDone)
+
+	def release(self, job):
+		if job in self.running_jobs:
+			self.running_jobs.remove(job)
+			for resource in job.manager_resources:
+				self.usage[resource] -= 1
+				if not self.usage[resource]:
+					del self.usage[resource]
 
 	def notifyFailed(self, job, task, problems):
 		from Tools import Notifications
 		from Screens.MessageBox import MessageBox
 		if problems[0].RECOVERABLE:
-			Notifications.AddNotificationWithCallback(self.errorCB, MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
+			Notifications.AddNotificationWithCallback(lambda answer: self.errorCB(answer, job), MessageBox, _("Error: %s\nRetry?") % (problems[0].getErrorMessage(task)))
 			return True
 		else:
 			Notifications.AddNotification(MessageBox, job.name + "\n" + _("Error") + (': %s') % (problems[0].getErrorMessage(task)), type = MessageBox.TYPE_ERROR )
@@ -377,9 +469,9 @@ class JobManager:
 		print("[Task] job", job, "completed with", problems, "in", task)
 		if problems:
 			if not job.onFail(job, task, problems):
-				self.errorCB(False)
+				self.errorCB(False, job)
 		else:
-			self.active_job = None
+			self.release(job)
 			if job.onSuccess:
 				job.onSuccess(job)
 			self.kick()
@@ -392,22 +484,42 @@ class JobManager:
 			self.visible = True
 			Notifications.AddNotification(JobView, job)
 
-	def errorCB(self, answer):
+	def errorCB(self, answer, job=None):
+		# A failed job keeps its lanes until it is retried or given up.
+		job = job or self.active_job
+		if job is None:
+			return
 		if answer:
 			print("[Task] retrying job")
-			self.active_job.retry()
+			job.retry()
 		else:
 			print("[Task] not retrying job.")
-			self.failed_jobs.append(self.active_job)
-			self.active_job = None
+			self.failed_jobs.append(job)
+			self.release(job)
 			self.kick()
 
 	def getPendingJobs(self):
-		list = [ ]
-		if self.active_job:
-			list.append(self.active_job)
-		list += self.active_jobs
-		return list
+		return self.running_jobs + self.active_jobs
+
+	def getMetrics(self):
+		"""Return the throughput of all running jobs together as a dictionary
+		with the number of "running" and "waiting" jobs, the bytes "done" and
+		"total", the "rate" in bytes per second and the "eta" in seconds, or
+		None when not known."""
+		done = total = rate = 0
+		for job in self.running_jobs:
+			jobDone, jobTotal = job.getTransfer()
+			done += jobDone
+			total += jobTotal
+			rate += job.getThroughput()[0]
+		return {
+			"running": len(self.running_jobs),
+			"waiting": len(self.active_jobs),
+			"done": done,
+			"total": total,
+			"rate": rate,
+			"eta": max(total - done, 0) / rate if rate else None
+		}
 
 # some examples:
 #class PartitionExistsPostcondition:
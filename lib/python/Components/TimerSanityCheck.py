@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 import NavigationInstance
+from bisect import bisect_right, insort
 from time import localtime, mktime, gmtime, time
 from enigma import iServiceInformation, eServiceCenter, eServiceReference, getBestPlayableServiceReference
 from timer import TimerEntry
@@ -9,16 +10,223 @@ import RecordTimer
 from Tools.CIHelper import cihelper
 from Components.config import config
 
+WEEK = 604800
+BFLAG = -1  # Begin events sort before end events at the same time.
+EFLAG = 1
+
+
+def getRepeatedBegins(timer, localtimediff):
+	# The begins of a repeated timer in the first week of the Epoch.
+	begins = []
+	rflags = timer.repeated
+	rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
+	begin = timer.begin % 86400 # map to first day
+	if (localtimediff > 0) and ((begin + localtimediff) > 86400):
+		rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
+	elif (localtimediff < 0) and (begin < localtimediff):
+		rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
+	while rflags: # then arrange on the week
+		if rflags & 1:
+			begins.append(begin)
+		begin += 86400
+		rflags >>= 1
+	return begins
+
+
+def isChecked(timer):
+	return not (timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded)
+
+
+# The timers of a timer list that take part in the conflict detection, kept
+# from one check to the next.  Single timers are kept sorted by their begin,
+# repeated timers with their begins in the week.  Every check only brings
+# the timers up to date that were added, changed or removed since the last
+# one and then only looks at the time window around the checked timer: all
+# timers that overlap it, the timers that overlap those and so on.  Timers
+# outside that window can not share a tuner with it.
+class TimerConflictIndex:
+	def __init__(self):
+		self.localtimediff = None
+		self.entries = {}  # id(timer): (state, timer)
+		self.singles = []  # (begin, end, id(timer), timer)
+		self.maxlength = 0
+		self.repeated = {}  # id(timer): (timer, begins)
+		self.positions = {}  # id(timer): position in the timer list
+		self.serviceTypes = {}  # Tuner types of services that could not be tuned.
+
+	def getState(self, timer):
+		return (timer.begin, timer.end, timer.repeated, timer.disabled, timer.conflict_detection, timer.state, timer.service_ref and timer.service_ref.ref.toString())
+
+	def sync(self, timerlist):
+		localtimediff = 25*3600 - mktime(gmtime(25*3600))
+		if localtimediff != self.localtimediff:
+			self.__init__()
+			self.localtimediff = localtimediff
+		positions = {}
+		for position, timer in enumerate(timerlist):
+			key = id(timer)
+			positions[key] = position
+			state = self.getState(timer)
+			entry = self.entries.get(key)
+			if entry is None or entry[1] is not timer or entry[0] != state:
+				if entry is not None:
+					self.remove(key)
+				self.add(timer, state)
+		for key in [x for x in self.entries if x not in positions]:
+			self.remove(key)
+		self.positions = positions
+
+	def add(self, timer, state):
+		self.entries[id(timer)] = (state, timer)
+		if not isChecked(timer):
+			return
+		if timer.repeated:
+			self.repeated[id(timer)] = (timer, getRepeatedBegins(timer, self.localtimediff))
+		else:
+			insort(self.singles, (timer.begin, timer.end, id(timer), timer))
+			self.maxlength = max(self.maxlength, timer.end - timer.begin)
+
+	def remove(self, key):
+		state, timer = self.entries.pop(key)
+		if self.repeated.pop(key, None) is None:
+			item = (timer.begin, timer.end, key, timer)
+			index = bisect_right(self.singles, item) - 1
+			if index >= 0 and self.singles[index][2] == key:
+				del self.singles[index]
+
+	def getHorizon(self, newtimer):
+		# The weeks the repeated timers are laid out on: all weeks with single
+		# timers, two weeks from the Epoch if there are none.
+		singles = [x for x in self.singles if x[3] is not newtimer]
+		if not newtimer.repeated:
+			singles.append((newtimer.begin, newtimer.end))
+		if not singles:
+			return 345600, 2, False # the Epoch begins on Thursday
+		interval_begin = singles[0][0]
+		if not newtimer.repeated:
+			interval_begin = min(interval_begin, newtimer.begin)
+		interval_end = max([x[1] for x in singles])
+		offset_0 = interval_begin - (interval_begin % WEEK)
+		weeks = (interval_end - offset_0) / WEEK
+		if (interval_end - offset_0) % WEEK:
+			weeks += 1
+		return offset_0, int(weeks), True
+
+	def getOccurrences(self, timer, begins, horizon, lo=None, hi=None):
+		offset_0, weeks, real = horizon
+		length = timer.end - timer.begin
+		first, last = 0, weeks
+		if real and lo is not None:
+			first = max(first, int((lo - offset_0 - length) // WEEK) - 1)
+			last = min(last, int((hi - offset_0) // WEEK) + 1)
+		occurrences = []
+		for cnt in range(first, last):
+			for begin in begins:
+				new_event_begin = begin + offset_0 + (cnt * WEEK)
+				if real:
+					# summertime correction
+					new_event_begin += 3600 * (localtime(timer.begin).tm_hour - localtime(new_event_begin).tm_hour)
+					if new_event_begin < timer.begin: # is the soap already running?
+						continue
+				new_event_end = new_event_begin + length
+				if lo is None or (new_event_begin <= hi and new_event_end >= lo):
+					occurrences.append((new_event_begin, new_event_end))
+		return occurrences
+
+	def find(self, lo, hi, horizon, newtimer):
+		# The (begin, end, position, timer) of all timers overlapping lo..hi.
+		found = []
+		singles = self.singles
+		index = bisect_right(singles, (lo - self.maxlength,))
+		while index < len(singles) and singles[index][0] <= hi:
+			begin, end, key, timer = singles[index]
+			if end >= lo and timer is not newtimer:
+				found.append((begin, end, self.positions[key], timer))
+			index += 1
+		for key, (timer, begins) in self.repeated.iteritems():
+			if timer is not newtimer:
+				position = self.positions[key]
+				found.extend([(begin, end, position, timer) for begin, end in self.getOccurrences(timer, begins, horizon, lo, hi)])
+		return found
+
+	def getEvents(self, newtimer):
+		"""Return the sorted (time, flag, position) begin and end events of the
+		new timer and of all timers in its time window, position -1 is the new
+		timer."""
+		horizon = self.getHorizon(newtimer)
+		if newtimer.repeated:
+			occurrences = self.getOccurrences(newtimer, getRepeatedBegins(newtimer, self.localtimediff), horizon)
+		else:
+			occurrences = [(newtimer.begin, newtimer.end)]
+		intervals = set([(begin, end, -1) for begin, end in occurrences])
+		windows = []
+		for begin, end in occurrences:
+			if [x for x in windows if x[0] <= begin and end <= x[1]]:
+				continue
+			lo, hi = begin, end
+			while True:
+				found = self.find(lo, hi, horizon, newtimer)
+				found += [(b, e, -1, newtimer) for b, e in occurrences if b <= hi and e >= lo]
+				newlo = min([lo] + [x[0] for x in found])
+				newhi = max([hi] + [x[1] for x in found])
+				if (newlo, newhi) == (lo, hi):
+					break
+				lo, hi = newlo, newhi
+			windows.append((lo, hi))
+			intervals.update([x[:3] for x in found])
+		events = []
+		for begin, end, position in intervals:
+			events.extend([(begin, BFLAG, position), (end, EFLAG, position)])
+		events.sort()
+		return events
+
+	def getServiceType(self, ref):
+		# The tuner type of a service from its transponder data.
+		refstr = ref.toString()
+		type = self.serviceTypes.get(refstr)
+		if type is None:
+			serviceInfo = eServiceCenter.getInstance().info(ref)
+			serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
+			type = self.serviceTypes[refstr] = -1 if serviceInfo is None else serviceInfo.get("tuner_type", -1)
+		return type
+
+
+conflictIndex = TimerConflictIndex()
+
+
+def getTransponderKey(ref):
+	# Services on one transponder are recorded with one tuner.
+	if not ref or ref.flags & eServiceReference.isGroup or '%3a//' in ref.toString():
+		return None
+	return ref.type, ref.getUnsignedData(2), ref.getUnsignedData(3), ref.getUnsignedData(4)
+
+
+def checkTimers(timerlist, timers):
+	"""Check the timers as if they were added to timerlist one after the
+	other, only the ones without a conflict.  Return a list with the
+	conflicting timers (see getSimulTimerList()) for each timer, an empty
+	list for the ones that can be added."""
+	timerlist = timerlist[:]
+	results = []
+	for timer in timers:
+		check = TimerSanityCheck(timerlist, timer)
+		if check.check():
+			results.append([])
+			if timer not in timerlist:
+				timerlist.append(timer)
+		else:
+			results.append(check.getSimulTimerList())
+	return results
+
+
 class TimerSanityCheck:
 	def __init__(self, timerlist, newtimer=None):
-		self.localtimediff = 25*3600 - mktime(gmtime(25*3600))
 		self.timerlist = timerlist
 		self.newtimer = newtimer
 		self.simultimer = []
-		self.rep_eventlist = []
 		self.nrep_eventlist = []
-		self.bflag = -1
-		self.eflag = 1
+		self.bflag = BFLAG
+		self.eflag = EFLAG
 
 	def check(self, ext_timer=None):
 		if ext_timer and isinstance(ext_timer, RecordTimer.RecordTimerEntry):
@@ -65,12 +273,6 @@ class TimerSanityCheck:
 		# count of running timers
 
 		serviceHandler = eServiceCenter.getInstance()
-# create a list with all start and end times
-# split it into recurring and singleshot timers
-
-##################################################################################
-# process the new timer
-		self.rep_eventlist = []
 		self.nrep_eventlist = []
 		if ext_timer and isinstance(ext_timer, RecordTimer.RecordTimerEntry):
 			self.newtimer = ext_timer
@@ -84,97 +286,19 @@ class TimerSanityCheck:
 		if curtime.tm_year > 1970 and self.newtimer.end < time():
 			print("[TimerSanityCheck] timer is finished!")
 			return True
-		rflags = self.newtimer.repeated
-		rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
-		if rflags:
-			begin = self.newtimer.begin % 86400 # map to first day
-			if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
-				rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
-			elif (self.localtimediff < 0) and (begin < self.localtimediff):
-				rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
-			while rflags: # then arrange on the week
-				if rflags & 1:
-					self.rep_eventlist.append((begin, -1))
-				begin += 86400
-				rflags >>= 1
-		else:
-			self.nrep_eventlist.extend([(self.newtimer.begin, self.bflag, -1), (self.newtimer.end, self.eflag, -1)])
 
 ##################################################################################
-# now process existing timers
-		self.check_timerlist = []
-		idx = 0
-		for timer in self.timerlist:
-			if timer != self.newtimer:
-				if timer.disabled or not timer.conflict_detection or not timer.service_ref or '%3a//' in timer.service_ref.ref.toString() or timer.state == TimerEntry.StateEnded:
-					continue
-				if timer.repeated:
-					rflags = timer.repeated
-					rflags = ((rflags & 0x7F)>> 3)|((rflags & 0x07)<<4)
-					begin = timer.begin % 86400 # map all to first day
-					if (self.localtimediff > 0) and ((begin + self.localtimediff) > 86400):
-						rflags = ((rflags >> 1)& 0x3F)|((rflags << 6)& 0x40)
-					elif (self.localtimediff < 0) and (begin < self.localtimediff):
-						rflags = ((rflags << 1)& 0x7E)|((rflags >> 6)& 0x01)
-					while rflags:
-						if rflags & 1:
-							self.rep_eventlist.append((begin, idx))
-						begin += 86400
-						rflags >>= 1
-				else:
-					self.nrep_eventlist.extend([(timer.begin, self.bflag, idx), (timer.end, self.eflag, idx)])
-			self.check_timerlist.append(timer)
-			idx += 1
-
-################################################################################
-# journalize timer repeations
-		if self.nrep_eventlist:
-			interval_begin = min(self.nrep_eventlist)[0]
-			interval_end = max(self.nrep_eventlist)[0]
-			offset_0 = interval_begin - (interval_begin % 604800)
-			weeks = (interval_end - offset_0) / 604800
-			if (interval_end - offset_0) % 604800:
-				weeks += 1
-			for cnt in range(int(weeks)):
-				for event in self.rep_eventlist:
-					if event[1] == -1: # -1 is the identifier of the changed timer
-						event_begin = self.newtimer.begin
-						event_end = self.newtimer.end
-					else:
-						event_begin = self.check_timerlist[event[1]].begin
-						event_end = self.check_timerlist[event[1]].end
-					new_event_begin = event[0] + offset_0 + (cnt * 604800)
-					# summertime correction
-					new_lth = localtime(new_event_begin).tm_hour
-					new_event_begin += 3600 * (localtime(event_begin).tm_hour - new_lth)
-					new_event_end = new_event_begin + (event_end - event_begin)
-					if event[1] == -1:
-						if new_event_begin >= self.newtimer.begin: # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]), (new_event_end, self.eflag, event[1])])
-					else:
-						if new_event_begin >= self.check_timerlist[event[1]].begin: # is the soap already running?
-							self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]), (new_event_end, self.eflag, event[1])])
-		else:
-			offset_0 = 345600 # the Epoch begins on Thursday
-			for cnt in (0, 1): # test two weeks to take care of Sunday-Monday transitions
-				for event in self.rep_eventlist:
-					if event[1] == -1: # -1 is the identifier of the changed timer
-						event_begin = self.newtimer.begin
-						event_end = self.newtimer.end
-					else:
-						event_begin = self.check_timerlist[event[1]].begin
-						event_end = self.check_timerlist[event[1]].end
-					new_event_begin = event[0] + offset_0 + (cnt * 604800)
-					new_event_end = new_event_begin + (event_end - event_begin)
-					self.nrep_eventlist.extend([(new_event_begin, self.bflag, event[1]), (new_event_end, self.eflag, event[1])])
+# create a chronological list with the start and end times of the new timer and
+# the timers in its time window, repeated timers are laid out on the weeks
 
-################################################################################
-# order list chronological
-		self.nrep_eventlist.sort()
+		conflictIndex.sync(self.timerlist)
+		self.check_timerlist = self.timerlist
+		self.nrep_eventlist = conflictIndex.getEvents(self.newtimer)
 
 ##################################################################################
 # detect overlapping timers and overlapping times
 		fakeRecList = []
+		transponders = {} # transponder: [fakeRecService, tunerType, count of timers using it]
 		ConflictTimer = None
 		ConflictTunerType = None
 		newTimerTunerType = None
@@ -212,52 +336,64 @@ class TimerSanityCheck:
 							timer_ref = alternativeref
 					if not alternativeref:
 						timer_ref = getBestPlayableServiceReference(timer.service_ref.ref, eServiceReference())
-				fakeRecService = NavigationInstance.instance.recordService(timer_ref, True)
-				if fakeRecService:
-					fakeRecResult = fakeRecService.start(True)
+				transponder = getTransponderKey(ref)
+				shared = transponder and transponders.get(transponder)
+				if shared: # a tuner is already tuned to the transponder
+					shared[2] += 1
+					fakeRecService = None
+					fakeRecResult = 0
+					tunerType = shared[1][:]
 				else:
-					fakeRecResult = -1
-				# TODO
-				#if fakeRecResult == -6 and len(NavigationInstance.instance.getRecordings(True)) < 2:
-				#	print("[TimerSanityCheck] less than two timers in the simulated recording list - timer conflict is not plausible - ignored !")
-				#	fakeRecResult = 0
-				if not fakeRecResult: # tune okay
-					if hasattr(fakeRecService, 'frontendInfo'):
-						feinfo = fakeRecService.frontendInfo()
-						if feinfo and hasattr(feinfo, 'getFrontendData'):
-							tunerType.append(feinfo.getFrontendData().get("tuner_type", -1))
-						feinfo = None
-				else: # tune failed.. so we must go another way to get service type (DVB-S, DVB-T, DVB-C)
-
-					def getServiceType(ref): # helper function to get a service type of a service reference
-						serviceInfo = serviceHandler.info(ref)
-						serviceInfo = serviceInfo and serviceInfo.getInfoObject(ref, iServiceInformation.sTransponderData)
-						return -1 if serviceInfo is None else serviceInfo.get("tuner_type", -1)
-
-					if ref and ref.flags & eServiceReference.isGroup: # service group ?
-						serviceList = serviceHandler.list(ref) # get all alternative services
-						if serviceList:
-							for ref in serviceList.getContent("R"): # iterate over all group service references
-								type = getServiceType(ref)
-								if not type in tunerType: # just add single time
-									tunerType.append(type)
-					elif ref:
-						tunerType.append(getServiceType(ref))
+					fakeRecService = NavigationInstance.instance.recordService(timer_ref, True)
+					if fakeRecService:
+						fakeRecResult = fakeRecService.start(True)
+					else:
+						fakeRecResult = -1
+					# TODO
+					#if fakeRecResult == -6 and len(NavigationInstance.instance.getRecordings(True)) < 2:
+					#	print("[TimerSanityCheck] less than two timers in the simulated recording list - timer conflict is not plausible - ignored !")
+					#	fakeRecResult = 0
+					if not fakeRecResult: # tune okay
+						if hasattr(fakeRecService, 'frontendInfo'):
+							feinfo = fakeRecService.frontendInfo()
+							if feinfo and hasattr(feinfo, 'getFrontendData'):
+								tunerType.append(feinfo.getFrontendData().get("tuner_type", -1))
+							feinfo = None
+						if transponder and fakeRecService:
+							shared = transponders[transponder] = [fakeRecService, tunerType, 1]
+					else: # tune failed.. so we must go another way to get service type (DVB-S, DVB-T, DVB-C)
+						getServiceType = conflictIndex.getServiceType
+						if ref and ref.flags & eServiceReference.isGroup: # service group ?
+							serviceList = serviceHandler.list(ref) # get all alternative services
+							if serviceList:
+								for ref in serviceList.getContent("R"): # iterate over all group service references
+									type = getServiceType(ref)
+									if not type in tunerType: # just add single time
+										tunerType.append(type)
+						elif ref:
+							tunerType.append(getServiceType(ref))
 
 				if event[2] == -1: # new timer
 					newTimerTunerType = tunerType
 				overlaplist.append((fakeRecResult, timer, tunerType))
-				fakeRecList.append((timer, fakeRecService))
+				fakeRecList.append((timer, fakeRecService, shared and transponder))
 				if fakeRecResult:
 					if ConflictTimer is None: # just take care of the first conflict
 						ConflictTimer = timer
 						ConflictTunerType = tunerType
 			elif event[1] == self.eflag:
-				for fakeRec in fakeRecList:
-					if timer == fakeRec[0] and fakeRec[1]:
-						NavigationInstance.instance.stopRecordService(fakeRec[1])
+				for fakeRec in fakeRecList[:]:
+					if timer == fakeRec[0]:
+						shared = fakeRec[2] and transponders.get(fakeRec[2])
+						if shared:
+							shared[2] -= 1
+							if not shared[2]: # the last timer on the transponder ended
+								NavigationInstance.instance.stopRecordService(shared[0])
+								del transponders[fakeRec[2]]
+						elif fakeRec[1]:
+							NavigationInstance.instance.stopRecordService(fakeRec[1])
 						fakeRecList.remove(fakeRec)
-				fakeRec = None
+				fakeRec = shared = None
 				for entry in overlaplist:
 					if entry[1] == timer:
 						overlaplist.remove(entry)
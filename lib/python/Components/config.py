@@ -1,9 +1,9 @@
 from copy import copy as shallowcopy
-from enigma import getPrevAsciiCode
-from os import fsync, rename
+from enigma import eTimer, getPrevAsciiCode
+from os import fsync, rename, stat
 from os.path import realpath
 from six import PY2
-from time import localtime, strftime
+from time import localtime, strftime, time
 
 from Components.SystemInfo import SystemInfo
 from Tools.Directories import SCOPE_CONFIG, fileExists, resolveFilename
@@ -77,6 +77,16 @@ def NoSave(element):
 	element.disableSave()
 	return element
 
+def setConfigParent(item, parent):
+	if isinstance(item, ConfigSubsection):
+		parents = item.content.parents
+	else:
+		parents = item.__dict__.setdefault("config_parents", [])
+	for x in parents:
+		if x is parent:
+			return
+	parents.append(parent)
+
 
 # ConfigElement, the base class of all ConfigElements.
 #
@@ -96,7 +106,14 @@ def NoSave(element):
 #   save()       Stores _value into saved_value, (or stores "None" if it should
 #                not be stored).
 #
+# A changed saved_value is reported to the config_parents (the ConfigSubsection,
+# ConfigSubList or ConfigSubDict holding the element), so only the changed
+# branches of the config tree have to be collected and pickled again.
+#
 class ConfigElement(object):
+	_saved_value = None
+	config_parents = ()
+
 	def __init__(self):
 		self.extra_args = []
 		self.saved_value = None
@@ -126,6 +143,17 @@ class ConfigElement(object):
 		if self.callNotifiersOnSaveAndCancel:
 			self.changedFinal()  # Call none immediate_feedback notifiers, immediate_feedback Notifiers are called as they are chanaged, so do not need to be called here.
 
+	def getSavedValue(self):
+		return self._saved_value
+
+	def setSavedValue(self, value):
+		if value != self._saved_value:
+			for x in self.config_parents:
+				x.savedValueChanged()
+		self._saved_value = value
+
+	saved_value = property(getSavedValue, setSavedValue)
+
 	def disableSave(self):
 		self.save_disabled = True
 
@@ -2004,6 +2032,8 @@ class ConfigSubsectionContent(object):
 # config.dipswitches.append(ConfigYesNo())
 #
 class ConfigSubList(list, object):
+	config_parents = ()
+
 	def __init__(self):
 		list.__init__(self)
 		self.stored_values = {}
@@ -2035,9 +2065,20 @@ class ConfigSubList(list, object):
 	def append(self, item):
 		i = str(len(self))
 		list.append(self, item)
+		setConfigParent(item, self)
 		if i in self.stored_values:
 			item.saved_value = self.stored_values[i]
 			item.load()
+		self.savedValueChanged()
+
+	def __delitem__(self, index):
+		list.__delitem__(self, index)
+		self.savedValueChanged()
+
+	# the saved values of a list are collected on every call, just pass it up
+	def savedValueChanged(self):
+		for x in self.config_parents:
+			x.savedValueChanged()
 
 	def dict(self):
 		return dict([(str(index), value) for index, value in enumerate(self)])
@@ -2047,15 +2088,27 @@ class ConfigSubList(list, object):
 # "key" has a proper str() method, because it will be used in the config file.
 #
 class ConfigSubDict(dict, object):
+	config_parents = ()
+
 	def __init__(self):
 		dict.__init__(self)
 		self.stored_values = {}
 
 	def __setitem__(self, key, item):
 		dict.__setitem__(self, key, item)
+		setConfigParent(item, self)
 		if str(key) in self.stored_values:
 			item.saved_value = self.stored_values[str(key)]
 			item.load()
+		self.savedValueChanged()
+
+	def __delitem__(self, key):
+		dict.__delitem__(self, key)
+		self.savedValueChanged()
+
+	def savedValueChanged(self):
+		for x in self.config_parents:
+			x.savedValueChanged()
 
 	def load(self):
 		for x in self.values():
@@ -2095,11 +2148,19 @@ class ConfigSubDict(dict, object):
 # If you don't understand this, try adding __setattr__ to a usual exisiting
 # class and you will.
 #
+# content.stored_values doubles as the saved_value of the subsection.  It is
+# only collected again from the items when something below the subsection
+# changed (content.dirty), and content.pickled keeps the pickled text of the
+# subsection until then.
+#
 class ConfigSubsection(object):
 	def __init__(self):
 		self.__dict__["content"] = ConfigSubsectionContent()
 		self.content.items = {}
 		self.content.stored_values = {}
+		self.content.parents = []
+		self.content.dirty = True
+		self.content.pickled = None
 
 	def __getattr__(self, name):
 		if name in self.content.items:
@@ -2112,11 +2173,21 @@ class ConfigSubsection(object):
 		assert isinstance(value, (ConfigSubsection, ConfigElement, ConfigSubList, ConfigSubDict)), "ConfigSubsections can only store ConfigSubsections, ConfigSubLists, ConfigSubDicts or ConfigElements"
 		content = self.content
 		content.items[name] = value
+		setConfigParent(value, self)
 		x = content.stored_values.get(name, None)
 		if x is not None:
 			# print("[config] Ok, now we have a new item '%s' and have the following value for it '%s'." % (name, str(x)))
 			value.saved_value = x
 			value.load()
+		self.savedValueChanged()
+
+	def savedValueChanged(self):
+		content = self.content
+		content.pickled = None
+		if not content.dirty:
+			content.dirty = True
+			for x in content.parents:
+				x.savedValueChanged()
 
 	def load(self):
 		for x in self.content.items.values():
@@ -2128,12 +2199,15 @@ class ConfigSubsection(object):
 
 	def getSavedValue(self):
 		res = self.content.stored_values
+		if not self.content.dirty:
+			return res
 		for (key, val) in self.content.items.items():
 			sv = val.saved_value
 			if sv is not None:
 				res[key] = sv
 			elif key in res:
 				del res[key]
+		self.content.dirty = False
 		return res
 
 	def setSavedValue(self, values):
@@ -2143,6 +2217,7 @@ class ConfigSubsection(object):
 			value = values.get(key, None)
 			if value is not None:
 				val.saved_value = value
+		self.savedValueChanged()
 
 	saved_value = property(getSavedValue, setSavedValue)
 
@@ -2171,9 +2246,28 @@ class Config(ConfigSubsection):
 			else:
 				result += [name, "=", str(val), "\n"]
 
+	# like pickle_this, but reuses the pickled text of unchanged subsections
+	def pickle_section(self, prefix, section, result):
+		content = section.content
+		if content.pickled is None or content.pickled[0] != prefix:
+			text = []
+			items = content.items
+			for (key, val) in sorted(section.saved_value.items(), key=lambda x: str(x[0]) if x[0].isdigit() else x[0].lower()):
+				name = ".".join((prefix, key))
+				if isinstance(items.get(key), ConfigSubsection):
+					self.pickle_section(name, items[key], text)
+				elif isinstance(val, dict):
+					self.pickle_this(name, val, text)
+				elif isinstance(val, tuple):
+					text += [name, "=", str(val[0]), "\n"]
+				else:
+					text += [name, "=", str(val), "\n"]
+			content.pickled = (prefix, "".join(text))
+		result.append(content.pickled[1])
+
 	def pickle(self):
 		result = []
-		self.pickle_this("config", self.saved_value, result)
+		self.pickle_section("config", self, result)
 		return "".join(result)
 
 	def unpickle(self, lines, base_file=True):
@@ -2205,8 +2299,9 @@ class Config(ConfigSubsection):
 		if "config" in tree:
 			self.setSavedValue(tree["config"])
 
-	def saveToFile(self, filename):
-		text = self.pickle()
+	def saveToFile(self, filename, text=None):
+		if text is None:
+			text = self.pickle()
 		try:
 			import os
 			f = open(filename + ".writing", "w")
@@ -2215,25 +2310,66 @@ class Config(ConfigSubsection):
 			fsync(f.fileno())
 			f.close()
 			rename(filename + ".writing", filename)
+			return True
 		except (IOError, OSError) as err:
 			print("[config] Error %d: Couldn't write '%s'!  (%s)" % (err.errno, filename, err.strerror))
+		return False
 
 	def loadFromFile(self, filename, base_file=True):
 		self.unpickle(open(filename, "r"), base_file)
 
 
+# Saves within SAVE_DELAY seconds after a write are merged into one delayed
+# write.  Use save(immediate=True) when the file has to be on disk right away,
+# e.g. before shutdown or before another process reads it.
+#
 class ConfigFile:
 	CONFIG_FILE = resolveFilename(SCOPE_CONFIG, "settings")
+	SAVE_DELAY = 2
+
+	def __init__(self):
+		self.saveTimer = None
+		self.lastSave = 0
+		self.savedText = None
+		self.savedStat = None
 
 	def load(self):
+		if self.saveTimer is not None and self.saveTimer.isActive():
+			self.writeFile()  # Do not read back what a pending save is about to replace.
 		try:
 			config.loadFromFile(self.CONFIG_FILE, True)
 		except (IOError, OSError) as err:
 			print("[config] Error %d: Unable to load config '%s', assuming defaults.  (%s)" % (err.errno, self.CONFIG_FILE, err.strerror))
 
-	def save(self):
+	def save(self, immediate=False):
 		# config.save()
-		config.saveToFile(self.CONFIG_FILE)
+		delay = self.SAVE_DELAY - (time() - self.lastSave)
+		if immediate or delay <= 0 or delay > self.SAVE_DELAY:
+			self.writeFile()
+		else:
+			if self.saveTimer is None:
+				self.saveTimer = eTimer()
+				self.saveTimer.callback.append(self.writeFile)
+			if not self.saveTimer.isActive():
+				self.saveTimer.start(int(delay * 1000), True)
+
+	def writeFile(self):
+		if self.saveTimer is not None:
+			self.saveTimer.stop()
+		self.lastSave = time()
+		text = config.pickle()
+		if text == self.savedText and self.savedStat == self.getFileStat():
+			return  # Nothing changed since our last write.
+		if config.saveToFile(self.CONFIG_FILE, text):
+			self.savedText = text
+			self.savedStat = self.getFileStat()
+
+	def getFileStat(self):
+		try:
+			st = stat(self.CONFIG_FILE)
+			return (st.st_mtime, st.st_size, st.st_ino)
+		except (IOError, OSError):
+			return None
 
 	def __resolveValue(self, pickles, cmap):
 		key = pickles[0]
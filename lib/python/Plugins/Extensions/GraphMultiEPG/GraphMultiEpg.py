@@ -81,6 +81,82 @@ config.misc.graph_mepg.zap_blind_bouquets = ConfigYesNo(default = False)
 
 listscreen = config.misc.graph_mepg.default_mode.value
 
+# Events of the services shown, per time window.  Paging left or right only
+# has to ask the EPG cache for the window that is new, the windows next to the
+# visible one are fetched in small chunks while the user is idle.
+#
+class EPGWindowCache:
+	MAX_AGE = 300  # Seconds, older windows are fetched again.
+	PREFETCH_CHUNK = 25  # Services per idle step.
+	PREFETCH_DELAY = 250  # Milliseconds after the last fill.
+
+	def __init__(self, epgcache):
+		self.epgcache = epgcache
+		self.windows = {}  # (time_base, time_epoch): (created, {service: (service, service_name, events)})
+		self.pending = []
+		self.prefetchTimer = eTimer()
+		self.prefetchTimer.callback.append(self.prefetchStep)
+
+	def getWindow(self, time_base, time_epoch):
+		key = (time_base, time_epoch)
+		window = self.windows.get(key)
+		if window is None or not 0 <= time() - window[0] < self.MAX_AGE:
+			window = self.windows[key] = (time(), {})
+		return window[1]
+
+	def query(self, window, services, time_base, time_epoch):
+		missing = []
+		for service in services:
+			if service not in window and service not in missing:
+				missing.append(service)
+		if not missing:
+			return
+		services = missing
+		test = [(service, 0, time_base, time_epoch) for service in services]
+		test.insert(0, 'XRnITBD') #return record, service ref, service name, event id, event title, begin time, duration
+		epg_data = [] if self.epgcache is None else self.epgcache.lookupEvent(test)
+		groups = []
+		for x in epg_data:
+			if not groups or groups[-1][0] != x[0]:
+				groups.append((x[0], x[1], []))
+			groups[-1][2].append((x[2], x[3], x[4], x[5])) #(event_id, event_title, begin_time, duration)
+		for index, (service, service_name, events) in enumerate(groups):
+			key = services[index] if len(groups) == len(services) else service
+			window[key] = (service, service_name, events[0][0] is not None and events or None)
+
+	def lookup(self, services, time_base, time_epoch):
+		"""Return (service, service_name, events) for every service."""
+		window = self.getWindow(time_base, time_epoch)
+		self.query(window, services, time_base, time_epoch)
+		return [window.get(x) or (x, "", None) for x in services]
+
+	def prefetch(self, services, time_base, time_epoch, first_time_base):
+		step = time_epoch * 60
+		keep = [(time_base, time_epoch), (time_base + step, time_epoch)]
+		if time_base - step >= first_time_base:
+			keep.append((time_base - step, time_epoch))
+		for key in self.windows.keys():
+			if key not in keep:
+				del self.windows[key]
+		self.pending = [(key, services[i:i + self.PREFETCH_CHUNK]) for key in keep[1:] for i in range(0, len(services), self.PREFETCH_CHUNK)]
+		self.prefetchTimer.start(self.PREFETCH_DELAY, True)
+
+	def prefetchStep(self):
+		if self.pending:
+			(time_base, time_epoch), services = self.pending.pop(0)
+			self.query(self.getWindow(time_base, time_epoch), services, time_base, time_epoch)
+		if self.pending:
+			self.prefetchTimer.start(0, True)
+
+	def stop(self):
+		self.pending = []
+		self.prefetchTimer.stop()
+
+	def clear(self):
+		self.stop()
+		self.windows.clear()
+
+
 class EPGList(GUIComponent):
 	def __init__(self, selChangedCB = None, timer = None, time_epoch = 120, overjump_empty = True, epg_bouquet=None):
 		GUIComponent.__init__(self)
@@ -97,6 +173,8 @@ class EPGList(GUIComponent):
 		self.setOverjump_Empty(overjump_empty)
 		self.epg_bouquet = epg_bouquet
 		self.epgcache = eEPGCache.getInstance()
+		self.epgWindows = EPGWindowCache(self.epgcache)
+		self.picons = {}
 		self.clocks = [ LoadPixmap(cached=True, path=resolveFilename(SCOPE_CURRENT_SKIN, 'icons/epgclock_add.png')),
 				LoadPixmap(cached=True, path=resolveFilename(SCOPE_CURRENT_SKIN, 'icons/epgclock_pre.png')),
 				LoadPixmap(cached=True, path=resolveFilename(SCOPE_CURRENT_SKIN, 'icons/epgclock.png')),
@@ -413,6 +491,7 @@ class EPGList(GUIComponent):
 		self.l.setSelectionClip(eRect(0, 0, 0, 0), False)
 
 	def preWidgetRemove(self, instance):
+		self.epgWindows.stop()
 		instance.selectionChanged.get().remove(self.serviceChanged)
 		instance.setContent(None)
 
@@ -493,9 +572,9 @@ class EPGList(GUIComponent):
 				backcolor = serviceBackColor if bgpng is None else None, backcolor_sel = serviceBackColor if bgpng is None else None))
 		if self.showPicon:
 			if picon is None: # go find picon and cache its location
-				picon = getPiconName(service)
-				curIdx = self.l.getCurrentSelectionIndex()
-				self.list[curIdx] = (service, service_name, events, picon, serviceref)
+				picon = self.picons.get(service)
+				if picon is None:
+					picon = self.picons[service] = getPiconName(service)
 			piconWidth = self.picon_size.width()
 			piconHeight = self.picon_size.height()
 			if picon != "":
@@ -682,43 +761,25 @@ class EPGList(GUIComponent):
 			self.time_base = int(stime)
 		if services is None:
 			time_base = self.time_base + self.offs * self.time_epoch * 60
-			test = [ (service[0], 0, time_base, self.time_epoch) for service in self.list ]
-			serviceList = self.list
-			piconIdx = 3
-			channelIdx = 4
+			serviceList = [(service[0], service[4]) for service in self.list]
 		else:
 			self.cur_event = None
 			self.cur_service = None
-			test = [ (service.ref.toString(), 0, self.time_base, self.time_epoch) for service in services ]
-			serviceList = services
-			piconIdx = 0
-			channelIdx = None
+			time_base = self.time_base
+			serviceList = [(service.ref.toString(), service) for service in services]
 
-		test.insert(0, 'XRnITBD') #return record, service ref, service name, event id, event title, begin time, duration
-		epg_data = [] if self.epgcache is None else self.epgcache.lookupEvent(test)
+		refs = [x[0] for x in serviceList]
+		rows = dict((x[0], x) for x in self.list or [])
 		self.list = [ ]
-		tmp_list = None
-		service = ""
-		sname = ""
-
-		serviceIdx = 0
-		for x in epg_data:
-			if service != x[0]:
-				if tmp_list is not None:
-					picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-					self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon, serviceList[serviceIdx] if (channelIdx is None) else serviceList[serviceIdx][channelIdx]))
-					serviceIdx += 1
-				service = x[0]
-				sname = x[1]
-				tmp_list = [ ]
-			tmp_list.append((x[2], x[3], x[4], x[5])) #(event_id, event_title, begin_time, duration)
-		if tmp_list and len(tmp_list):
-			picon = None if piconIdx == 0 else serviceList[serviceIdx][piconIdx]
-			self.list.append((service, sname, tmp_list[0][0] is not None and tmp_list or None, picon, serviceList[serviceIdx] if (channelIdx is None) else serviceList[serviceIdx][channelIdx]))
-			serviceIdx += 1
+		for (ref, serviceref), (service, sname, events) in zip(serviceList, self.epgWindows.lookup(refs, time_base, self.time_epoch)):
+			row = rows.get(service)
+			if row is None or row[1] != sname or row[2] != events or row[4] is not serviceref:  # Reuse the rows that did not change.
+				row = (service, sname, events, self.picons.get(service), serviceref)
+			self.list.append(row)
 
 		self.l.setList(self.list)
 		self.findBestEvent()
+		self.epgWindows.prefetch(refs, time_base, self.time_epoch, self.time_base)
 
 	def getEventRect(self):
 		rc = self.event_rect
@@ -1,7 +1,18 @@
 from Components.config import ConfigSubsection, config
 import os
 
-config.plugins = ConfigSubsection()
+
+class PluginConfigSubsection(ConfigSubsection):
+	# Plugins are only imported when they are needed (see PluginComponent), so
+	# their settings appear when somebody asks for them.
+	def __getattr__(self, name):
+		if not name.startswith("__") and name not in self.content.items:
+			from Components.PluginComponent import plugins
+			plugins.loadPluginConfig(name)
+		return ConfigSubsection.__getattr__(self, name)
+
+
+config.plugins = PluginConfigSubsection()
 
 class PluginDescriptor(object):
 	"""An object to describe a plugin."""
@@ -62,7 +62,7 @@ class BackupScreen(Screen, ConfigListScreen):
 		self.setTitle(_("Backup is running..."))
 
 	def doBackup(self):
-		configfile.save()
+		configfile.save(immediate=True)
 		if config.plugins.softwaremanager.epgcache.value:
 			eEPGCache.getInstance().save()
 		try:
@@ -14,6 +14,7 @@ from Screens.SoftwareUpdate import UpdatePlugin
 from Components.ActionMap import ActionMap, NumberActionMap
 from Components.Input import Input
 from Components.Opkg import OpkgComponent
+from Components.PackageIndex import packageIndex
 from Components.Sources.StaticText import StaticText
 from Components.ScrollLabel import ScrollLabel
 from Components.Pixmap import Pixmap
@@ -1730,65 +1731,24 @@ class PacketManager(Screen, NumericalTextInput):
 		elif event == OpkgComponent.EVENT_DONE:
 			if self.list_updating:
 				self.list_updating = False
-				if not self.Console:
-					self.Console = Console()
-				cmd = self.opkg.opkg + " list"
-				self.Console.ePopen(cmd, self.OpkgList_Finished)
+				self.readPacketLists()
 		pass
 
-	def OpkgList_Finished(self, result, retval, extra_args = None):
-		if result:
-			self.packetlist = []
-			last_name = ""
-			for x in result.splitlines():
-				if ' - ' in x:
-					tokens = x.split(' - ')
-					name = tokens[0].strip()
-					if name and not any(name.endswith(x) for x in self.unwanted_extensions):
-						l = len(tokens)
-						version = l > 1 and tokens[1].strip() or ""
-						descr = l > 2 and tokens[2].strip() or ""
-						if name == last_name:
-							continue
-						last_name = name
-						self.packetlist.append([name, version, descr])
-				elif len(self.packetlist) > 0:
-					# no ' - ' in the text, assume that this is the description
-					# therefore add this text to the last packet description
-					last_packet = self.packetlist[-1]
-					last_packet[2] = last_packet[2] + x
-					self.packetlist[:-1] + last_packet
-
-		if not self.Console:
-			self.Console = Console()
-		cmd = self.opkg.opkg + " list_installed"
-		self.Console.ePopen(cmd, self.OpkgListInstalled_Finished)
-
-	def OpkgListInstalled_Finished(self, result, retval, extra_args = None):
-		if result:
-			self.installed_packetlist = {}
-			for x in result.splitlines():
-				tokens = x.split(' - ')
-				name = tokens[0].strip()
-				if not any(name.endswith(x) for x in self.unwanted_extensions):
-					l = len(tokens)
-					version = l > 1 and tokens[1].strip() or ""
-					self.installed_packetlist[name] = version
-		if not self.Console:
-			self.Console = Console()
-		cmd = "opkg list-upgradable"
-		self.Console.ePopen(cmd, self.OpkgListUpgradeable_Finished)
-
-	def OpkgListUpgradeable_Finished(self, result, retval, extra_args = None):
-		if result:
-			self.upgradeable_packages = {}
-			for x in result.splitlines():
-				tokens = x.split(' - ')
-				name = tokens[0].strip()
-				if not any(name.endswith(x) for x in self.unwanted_extensions):
-					l = len(tokens)
-					version = l > 2 and tokens[2].strip() or ""
-					self.upgradeable_packages[name] = version
+	def readPacketLists(self):
+		# The feed lists and the status are read directly, not through the
+		# output of 'opkg list', 'opkg list_installed' and 'opkg list-upgradable'.
+		self.packetlist = []
+		for name, version, descr in packageIndex.getPackages():
+			if not any(name.endswith(x) for x in self.unwanted_extensions):
+				self.packetlist.append([name, version, descr])
+		self.installed_packetlist = {}
+		for name, version in six.iteritems(packageIndex.getInstalled()):
+			if not any(name.endswith(x) for x in self.unwanted_extensions):
+				self.installed_packetlist[name] = version
+		self.upgradeable_packages = {}
+		for name, versions in six.iteritems(packageIndex.getUpgradable()):
+			if not any(name.endswith(x) for x in self.unwanted_extensions):
+				self.upgradeable_packages[name] = versions[1]
 		self.buildPacketList()
 
 	def buildEntryComponent(self, name, version, description, state):
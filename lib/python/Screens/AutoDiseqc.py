@@ -454,7 +454,7 @@ class AutoDiseqc(Screen, ConfigListScreen):
 
 	def saveAndReloadNimConfig(self):
 		config.Nims[self.feid].save()
-		configfile.save()
+		configfile.save(immediate=True)
 		configfile.load()
 		nimmanager.sec.update()
 
@@ -1,6 +1,5 @@
 # -*- coding: UTF-8 -*-
 from __future__ import print_function
-from base64 import encodestring
 from os import listdir, remove, rename, system, path
 from enigma import eListboxPythonMultiContent, eTimer, gFont, loadPNG, RT_HALIGN_RIGHT, getDesktop
 from Components.ActionMap import ActionMap, NumberActionMap
@@ -9,6 +8,7 @@ from Components.ConfigList import ConfigListScreen
 from Components.Console import Console
 from Components.Label import Label
 from Components.MenuList import MenuList
+from Components.SoftcamWebif import getPage
 from Components.MultiContent import MultiContentEntryText, MultiContentEntryPixmapAlphaTest, MultiContentEntryPixmapAlphaBlend
 from Components.ScrollLabel import ScrollLabel
 from Components.Sources.StaticText import StaticText
@@ -18,60 +18,11 @@ from Screens.MessageBox import MessageBox
 from Screens.Screen import Screen
 from Screens.VirtualKeyBoard import VirtualKeyBoard
 from Tools.Directories import fileExists, SCOPE_CURRENT_SKIN, resolveFilename
-from twisted.internet import reactor
-from twisted.web.client import HTTPClientFactory
-from urlparse import urlparse, urlunparse
 
 VERSION = "v2"
 DATE = "21.11.2014"
 CFG = "/etc/CCcam.cfg"
 
-def _parse(url):
-	url = url.strip()
-	parsed = urlparse(url)
-	scheme = parsed[0]
-	path = urlunparse(('','') + parsed[2:])
-
-	host, port = parsed[1], 80
-
-	if '@' in host:
-		username, host = host.split('@')
-		if ':' in username:
-			username, password = username.split(':')
-		else:
-			password = ""
-	else:
-		username = ""
-		password = ""
-
-	if ':' in host:
-		host, port = host.split(':')
-		port = int(port)
-
-	if path == "":
-		path = "/"
-
-	return scheme, host, port, path, username, password
-
-def getPage(url, contextFactory=None, *args, **kwargs):
-	scheme, host, port, path, username, password = _parse(url)
-
-	if username and password:
-		url = scheme + '://' + host + ':' + str(port) + path
-		basicAuth = encodestring("%s:%s" % (username, password))
-		authHeader = "Basic " + basicAuth.strip()
-		AuthHeaders = {"Authorization": authHeader}
-
-		if kwargs.has_key("headers"):
-			kwargs["headers"].update(AuthHeaders)
-		else:
-			kwargs["headers"] = AuthHeaders
-
-	factory = HTTPClientFactory(url, *args, **kwargs)
-	reactor.connectTCP(host, port, factory)
-
-	return factory.deferred
-
 class HelpableNumberActionMap(NumberActionMap):
 	def __init__(self, parent, context, actions, prio):
 		alist = []
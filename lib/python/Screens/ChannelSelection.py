@@ -13,6 +13,7 @@ from Components.ServiceEventTracker import ServiceEventTracker, InfoBarBase
 profile("ChannelSelection.py 1")
 from Screens.EpgSelection import EPGSelection
 from enigma import eServiceReference, eServiceReferenceDVB, eEPGCache, eServiceCenter, eRCInput, eTimer, eDVBDB, iPlayableService, iServiceInformation, getPrevAsciiCode
+from Components.BouquetIndex import bouquetIndex
 from Components.config import config, configfile, ConfigSubsection, ConfigText, ConfigYesNo
 from Tools.NumericalTextInput import NumericalTextInput
 profile("ChannelSelection.py 2")
@@ -304,6 +305,7 @@ class ChannelContextMenu(Screen):
 	def setCAID(self, value):
 		eDVBDB.getInstance().addCAID(eServiceReference(self.csel.getCurrentSelection().toString()), value)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		self.close()
 
 	def setBISS(self):
@@ -318,12 +320,14 @@ class ChannelContextMenu(Screen):
 	def addDedicated3DFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		self.set3DMode(True)
 		self.close()
 
 	def removeDedicated3DFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_IS_DEDICATED_3D)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		self.set3DMode(False)
 		self.close()
 
@@ -335,12 +339,14 @@ class ChannelContextMenu(Screen):
 	def addCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().addFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = True
 		self.close()
 
 	def removeCenterDVBSubsFlag(self):
 		eDVBDB.getInstance().removeFlag(eServiceReference(self.csel.getCurrentSelection().toString()), FLAG_CENTER_DVB_SUBS)
 		eDVBDB.getInstance().reloadBouquets()
+		bouquetIndex.invalidate()
 		config.subtitles.dvb_subtitles_centered.value = False
 		self.close()
 
@@ -399,6 +405,7 @@ class ChannelContextMenu(Screen):
 				self.csel.confirmRemove = False
 			self.csel.removeBouquet()
 			eDVBDB.getInstance().reloadBouquets()
+			bouquetIndex.invalidate()
 			self.close()
 
 	def purgeDeletedBouquets(self):
@@ -422,6 +429,7 @@ class ChannelContextMenu(Screen):
 		eDVBDBInstance = eDVBDB.getInstance()
 		eDVBDBInstance.setLoadUnlinkedUserbouquets(True)
 		eDVBDBInstance.reloadBouquets()
+		bouquetIndex.invalidate()
 		eDVBDBInstance.setLoadUnlinkedUserbouquets(config.misc.load_unlinked_userbouquets.value)
 		refreshServiceList()
 		self.csel.showFavourites()
@@ -988,6 +996,7 @@ class ChannelSelectionEdit:
 				mutableList.addService(current)
 				mutableList.moveService(current, index)
 				mutableList.flushChanges()
+				bouquetIndex.invalidate()
 				self.servicelist.addService(current, True)
 				self.servicelist.removeCurrent()
 				if not self.servicelist.atEnd():
@@ -1004,10 +1013,12 @@ class ChannelSelectionEdit:
 				if not mutableList.addService(ref, current):
 					self.servicelist.addService(ref, True)
 					mutableList.flushChanges()
+					bouquetIndex.invalidate()
 					break
 			elif not mutableList.addService(ref):
 				self.servicelist.addService(ref, True)
 				mutableList.flushChanges()
+				bouquetIndex.invalidate()
 				break
 			cnt+=1
 
@@ -1041,12 +1052,14 @@ class ChannelSelectionEdit:
 				mutableBouquet.removeService(cur_service.ref)
 				mutableBouquet.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				bouquetIndex.invalidate()
 				mutableAlternatives = new_ref.list().startEdit()
 				if mutableAlternatives:
 					mutableAlternatives.setListName(name)
 					if mutableAlternatives.addService(cur_service.ref):
 						print("[ChannelSelection] add", cur_service.ref.toString(), "to new alternatives failed")
 					mutableAlternatives.flushChanges()
+					bouquetIndex.invalidate()
 					self.servicelist.addService(new_ref.ref, True)
 					self.servicelist.removeCurrent()
 					if not end:
@@ -1077,6 +1090,7 @@ class ChannelSelectionEdit:
 			if not mutableBouquetList.addService(new_bouquet_ref):
 				mutableBouquetList.flushChanges()
 				eDVBDB.getInstance().reloadBouquets()
+				bouquetIndex.invalidate()
 				mutableBouquet = serviceHandler.list(new_bouquet_ref).startEdit()
 				if mutableBouquet:
 					mutableBouquet.setListName(bName)
@@ -1085,6 +1099,7 @@ class ChannelSelectionEdit:
 							if mutableBouquet.addService(service):
 								print("[ChannelSelection] add", service.toString(), "to new bouquet failed")
 					mutableBouquet.flushChanges()
+					bouquetIndex.invalidate()
 				else:
 					print("[ChannelSelection] get mutable list for new created bouquet failed")
 				# do some voodoo to check if current_root is equal to bouquet_root
@@ -1143,6 +1158,7 @@ class ChannelSelectionEdit:
 	def removeSatelliteService(self):
 		current = self.getCurrentSelection()
 		eDVBDB.getInstance().removeService(current)
+		bouquetIndex.invalidate()
 		refreshServiceList()
 		if not self.atEnd():
 			self.servicelist.moveUp()
@@ -1181,6 +1197,7 @@ class ChannelSelectionEdit:
 					if idx != -1:
 						satpos = int(tmp[:idx])
 						eDVBDB.getInstance().removeServices(-1, -1, -1, satpos)
+			bouquetIndex.invalidate()
 			refreshServiceList()
 			if hasattr(self, 'showSatellites'):
 				self.showSatellites()
@@ -1232,6 +1249,7 @@ class ChannelSelectionEdit:
 				if self.bouquet_mark_edit == EDIT_ALTERNATIVES and not new_marked and self.__marked:
 					self.mutableList.addService(eServiceReference(self.__marked[0]))
 				self.mutableList.flushChanges()
+				bouquetIndex.invalidate()
 		self.__marked = []
 		self.clearMarks()
 		self.bouquet_mark_edit = OFF
@@ -1283,6 +1301,7 @@ class ChannelSelectionEdit:
 		if ref.valid() and mutableList is not None:
 			if not mutableList.removeService(ref):
 				mutableList.flushChanges() #FIXME dont flush on each single removed service
+				bouquetIndex.invalidate()
 				self.servicelist.removeCurrent()
 				self.servicelist.resetRoot()
 				playingref = self.session.nav.getCurrentlyPlayingServiceOrGroup()
@@ -1296,6 +1315,7 @@ class ChannelSelectionEdit:
 				service = self.servicelist.getCurrent()
 			if not mutableList.addService(service):
 				mutableList.flushChanges()
+				bouquetIndex.invalidate()
 				# do some voodoo to check if current_root is equal to dest
 				cur_root = self.getRoot()
 				str1 = cur_root and cur_root.toString() or -1
@@ -1313,6 +1333,7 @@ class ChannelSelectionEdit:
 				self.toggleMoveMarked() # unmark current entry
 			self.movemode = False
 			self.mutableList.flushChanges() # FIXME add check if changes was made
+			bouquetIndex.invalidate()
 			self.mutableList = None
 			self.setTitle(self.saved_title)
 			self.saved_title = None
@@ -1430,23 +1451,9 @@ class ChannelSelectionBase(Screen):
 		self.recallBouquetMode()
 
 	def getBouquetNumOffset(self, bouquet):
-		if not config.usage.multibouquet.value:
+		if not config.usage.multibouquet.value or 'userbouquet.' not in bouquet.toCompareString():
 			return 0
-		str = bouquet.toString()
-		offset = 0
-		if 'userbouquet.' in bouquet.toCompareString():
-			serviceHandler = eServiceCenter.getInstance()
-			servicelist = serviceHandler.list(bouquet)
-			if not servicelist is None:
-				while True:
-					serviceIterator = servicelist.getNext()
-					if not serviceIterator.valid(): #check if end of list
-						break
-					number = serviceIterator.getChannelNum()
-					if number > 0:
-						offset = number - 1
-						break
-		return offset
+		return bouquetIndex.getNumberOffset(bouquet)
 
 	def recallBouquetMode(self):
 		if self.mode == MODE_TV:
@@ -39,7 +39,11 @@ class CopyFileTask(Components.Task.PythonTask):
 				print("[CopyFiles] Failed to stat", src)
 		if not self.end:
 			self.end = 1
+		self.bytes_total = self.end
 		print("[CopyFiles] size:", self.end)
+	def onTimer(self):
+		self.bytes_done = self.pos
+		Components.Task.PythonTask.onTimer(self)
 	def work(self):
 		print("[CopyFiles] handles ", len(self.handles))
 		try:
@@ -107,11 +111,16 @@ class MoveFileTask(CopyFileTask):
 		if errors:
 			raise errors[0]
 
+def getMountResources(fileList):
+	# The copies run in the lanes of the mounts they write to, not with the other PythonTasks.
+	return tuple(set([Components.Task.getMountResource(os.path.dirname(dst)) for src, dst in fileList]))
+
 def copyFiles(fileList, name):
 	name = _("Copy") + " " + name
 	job = Components.Task.Job(name)
 	task = CopyFileTask(job, name)
 	task.openFiles(fileList)
+	job.resources = getMountResources(fileList)
 	Components.Task.job_manager.AddJob(job)
 
 def moveFiles(fileList, name):
@@ -119,4 +128,5 @@ def moveFiles(fileList, name):
 	job = Components.Task.Job(name)
 	task = MoveFileTask(job, name)
 	task.openFiles(fileList)
+	job.resources = getMountResources(fileList)
 	Components.Task.job_manager.AddJob(job)
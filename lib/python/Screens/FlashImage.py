@@ -295,7 +295,7 @@ class FlashImage(Screen):
 		if retval:
 			if os.path.isfile(self.BACKUP_SCRIPT):
 				self["info"].setText(_("Backing up to: %s") % self.destination)
-				configfile.save()
+				configfile.save(immediate=True)
 				if config.plugins.autobackup.epgcache.value:
 					eEPGCache.getInstance().save()
 				self.containerbackup = Console()
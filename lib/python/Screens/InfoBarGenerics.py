@@ -3,6 +3,7 @@
 from __future__ import print_function
 from Screens.ChannelSelection import ChannelSelection, BouquetSelector, SilentBouquetSelector
 from Components.ActionMap import ActionMap, HelpableActionMap, NumberActionMap
+from Components.BouquetIndex import bouquetIndex, isPlayable
 from Components.Harddisk import harddiskmanager
 from Components.Input import Input
 from Components.Label import Label
@@ -15,29 +16,23 @@ from Components.Sources.Boolean import Boolean
 from Components.config import config, ConfigBoolean, ConfigClock
 from Components.SystemInfo import SystemInfo
 from Components.UsageConfig import preferredInstantRecordPath, defaultMoviePath
-from Components.VolumeControl import VolumeControl
 from Components.Sources.StaticText import StaticText
-from Screens.EpgSelection import EPGSelection
 from Plugins.Plugin import PluginDescriptor
 from Screens.Screen import Screen
 from Screens.ScreenSaver import InfoBarScreenSaver
 from Screens import Standby
 from Screens.ChoiceBox import ChoiceBox
 from Screens.Dish import Dish
-from Screens.EventView import EventViewEPGSelect, EventViewSimple
-from Screens.InputBox import InputBox
 from Screens.MessageBox import MessageBox
-from Screens.MinuteInput import MinuteInput
-from Screens.TimerSelection import TimerSelection
 from Screens.PictureInPicture import PictureInPicture
 import Screens.Standby
 from Screens.SubtitleDisplay import SubtitleDisplay
 from Screens.RdsDisplay import RdsInfoDisplay, RassInteractive
-from Screens.TimeDateInput import TimeDateInput
 from Screens.UnhandledKey import UnhandledKey
 from ServiceReference import ServiceReference, isPlayableForCur, hdmiInServiceRef
 from Tools import Notifications, ASCIItranslit
 from Tools.Directories import fileExists, fileHas, getRecordingFilename, moveFiles
+from Tools.Import import lazyImport
 from Tools.KeyBindings import getKeyBindingKeys, getKeyDescription
 from keyids import KEYFLAGS, KEYIDS, invertKeyIds
 from enigma import eTimer, eServiceCenter, eDVBServicePMTHandler, iServiceInformation, iPlayableService, eServiceReference, eEPGCache, eActionMap, getDesktop, eDVBDB, getBoxBrand, getBoxType
@@ -53,6 +48,17 @@ from Screens.Menu import MainMenu, mdom
 from boxbranding import getMachineBuild
 import six
 
+# Only opened on a key press, imported then.
+EPGSelection = lazyImport("Screens.EpgSelection", "EPGSelection")
+EventViewEPGSelect = lazyImport("Screens.EventView", "EventViewEPGSelect")
+EventViewSimple = lazyImport("Screens.EventView", "EventViewSimple")
+InputBox = lazyImport("Screens.InputBox", "InputBox")
+MinuteInput = lazyImport("Screens.MinuteInput", "MinuteInput")
+PiPSetup = lazyImport("Screens.PiPSetup", "PiPSetup")
+TimeDateInput = lazyImport("Screens.TimeDateInput", "TimeDateInput")
+TimerSelection = lazyImport("Screens.TimerSelection", "TimerSelection")
+VolumeControl = lazyImport("Components.VolumeControl", "VolumeControl")
+
 model = getBoxType()
 brand = getBoxBrand()
 platform = getMachineBuild()
@@ -708,38 +714,16 @@ class InfoBarNumberZap:
 		if service:
 			self.selectAndStartService(service, bouquet)
 
-	def searchNumberHelper(self, serviceHandler, num, bouquet):
-		servicelist = serviceHandler.list(bouquet)
-		if servicelist:
-			serviceIterator = servicelist.getNext()
-			while serviceIterator.valid():
-				if num == serviceIterator.getChannelNum():
-					return serviceIterator
-				serviceIterator = servicelist.getNext()
-		return None
-
 	def searchNumber(self, number, firstBouquetOnly=False, bouquet=None):
 		bouquet = bouquet or self.servicelist.getRoot()
 		service = None
-		serviceHandler = eServiceCenter.getInstance()
 		if not firstBouquetOnly:
-			service = self.searchNumberHelper(serviceHandler, number, bouquet)
+			service = bouquetIndex.getBouquet(bouquet).numbers.get(number)
 		if config.usage.multibouquet.value and not service:
-			bouquet = self.servicelist.bouquet_root
-			bouquetlist = serviceHandler.list(bouquet)
-			if bouquetlist:
-				bouquet = bouquetlist.getNext()
-				while bouquet.valid():
-					if bouquet.flags & eServiceReference.isDirectory and not bouquet.flags & eServiceReference.isInvisible:
-						service = self.searchNumberHelper(serviceHandler, number, bouquet)
-						if service:
-							playable = not (service.flags & (eServiceReference.isMarker|eServiceReference.isDirectory)) or (service.flags & eServiceReference.isNumberedMarker)
-							if not playable:
-								service = None
-							break
-						if config.usage.alternative_number_mode.value or firstBouquetOnly:
-							break
-					bouquet = bouquetlist.getNext()
+			service, found = bouquetIndex.getRoot(self.servicelist.bouquet_root).findNumber(number, config.usage.alternative_number_mode.value or firstBouquetOnly)
+			bouquet = found or bouquet
+			if service and not isPlayable(service):
+				service = None
 		return service, bouquet
 
 	def selectAndStartService(self, service, bouquet):
@@ -2259,8 +2243,6 @@ class InfoBarTimeshift():
 			self.save_timeshift_only_current_event = True
 			self.ts_current_event_timer.startLongTimer(duration)
 
-from Screens.PiPSetup import PiPSetup
-
 class InfoBarExtensions:
 	EXTENSION_SINGLE = 0
 	EXTENSION_LIST = 1
@@ -3351,6 +3333,7 @@ class InfoBarNotifications:
 				if "channels" in config.usage.remote_fallback_import.value:
 					eDVBDB.getInstance().reloadBouquets()
 					eDVBDB.getInstance().reloadServicelist()
+					bouquetIndex.invalidate()
 					from Components.ParentalControl import parentalControl
 					parentalControl.open()
 					refreshServiceList()
@@ -1,6 +1,7 @@
 from Screens.Screen import Screen
 from Components.ConfigList import ConfigListScreen, ConfigList
 from Components.ActionMap import ActionMap
+from Components.BouquetIndex import bouquetIndex
 from Components.Sources.StaticText import StaticText
 from Components.config import config, ConfigSubsection, ConfigBoolean, getConfigListEntry, ConfigSelection, ConfigYesNo, ConfigIP, ConfigNothing
 from Components.Network import iNetwork
@@ -184,4 +185,5 @@ class InstallWizardOpkgUpdater(Screen):
 					config.misc.installwizard.channellistdownloaded.value = True
 					eDVBDB.getInstance().reloadBouquets()
 					eDVBDB.getInstance().reloadServicelist()
+					bouquetIndex.invalidate()
 			self.close()
@@ -4,6 +4,7 @@ from Components.Button import Button
 from Components.ActionMap import HelpableActionMap, ActionMap, NumberActionMap
 from Components.ChoiceList import ChoiceList, ChoiceEntryComponent
 from Components.MovieList import MovieList, resetMoviePlayState, AUDIO_EXTENSIONS, DVD_EXTENSIONS, IMAGE_EXTENSIONS, moviePlayState
+from Components.MovieIndex import INDEX_NAME
 from Components.DiskInfo import DiskInfo
 from Tools.Trashcan import TrashInfo
 from Components.Pixmap import Pixmap, MultiPixmap
@@ -2127,7 +2128,7 @@ class MovieSelection(Screen, HelpableScreen, SelectionEventInfo, InfoBarBase, Pr
 						ffn = os.path.join(cur_path, fn)
 						if os.path.isdir(ffn):
 							subdirs += 1
-						else:
+						elif fn != INDEX_NAME:
 							tempfn, tempfext = os.path.splitext(fn)
 							if tempfext not in ('.eit', '.ap', '.cuts', '.meta', '.sc'):
 								files += 1
@@ -2157,7 +2158,7 @@ class MovieSelection(Screen, HelpableScreen, SelectionEventInfo, InfoBarBase, Pr
 						ffn = os.path.join(cur_path, fn)
 						if os.path.isdir(ffn):
 							subdirs += 1
-						else:
+						elif fn != INDEX_NAME:
 							tempfn, tempfext = os.path.splitext(fn)
 							if tempfext not in ('.eit', '.ap', '.cuts', '.meta', '.sc'):
 								files += 1
@@ -2168,6 +2169,8 @@ class MovieSelection(Screen, HelpableScreen, SelectionEventInfo, InfoBarBase, Pr
 					return
 				else:
 					try:
+						if os.path.exists(os.path.join(cur_path, INDEX_NAME)):
+							os.remove(os.path.join(cur_path, INDEX_NAME))
 						os.rmdir(cur_path)
 					except Exception as e:
 						print("[MovieSelection] Failed delete", e)
@@ -10,12 +10,14 @@ from Components.ConfigList import ConfigList, ConfigListScreen
 from Components.MenuList import MenuList
 from Tools.LoadPixmap import LoadPixmap
 from Tools.Directories import SCOPE_CURRENT_SKIN, resolveFilename, fileExists
-from enigma import eTimer, RT_HALIGN_LEFT, eListboxPythonMultiContent, gFont, getDesktop
-from xml.etree import ElementTree
+from enigma import RT_HALIGN_LEFT, eListboxPythonMultiContent, gFont, getDesktop
 from operator import itemgetter
 from Components.SystemInfo import SystemInfo
+from Components.SoftcamWebif import WebifError, getWebifClient
+from Tools.GetEcmInfo import ecmInfo
+from urllib import quote
+from twisted.internet.defer import fail, gatherResults, succeed
 import os, time
-import urllib2
 import skin
 
 ###global
@@ -133,7 +135,9 @@ class NcamInfo:
 
 		return ret
 
-	def openWebIF(self, part = None, reader = None, cmd = None):
+	def getWebif(self):
+		"""Return (True, client) for the configured web interface, or (False,
+		error message)."""
 		if config.ncaminfo.userdatafromconf.value:
 			self.ip = "127.0.0.1"
 			udata = self.getUserData()
@@ -156,197 +160,147 @@ class NcamInfo:
 			self.port = config.ncaminfo.port.value
 			self.username = config.ncaminfo.username.value
 			self.password = config.ncaminfo.password.value
-		if part is None:
-			self.url = "http://%s:%s/ncamapi.html?part=status" % ( self.ip, self.port )
-		else:
-			self.url = "http://%s:%s/ncamapi.html?part=%s" % (self.ip, self.port, part )
-		if part is not None and reader is not None:
-			self.url = "http://%s:%s/ncamapi.html?part=%s&label=%s" % ( self.ip, self.port, part, reader )
-
-		print ("URL=%s" % self.url)
-		pwman = urllib2.HTTPPasswordMgrWithDefaultRealm()
-		pwman.add_password( None, self.url, self.username, self.password )
-		handlers = urllib2.HTTPDigestAuthHandler( pwman )
-		opener = urllib2.build_opener( urllib2.HTTPHandler, handlers )
-		urllib2.install_opener( opener )
-		request = urllib2.Request( self.url )
-		err = False
-		try:
-			data = urllib2.urlopen( request ).read()
-		except urllib2.URLError, e:
-			if hasattr(e, "reason"):
-				err = str(e.reason)
-			elif hasattr(e, "code"):
-				err = str(e.code)
-
-		if err is not False:
-			print  ("[openWebIF] Fehler: %s" % err)
-			return (False, err)
-		else:
-                        return (True, data)
-                        return
+		return (True, getWebifClient("http://%s:%s" % (self.ip, self.port), self.username, self.password))
 
-	def readXML(self, typ):
-		if typ == "l":
-			self.showLog = True
-			part = "status&appendlog=1"
-		else:
-			self.showLog = False
-			part = None
-		result = self.openWebIF(part)
+	def getPath(self, part = None, reader = None):
+		path = "/ncamapi.html?part=%s" % (part or "status")
+		if part is not None and reader is not None:
+			path += "&label=%s" % quote(reader)
+		return path
+
+	def openWebIF(self, part = None, reader = None, records = ("client",), texts = ()):
+		"""Return a Deferred that fires with the WebifDocument of the part,
+		keeping the elements named in records and the text of those in texts."""
+		result = self.getWebif()
+		if not result[0]:
+			return fail(WebifError(result[1]))
+		return result[1].request(self.getPath(part, reader), records, texts)
+
+	def readXML(self, data, typ):
 		retval = []
 		tmp = {}
-		if result[0]:
-			if not self.showLog:
-				data = ElementTree.XML(result[1])
-#				if typ=="version":
-#					if data.attrib.has_key("version"):
-#						self.version = data.attrib["version"]
-#					else:
-#						self.version = "n/a"
-#					return self.version
-				status = data.find("status")
-				clients = status.findall("client")
-				for cl in clients:
-					name = cl.attrib["name"]
-					proto = cl.attrib["protocol"]
-					if cl.attrib.has_key("au"):
-						au = cl.attrib["au"]
-					else:
-						au = ""
-					caid = cl.find("request").attrib["caid"]
-					srvid = cl.find("request").attrib["srvid"]
-					if cl.find("request").attrib.has_key("ecmtime"):
-						ecmtime = cl.find("request").attrib["ecmtime"]
-						if ecmtime == "0" or ecmtime == "":
-							ecmtime = _("n/a")
-						else:
-							ecmtime = str(float(ecmtime) / 1000)[:5]
-					else:
-						ecmtime = "not available"
-					srvname = cl.find("request").text
-					if srvname is not None:
-						if ":" in srvname:
-							srvname_short = srvname.split(":")[1].strip()
-						else:
-							srvname_short = srvname
+		if typ != "l":
+			for cl in data.records.get("client", []):
+				name = cl.attrib["name"]
+				proto = cl.attrib["protocol"]
+				if cl.attrib.has_key("au"):
+					au = cl.attrib["au"]
+				else:
+					au = ""
+				caid = cl.find("request").attrib["caid"]
+				srvid = cl.find("request").attrib["srvid"]
+				if cl.find("request").attrib.has_key("ecmtime"):
+					ecmtime = cl.find("request").attrib["ecmtime"]
+					if ecmtime == "0" or ecmtime == "":
+						ecmtime = _("n/a")
 					else:
-						srvname_short = _("n/A")
-					login = cl.find("times").attrib["login"]
-					online = cl.find("times").attrib["online"]
-					if proto.lower() == "dvbapi":
-						ip = ""
+						ecmtime = str(float(ecmtime) / 1000)[:5]
+				else:
+					ecmtime = "not available"
+				srvname = cl.find("request").text
+				if srvname is not None:
+					if ":" in srvname:
+						srvname_short = srvname.split(":")[1].strip()
 					else:
-						ip = cl.find("connection").attrib["ip"]
-						if ip == "0.0.0.0":
-							ip = ""
-					port = cl.find("connection").attrib["port"]
-					connstatus = cl.find("connection").text
-					if name != "" and name != "anonymous" and proto != "":
-						try:
-							tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
-						except KeyError:
-							tmp[cl.attrib["type"]] = []
-							tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
-			else:
-				if "<![CDATA" not in result[1]:
-					tmp = result[1].replace("<log>", "<log><![CDATA[").replace("</log>", "]]></log>")
+						srvname_short = srvname
 				else:
-					tmp = result[1]
-				data = ElementTree.XML(tmp)
-				log = data.find("log")
-				logtext = log.text
-			if typ == "s":
-				if tmp.has_key("r"):
-					for i in tmp["r"]:
-						retval.append(i)
-				if tmp.has_key("p"):
-					for i in tmp["p"]:
-						retval.append(i)
-			elif typ == "c":
-				if tmp.has_key("c"):
-					for i in tmp["c"]:
-						retval.append(i)
-			elif typ == "l":
-				tmp = logtext.split("\n")
-				retval = []
-				for i in tmp:
-					tmp2 = i.split(" ")
-					if len(tmp2) > 2:
-						del tmp2[2]
-						txt = ""
-						for j in tmp2:
-							txt += "%s " % j.strip()
-						retval.append( txt )
-
-			return retval
-
-		else:
-			return result[1]
-	def getVersion(self):
-		xmldata = self.openWebIF()
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			if data.attrib.has_key("version"):
-				self.version = data.attrib["version"]
-			else:
-				self.version = _("n/a")
-			return self.version
+					srvname_short = _("n/A")
+				login = cl.find("times").attrib["login"]
+				online = cl.find("times").attrib["online"]
+				if proto.lower() == "dvbapi":
+					ip = ""
+				else:
+					ip = cl.find("connection").attrib["ip"]
+					if ip == "0.0.0.0":
+						ip = ""
+				port = cl.find("connection").attrib["port"]
+				connstatus = cl.find("connection").text
+				if name != "" and name != "anonymous" and proto != "":
+					try:
+						tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
+					except KeyError:
+						tmp[cl.attrib["type"]] = []
+						tmp[cl.attrib["type"]].append( (name, proto, "%s:%s" % (caid, srvid), srvname_short, ecmtime, ip, connstatus) )
+		if typ == "s":
+			if tmp.has_key("r"):
+				for i in tmp["r"]:
+					retval.append(i)
+			if tmp.has_key("p"):
+				for i in tmp["p"]:
+					retval.append(i)
+		elif typ == "c":
+			if tmp.has_key("c"):
+				for i in tmp["c"]:
+					retval.append(i)
+		elif typ == "l":
+			tmp = data.getText("log").split("\n")
+			retval = []
+			for i in tmp:
+				tmp2 = i.split(" ")
+				if len(tmp2) > 2:
+					del tmp2[2]
+					txt = ""
+					for j in tmp2:
+						txt += "%s " % j.strip()
+					retval.append( txt )
+		return retval
+
+	def getVersion(self, data):
+		if data.root.has_key("version"):
+			self.version = data.root["version"]
 		else:
 			self.version = _("n/a")
 		return self.version
 
 	def getTotalCards(self, reader):
-		xmldata = self.openWebIF(part = "entitlement", reader = reader)
-		if xmldata[0]:
-			xmld = ElementTree.XML(xmldata[1])
-			cards = xmld.find("reader").find("cardlist")
-			cardTotal = cards.attrib["totalcards"]
-			return cardTotal
-		else:
-			return None
+		def gotCards(data):
+			return data.attributes.get("cardlist", {}).get("totalcards")
+		return self.openWebIF(part = "entitlement", reader = reader, records = ()).addCallback(gotCards)
+
 	def getReaders(self, spec = None):
-		xmldata = self.openWebIF()
-		readers = []
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			status = data.find("status")
-			clients = status.findall("client")
-			for cl in clients:
+		"""Return a Deferred that fires with a list of (text, reader name)."""
+		def gotStatus(data):
+			readers = []
+			for cl in data.records["client"]:
 				if cl.attrib.has_key("type"):
 					if cl.attrib["type"] == "p" or cl.attrib["type"] == "r":
 						if spec is not None:
 							proto = cl.attrib["protocol"]
 							if spec in proto:
-								name = cl.attrib["name"]
-								cards = self.getTotalCards(name)
-								readers.append( ( _("%s ( %s Cards )") % (name, cards), name) )
+								readers.append(cl.attrib["name"])
 						else:
 							if cl.attrib["name"] != "" and cl.attrib["name"] != "" and cl.attrib["protocol"] != "":
 								readers.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
-			return readers
-		else:
-			return None
+			if spec is None:
+				return readers
+			# The card counts of all readers are asked for at once.
+			return gatherResults([self.getTotalCards(name).addErrback(lambda failure: None) for name in readers]).addCallback(lambda cards: [( _("%s ( %s Cards )") % (name, count), name) for name, count in zip(readers, cards)])
+		return self.openWebIF().addCallback(gotStatus)
 
 	def getClients(self):
-		xmldata = self.openWebIF()
-		clientnames = []
-		if xmldata[0]:
-			data = ElementTree.XML(xmldata[1])
-			status = data.find("status")
-			clients = status.findall("client")
-			for cl in clients:
+		def gotStatus(data):
+			clientnames = []
+			for cl in data.records["client"]:
 				if cl.attrib.has_key("type"):
 					if cl.attrib["type"] == "c":
-						readers.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
+						clientnames.append( (cl.attrib["name"], cl.attrib["name"]) )  # return tuple for later use in Choicebox
 			return clientnames
-		else:
-			return None
+		return self.openWebIF().addCallback(gotStatus)
+
+	def cancelRequest(self):
+		if getattr(self, "request", None) is not None:
+			request, self.request = self.request, None
+			request.cancel()
+
+	def cancelRequest(self):
+		if getattr(self, "request", None) is not None:
+			request, self.request = self.request, None
+			request.cancel()
 
 	def getECMInfo(self, ecminfo):
 		result = []
-		if os.path.exists(ecminfo):
-			data = open(ecminfo, "r").readlines()
+		if ecmInfo.getStamp(ecminfo):
+			data = ecmInfo.getLines(ecminfo)
 			for i in data:
 				if "caid" in i:
 					result.append( (_("CAID"), i.split(":")[1].strip()) )
@@ -403,6 +357,8 @@ class NcamInfoMenu(Screen):
 		Screen.setTitle(self, title)
 		self.menu = [ _("Show /tmp/ecm.info"), _("Show Clients"), _("Show Readers/Proxies"), _("Show log"), _("Card infos (CCcam-Reader)"), _("ECM Statistics"), _("Setup") ]
 		self.osc = NcamInfo()
+		self.request = None
+		self.onClose.append(self.cancelRequest)
 		self["mainmenu"] = oscMenuList([])
 		self["actions"] = NumberActionMap(["OkCancelActions", "InputActions", "ColorActions"],
 					{
@@ -476,25 +432,11 @@ class NcamInfoMenu(Screen):
 		elif entry == 3:
 			self.session.open(oscInfo, "l")
 		elif entry == 4:
-			osc = NcamInfo()
-			reader = osc.getReaders("cccam")  # get list of available CCcam-Readers
-			if isinstance(reader, list):
-				if len(reader) == 1:
-					self.session.open(oscEntitlements, reader[0][1])
-				else:
-					self.callbackmode = "cccam"
-					self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose CCcam-Reader"), list=reader)
+			self.request = self.osc.getReaders("cccam")  # get list of available CCcam-Readers
+			self.request.addCallbacks(self.gotReaders, self.readersError, callbackArgs=("cccam",))
 		elif entry == 5:
-			osc = NcamInfo()
-			reader = osc.getReaders()
-			if reader is not None:
-				reader.append( (_("All"), "all") )
-				if isinstance(reader, list):
-					if len(reader) == 1:
-						self.session.open(oscReaderStats, reader[0][1])
-					else:
-						self.callbackmode = "readers"
-						self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose reader"), list=reader)
+			self.request = self.osc.getReaders()
+			self.request.addCallbacks(self.gotReaders, self.readersError, callbackArgs=("readers",))
 		elif entry == 6:
 			if SystemInfo["NCamIsActive"]:
 				screentitle = _("NCam Config info")
@@ -502,6 +444,32 @@ class NcamInfoMenu(Screen):
 				screentitle = _("OScam Config info")
 			self.session.open(NcamInfoConfigScreen)
 
+	def gotReaders(self, reader, mode):
+		if self.request is None:  # Closed.
+			return
+		self.request = None
+		if mode == "readers":
+			reader.append( (_("All"), "all") )
+		if len(reader) == 1:
+			self.session.open(mode == "cccam" and oscEntitlements or oscReaderStats, reader[0][1])
+		elif reader:
+			self.callbackmode = mode
+			if mode == "cccam":
+				self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose CCcam-Reader"), list=reader)
+			else:
+				self.session.openWithCallback(self.chooseReaderCallback, ChoiceBox, title = _("Please choose reader"), list=reader)
+
+	def readersError(self, failure):
+		if self.request is None:
+			return
+		self.request = None
+		self.session.open(MessageBox, failure.getErrorMessage(), MessageBox.TYPE_ERROR)
+
+	def cancelRequest(self):
+		if self.request is not None:
+			request, self.request = self.request, None
+			request.cancel()
+
 	def chooseReaderCallback(self, retval):
 		print(retval)
 		if retval is not None:
@@ -582,10 +550,8 @@ class oscECMInfo(Screen, NcamInfo):
 		self.ecminfo = "/tmp/ecm.info"
 		self["output"] = oscMenuList([])
 		if config.ncaminfo.autoupdate.value:
-			self.loop = eTimer()
-			self.loop.callback.append(self.showData)
-			timeout = config.ncaminfo.intervall.value * 1000
-			self.loop.start(int(100))
+			ecmInfo.subscribe(self.ecmInfoChanged)
+			self.onClose.append(self.unsubscribe)
 		self["actions"] = ActionMap(["OkCancelActions"],
 					{
 						"ok": self.exit,
@@ -594,10 +560,15 @@ class oscECMInfo(Screen, NcamInfo):
 		self.onLayoutFinish.append(self.showData)
 
 	def exit(self):
-		if config.ncaminfo.autoupdate.value:
-			self.loop.stop()
 		self.close()
 
+	def unsubscribe(self):
+		ecmInfo.unsubscribe(self.ecmInfoChanged)
+
+	def ecmInfoChanged(self, path):
+		if path == self.ecminfo:
+			self.showData()
+
 	def buildListEntry(self, listentry):
 		return [
 			"",
@@ -620,10 +591,11 @@ class oscInfo(Screen, NcamInfo):
 		global HDSKIN, sizeH
 		self.session = session
 		self.what = what
-		self.firstrun = True
 		self.listchange = True
 		self.scrolling = False
-		self.webif_data = self.readXML(typ = self.what)
+		self.client = None
+		self.data = None
+		self.out = []
 		ypos = 10
 		ysize = 350
 		self.rows = 12
@@ -659,11 +631,6 @@ class oscInfo(Screen, NcamInfo):
 			self["key_green"] = StaticText(_("Clients"))
 			self["key_yellow"] = StaticText(_("Servers"))
 			self["key_blue"] = StaticText(_("Log"))
-		if config.ncaminfo.autoupdate.value:
-			self.loop = eTimer()
-			self.loop.callback.append(self.showData)
-			timeout = config.ncaminfo.intervall.value * 1000
-			self.loop.start(int(100))
 		self["actions"] = ActionMap(["OkCancelActions", "ColorActions", "DirectionActions"],
 					{
 						"ok": self.key_ok,
@@ -679,11 +646,52 @@ class oscInfo(Screen, NcamInfo):
 						"moveUp": self.key_moveUp,
 						"moveDown": self.key_moveDown
 					}, -1)
-		self.onLayoutFinish.append(self.showData)
+		self.onLayoutFinish.append(self.subscribe)
+		self.onClose.append(self.unsubscribe)
+
+	def subscribe(self):
+		# The clients and the servers are both taken from the status, the web
+		# interface is asked once per interval for all screens showing it.
+		result = self.getWebif()
+		if not result[0]:
+			self.showData(result[1])
+			return
+		self.client = result[1]
+		self.path = self.getPath(self.what == "l" and "status&appendlog=1" or None)
+		interval = config.ncaminfo.autoupdate.value and config.ncaminfo.intervall.value or 0
+		self.client.subscribe(self.path, self.gotData, self.gotError, self.convertData, interval, records = ("client",), texts = ("log",))
+
+	def unsubscribe(self):
+		if self.client is not None:
+			self.client.unsubscribe(self.path, self.gotData)
+			self.client = None
+
+	def convertData(self, data):
+		return self.getVersion(data), self.readXML(data, self.what)
+
+	def gotData(self, data):
+		self.version, self.data = data
+		self.errmsg = ""
+		self.showData(self.data)
+
+	def gotError(self, error):
+		self.data = None
+		self.showData(error)
+
+	def setMode(self, what):
+		if self.what != what:
+			self.listchange = True
+			self.what = what
+			self.disableScrolling()
+			self.unsubscribe()
+			self.subscribe()
 
 	def key_ok(self):
 		self.disableScrolling()
-		self.showData()
+		if self.data is not None:
+			self.showData(self.data)
+		if self.client is not None:
+			self.client.refresh(self.path)
 
 	def key_up(self):
 		self.enableScrolling()
@@ -717,32 +725,15 @@ class oscInfo(Screen, NcamInfo):
 		self["output"].moveToIndex(len(self.out)-1)
 
 	def key_green(self):
-		if self.what == "c":
-			pass
-		else:
-			self.listchange = True
-			self.what = "c"
-			self.key_ok()
+		self.setMode("c")
 
 	def key_yellow(self):
-		if self.what == "s":
-			pass
-		else:
-			self.listchange = True
-			self.what = "s"
-			self.key_ok()
+		self.setMode("s")
 
 	def key_blue(self):
-		if self.what == "l":
-			pass
-		else:
-			self.listchange = True
-			self.what = "l"
-			self.key_ok()
+		self.setMode("l")
 
 	def exit(self):
-		if config.ncaminfo.autoupdate.value:
-			self.loop.stop()
 		self.close()
 
 	def buildListEntry(self, listentry, heading = False):
@@ -794,12 +785,7 @@ class oscInfo(Screen, NcamInfo):
 				res.append( (eListboxPythonMultiContent.TYPE_TEXT, 5*f, 0, self.sizeLH,self.itemheight*f, 2, RT_HALIGN_LEFT, i) )
 		return res
 
-	def showData(self):
-		if self.firstrun:
-			data = self.webif_data
-			self.firstrun = False
-		else:
-			data = self.readXML(typ = self.what)
+	def showData(self, data):
 		self.out = []
 		self.itemheight = 25
 		if not isinstance(data,str):
@@ -815,33 +801,31 @@ class oscInfo(Screen, NcamInfo):
 						self.out.append( self.buildLogListEntry( (i,) ))
 			if self.what == "c":
 				if SystemInfo["NCamIsActive"]:
-					self.setTitle(_("Client Info ( NCam-Version: %s )") % self.getVersion())
+					self.setTitle(_("Client Info ( NCam-Version: %s )") % self.version)
 				else:
-					self.setTitle(_("Client Info ( OScam-Version: %s )") % self.getVersion())
+					self.setTitle(_("Client Info ( OScam-Version: %s )") % self.version)
 				self["key_green"].setText("")
 				self["key_yellow"].setText(_("Servers"))
 				self["key_blue"].setText(_("Log"))
 			elif self.what == "s":
 				if SystemInfo["NCamIsActive"]:
-					self.setTitle(_("Server Info ( NCam-Version: %s )") % self.getVersion())
+					self.setTitle(_("Server Info ( NCam-Version: %s )") % self.version)
 				else:
-					self.setTitle(_("Server Info ( OScam-Version: %s )") % self.getVersion())
+					self.setTitle(_("Server Info ( OScam-Version: %s )") % self.version)
 				self["key_green"].setText(_("Clients"))
 				self["key_yellow"].setText("")
 				self["key_blue"].setText(_("Log"))
 			elif self.what == "l":
 				if SystemInfo["NCamIsActive"]:
-					self.setTitle(_("NCam Log ( NCam-Version: %s )") % self.getVersion())
+					self.setTitle(_("NCam Log ( NCam-Version: %s )") % self.version)
 				else:
-					self.setTitle(_("OScam Log ( OScam-Version: %s )") % self.getVersion())
+					self.setTitle(_("OScam Log ( OScam-Version: %s )") % self.version)
 				self["key_green"].setText(_("Clients"))
 				self["key_yellow"].setText(_("Servers"))
 				self["key_blue"].setText("")
 				self.itemheight = 20
 		else:
 			self.errmsg = (data,)
-			if config.ncaminfo.autoupdate.value:
-				self.loop.stop()
 			for i in self.errmsg:
 				self.out.append( self.buildListEntry( (i,) ))
 			self.setTitle(_("Error") + ": " + data)
@@ -922,6 +906,7 @@ class oscEntitlements(Screen, NcamInfo):
 		Screen.__init__(self, session)
 		self.mlist = oscMenuList([])
 		self.cccamreader = reader
+		self.request = None
 		self["output"] = List([ ])
 		self["actions"] = ActionMap(["OkCancelActions"],
 					{
@@ -929,6 +914,7 @@ class oscEntitlements(Screen, NcamInfo):
 						"cancel": self.exit
 					}, -1)
 		self.onLayoutFinish.append(self.showData)
+		self.onClose.append(self.cancelRequest)
 
 	def exit(self):
 		self.close()
@@ -963,17 +949,22 @@ class oscEntitlements(Screen, NcamInfo):
 		return res
 
 	def showData(self):
-		xmldata_for_reader = self.openWebIF(part = "entitlement", reader = self.cccamreader)
-		xdata = ElementTree.XML(xmldata_for_reader[1])
-		reader = xdata.find("reader")
-		if reader.attrib.has_key("hostaddress"):
-			hostadr = reader.attrib["hostaddress"]
+		if self.request is None:
+			self.request = self.openWebIF(part = "entitlement", reader = self.cccamreader, records = ("card",))
+			self.request.addCallbacks(self.gotData, self.gotError)
+
+	def gotData(self, xdata):
+		if self.request is None:  # Closed.
+			return
+		self.request = None
+		reader = xdata.attributes.get("reader", {})
+		if reader.has_key("hostaddress"):
+			hostadr = reader["hostaddress"]
 			host_ok = True
 		else:
 			host_ok = False
-		cardlist = reader.find("cardlist")
-		cardTotal = cardlist.attrib["totalcards"]
-		cards = cardlist.findall("card")
+		cardTotal = xdata.attributes.get("cardlist", {}).get("totalcards", "")
+		cards = xdata.records["card"]
 		caid = {}
 		for i in cards:
 			ccaid = i.attrib["caid"]
@@ -1018,6 +1009,12 @@ class oscEntitlements(Screen, NcamInfo):
 		title = [ _("Reader"), self.cccamreader, _("Cards:"), cardTotal, _("Server:"), hostadr ]
 		self.setTitle( " ".join(title))
 
+	def gotError(self, failure):
+		if self.request is None:  # Closed.
+			return
+		self.request = None
+		self.setTitle(_("Error") + ": " + failure.getErrorMessage())
+
 class oscReaderStats(Screen, NcamInfo):
 	global HDSKIN, sizeH
 	sizeLH = sizeH - 20
@@ -1060,6 +1057,7 @@ class oscReaderStats(Screen, NcamInfo):
 		else:
 			self.allreaders = False
 		self.reader = reader
+		self.request = None
 		self.mlist = oscMenuList([])
 		self["output"] = List([ ])
 		self["actions"] = ActionMap(["OkCancelActions"],
@@ -1068,6 +1066,7 @@ class oscReaderStats(Screen, NcamInfo):
 						"cancel": self.exit
 					}, -1)
 		self.onLayoutFinish.append(self.showData)
+		self.onClose.append(self.cancelRequest)
 
 	def exit(self):
 		self.close()
@@ -1105,15 +1104,27 @@ class oscReaderStats(Screen, NcamInfo):
 		return sorted(datalist, key=itemgetter(sort_col), reverse = reverse)
 
 	def showData(self):
-		readers = self.getReaders()
+		if self.request is None:
+			if self.allreaders:
+				self.request = self.getReaders()
+			else:
+				self.request = succeed([(self.reader, self.reader)])
+			self.request.addCallback(self.getStats)
+			self.request.addCallbacks(self.gotData, self.gotError)
+
+	def getStats(self, readers):
+		# The statistics of all readers are asked for at once.
+		return gatherResults([self.openWebIF(part = "readerstats", reader = i[1], records = ("ecm",)).addCallbacks(lambda xdata, i=i: (i, xdata), lambda failure, i=i: (i, None)) for i in readers])
+
+	def gotData(self, stats):
+		if self.request is None:  # Closed.
+			return
+		self.request = None
 		result = []
 		title2 = ""
-		for i in readers:
-			xmldata = self.openWebIF(part = "readerstats", reader = i[1])
+		for i, xdata in stats:
 			emm_wri = emm_ski = emm_blk = emm_err = ""
-			if xmldata[0]:
-				xdata = ElementTree.XML(xmldata[1])
-				rdr = xdata.find("reader")
+			if xdata is not None:
 #					emms = rdr.find("emmstats")
 #					if emms.attrib.has_key("totalwritten"):
 #						emm_wri = emms.attrib["totalwritten"]
@@ -1124,11 +1135,11 @@ class oscReaderStats(Screen, NcamInfo):
 #					if emms.attrib.has_key("totalerror"):
 #						emm_err = emms.attrib["totalerror"]
 
-				ecmstat = rdr.find("ecmstats")
-				totalecm = ecmstat.attrib["totalecm"]
-				ecmcount = ecmstat.attrib["count"]
-				lastacc = ecmstat.attrib["lastaccess"]
-				ecm = ecmstat.findall("ecm")
+				ecmstat = xdata.attributes.get("ecmstats", {})
+				totalecm = ecmstat.get("totalecm")
+				ecmcount = ecmstat.get("count")
+				lastacc = ecmstat.get("lastaccess")
+				ecm = xdata.records["ecm"]
 				if ecmcount > 0:
 					for j in ecm:
 						caid = j.attrib["caid"]
@@ -1174,6 +1185,12 @@ class oscReaderStats(Screen, NcamInfo):
 		title = [ _("Reader Statistics"), title2 ]
 		self.setTitle( " ".join(title))
 
+	def gotError(self, failure):
+		if self.request is None:  # Closed.
+			return
+		self.request = None
+		self.setTitle(_("Error") + ": " + failure.getErrorMessage())
+
 class NcamInfoConfigScreen(Screen, ConfigListScreen):
 	def __init__(self, session, msg = None):
 		Screen.__init__(self, session)
@@ -3,6 +3,7 @@ from Screens.Screen import Screen
 from Screens.ParentalControlSetup import ProtectedScreen
 from enigma import eConsoleAppContainer, eDVBDB, eTimer
 
+from Components.BouquetIndex import bouquetIndex
 from Components.ActionMap import ActionMap, NumberActionMap
 from Components.config import config, ConfigSubsection, ConfigText
 from Components.PluginComponent import plugins
@@ -14,6 +15,7 @@ from Components.Harddisk import harddiskmanager
 from Components.Sources.StaticText import StaticText
 from Components.SystemInfo import SystemInfo, hassoftcaminstalled
 from Components import Opkg
+from Components.PackageIndex import packageIndex
 from Screens.MessageBox import MessageBox
 from Screens.ChoiceBox import ChoiceBox
 from Screens.Console import Console
@@ -317,6 +319,7 @@ class PluginDownloadBrowser(Screen):
 			self["text"].setText(_("Reloading bouquets and services..."))
 			eDVBDB.getInstance().reloadBouquets()
 			eDVBDB.getInstance().reloadServicelist()
+			bouquetIndex.invalidate()
 			from Components.ParentalControl import parentalControl
 			parentalControl.open()
 			refreshServiceList()
@@ -403,6 +406,13 @@ class PluginDownloadBrowser(Screen):
 	def startOpkgListInstalled(self, pkgname = PLUGIN_PREFIX + '*'):
 		self.container.execute(self.opkg + Opkg.opkgExtraDestinations() + " list_installed '%s'" % pkgname)
 
+	def listInstalled(self):
+		# Read from the opkg status directly, as if 'opkg list_installed' ran.
+		installed = packageIndex.getInstalled(self.PLUGIN_PREFIX)
+		for name in sorted(installed):
+			self.addInstalled([name, installed[name]])
+		self.runFinished(0)
+
 	def startOpkgListAvailable(self):
 		self.container.execute(self.opkg + Opkg.opkgExtraDestinations() + " list '" + self.PLUGIN_PREFIX + "*'")
 
@@ -418,10 +428,10 @@ class PluginDownloadBrowser(Screen):
 				PluginDownloadBrowser.lastDownloadDate = time()
 			else:
 				self.run = 1
-				self.startOpkgListInstalled()
+				self.listInstalled()
 		elif self.type == self.REMOVE:
 			self.run = 1
-			self.startOpkgListInstalled()
+			self.listInstalled()
 
 	def installFinished(self):
 		if hasattr(self, 'postInstallCall'):
@@ -456,7 +466,7 @@ class PluginDownloadBrowser(Screen):
 		if self.run == 0:
 			self.run = 1
 			if self.type == self.DOWNLOAD:
-				self.startOpkgListInstalled()
+				self.listInstalled()
 		elif self.run == 1 and self.type == self.DOWNLOAD:
 			self.run = 2
 			pluginlist = []
@@ -498,29 +508,31 @@ class PluginDownloadBrowser(Screen):
 
 		if self.run == 1:
 			for x in lines:
-				plugin = x.split(" - ", 2)
-				# 'opkg list_installed' only returns name + version, no description field
-				if len(plugin) >= 2:
-					if config.misc.extraopkgpackages.value is True:
-						if not plugin[0].endswith('--pycache--'):
-							if plugin[0] not in self.installedplugins:
-								if self.type == self.DOWNLOAD:
-									self.installedplugins.append(plugin[0])
-								else:
-									if len(plugin) == 2:
-										plugin.append('')
-									plugin.append(plugin[0][15:])
-									self.pluginlist.append(plugin)
-					else:
-						if not plugin[0].endswith('-dev') and not plugin[0].endswith('-staticdev') and not plugin[0].endswith('-dbg') and not plugin[0].endswith('-doc') and not plugin[0].endswith('-src') and not plugin[0].endswith('-po') and not plugin[0].endswith('--pycache--'):
-							if plugin[0] not in self.installedplugins:
-								if self.type == self.DOWNLOAD:
-									self.installedplugins.append(plugin[0])
-								else:
-									if len(plugin) == 2:
-										plugin.append('')
-									plugin.append(plugin[0][15:])
-									self.pluginlist.append(plugin)
+				self.addInstalled(x.split(" - ", 2))
+
+	def addInstalled(self, plugin):
+		# 'opkg list_installed' only returns name + version, no description field
+		if len(plugin) >= 2:
+			if config.misc.extraopkgpackages.value is True:
+				if not plugin[0].endswith('--pycache--'):
+					if plugin[0] not in self.installedplugins:
+						if self.type == self.DOWNLOAD:
+							self.installedplugins.append(plugin[0])
+						else:
+							if len(plugin) == 2:
+								plugin.append('')
+							plugin.append(plugin[0][15:])
+							self.pluginlist.append(plugin)
+			else:
+				if not plugin[0].endswith('-dev') and not plugin[0].endswith('-staticdev') and not plugin[0].endswith('-dbg') and not plugin[0].endswith('-doc') and not plugin[0].endswith('-src') and not plugin[0].endswith('-po') and not plugin[0].endswith('--pycache--'):
+					if plugin[0] not in self.installedplugins:
+						if self.type == self.DOWNLOAD:
+							self.installedplugins.append(plugin[0])
+						else:
+							if len(plugin) == 2:
+								plugin.append('')
+							plugin.append(plugin[0][15:])
+							self.pluginlist.append(plugin)
 
 	def updateList(self):
 		list = []
@@ -2,6 +2,7 @@
 # -*- coding: utf-8 -*-
 from enigma import eDVBDB, getLinkedSlotID, eDVBResourceManager
 from Screens.Screen import Screen
+from Components.BouquetIndex import bouquetIndex
 from Components.SystemInfo import SystemInfo
 from Components.ActionMap import ActionMap
 from Components.ConfigList import ConfigListScreen
@@ -553,6 +554,7 @@ class NimSetup(Screen, ConfigListScreen, ServiceStopScreen):
 
 		if confirmed[1] == "yes" or confirmed[1] == "yestoall":
 			eDVBDB.getInstance().removeServices(-1, -1, -1, self.satpos_to_remove)
+			bouquetIndex.invalidate()
 
 		if self.satpos_to_remove is not None:
 			self.unconfed_sats.remove(self.satpos_to_remove)
@@ -10,6 +10,7 @@ from Components.ActionMap import ActionMap
 from Components.FIFOList import FIFOList
 from Components.Sources.FrontendInfo import FrontendInfo
 from Components.config import config
+from Components.BouquetIndex import bouquetIndex
 from enigma import eServiceReference
 
 class ServiceScanSummary(Screen):
@@ -44,6 +45,7 @@ class ServiceScan(Screen):
 				lcn.buildAfterScan()
 			except Exception as e:
 				print(str(e))
+			bouquetIndex.invalidate()
 			if self.currentInfobar.__class__.__name__ == "InfoBar":
 				selectedService = self["servicelist"].getCurrentSelection()
 				if selectedService and self.currentServiceList is not None:
@@ -112,6 +114,7 @@ class ServiceScan(Screen):
 		}, -2)
 		self.setTitle(_("Service scan"))
 		self.onFirstExecBegin.append(self.doServiceScan)
+		self.onClose.append(bouquetIndex.invalidate)
 
 	def doServiceScan(self):
 		self["servicelist"].len = self["servicelist"].instance.size().height() / self["servicelist"].l.getItemSize().height()
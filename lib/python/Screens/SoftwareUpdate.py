@@ -10,6 +10,7 @@ from Screens.TextBox import TextBox
 from Screens.About import CommitInfoDevelop
 from Components.config import config
 from Components.About import about
+from Components.BouquetIndex import bouquetIndex
 from Components.ActionMap import ActionMap
 from Components.Opkg import OpkgComponent
 from Components.Language import language
@@ -253,6 +254,7 @@ class UpdatePlugin(Screen, ProtectedScreen):
 					self.showUpdateCompletedMessage()
 					eDVBDB.getInstance().reloadBouquets()
 					eDVBDB.getInstance().reloadServicelist()
+					bouquetIndex.invalidate()
 			elif self.error == 0:
 				self.showUpdateCompletedMessage()
 			else:
@@ -0,0 +1,248 @@
+from __future__ import print_function
+import os
+import shutil
+import socket
+import threading
+from calendar import timegm
+from email.utils import formatdate, mktime_tz, parsedate_tz
+from ftplib import FTP, all_errors as ftpErrors
+from httplib import HTTPConnection, HTTPException, HTTPSConnection
+from Queue import Empty, Queue
+from urlparse import urlsplit
+
+# Fetch a lot of files from one server, as the client mode and the fallback
+# tuner channel import do.  The connections (a logged in FTP session or an
+# HTTP keep-alive connection) are kept in a pool and reused for all files, a
+# few files are fetched at the same time and files that are the same as the
+# local copy are linked from there instead of being transferred again.
+
+CONCURRENCY = 4
+TIMEOUT = 10  # Seconds.
+CHUNK_SIZE = 65536
+
+UNCHANGED = "unchanged"
+DOWNLOADED = "downloaded"
+
+
+class TransferError(Exception):
+	pass
+
+
+def getStamp(path):
+	try:
+		status = os.stat(path)
+	except OSError:
+		return None
+	return status.st_size, int(status.st_mtime)
+
+
+def linkFile(source, destination):
+	if os.path.exists(destination):
+		os.remove(destination)
+	try:
+		os.link(source, destination)
+	except OSError:
+		shutil.copy2(source, destination)
+
+
+def swapFiles(staging, target, names, stale=()):
+	"""Move the files in names from staging into target, each one replacing
+	the old file with one rename, and only then remove the files in target
+	that start with one of the stale prefixes and were not replaced."""
+	for name in names:
+		source = os.path.join(staging, name)
+		destination = os.path.join(target, name)
+		if os.path.exists(destination) and os.path.samefile(source, destination):
+			os.remove(source)  # Linked because it was unchanged, rename() would leave both.
+			continue
+		try:
+			os.rename(source, destination)
+		except OSError:  # Not the same file system.
+			shutil.move(source, "%s.tmp" % destination)
+			os.rename("%s.tmp" % destination, destination)
+	if stale:
+		for name in os.listdir(target):
+			if name.startswith(tuple(stale)) and name not in names:
+				os.remove(os.path.join(target, name))
+
+
+class BulkFetcher:
+	"""Fetches files over a pool of kept connections.  Subclasses provide
+	connect(), which returns a new session, disconnect(session) and
+	fetchFile(session, remote, destination, local), which returns
+	DOWNLOADED or UNCHANGED."""
+
+	def __init__(self, concurrency=CONCURRENCY):
+		self.concurrency = max(concurrency, 1)
+		self.sessions = []
+		self.lock = threading.Lock()
+
+	def acquire(self):
+		with self.lock:
+			if self.sessions:
+				return self.sessions.pop()
+		return self.connect()
+
+	def release(self, session):
+		with self.lock:
+			self.sessions.append(session)
+
+	def close(self):
+		with self.lock:
+			sessions, self.sessions = self.sessions, []
+		for session in sessions:
+			self.disconnect(session)
+
+	def fetch(self, files, destination, local=None):
+		"""Fetch the remote files into the directory destination.  files is a
+		list of names or (remote, name) tuples.  Files that are unchanged
+		compared to the one in the directory local are linked from there.
+		Returns a dictionary of name: UNCHANGED or DOWNLOADED and raises
+		TransferError when one of the files could not be fetched."""
+		queue = Queue()
+		for item in files:
+			queue.put(isinstance(item, tuple) and item or (item, item))
+		results = {}
+		errors = []
+
+		def worker():
+			session = None
+			while not errors:
+				try:
+					remote, name = queue.get_nowait()
+				except Empty:
+					break
+				try:
+					if session is None:
+						session = self.acquire()
+					results[name] = self.fetchFile(session, remote, os.path.join(destination, name), local and os.path.join(local, name))
+				except Exception as err:
+					errors.append((remote, err))
+					if session is not None:
+						self.disconnect(session)
+						session = None
+			if session is not None:
+				self.release(session)
+
+		workers = [threading.Thread(target=worker) for x in range(min(self.concurrency, queue.qsize()))]
+		for thread in workers:
+			thread.start()
+		for thread in workers:
+			thread.join()
+		if errors:
+			raise TransferError("Unable to fetch '%s'! (%s)" % errors[0])
+		return results
+
+
+class FTPFetcher(BulkFetcher):
+	def __init__(self, host, port=21, user="", passwd="", directory="/", passive=True, timeout=TIMEOUT, concurrency=CONCURRENCY):
+		BulkFetcher.__init__(self, concurrency)
+		self.host = host
+		self.port = port
+		self.user = user
+		self.passwd = passwd
+		self.directory = directory
+		self.passive = passive
+		self.timeout = timeout
+
+	def connect(self):
+		ftp = FTP()
+		ftp.set_pasv(self.passive)
+		ftp.connect(host=self.host, port=self.port, timeout=self.timeout)
+		ftp.login(user=self.user, passwd=self.passwd)
+		ftp.cwd(self.directory)
+		ftp.voidcmd("TYPE I")
+		return ftp
+
+	def disconnect(self, ftp):
+		try:
+			ftp.quit()
+		except ftpErrors:
+			ftp.close()
+
+	def getRemoteStamp(self, ftp, remote):
+		# Servers without SIZE or MDTM just get every file transferred.
+		try:
+			size = ftp.size(remote)
+			mdtm = ftp.sendcmd("MDTM %s" % remote)[4:18]  # YYYYMMDDhhmmss, strptime() is not thread safe.
+			mtime = timegm((int(mdtm[:4]),) + tuple(int(mdtm[x:x + 2]) for x in (4, 6, 8, 10, 12)))
+		except (ftpErrors + (ValueError, TypeError)):
+			return None
+		return size, mtime
+
+	def fetchFile(self, ftp, remote, destination, local):
+		stamp = self.getRemoteStamp(ftp, remote)
+		if stamp and local and getStamp(local) == stamp:
+			linkFile(local, destination)
+			return UNCHANGED
+		with open(destination, "wb") as fd:
+			ftp.retrbinary("RETR %s" % remote, fd.write, CHUNK_SIZE)
+		if stamp:
+			os.utime(destination, (stamp[1], stamp[1]))
+		return DOWNLOADED
+
+
+class HTTPFetcher(BulkFetcher):
+	def __init__(self, url, headers=None, timeout=TIMEOUT, concurrency=CONCURRENCY):
+		BulkFetcher.__init__(self, concurrency)
+		url = urlsplit(url)
+		self.scheme = url.scheme
+		self.netloc = url.netloc
+		self.prefix = url.path.rstrip("/")
+		self.headers = headers or {}
+		self.timeout = timeout
+
+	def connect(self):
+		connection = self.scheme == "https" and HTTPSConnection or HTTPConnection
+		return connection(self.netloc, timeout=self.timeout)
+
+	def disconnect(self, connection):
+		connection.close()
+
+	def request(self, connection, path, headers=None):
+		request = dict(self.headers)
+		request.update(headers or {})
+		for retry in (True, False):
+			try:
+				connection.request("GET", self.prefix + path, headers=request)
+				return connection.getresponse()
+			except (HTTPException, socket.error):
+				connection.close()  # The server closed the kept alive connection, the next request reconnects.
+				if not retry:
+					raise
+
+	def get(self, path):
+		"""Return the body of path, reusing a pooled connection."""
+		connection = self.acquire()
+		try:
+			response = self.request(connection, path)
+			data = response.read()
+		except Exception:
+			self.disconnect(connection)
+			raise
+		self.release(connection)
+		if response.status != 200:
+			raise TransferError("Unable to get '%s'! (HTTP %d)" % (path, response.status))
+		return data
+
+	def fetchFile(self, connection, remote, destination, local):
+		stamp = local and getStamp(local)
+		response = self.request(connection, remote, stamp and {"If-Modified-Since": formatdate(stamp[1], usegmt=True)})
+		if response.status == 304:
+			response.read()
+			linkFile(local, destination)
+			return UNCHANGED
+		if response.status != 200:
+			response.read()
+			raise TransferError("HTTP %d" % response.status)
+		with open(destination, "wb") as fd:
+			while True:
+				data = response.read(CHUNK_SIZE)
+				if not data:
+					break
+				fd.write(data)
+		modified = parsedate_tz(response.getheader("last-modified", ""))
+		if modified:
+			mtime = mktime_tz(modified)
+			os.utime(destination, (mtime, mtime))
+		return DOWNLOADED
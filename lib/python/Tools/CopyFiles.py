@@ -1,9 +1,18 @@
 from __future__ import print_function
-from Components.Task import PythonTask, Task, Job, job_manager as JobManager, Condition
+from time import time
+from Components.Harddisk import findMountPoint
+from Components.MovieIndex import movieIndex
+from Components.Task import PythonTask, Task, Job, job_manager as JobManager, Condition, getMountResource
 from Tools.Directories import fileExists
+from Tools.FileTransfer import FileTransfer
+from Tools.Trashcan import trashFilesAdded
 from enigma import eTimer
 from os import path
-from shutil import rmtree, copy2, move
+from shutil import rmtree
+
+SYNC_SIZE = 100 * 1000 * 1000  # Smaller transfers are done right away.
+RECORDING_RATE_LIMIT = 10 * 1024 * 1024  # Bytes per second, while a recording writes to one of the disks.
+RATE_CHECK_INTERVAL = 5  # Seconds.
 
 class DeleteFolderTask(PythonTask):
 	def openFiles(self, fileList):
@@ -19,24 +28,95 @@ class DeleteFolderTask(PythonTask):
 		if errors:
 			raise errors[0]
 
-class CopyFileJob(Job):
+def getRecordingMounts():
+	import NavigationInstance
+	mounts = set()
+	if NavigationInstance.instance:
+		for timer in NavigationInstance.instance.RecordTimer.timer_list:
+			if timer.isRunning() and not timer.justplay and getattr(timer, "Filename", None):
+				mounts.add(findMountPoint(timer.Filename))
+	return mounts
+
+def updateMovieIndex(fileList, move):
+	for src, dst in fileList:
+		if move:
+			movieIndex.moveFile(src, dst)
+		else:
+			movieIndex.copyFile(src, dst)
+	if move:
+		trashFilesAdded([dst for src, dst in fileList])
+
+class FileTransferTask(PythonTask):
+	# rateLimit None limits the transfer only while a recording writes to a disk it uses.
+	def __init__(self, job, name, transfer, rateLimit=None):
+		PythonTask.__init__(self, job, name)
+		self.transfer = transfer
+		self.rateLimit = rateLimit
+		self.end = transfer.total or 1
+		self.bytes_total = transfer.total
+		self.mounts = set()
+		for src, dst in transfer.fileList:
+			self.mounts.add(findMountPoint(src))
+			self.mounts.add(findMountPoint(path.dirname(dst)))
+		self.rateChecked = 0
+
+	def prepare(self):
+		self.transfer.aborted = False
+		self.updateRateLimit()
+
+	def updateRateLimit(self):
+		self.rateChecked = time()
+		rateLimit = self.rateLimit
+		if rateLimit is None:
+			rateLimit = self.mounts & getRecordingMounts() and RECORDING_RATE_LIMIT or 0
+		if rateLimit != self.transfer.rateLimit:
+			print("[CopyFiles] rate limit", rateLimit or "off")
+			self.transfer.setRateLimit(rateLimit)
+
+	def work(self):
+		self.transfer.run()
+
+	def abort(self):
+		self.transfer.abort()
+		PythonTask.abort(self)
+
+	def onTimer(self):
+		self.pos = self.bytes_done = self.transfer.done
+		if self.rateLimit is None and not 0 <= time() - self.rateChecked < RATE_CHECK_INTERVAL:
+			self.updateRateLimit()
+		PythonTask.onTimer(self)
+
+	def afterRun(self):
+		if self.transfer.committed:
+			self.bytes_done = self.bytes_total
+			updateMovieIndex(self.transfer.fileList, self.transfer.move)
+
+class FileTransferJob(Job):
+	def __init__(self, transfer, name, rateLimit=None):
+		Job.__init__(self, transfer.move and _("Moving files") or _("Copying files"))
+		self.resources = tuple(set([getMountResource(path.dirname(dst)) for src, dst in transfer.fileList]))
+		FileTransferTask(self, name, transfer, rateLimit)
+
+# Like cp -Rf and mv -f, a destination that is a directory gets the source put into it.
+class CopyFileJob(FileTransferJob):
 	def __init__(self, srcfile, destfile, name):
-		Job.__init__(self, _("Copying files"))
-		cmdline = 'cp -Rf "%s" "%s"' % (srcfile, destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+		if path.isdir(destfile):
+			destfile = path.join(destfile, path.basename(srcfile))
+		FileTransferJob.__init__(self, FileTransfer([(srcfile, destfile)]), name)
 
-class MoveFileJob(Job):
+class MoveFileJob(FileTransferJob):
 	def __init__(self, srcfile, destfile, name):
-		Job.__init__(self, _("Moving files"))
-		cmdline = 'mv -f "%s" "%s"' % (srcfile, destfile)
-		AddFileProcessTask(self, cmdline, srcfile, destfile, name)
+		if path.isdir(destfile):
+			destfile = path.join(destfile, path.basename(srcfile))
+		FileTransferJob.__init__(self, FileTransfer([(srcfile, destfile)], move=True), name)
 
 class AddFileProcessTask(Task):
-	def __init__(self, job, cmdline, srcfile, destfile, name):
+	def __init__(self, job, cmdline, srcfile, destfile, name, indexUpdate=None):
 		Task.__init__(self, job, name)
 		self.setCmdline(cmdline)
 		self.srcfile = srcfile
 		self.destfile = destfile
+		self.indexUpdate = indexUpdate  # Keeps the movie index in step with the files.
 
 		self.ProgressTimer = eTimer()
 		self.ProgressTimer.callback.append(self.ProgressUpdate)
@@ -45,17 +125,22 @@ class AddFileProcessTask(Task):
 		if self.srcsize <= 0 or not fileExists(self.destfile, 'r'):
 			return
 
-		self.setProgress(int((path.getsize(self.destfile)/float(self.srcsize))*100))
+		self.bytes_done = path.getsize(self.destfile)
+		self.setProgress(int((self.bytes_done/float(self.srcsize))*100))
 		self.ProgressTimer.start(5000, True)
 
 	def prepare(self):
 		if fileExists(self.srcfile, 'r'):
 			self.srcsize = path.getsize(self.srcfile)
+			self.bytes_total = self.srcsize
 			self.ProgressTimer.start(5000, True)
 
 	def afterRun(self):
+		self.bytes_done = self.bytes_total
 		self.setProgress(100)
 		self.ProgressTimer.stop()
+		if self.indexUpdate and self.returncode == 0:
+			self.indexUpdate(self.srcfile, self.destfile)
 
 
 class DownloadProcessTask(Job):
@@ -100,6 +185,8 @@ class DownloadTask(Task):
 	def download_progress(self, recvbytes, totalbytes):
 		if ( recvbytes - self.last_recvbytes  ) > 100000: # anti-flicker
 			self.progress = int(100*(float(recvbytes)/float(totalbytes)))
+			self.bytes_done = recvbytes
+			self.bytes_total = totalbytes
 			if (((float(totalbytes)/1024)/1024)/1024) >= 1:
 				self.name = _("Downloading") + ' ' + _("%s of %s GB") % (str(round((((float(recvbytes)/1024)/1024)/1024), 2)), str(round((((float(totalbytes)/1024)/1024)/1024), 2)))
 			elif ((float(totalbytes)/1024)/1024) >= 1:
@@ -122,19 +209,23 @@ class DownloadTask(Task):
 		else:
 			Task.processFinished(self, 0)
 
-def copyFiles(fileList, name):
-	for src, dst in fileList:
-		if path.isdir(src) or int(path.getsize(src))/1000/1000 > 100:
-			JobManager.AddJob(CopyFileJob(src, dst, name))
-		else:
-			copy2(src, dst)
-
-def moveFiles(fileList, name):
-	for src, dst in fileList:
-		if path.isdir(src) or int(path.getsize(src))/1000/1000 > 100:
-			JobManager.AddJob(MoveFileJob(src, dst, name))
-		else:
-			move(src, dst)
+# The files in fileList, e.g. a recording and its .ap, .sc, .cuts, .meta and
+# .eit files, are copied or moved as one: all of them or none.  Renames and
+# small transfers are done right away and raise on failure, everything else
+# becomes a job.
+def transferFiles(fileList, name, move=False, rateLimit=None):
+	transfer = FileTransfer(fileList, move=move)
+	if transfer.total <= SYNC_SIZE and not transfer.directories:
+		transfer.run()
+		updateMovieIndex(fileList, move)
+	else:
+		JobManager.AddJob(FileTransferJob(transfer, name, rateLimit))
+
+def copyFiles(fileList, name, rateLimit=None):
+	transferFiles(fileList, name, False, rateLimit)
+
+def moveFiles(fileList, name, rateLimit=None):
+	transferFiles(fileList, name, True, rateLimit)
 
 def deleteFiles(fileList, name):
 	job = Job(_("Deleting files"))
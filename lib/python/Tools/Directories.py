@@ -1,7 +1,6 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 import errno
-import inspect
 import os, sys
 
 from enigma import eEnv, getDesktop
@@ -81,6 +80,14 @@ defaultPaths = {
 	SCOPE_LIBDIR: (eEnv.resolve("${libdir}/"), PATH_DONTCREATE)
 }
 
+# Scopes that search a list of candidate directories.  The result of these
+# lookups is kept in resolveCache until the active skin changes or a partition
+# is mounted or removed.
+#
+cachedScopes = frozenset((SCOPE_CURRENT_SKIN, SCOPE_ACTIVE_SKIN, SCOPE_SKIN_IMAGE, SCOPE_CURRENT_LCDSKIN, SCOPE_ACTIVE_LCDSKIN, SCOPE_FONTS, SCOPE_CURRENT_PLUGIN))
+resolveCache = {}
+pluginContext = []  # Stack of plugin directories that are being loaded or started, see PluginComponent.
+
 def resolveFilename(scope, base="", path_prefix=None):
 	# You can only use the ~/ if we have a prefix directory.
 	if str(base).startswith("~/"):
@@ -96,6 +103,29 @@ def resolveFilename(scope, base="", path_prefix=None):
 	if scope not in defaultPaths:
 		print("[Directories] Error: Invalid scope=%str provided to resolveFilename!" % scope)
 		return None
+	# Remove any suffix data and restore it at the end.
+	suffix = None
+	data = base.split(":", 1)
+	if len(data) > 1:
+		base = data[0]
+		suffix = data[1]
+	if base and scope in cachedScopes:
+		key = (scope, base, getActiveSkin(scope))
+		path = resolveCache.get(key)
+		if path is None:
+			path = resolveCache[key] = resolveScope(scope, base)
+	elif scope in (SCOPE_CURRENT_PLUGIN_ABSOLUTE, SCOPE_CURRENT_PLUGIN_RELATIVE):
+		path = resolveScope(scope, base, getCallingPlugin(sys._getframe(1)))
+	else:
+		path = resolveScope(scope, base)
+	if path is None:
+		return None
+	# If a suffix was supplier restore it.
+	if suffix is not None:
+		path = "%s:%s" % (path, suffix)
+	return path
+
+def resolveScope(scope, base, plugin=None):
 	# Ensure that the defaultPaths directories that should exist do exist.
 	path, flag = defaultPaths.get(scope)
 	if flag == PATH_CREATE and not pathExists(path):
@@ -104,35 +134,17 @@ def resolveFilename(scope, base="", path_prefix=None):
 		except (IOError, OSError) as err:
 			print("[Directories] Error %d: Couldn't create directory '%s' (%s)" % (err.errno, path, err.strerror))
 			return None
-	# Remove any suffix data and restore it at the end.
-	suffix = None
-	data = base.split(":", 1)
-	if len(data) > 1:
-		base = data[0]
-		suffix = data[1]
 	path = base
 	# If base is "" then set path to the scope.  Otherwise use the scope to resolve the base filename.
 	if base is "":
 		path, flags = defaultPaths.get(scope)
 		# If the scope is SCOPE_CURRENT_SKIN or SCOPE_ACTIVE_SKIN or SCOPE_SKIN_IMAGE append the current skin to the scope path.
 		if scope in (SCOPE_CURRENT_SKIN, SCOPE_ACTIVE_SKIN, SCOPE_SKIN_IMAGE):
-			# This import must be here as this module finds the config file as part of the config initialisation.
-			from Components.config import config
-			skin = os.path.dirname(config.skin.primary_skin.value)
-			path = os.path.join(path, skin)
+			path = os.path.join(path, getActiveSkin(scope))
 		elif scope in (SCOPE_CURRENT_PLUGIN_ABSOLUTE, SCOPE_CURRENT_PLUGIN_RELATIVE):
-			callingCode = os.path.normpath(inspect.stack()[1][1])
-			plugins = os.path.normpath(defaultPaths[SCOPE_PLUGINS][0])
-			path = None
-			if comparePath(plugins, callingCode):
-				pluginCode = callingCode[len(plugins) + 1:].split(os.sep)
-				if len(pluginCode) > 2:
-					relative = "%s%s%s" % (pluginCode[0], os.sep, pluginCode[1])
-					path = os.path.join(plugins, relative)
+			path = plugin
 	elif scope in (SCOPE_CURRENT_SKIN, SCOPE_ACTIVE_SKIN, SCOPE_SKIN_IMAGE):
-		# This import must be here as this module finds the config file as part of the config initialisation.
-		from Components.config import config
-		skin = os.path.dirname(config.skin.primary_skin.value)
+		skin = getActiveSkin(scope)
 		resolveList = [
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], skin),
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], "skin_common"),
@@ -148,12 +160,7 @@ def resolveFilename(scope, base="", path_prefix=None):
 				path = file
 				break
 	elif scope in (SCOPE_CURRENT_LCDSKIN, SCOPE_ACTIVE_LCDSKIN):
-		# This import must be here as this module finds the config file as part of the config initialisation.
-		from Components.config import config
-		if hasattr(config.skin, "display_skin"):
-			skin = os.path.dirname(config.skin.display_skin.value)
-		else:
-			skin = ""
+		skin = getActiveSkin(scope)
 		resolveList = [
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], "display", skin),
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], "display", "skin_common"),
@@ -169,10 +176,7 @@ def resolveFilename(scope, base="", path_prefix=None):
 				path = file
 				break
 	elif scope == SCOPE_FONTS:
-		# This import must be here as this module finds the config file as part of the config initialisation.
-		from Components.config import config
-		skin = os.path.dirname(config.skin.primary_skin.value)
-		display = os.path.dirname(config.skin.display_skin.value) if hasattr(config.skin, "display_skin") else None
+		skin, display = getActiveSkin(scope)
 		resolveList = [
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], "fonts"),
 			os.path.join(defaultPaths[SCOPE_CONFIG][0], skin)
@@ -197,28 +201,51 @@ def resolveFilename(scope, base="", path_prefix=None):
 		if pathExists(file):
 			path = file
 	elif scope in (SCOPE_CURRENT_PLUGIN_ABSOLUTE, SCOPE_CURRENT_PLUGIN_RELATIVE):
-		callingCode = os.path.normpath(inspect.stack()[1][1])
-		plugins = os.path.normpath(defaultPaths[SCOPE_PLUGINS][0])
-		path = None
-		if comparePath(plugins, callingCode):
-			pluginCode = callingCode[len(plugins) + 1:].split(os.sep)
-			if len(pluginCode) > 2:
-				relative = os.path.join("%s%s%s" % (pluginCode[0], os.sep, pluginCode[1]), base)
-				path = os.path.join(plugins, relative)
+		path = os.path.join(plugin, base) if plugin else None
 	else:
 		path, flags = defaultPaths.get(scope)
 		path = os.path.join(path, base)
+	if path is None:
+		return None
 	path = os.path.normpath(path)
 	# If the path is a directory then ensure that it ends with a "/".
 	if os.path.isdir(path) and not path.endswith("/"):
 		path += "/"
 	if scope == SCOPE_CURRENT_PLUGIN_RELATIVE:
-		path = path[len(plugins) + 1:]
-	# If a suffix was supplier restore it.
-	if suffix is not None:
-		path = "%s:%s" % (path, suffix)
+		path = path[len(os.path.normpath(defaultPaths[SCOPE_PLUGINS][0])) + 1:]
 	return path
 
+# Return the part of the skin configuration that the scope depends on.
+#
+def getActiveSkin(scope):
+	# This import must be here as this module finds the config file as part of the config initialisation.
+	from Components.config import config
+	if scope in (SCOPE_CURRENT_LCDSKIN, SCOPE_ACTIVE_LCDSKIN):
+		return os.path.dirname(config.skin.display_skin.value) if hasattr(config.skin, "display_skin") else ""
+	skin = os.path.dirname(config.skin.primary_skin.value)
+	if scope == SCOPE_FONTS:
+		return (skin, os.path.dirname(config.skin.display_skin.value) if hasattr(config.skin, "display_skin") else None)
+	return skin
+
+# Return the directory of the plugin that the code of the given frame belongs
+# to.  If the code is not located in the plugins directory (e.g. it has been
+# compiled elsewhere) use the plugin that is currently being loaded or
+# started by PluginComponent.
+#
+def getCallingPlugin(frame):
+	callingCode = os.path.normpath(frame.f_code.co_filename)
+	plugins = os.path.normpath(defaultPaths[SCOPE_PLUGINS][0])
+	if callingCode.startswith(plugins + os.sep):
+		pluginCode = callingCode[len(plugins) + 1:].split(os.sep)
+		if len(pluginCode) > 2:
+			return os.path.join(plugins, pluginCode[0], pluginCode[1])
+	if pluginContext:
+		return pluginContext[-1]
+	return None
+
+def clearResolveCache(*args):
+	resolveCache.clear()
+
 def comparePath(leftPath, rightPath):
 	if leftPath.endswith(os.sep):
 		leftPath = leftPath[:-1]
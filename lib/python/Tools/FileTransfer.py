@@ -0,0 +1,247 @@
+from __future__ import print_function
+import os
+from ctypes import CDLL, c_int, c_size_t, c_ssize_t, c_uint, c_void_p, get_errno
+from shutil import copystat, rmtree
+from time import sleep, time
+
+# Copies and moves files in enigma2 itself instead of starting cp and mv.  The
+# data is moved by the kernel with copy_file_range() or sendfile() in large
+# chunks, with read() and write() where neither works, so the progress is
+# known to the byte and the rate can be limited.  A list of files, like the
+# files of a recording, is transferred as one unit that either completes or
+# leaves everything as it was.
+#
+# The work is meant to be done in a thread, abort() and setRateLimit() may be
+# called from another one.
+
+CHUNK_SIZE = 4 * 1024 * 1024  # A multiple of the page size.
+TEMP_SUFFIX = ".copying"
+BACKUP_SUFFIX = ".replaced"
+
+
+class TransferAborted(Exception):
+	pass
+
+
+def getLibcFunction(name, restype, argtypes):
+	try:
+		function = getattr(CDLL(None, use_errno=True), name)
+	except (OSError, AttributeError):
+		return None
+	function.restype = restype
+	function.argtypes = argtypes
+	return function
+
+
+libcCopyFileRange = getLibcFunction("copy_file_range", c_ssize_t, [c_int, c_void_p, c_int, c_void_p, c_size_t, c_uint])
+libcSendfile = getLibcFunction("sendfile64", c_ssize_t, [c_int, c_int, c_void_p, c_size_t])
+
+
+def checkResult(count):
+	if count < 0:
+		error = get_errno()
+		raise OSError(error, os.strerror(error))
+	return count
+
+
+# All of them copy from and advance the current positions of the files.
+def copyFileRange(fdIn, fdOut, size):
+	if libcCopyFileRange is None:
+		raise OSError(38, "copy_file_range() not available")  # errno.ENOSYS
+	return checkResult(libcCopyFileRange(fdIn, None, fdOut, None, size, 0))
+
+
+def sendfile(fdIn, fdOut, size):
+	if libcSendfile is None:
+		raise OSError(38, "sendfile() not available")
+	return checkResult(libcSendfile(fdOut, fdIn, None, size))
+
+
+def readWrite(fdIn, fdOut, size):
+	data = os.read(fdIn, size)
+	written = 0
+	while written < len(data):
+		written += os.write(fdOut, data[written:])
+	return len(data)
+
+
+COPY_METHODS = (copyFileRange, sendfile, readWrite)
+
+
+def getDevice(path):
+	while not os.path.exists(path) and os.path.dirname(path) != path:
+		path = os.path.dirname(path)
+	return os.stat(path).st_dev
+
+
+def removePath(path):
+	if os.path.isdir(path) and not os.path.islink(path):
+		rmtree(path)
+	else:
+		os.remove(path)
+
+
+class FileTransfer:
+	"""Copy or move the (source, destination) tuples in fileList as one
+	unit.  Everything is written to temporary names next to the destinations
+	and only renamed into place when all of it is complete.  When something
+	fails or the transfer is aborted, all that was written is removed and the
+	files that were replaced are restored.  Sources that are moved within
+	their file system are renamed.  Directories are merged into existing
+	ones."""
+
+	def __init__(self, fileList, move=False, rateLimit=0):
+		self.fileList = fileList
+		self.move = move
+		self.items = []  # (source, destination, rename) of files and symbolic links.
+		self.directories = []  # Destination directories.
+		self.sourceDirectories = []  # Removed after a move.
+		self.total = 0
+		self.done = 0
+		self.aborted = False
+		self.committed = False
+		for source, destination in fileList:
+			self.plan(source, destination)
+		self.setRateLimit(rateLimit)
+
+	def plan(self, source, destination):
+		if self.move and not os.path.lexists(destination) and os.lstat(source).st_dev == getDevice(os.path.dirname(destination)):
+			self.items.append((source, destination, True))
+		elif os.path.isdir(source) and not os.path.islink(source):
+			self.directories.append(destination)
+			if self.move:
+				self.sourceDirectories.append(source)
+			for name in sorted(os.listdir(source)):
+				self.plan(os.path.join(source, name), os.path.join(destination, name))
+		else:
+			self.items.append((source, destination, False))
+			if not os.path.islink(source):
+				self.total += os.stat(source).st_size
+
+	def setRateLimit(self, rateLimit):
+		"""Limit the transfer to rateLimit bytes per second, 0 for no limit."""
+		self.limitStart = (time(), self.done)
+		self.rateLimit = rateLimit or 0
+
+	def abort(self):
+		self.aborted = True
+
+	def checkAborted(self):
+		if self.aborted:
+			raise TransferAborted("Aborted")
+
+	def throttle(self):
+		while self.rateLimit > 0:
+			start, done = self.limitStart
+			wait = start + float(self.done - done) / self.rateLimit - time()
+			if wait <= 0:
+				break
+			self.checkAborted()
+			sleep(min(wait, 0.5))
+
+	def copyData(self, fdIn, fdOut, size):
+		methods = list(COPY_METHODS)
+		copied = 0
+		while True:
+			self.checkAborted()
+			try:
+				count = methods[0](fdIn, fdOut, CHUNK_SIZE)
+			except OSError:
+				if copied or len(methods) == 1:
+					raise
+				methods.pop(0)  # Not supported for these files, nothing was copied yet.
+				continue
+			if not count:
+				if copied < size and len(methods) > 1:
+					methods = methods[-1:]  # Some file systems end early, read what is left.
+					continue
+				break
+			copied += count
+			self.done += count
+			self.throttle()
+
+	def copyItem(self, source, destination):
+		if os.path.lexists(destination):
+			removePath(destination)  # Left behind by an earlier attempt.
+		if os.path.islink(source):
+			os.symlink(os.readlink(source), destination)
+			return
+		with open(source, "rb") as fdIn:
+			with open(destination, "wb") as fdOut:
+				self.copyData(fdIn.fileno(), fdOut.fileno(), os.fstat(fdIn.fileno()).st_size)
+		copystat(source, destination)
+
+	def run(self):
+		"""Do the transfer, raises the error after everything was undone."""
+		created = []
+		written = []
+		committed = []  # (source, destination, rename, backup)
+		self.done = 0  # Again, when retried.
+		self.setRateLimit(self.rateLimit)
+		try:
+			for directory in self.directories:
+				if not os.path.isdir(directory):
+					os.mkdir(directory)
+					created.append(directory)
+			for source, destination, rename in self.items:
+				if not rename:
+					written.append(destination + TEMP_SUFFIX)
+					self.copyItem(source, destination + TEMP_SUFFIX)
+			self.checkAborted()
+			for source, destination, rename in self.items:
+				backup = None
+				if os.path.lexists(destination):
+					backup = destination + BACKUP_SUFFIX
+					os.rename(destination, backup)
+				try:
+					os.rename(rename and source or destination + TEMP_SUFFIX, destination)
+				except OSError:
+					if backup:
+						os.rename(backup, destination)
+					raise
+				committed.append((source, destination, rename, backup))
+		except Exception as err:
+			print("[FileTransfer] Error: Transfer failed, undoing it! (%s)" % err)
+			self.rollback(created, written, committed)
+			raise
+		self.committed = True
+		self.cleanup(committed)
+
+	def rollback(self, created, written, committed):
+		for source, destination, rename, backup in reversed(committed):
+			try:
+				if rename:
+					os.rename(destination, source)
+				else:
+					removePath(destination)
+				if backup:
+					os.rename(backup, destination)
+			except OSError as err:
+				print("[FileTransfer] Error: Unable to undo '%s'! (%s)" % (destination, err))
+		for path in written:
+			if os.path.lexists(path):
+				try:
+					removePath(path)
+				except OSError as err:
+					print("[FileTransfer] Error: Unable to remove '%s'! (%s)" % (path, err))
+		for directory in reversed(created):
+			try:
+				os.rmdir(directory)
+			except OSError as err:
+				print("[FileTransfer] Error: Unable to remove '%s'! (%s)" % (directory, err))
+
+	def cleanup(self, committed):
+		# Everything is in place, problems from here on leave the files at both places.
+		for source, destination, rename, backup in committed:
+			try:
+				if backup:
+					removePath(backup)
+				if self.move and not rename:
+					os.remove(source)
+			except OSError as err:
+				print("[FileTransfer] Error: Unable to remove '%s'! (%s)" % (err.filename, err))
+		for directory in reversed(self.sourceDirectories):
+			try:
+				os.rmdir(directory)
+			except OSError as err:
+				print("[FileTransfer] Error: Unable to remove '%s'! (%s)" % (directory, err))
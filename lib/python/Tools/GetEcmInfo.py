@@ -1,23 +1,221 @@
 import os
 import time
 
+from enigma import eTimer
+
 ECM_INFO = '/tmp/ecm.info'
 EMPTY_ECM_INFO = '', '0', '0', '0'
+CHECK_INTERVAL = 500  # Milliseconds, a file is not checked more often than this.
 
 old_ecm_time = time.time()
 info = {}
 ecm = ''
 data = EMPTY_ECM_INFO
 
+
+def parseEcmInfo(lines):
+	"""Parse the ecm.info of any of the common softcams (mgcamd, oscam,
+	CCcam, wicardd, ...) into one dictionary with lower case keys like
+	"caid", "pid", "prov", "reader", "hops", "ecm time", "source",
+	"server", "port" and "protocol"."""
+	info = {}
+	for line in lines:
+		x = line.lower().find("msec")
+		# ecm time for mgcamd and oscam
+		if x != -1:
+			info["ecm time"] = line[0:x + 4]
+			continue
+		item = line.split(":", 1)
+		if len(item) > 1:
+			# wicardd block
+			if item[0] == "Provider":
+				item[0] = "prov"
+				item[1] = item[1].strip()[2:]
+			elif item[0] == "ECM PID":
+				item[0] = "pid"
+			elif item[0] == "response time":
+				info["source"] = "net"
+				it_tmp = item[1].strip().split(" ")
+				info["ecm time"] = "%s msec" % it_tmp[0]
+				y = it_tmp[-1].find("[")
+				if y != -1:
+					info["server"] = it_tmp[-1][:y]
+					info["protocol"] = it_tmp[-1][y + 1:-1]
+				y = it_tmp[-1].find("(")
+				if y != -1:
+					info["server"] = it_tmp[-1].split("(")[-1].split(":")[0]
+					info["port"] = it_tmp[-1].split("(")[-1].split(":")[-1].rstrip(")")
+				else:
+					item[0] = "source"
+					item[1] = "sci"
+				if it_tmp[-1].find("emu") > -1 or it_tmp[-1].find("cache") > -1 or it_tmp[-1].find("card") > -1 or it_tmp[-1].find("biss") > -1:
+					item[0] = "source"
+					item[1] = "emu"
+			elif item[0] in ("hops", "system", "provider"):
+				item[1] = item[1].strip("\n")
+			elif item[0][:2] == "cw" or item[0] == "ChID" or item[0] == "Service":
+				pass
+			# mgcamd and new oscam block
+			elif item[0] == "source":
+				if item[1].strip()[:3] == "net":
+					it_tmp = item[1].strip().split(" ")
+					info["protocol"] = it_tmp[1][1:]
+					info["server"] = it_tmp[-1].split(":", 1)[0]
+					info["port"] = it_tmp[-1].split(":", 1)[1][:-1]
+					item[1] = "net"
+			elif item[0] == "prov":
+				y = item[1].find(",")
+				if y != -1:
+					item[1] = item[1][:y]
+			# old oscam block
+			elif item[0] == "reader":
+				if item[1].strip() == "emu":
+					item[0] = "source"
+			elif item[0] == "from":
+				if item[1].strip() == "local":
+					item[1] = "sci"
+					item[0] = "source"
+				else:
+					info["source"] = "net"
+					item[0] = "server"
+			# CCcam block
+			elif item[0] == "provid":
+				item[0] = "prov"
+			elif item[0] == "using":
+				if item[1].strip() == "emu" or item[1].strip() == "sci":
+					item[0] = "source"
+				else:
+					info["source"] = "net"
+					item[0] = "protocol"
+			elif item[0] == "address":
+				tt = item[1].find(":")
+				if tt != -1:
+					info["server"] = item[1][:tt].strip()
+					item[0] = "port"
+					item[1] = item[1][tt + 1:]
+			info[item[0].strip().lower()] = item[1].strip()
+		else:
+			x = line.lower().find("caid")
+			if x != -1:
+				y = line.find(",")
+				if y != -1:
+					info["caid"] = line[x + 5:y]
+			if "pid" not in info:
+				x = line.lower().find("pid")
+				if x != -1:
+					y = line.find(" =")
+					z = line.find(" *")
+					if y != -1:
+						info["pid"] = line[x + 4:y]
+					elif z != -1:
+						info["pid"] = line[x + 4:z]
+	return info
+
+
+# One reader of the ecm.info files for the whole process.  Every file is
+# checked at most once per CHECK_INTERVAL and only read and parsed again when
+# its modification time or size changed, no matter how many converters and
+# renderers on screen ask for it.  Interested parties can subscribe to be
+# called when one of the files changed instead of polling it themselves.
+#
+class EcmInfoSource:
+	def __init__(self):
+		self.files = {}  # path: [checked, (mtime, size), lines, records]
+		self.subscribers = []
+		self.timer = None
+
+	def getFile(self, path, force=False):
+		entry = self.files.get(path)
+		if entry is None:
+			entry = self.files[path] = [None, None, [], {}]
+		now = time.time()
+		if force or entry[0] is None or not 0 <= now - entry[0] < CHECK_INTERVAL / 1000.0:
+			entry[0] = now
+			try:
+				status = os.stat(path)
+				stamp = (status.st_mtime, status.st_size)
+			except OSError:
+				stamp = None
+			if stamp != entry[1]:
+				entry[1] = stamp
+				entry[2] = []
+				entry[3] = {}
+				if stamp:
+					try:
+						with open(path, "r") as fd:
+							entry[2] = fd.readlines()
+					except (IOError, OSError):
+						pass
+		return entry
+
+	def getStamp(self, path=ECM_INFO):
+		"""Return (mtime, size) of the file or None if it does not exist."""
+		return self.getFile(path)[1]
+
+	def getLines(self, path=ECM_INFO):
+		return self.getFile(path)[2]
+
+	def getContent(self, path=ECM_INFO):
+		return "".join(self.getFile(path)[2])
+
+	def getRecord(self, path=ECM_INFO, parser=parseEcmInfo):
+		"""Return the file parsed by parser.  The result is shared by all
+		callers and must not be modified."""
+		entry = self.getFile(path)
+		record = entry[3].get(parser)
+		if record is None:
+			record = entry[3][parser] = parser(entry[2])
+		return record
+
+	def getPath(self, service):
+		"""Return the ecm.info of the tuner the service is running on, softcams
+		that support more than one tuner write /tmp/ecm<tuner>.info."""
+		frontendInfo = service and service.frontendInfo()
+		if frontendInfo:
+			path = "/tmp/ecm%s.info" % frontendInfo.getAll(False).get("tuner_number")
+			if self.getStamp(path):
+				return path
+		return ECM_INFO
+
+	def subscribe(self, callback):
+		if callback not in self.subscribers:
+			self.subscribers.append(callback)
+		if self.timer is None:
+			self.timer = eTimer()
+			self.timer.callback.append(self.poll)
+		if not self.timer.isActive():
+			self.getFile(ECM_INFO)
+			self.timer.start(CHECK_INTERVAL)
+
+	def unsubscribe(self, callback):
+		if callback in self.subscribers:
+			self.subscribers.remove(callback)
+		if not self.subscribers and self.timer:
+			self.timer.stop()
+
+	def poll(self):
+		changed = []
+		for path, entry in self.files.items():
+			stamp = entry[1]
+			if self.getFile(path, force=True)[1] != stamp:
+				changed.append(path)
+		for path in changed:
+			for callback in self.subscribers[:]:
+				callback(path)
+
+
+ecmInfo = EcmInfoSource()
+
 class GetEcmInfo:
 	def pollEcmData(self):
 		global data
 		global old_ecm_time
 		global info
 		global ecm
-		try:
-			ecm_time = os.stat(ECM_INFO).st_mtime
-		except:
+		stamp = ecmInfo.getStamp()
+		if stamp:
+			ecm_time = stamp[0]
+		else:
 			ecm_time = old_ecm_time
 			data = EMPTY_ECM_INFO
 			info = {}
@@ -29,10 +227,7 @@ class GetEcmInfo:
 			info['ecminterval2'] = oecmi1
 			info['ecminterval1'] = oecmi0
 			old_ecm_time = ecm_time
-			try:
-				ecm = open(ECM_INFO, 'r').readlines()
-			except:
-				ecm = ''
+			ecm = ecmInfo.getLines() or ''
 			for line in ecm:
 				d = line.split(':', 1)
 				if len(d) > 1:
@@ -4,3 +4,38 @@ def my_import(name):
 	for comp in components[1:]:
 		mod = getattr(mod, comp)
 	return mod
+
+
+# Stands in for a module, or for a name from a module, that is only imported
+# when it is used for the first time, e.g. a screen that is only opened on a
+# key press.  Calling it and getting attributes work as with the real thing,
+# isinstance() and subclassing need the real thing.
+#
+# EPGSelection = lazyImport("Screens.EpgSelection", "EPGSelection")
+#
+class lazyImport(object):
+	def __init__(self, module, name=None):
+		self.__dict__["_module"] = module
+		self.__dict__["_name"] = name
+		self.__dict__["_target"] = None
+
+	def _resolve(self):
+		target = self._target
+		if target is None:
+			target = my_import(self._module)
+			if self._name:
+				target = getattr(target, self._name)
+			self.__dict__["_target"] = target
+		return target
+
+	def __getattr__(self, name):
+		return getattr(self._resolve(), name)
+
+	def __setattr__(self, name, value):
+		setattr(self._resolve(), name, value)
+
+	def __call__(self, *args, **kwargs):
+		return self._resolve()(*args, **kwargs)
+
+	def __repr__(self):
+		return "<lazyImport %s%s>" % (self._module, self._name and ".%s" % self._name or "")
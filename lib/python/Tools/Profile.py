@@ -2,7 +2,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function
 # the implementation here is a bit crappy.
+import json
+import os
+import sys
 import time
+from six.moves import builtins
 from Tools.Directories import resolveFilename, SCOPE_CONFIG
 from enigma import getBoxType
 
@@ -34,8 +38,69 @@ try:
 except IOError:
 	print("[Profile] WARNING: couldn't open profile file!")
 
+# Import profiling, enabled by creating the file IMPORT_PROFILE_FLAG.  Until
+# profile_final() every import that loads a module is timed, the time spent in
+# the imports it does itself is subtracted for the self time.  The result is
+# written as a text report sorted by cumulative time and as a trace file that
+# chrome://tracing or https://ui.perfetto.dev can show.
+
+IMPORT_PROFILE_FLAG = resolveFilename(SCOPE_CONFIG, "importprofile")
+IMPORT_PROFILE_REPORT = "/tmp/importprofile.txt"
+IMPORT_PROFILE_TRACE = "/tmp/importprofile.json"
+
+import_events = []  # (module, start, cumulative, self)
+import_stack = []  # Time spent in nested imports, one entry per active import.
+profile_events = []  # (time, id)
+real_import = builtins.__import__
+
+def imported_name(name, globals, level):
+	# Python 2 tries "import x" relative to the importing package first.
+	if level != 0 and globals:
+		package = globals.get("__package__") or globals.get("__name__", "")
+		if "__path__" not in globals and not globals.get("__package__"):
+			package = package.rpartition(".")[0]
+		if package and sys.modules.get("%s.%s" % (package, name)) is not None:
+			return "%s.%s" % (package, name)
+	return name
+
+def profiled_import(name, globals=None, locals=None, fromlist=None, level=-1):
+	loaded = len(sys.modules)
+	start = time.time()
+	import_stack.append(0.0)
+	try:
+		return real_import(name, globals, locals, fromlist, level)
+	finally:
+		nested = import_stack.pop()
+		elapsed = time.time() - start
+		if import_stack:
+			import_stack[-1] += elapsed
+		if len(sys.modules) != loaded:  # Not just a lookup of an already imported module.
+			import_events.append((imported_name(name, globals, level), start - profile_start, elapsed, elapsed - nested))
+
+def write_import_profile():
+	builtins.__import__ = real_import
+	try:
+		with open(IMPORT_PROFILE_REPORT, "w") as fd:
+			fd.write("%10s %10s  %s\n" % ("cumul. ms", "self ms", "module"))
+			for module, start, cumulative, own in sorted(import_events, key=lambda x: -x[2]):
+				fd.write("%10.1f %10.1f  %s\n" % (cumulative * 1000, own * 1000, module))
+			fd.write("%10s %10.1f  total of %d imports\n" % ("", sum(x[3] for x in import_events) * 1000, len(import_events)))
+		events = [{"name": module, "cat": "import", "ph": "X", "ts": int(start * 1000000), "dur": int(cumulative * 1000000), "pid": 1, "tid": 1} for module, start, cumulative, own in import_events]
+		events += [{"name": id, "cat": "profile", "ph": "i", "s": "g", "ts": int(t * 1000000), "pid": 1, "tid": 1} for t, id in profile_events]
+		with open(IMPORT_PROFILE_TRACE, "w") as fd:
+			json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fd)
+		print("[Profile] Import profile written to '%s' and '%s'." % (IMPORT_PROFILE_REPORT, IMPORT_PROFILE_TRACE))
+	except (IOError, OSError) as err:
+		print("[Profile] Error %d: Unable to write import profile! (%s)" % (err.errno, err.strerror))
+
+import_profile = os.path.exists(IMPORT_PROFILE_FLAG)
+if import_profile:
+	builtins.__import__ = profiled_import
+
 def profile(id):
 	now = time.time() - profile_start
+	if import_profile:
+		profile_events.append((now, id))
 	if profile_file:
 		profile_file.write("%7.3f\t%s\n" % (now, id))
 
@@ -62,7 +127,10 @@ def profile(id):
 				pass
 
 def profile_final():
-	global profile_file
+	global profile_file, import_profile
 	if profile_file is not None:
 		profile_file.close()
 		profile_file = None
+	if import_profile:
+		import_profile = False
+		write_import_profile()
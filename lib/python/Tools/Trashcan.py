@@ -1,14 +1,36 @@
 from __future__ import print_function
+import marshal
+import threading
 import time
 import os
 import enigma
 from Components.config import config
 from Components import Harddisk
+from Components.MovieIndex import INDEX_NAME, movieIndex
 from twisted.internet import threads
 from Components.GUIComponent import GUIComponent
 from Components.VariableText import VariableText
 import Components.Task
 
+# Every trash folder has an index of the files in it with their size and
+# ctime (the time they were moved to the trash), so the size of the trash is
+# known and the oldest files can be purged without walking the folder.  The
+# index is brought up to date by listing the top level of the folder: names
+# that are new are scanned and names that are gone are dropped.  The files
+# that are about to be purged are written to a journal first, a purge that was
+# cut short is finished when the index is loaded again.
+#
+# Mounts are looked at in parallel, and a mount that does not answer in time
+# (a network share that went away) is skipped instead of holding up the rest.
+
+TRASH_INDEX_NAME = ".e2trashindex"
+TRASH_INDEX_VERSION = 1
+PURGE_JOURNAL_NAME = ".e2trashpurge"
+SKIP_NAMES = (INDEX_NAME, TRASH_INDEX_NAME, TRASH_INDEX_NAME + ".tmp", PURGE_JOURNAL_NAME, ".e2settings.pkl")
+SCAN_THREADS = 4
+PROBE_TIMEOUT = 10  # Seconds, per mount.
+PURGE_TIMEOUT = 120  # Seconds, per trash folder.
+
 def getTrashFolder(path=None):
 	# Returns trash folder without symlinks
 	try:
@@ -43,6 +65,8 @@ def createTrashFolder(path=None):
 def get_size(start_path = '.'):
 	total_size = 0
 	if start_path:
+		if os.path.basename(start_path) == ".Trash" and os.path.isdir(start_path):
+			return getTrashIndex(start_path).refresh().getSize()
 		for dirpath, dirnames, filenames in os.walk(start_path):
 			for f in filenames:
 				try:
@@ -52,18 +76,242 @@ def get_size(start_path = '.'):
 					pass
 	return total_size
 
+class TrashIndex:
+	def __init__(self, trash):
+		self.trash = trash
+		self.entries = {}  # Path relative to the trash folder: (size, ctime).
+		self.loaded = False
+		self.lock = threading.RLock()
+
+	def isSkipped(self, name):
+		return name in SKIP_NAMES or name.endswith(".del")  # Being erased by eBackgroundFileEraser.
+
+	def load(self):
+		try:
+			with open(os.path.join(self.trash, TRASH_INDEX_NAME), "rb") as fd:
+				version, entries = marshal.load(fd)
+			if version == TRASH_INDEX_VERSION:
+				self.entries = entries
+		except (IOError, OSError, EOFError, ValueError, TypeError):
+			self.entries = {}
+		self.loaded = True
+		self.resumePurge()
+
+	def save(self):
+		path = os.path.join(self.trash, TRASH_INDEX_NAME)
+		try:
+			with open(path + ".tmp", "wb") as fd:
+				marshal.dump((TRASH_INDEX_VERSION, self.entries), fd)
+			os.rename(path + ".tmp", path)
+		except (IOError, OSError) as err:
+			print("[Trashcan] Error: Unable to save the index of '%s'! (%s)" % (self.trash, err))
+
+	def addEntry(self, path):
+		try:
+			st = os.lstat(path)
+		except OSError:
+			return
+		self.entries[os.path.relpath(path, self.trash)] = (st.st_size, st.st_ctime)
+
+	def scan(self, name):
+		path = os.path.join(self.trash, name)
+		if os.path.isdir(path) and not os.path.islink(path):
+			for root, dirs, files in os.walk(path, topdown=False):
+				for file in files:
+					if not self.isSkipped(file):
+						self.addEntry(os.path.join(root, file))
+				# Remove empty directories if possible
+				for dir in dirs:
+					try:
+						os.rmdir(os.path.join(root, dir))
+					except OSError:
+						pass
+			try:
+				os.rmdir(path)
+			except OSError:
+				pass
+		else:
+			self.addEntry(path)
+
+	def refresh(self):
+		with self.lock:
+			if not self.loaded:
+				self.load()
+			names = set([name for name in os.listdir(self.trash) if not self.isSkipped(name)])
+			known = set([path.split("/", 1)[0] for path in self.entries])
+			gone = [path for path in self.entries if path.split("/", 1)[0] not in names]
+			for path in gone:
+				del self.entries[path]
+			count = len(self.entries)
+			for name in names - known:
+				self.scan(name)
+			if gone or len(self.entries) != count:
+				self.save()
+		return self
+
+	def add(self, paths):
+		"""Add files or directories that were just moved into the trash."""
+		with self.lock:
+			if not self.loaded:
+				self.load()
+			for path in paths:
+				if os.path.isdir(path) and not os.path.islink(path):
+					for root, dirs, files in os.walk(path):
+						for file in files:
+							self.addEntry(os.path.join(root, file))
+				else:
+					self.addEntry(path)
+			self.save()
+
+	def clear(self):
+		with self.lock:
+			self.entries = {}
+			self.loaded = True
+			self.save()
+
+	def getSize(self):
+		return sum([entry[0] for entry in self.entries.values()])
+
+	def purge(self, ctimeLimit, bytesToRemove):
+		"""Erase the files that were moved to the trash before ctimeLimit and
+		then the oldest ones until bytesToRemove bytes were erased.  Returns
+		the erased files."""
+		with self.lock:
+			self.refresh()
+			print("[Trashcan] bytesToRemove", bytesToRemove, self.trash)
+			victims = []
+			for path, (size, ctime) in sorted(self.entries.items(), key=lambda entry: entry[1][1]):
+				if ctime >= ctimeLimit and bytesToRemove < 0:
+					break
+				victims.append(path)
+				bytesToRemove -= size
+			if victims:
+				self.erase(victims)
+			print("[Trashcan] Size after purging:", self.getSize(), self.trash)
+			return [os.path.join(self.trash, path) for path in victims]
+
+	def erase(self, victims):
+		journal = os.path.join(self.trash, PURGE_JOURNAL_NAME)
+		try:
+			with open(journal, "wb") as fd:
+				marshal.dump(victims, fd)
+		except (IOError, OSError) as err:
+			print("[Trashcan] Error: Unable to write the purge journal of '%s'! (%s)" % (self.trash, err))
+		eraser = enigma.eBackgroundFileEraser.getInstance()
+		for path in victims:
+			eraser.erase(os.path.join(self.trash, path))  # Does nothing when the file is gone already.
+			self.entries.pop(path, None)
+		self.save()
+		try:
+			os.remove(journal)
+		except OSError:
+			pass
+
+	def resumePurge(self):
+		try:
+			with open(os.path.join(self.trash, PURGE_JOURNAL_NAME), "rb") as fd:
+				victims = marshal.load(fd)
+		except (IOError, OSError, EOFError, ValueError, TypeError):
+			return
+		print("[Trashcan] Finishing the interrupted purge of", self.trash)
+		self.erase(victims)
+
+trashIndexes = {}
+
+def getTrashIndex(trash):
+	trash = os.path.realpath(trash)
+	index = trashIndexes.get(trash)
+	if index is None:
+		index = trashIndexes.setdefault(trash, TrashIndex(trash))
+	return index
+
+def trashFilesAdded(paths):
+	# Tools.CopyFiles tells about files and directories that were moved, the ones moved into a trash folder are indexed.
+	for path in paths:
+		trash = os.path.dirname(os.path.normpath(path))
+		if os.path.basename(trash) == ".Trash":
+			getTrashIndex(trash).add([path])
+
+scanCondition = threading.Condition()
+busyPaths = set()  # Paths with a call that did not return in time.
+
+def runConcurrently(function, paths, timeout):
+	"""Call function(path) for every path, SCAN_THREADS at a time, and return
+	a dictionary path: result of the calls that returned within timeout
+	seconds.  A thread whose call takes longer is replaced and its path is
+	skipped until the call returned."""
+	with scanCondition:
+		paths = [path for path in paths if path not in busyPaths]
+	queue = list(paths)
+	started = {}
+	results = {}
+
+	def worker():
+		while True:
+			with scanCondition:
+				if not queue:
+					return
+				path = queue.pop(0)
+				started[path] = time.time()
+				busyPaths.add(path)
+			try:
+				result = function(path)
+			except Exception as err:
+				print("[Trashcan] Error: '%s' failed! (%s)" % (path, err))
+				result = None
+			with scanCondition:
+				busyPaths.discard(path)
+				results[path] = result
+				scanCondition.notifyAll()
+
+	def startWorker():
+		thread = threading.Thread(target=worker)
+		thread.daemon = True
+		thread.start()
+
+	for x in range(min(SCAN_THREADS, len(paths))):
+		startWorker()
+	skipped = set()
+	with scanCondition:
+		while len(results) + len(skipped) < len(paths):
+			now = time.time()
+			for path, start in started.items():
+				if path not in results and path not in skipped and now - start >= timeout:
+					print("[Trashcan] '%s' did not answer within %d seconds, skipping it." % (path, timeout))
+					skipped.add(path)
+					startWorker()
+			waiting = [start + timeout - now for path, start in started.items() if path not in results and path not in skipped]
+			scanCondition.wait(waiting and max(min(waiting), 0.01) or 0.1)
+		return dict([(path, results[path]) for path in results if path not in skipped])
+
+def getTrashMounts(network=True):
+	mounts = []
+	for mount in Harddisk.getProcMounts():
+		if mount[1].startswith('/media/') and mount[1] != '/media/autofs':
+			if network or not mount[1].startswith(('/media/net', '/media/autofs')):
+				mounts.append(mount[1])
+	return mounts
+
 def enumTrashFolders():
 	# Walk through all Trash folders. This may access network
-	# drives and similar, so might block for minutes.
-	for mount in Harddisk.getProcMounts():
-		if mount[1].startswith('/media/'):
-			mountpoint = mount[1]
-			movie = os.path.join(mountpoint, 'movie')
-			if os.path.isdir(movie):
-				mountpoint = movie
-			result = os.path.join(mountpoint, ".Trash")
-			if os.path.isdir(result):
-				yield result
+	# drives and similar, mounts that do not answer in time are skipped.
+	def probe(mountpoint):
+		movie = os.path.join(mountpoint, 'movie')
+		if os.path.isdir(movie):
+			mountpoint = movie
+		result = os.path.join(mountpoint, ".Trash")
+		return os.path.isdir(result) and result or None
+	mounts = getTrashMounts()
+	results = runConcurrently(probe, mounts, PROBE_TIMEOUT)
+	for mountpoint in mounts:
+		if results.get(mountpoint):
+			yield results[mountpoint]
+
+def findTrashFolders(mounts):
+	def probe(mountpoint):
+		return [trash for trash in (os.path.join(mountpoint, '.Trash'), os.path.join(mountpoint, 'movie/.Trash')) if os.path.isdir(trash)]
+	results = runConcurrently(probe, mounts, PROBE_TIMEOUT)
+	return [trash for mountpoint in mounts for trash in results.get(mountpoint) or ()]
 
 class Trashcan:
 	def __init__(self, session):
@@ -122,6 +370,8 @@ class Trashcan:
 
 	def cleanReady(self, result=None):
 		self.isCleaning = False
+		for fn in result or ():
+			movieIndex.removeFile(fn)
 		# schedule another clean loop if needed (so we clean up all devices, not just one)
 		self.cleanIfIdle()
 
@@ -131,47 +381,18 @@ class Trashcan:
 
 def purge(cleanset, ctimeLimit, reserveBytes):
 	# Remove expired items from trash, and attempt to have
-	# reserveBytes of free disk space.
-	for trash in cleanset:
+	# reserveBytes of free disk space.  Returns the removed files.
+	def purgeTrash(trash):
 		if not os.path.isdir(trash):
 			print("[Trashcan] No trash.", trash)
-			return 0
+			return []
 		diskstat = os.statvfs(trash)
 		free = diskstat.f_bfree * diskstat.f_bsize
-		bytesToRemove = reserveBytes - free
-		candidates = []
-		print("[Trashcan] bytesToRemove", bytesToRemove, trash)
-		size = 0
-		for root, dirs, files in os.walk(trash, topdown=False):
-			for name in files:
-				try:
-					fn = os.path.join(root, name)
-					st = os.stat(fn)
-					if st.st_ctime < ctimeLimit:
-						print("[Trashcan] Too old:", name, st.st_ctime)
-						enigma.eBackgroundFileEraser.getInstance().erase(fn)
-						bytesToRemove -= st.st_size
-					else:
-						candidates.append((st.st_ctime, fn, st.st_size))
-						size += st.st_size
-				except Exception as e:
-					print("[Trashcan] Failed to stat %s:"% name, e)
-			# Remove empty directories if possible
-			for name in dirs:
-				try:
-					os.rmdir(os.path.join(root, name))
-				except:
-					pass
-		candidates.sort()
-		# Now we have a list of ctime, candidates, size. Sorted by ctime (=deletion time)
-		print("[Trashcan] Bytes to remove remaining:", bytesToRemove, trash)
-		for st_ctime, fn, st_size in candidates:
-			if bytesToRemove < 0:
-				break
-			enigma.eBackgroundFileEraser.getInstance().erase(fn)
-			bytesToRemove -= st_size
-			size -= st_size
-		print("[Trashcan] Size after purging:", size, trash)
+		return getTrashIndex(trash).purge(ctimeLimit, reserveBytes - free)
+	erased = []
+	for files in runConcurrently(purgeTrash, [trash for trash in cleanset if trash], PURGE_TIMEOUT).values():
+		erased += files or []
+	return erased
 
 def cleanAll(trash):
 	if not os.path.isdir(trash):
@@ -179,6 +400,8 @@ def cleanAll(trash):
 		return 0
 	for root, dirs, files in os.walk(trash, topdown=False):
 		for name in files:
+			if root == trash and name in (TRASH_INDEX_NAME, PURGE_JOURNAL_NAME):
+				continue
 			fn = os.path.join(root, name)
 			try:
 				enigma.eBackgroundFileEraser.getInstance().erase(fn)
@@ -190,6 +413,8 @@ def cleanAll(trash):
 				os.rmdir(os.path.join(root, name))
 			except:
 				pass
+	if os.path.basename(os.path.normpath(trash)) == ".Trash":
+		getTrashIndex(trash).clear()
 
 def init(session):
 	global instance
@@ -201,74 +426,10 @@ class CleanTrashTask(Components.Task.PythonTask):
 		self.reserveBytes = reserveBytes
 
 	def work(self):
-		mounts=[]
-		matches = []
 		print("[Trashcan] probing folders")
-		f = open('/proc/mounts', 'r')
-		for line in f.readlines():
-			parts = line.strip().split()
-			if parts[1] == '/media/autofs':
-				continue
-			if config.usage.movielist_trashcan_network_clean.value and parts[1].startswith('/media/net'):
-				mounts.append(parts[1])
-			elif config.usage.movielist_trashcan_network_clean.value and parts[1].startswith('/media/autofs'):
-				mounts.append(parts[1])
-			elif not parts[1].startswith('/media/net') and not parts[1].startswith('/media/autofs'):
-				mounts.append(parts[1])
-		f.close()
-
-		for mount in mounts:
-			if os.path.isdir(os.path.join(mount, '.Trash')):
-				matches.append(os.path.join(mount, '.Trash'))
-			if os.path.isdir(os.path.join(mount, 'movie/.Trash')):
-				matches.append(os.path.join(mount, 'movie/.Trash'))
-
+		matches = findTrashFolders(getTrashMounts(config.usage.movielist_trashcan_network_clean.value))
 		print("[Trashcan] found following trashcan's:", matches)
-		if len(matches):
-			for trashfolder in matches:
-				print("[Trashcan] looking in trashcan", trashfolder)
-				trashsize = get_size(trashfolder)
-				diskstat = os.statvfs(trashfolder)
-				free = diskstat.f_bfree * diskstat.f_bsize
-				bytesToRemove = self.reserveBytes - free
-				print("[Trashcan] " + str(trashfolder) + ": Size:", trashsize)
-				candidates = []
-				size = 0
-				for root, dirs, files in os.walk(trashfolder, topdown=False):
-					for name in files:
-# Don't delete any per-directory config files from .Trash if the option is in use
-						if (config.movielist.settings_per_directory.value and name == ".e2settings.pkl"):
-							continue
-						try:
-							fn = os.path.join(root, name)
-							st = os.stat(fn)
-							if st.st_ctime < self.ctimeLimit:
-								enigma.eBackgroundFileEraser.getInstance().erase(fn)
-								bytesToRemove -= st.st_size
-							else:
-								candidates.append((st.st_ctime, fn, st.st_size))
-								size += st.st_size
-						except Exception as e:
-							print("[Trashcan] Failed to stat %s:"% name, e)
-					# Remove empty directories if possible
-					for name in dirs:
-						try:
-							os.rmdir(os.path.join(root, name))
-						except:
-							pass
-					candidates.sort()
-					# Now we have a list of ctime, candidates, size. Sorted by ctime (=deletion time)
-					for st_ctime, fn, st_size in candidates:
-						if bytesToRemove < 0:
-							break
-						try:
-							# somtimes the file does not exist, can happen if trashcan is on a network, the main box could also be emptying trash at same time.
-							enigma.eBackgroundFileEraser.getInstance().erase(fn)
-						except:
-							pass
-						bytesToRemove -= st_size
-						size -= st_size
-					print("[Trashcan] " + str(trashfolder) + ": Size now:", size)
+		purge(matches, self.ctimeLimit, self.reserveBytes)
 
 class TrashInfo(VariableText, GUIComponent):
 	FREE = 0
@@ -160,6 +160,7 @@ from Screens.Wizard import wizardManager
 from Screens.StartWizard import *
 import Screens.Rc
 from Tools.BoundFunction import boundFunction
+from Tools.Import import lazyImport
 from Plugins.Plugin import PluginDescriptor
 
 profile("misc")
@@ -453,19 +454,25 @@ class PowerKey:
 			return 0
 
 profile("Scart")
-from Screens.Scart import Scart
+Scart = lazyImport("Screens.Scart", "Scart")
 
 class AutoScartControl:
 	def __init__(self, session):
 		self.force = False
+		self.session = session
+		self.scartDialog = None
 		self.current_vcr_sb = enigma.eAVSwitch.getInstance().getVCRSlowBlanking()
 		if self.current_vcr_sb and config.av.vcrswitch.value:
-			self.scartDialog = session.instantiateDialog(Scart, True)
-		else:
-			self.scartDialog = session.instantiateDialog(Scart, False)
+			self.getScartDialog(True)
 		config.av.vcrswitch.addNotifier(self.recheckVCRSb)
 		enigma.eAVSwitch.getInstance().vcr_sb_notifier.get().append(self.VCRSbChanged)
 
+	def getScartDialog(self, start_visible=False):
+		# Only created once a VCR shows up, most boxes never have one.
+		if self.scartDialog is None:
+			self.scartDialog = self.session.instantiateDialog(Scart, start_visible)
+		return self.scartDialog
+
 	def recheckVCRSb(self, configElement):
 		self.VCRSbChanged(self.current_vcr_sb)
 
@@ -474,8 +481,8 @@ class AutoScartControl:
 		self.current_vcr_sb = value
 		if config.av.vcrswitch.value or value > 2:
 			if value:
-				self.scartDialog.showMessageBox()
-			else:
+				self.getScartDialog().showMessageBox()
+			elif self.scartDialog:
 				self.scartDialog.switchToTV()
 
 profile("Load:CI")
@@ -594,7 +601,7 @@ def runScreenTest():
 	session.nav.shutdown()
 
 	profile("configfile.save")
-	configfile.save()
+	configfile.save(immediate=True)
 	from Screens import InfoBarGenerics
 	InfoBarGenerics.saveResumePoints()
 
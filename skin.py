@@ -1,14 +1,16 @@
 import errno
+import marshal
 import xml.etree.cElementTree
 
 from enigma import addFont, eLabel, ePixmap, ePoint, eRect, eSize, eWindow, eWindowStyleManager, eWindowStyleSkinned, getDesktop, gFont, getFontFaces, gRGB
+from os import rename, stat
 from os.path import basename, dirname, isfile
 
 from Components.config import ConfigSubsection, ConfigText, config
 from Components.RcModel import rc_model
 from Components.SystemInfo import SystemInfo
 from Components.Sources.Source import ObsoleteSource
-from Tools.Directories import SCOPE_CONFIG, SCOPE_CURRENT_LCDSKIN, SCOPE_CURRENT_SKIN, SCOPE_FONTS, SCOPE_SKIN, resolveFilename, fileExists
+from Tools.Directories import SCOPE_CONFIG, SCOPE_CURRENT_LCDSKIN, SCOPE_CURRENT_SKIN, SCOPE_FONTS, SCOPE_SKIN, clearResolveCache, resolveFilename, fileExists
 from Tools.Import import my_import
 from Tools.LoadPixmap import LoadPixmap
 
@@ -19,11 +21,31 @@ DEFAULT_DISPLAY_SKIN = SystemInfo["grautec"] and "skin_default/skin_display_grau
 USER_SKIN = "skin_user.xml"
 USER_SKIN_TEMPLATE = "skin_user_%s.xml"
 SUBTITLE_SKIN = "skin_subtitles.xml"
+SKIN_CACHE = "skin.cache"
+SKIN_CACHE_VERSION = 1
 
 GUI_SKIN_ID = 0  # Main frame-buffer.
 DISPLAY_SKIN_ID = 1  # Front panel / display / LCD.
 
-domScreens = {}  # Dictionary of skin based screens.
+
+# Dictionary of skin screens.  Screens loaded from the compiled skin cache are
+# kept as compact tuples and are only converted into elements when first used.
+#
+class SkinScreens(dict):
+	def __getitem__(self, name):
+		element, path = dict.__getitem__(self, name)
+		if isinstance(element, tuple):
+			element = buildElement(element)
+			dict.__setitem__(self, name, (element, path))
+		return (element, path)
+
+	def get(self, name, default=None):
+		if name in self:
+			return self[name]
+		return default
+
+
+domScreens = SkinScreens()  # Dictionary of skin based screens.
 colors = {  # Dictionary of skin color names.
 	"key_back": gRGB(0x00313131),
 	"key_blue": gRGB(0x0018188b),
@@ -41,6 +63,12 @@ parameters = {}  # Dictionary of skin parameters used to modify code behavior.
 setups = {}  # Dictionary of images associated with setup menus.
 switchPixmap = {}  # Dictionary of switch images.
 windowStyles = {}  # Dictionary of window styles for each screen ID.
+skinCache = None  # Dictionary of compiled skin files, see readSkinFile().
+skinCacheChanged = False
+skinCacheUsed = set()
+fontCache = {}  # Dictionary of resolved font attributes.
+colorCache = {}  # Dictionary of resolved color attributes.
+coordinateCache = {}  # Dictionary of evaluated coordinate expressions.
 
 config.skin = ConfigSubsection()
 skin = resolveFilename(SCOPE_SKIN, DEFAULT_SKIN)
@@ -49,6 +77,8 @@ if not isfile(skin):
 	DEFAULT_SKIN = EMERGENCY_SKIN
 config.skin.primary_skin = ConfigText(default=DEFAULT_SKIN)
 config.skin.display_skin = ConfigText(default=DEFAULT_DISPLAY_SKIN)
+config.skin.primary_skin.addNotifier(clearResolveCache, initial_call=False)
+config.skin.display_skin.addNotifier(clearResolveCache, initial_call=False)
 
 currentPrimarySkin = None
 currentDisplaySkin = None
@@ -106,6 +136,7 @@ def InitSkins():
 			result = loadSkin(name, scope=SCOPE_CURRENT_SKIN, desktop=getDesktop(GUI_SKIN_ID), screenID=GUI_SKIN_ID)
 	if result is None:
 		loadSkin(USER_SKIN, scope=SCOPE_CURRENT_SKIN, desktop=getDesktop(GUI_SKIN_ID), screenID=GUI_SKIN_ID)
+	saveSkinCache()
 	runCallbacks = True
 
 # Temporary entry point for older versions of mytest.py.
@@ -120,49 +151,43 @@ def loadSkin(filename, scope=SCOPE_SKIN, desktop=getDesktop(GUI_SKIN_ID), screen
 	filename = resolveFilename(scope, filename)
 	print("[Skin] Loading skin file '%s'." % filename)
 	try:
-		with open(filename, "r") as fd:  # This open gets around a possible file handle leak in Python's XML parser.
-			try:
-				domSkin = xml.etree.cElementTree.parse(fd).getroot()
-				# print("[Skin] DEBUG: Extracting non screen blocks from '%s'.  (scope='%s')" % (filename, scope))
-				# For loadSingleSkinData colors, bordersets etc. are applied one after
-				# the other in order of ascending priority.
-				loadSingleSkinData(desktop, screenID, domSkin, filename, scope=scope)
-				for element in domSkin:
-					if element.tag == "screen":  # Process all screen elements.
-						name = element.attrib.get("name", None)
-						if name:  # Without a name, it's useless!
-							scrnID = element.attrib.get("id", None)
-							if scrnID is None or scrnID == screenID:  # If there is a screen ID is it for this display.
-								# print("[Skin] DEBUG: Extracting screen '%s' from '%s'.  (scope='%s')" % (name, filename, scope))
-								domScreens[name] = (element, "%s/" % dirname(filename))
-					elif element.tag == "windowstyle":  # Process the windowstyle element.
-						scrnID = element.attrib.get("id", None)
-						if scrnID is not None:  # Without an scrnID, it is useless!
-							scrnID = int(scrnID)
-							# print("[Skin] DEBUG: Processing a windowstyle ID='%s'." % scrnID)
-							domStyle = xml.etree.cElementTree.ElementTree(xml.etree.cElementTree.Element("skin"))
-							domStyle.getroot().append(element)
-							windowStyles[scrnID] = (desktop, screenID, domStyle.getroot(), filename, scope)
-					# Element is not a screen or windowstyle element so no need for it any longer.
-				reloadWindowStyles()  # Reload the window style to ensure all skin changes are taken into account.
-				print("[Skin] Loading skin file '%s' complete." % filename)
-				if runCallbacks:
-					for method in self.callbacks:
-						if method:
-							method()
-				return True
-			except xml.etree.cElementTree.ParseError as err:
-				fd.seek(0)
-				content = fd.readlines()
-				line, column = err.position
-				print("[Skin] XML Parse Error: '%s' in '%s'!" % (err, filename))
-				data = content[line - 1].replace("\t", " ").rstrip()
-				print("[Skin] XML Parse Error: '%s'" % data)
-				print("[Skin] XML Parse Error: '%s^%s'" % ("-" * column, " " * (len(data) - column - 1)))
-			except Exception as err:
-				print("[Skin] Error: Unable to parse skin data in '%s' (%s) - '%s'!" % (filename, type(err).__name__, err))
-				# import traceback
-				# traceback.print_exc()
+		domSkin, screens = readSkinFile(filename)
+		try:
+			# print("[Skin] DEBUG: Extracting non screen blocks from '%s'.  (scope='%s')" % (filename, scope))
+			# For loadSingleSkinData colors, bordersets etc. are applied one after
+			# the other in order of ascending priority.
+			loadSingleSkinData(desktop, screenID, domSkin, filename, scope=scope)
+			for name, scrnID, element in screens:  # Process all screen elements.
+				if scrnID is None or scrnID == screenID:  # If there is a screen ID is it for this display.
+					# print("[Skin] DEBUG: Extracting screen '%s' from '%s'.  (scope='%s')" % (name, filename, scope))
+					domScreens[name] = (element, "%s/" % dirname(filename))
+			for element in domSkin.findall("windowstyle"):  # Process the windowstyle element.
+				scrnID = element.attrib.get("id", None)
+				if scrnID is not None:  # Without an scrnID, it is useless!
+					scrnID = int(scrnID)
+					# print("[Skin] DEBUG: Processing a windowstyle ID='%s'." % scrnID)
+					domStyle = xml.etree.cElementTree.ElementTree(xml.etree.cElementTree.Element("skin"))
+					domStyle.getroot().append(element)
+					windowStyles[scrnID] = (desktop, screenID, domStyle.getroot(), filename, scope)
+			reloadWindowStyles()  # Reload the window style to ensure all skin changes are taken into account.
+			print("[Skin] Loading skin file '%s' complete." % filename)
+			if runCallbacks:
+				for method in self.callbacks:
+					if method:
+						method()
+			return True
+		except Exception as err:
+			print("[Skin] Error: Unable to parse skin data in '%s' (%s) - '%s'!" % (filename, type(err).__name__, err))
+			# import traceback
+			# traceback.print_exc()
+	except xml.etree.cElementTree.ParseError as err:
+		with open(filename, "r") as fd:
+			content = fd.readlines()
+		line, column = err.position
+		print("[Skin] XML Parse Error: '%s' in '%s'!" % (err, filename))
+		data = content[line - 1].replace("\t", " ").rstrip()
+		print("[Skin] XML Parse Error: '%s'" % data)
+		print("[Skin] XML Parse Error: '%s^%s'" % ("-" * column, " " * (len(data) - column - 1)))
 	except (IOError, OSError) as err:
 		if err.errno == errno.ENOENT:  # No such file or directory
 			print("[Skin] Warning: Skin file '%s' does not exist!" % filename)
@@ -172,8 +197,85 @@ def loadSkin(filename, scope=SCOPE_SKIN, desktop=getDesktop(GUI_SKIN_ID), screen
 		print("[Skin] Error: Unexpected error opening skin file '%s'! (%s)" % (filename, err))
 	return False
 
+# Read a skin XML file and return the skin element without its screens and a
+# list of (name, id, screen) tuples.  Every parsed skin file is compiled into
+# compact tuples that are kept in the skin cache file (SCOPE_CONFIG) keyed by
+# the file modification time and size.  When the skin file has not changed the
+# XML is not parsed again and the screens are only converted back into
+# elements when they are used, see SkinScreens.
+#
+def readSkinFile(filename):
+	global skinCacheChanged
+	cache = loadSkinCache()
+	status = stat(filename)
+	key = (status.st_mtime, status.st_size)
+	skinCacheUsed.add(filename)
+	entry = cache.get(filename)
+	if entry and entry[0] == key:
+		return buildElement(entry[1]), entry[2]
+	with open(filename, "r") as fd:  # This open gets around a possible file handle leak in Python's XML parser.
+		domSkin = xml.etree.cElementTree.parse(fd).getroot()
+	screens = []
+	compiledScreens = []
+	for element in domSkin.findall("screen"):
+		name = element.attrib.get("name", None)
+		if name:  # Without a name, it's useless!
+			scrnID = element.attrib.get("id", None)
+			screens.append((name, scrnID, element))
+			compiledScreens.append((name, scrnID, compileElement(element)))
+		domSkin.remove(element)  # Element is a screen element so no need for it in the skin element any longer.
+	cache[filename] = (key, compileElement(domSkin), compiledScreens)
+	skinCacheChanged = True
+	return domSkin, screens
+
+def loadSkinCache():
+	global skinCache
+	if skinCache is None:
+		skinCache = {}
+		try:
+			with open(resolveFilename(SCOPE_CONFIG, SKIN_CACHE), "rb") as fd:
+				version, cache = marshal.load(fd)
+			if version == SKIN_CACHE_VERSION:
+				skinCache = cache
+		except (IOError, OSError):
+			pass
+		except Exception as err:
+			print("[Skin] Error: Unable to read the skin cache! (%s)" % err)
+	return skinCache
+
+def saveSkinCache():
+	global skinCacheChanged
+	if skinCache is None:
+		return
+	for filename in list(skinCache.keys()):  # Forget skin files that are no longer used.
+		if filename not in skinCacheUsed:
+			del skinCache[filename]
+			skinCacheChanged = True
+	if skinCacheChanged:
+		filename = resolveFilename(SCOPE_CONFIG, SKIN_CACHE)
+		try:
+			with open("%s.tmp" % filename, "wb") as fd:
+				marshal.dump((SKIN_CACHE_VERSION, skinCache), fd)
+			rename("%s.tmp" % filename, filename)
+			skinCacheChanged = False
+		except (IOError, OSError) as err:
+			print("[Skin] Error %d: Unable to write the skin cache '%s'! (%s)" % (err.errno, filename, err.strerror))
+
+def compileElement(element):
+	return (element.tag, tuple(element.items()), element.text, tuple([compileElement(x) for x in element]))
+
+def buildElement(compiled):
+	tag, attributes, text, children = compiled
+	element = xml.etree.cElementTree.Element(tag, dict(attributes))
+	element.text = text
+	for child in children:
+		element.append(buildElement(child))
+	return element
+
 def reloadSkins():
 	domScreens.clear()
+	skinCacheUsed.clear()
+	coordinateCache.clear()
 	colors.clear()
 	colors = {
 		"key_back": gRGB(0x00313131),
@@ -234,7 +336,11 @@ def parseColor(value):
 			return colors[value]
 		except KeyError:
 			raise SkinError("Color '%s' must be #aarrggbb or valid named color" % value)
-	return gRGB(int(value[1:], 0x10))
+	try:
+		return colorCache[value]
+	except KeyError:
+		color = colorCache[value] = gRGB(int(value[1:], 0x10))
+		return color
 
 # Convert a coordinate string into a number.  Used to convert object position and
 # size attributes into a number.
@@ -291,17 +397,24 @@ def parseCoordinate(value, parent, size=0, font=None):
 			try:
 				result = int(val)  # For speed try a simple number first.
 			except ValueError:
-				try:
-					result = int(eval(val))
-				except Exception as err:
-					print("[Skin] %s Error (%s): Coordinate '%s', calculated to '%s', can't be evaluated!" % (type(err).__name__, err, value, val))
-					result = 0
+				result = coordinateCache.get(val)  # The same expressions are used over and over again.
+				if result is None:
+					try:
+						result = int(eval(val))
+					except Exception as err:
+						print("[Skin] %s Error (%s): Coordinate '%s', calculated to '%s', can't be evaluated!" % (type(err).__name__, err, value, val))
+						result = 0
+					coordinateCache[val] = result
 	# print("[Skin] DEBUG: parseCoordinate value='%s', parent='%s', size=%s, font='%s', val='%s'." % (value, parent, size, font, val))
 	if result < 0:
 		result = 0
 	return result
 
 def parseFont(value, scale=((1, 1), (1, 1))):
+	try:
+		return gFont(*fontCache[(value, scale)])
+	except KeyError:
+		pass
 	if ";" in value:
 		(name, size) = value.split(";")
 		try:
@@ -328,7 +441,8 @@ def parseFont(value, scale=((1, 1), (1, 1))):
 			name = font[0]
 			size = font[1] if size is None else size
 	# print("[Skin] DEBUG: Scale font %d -> %d." % (size, int(size) * scale[1][0] / scale[1][1]))
-	return gFont(name, int(size) * scale[0][0] / scale[0][1])
+	font = fontCache[(value, scale)] = (name, int(size) * scale[0][0] / scale[0][1])
+	return gFont(*font)
 
 # Convert a parameter string into a value based on string triggers.  The type
 # and value returned is based on the trigger.
@@ -767,6 +881,7 @@ def loadSingleSkinData(desktop, screenID, domSkin, pathSkin, scope=SCOPE_CURRENT
 				from enigma import gMainDC
 				gMainDC.getInstance().setResolution(xres, yres)
 				desktop.resize(eSize(xres, yres))
+				clearResolveCache()  # The skin fallback directory depends on the resolution.
 				if bpp != 32:
 					pass  # Load palette (Not yet implemented!)
 				if yres >= 1080:
@@ -987,6 +1102,7 @@ def loadSingleSkinData(desktop, screenID, domSkin, pathSkin, scope=SCOPE_CURRENT
 		# The "desktop" parameter is hard-coded to the GUI screen, so we must ask
 		# for the one that this actually applies to.
 		getDesktop(scrnID).setMargins(r)
+	fontCache.clear()  # Font aliases and font faces may have changed.
 
 
 class additionalWidget:
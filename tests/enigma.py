@@ -25,6 +25,7 @@ from events import eventfnc
 class eTimer:
 	def __init__(self):
 		self.timeout = slot()
+		self.callback = self.timeout.list
 		self.next_activation = None
 		print("[enigma] NEW TIMER")
 
@@ -0,0 +1,135 @@
+from __future__ import print_function
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import tests
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from email.utils import formatdate, mktime_tz, parsedate_tz
+from SocketServer import StreamRequestHandler, ThreadingMixIn, ThreadingTCPServer
+from time import gmtime, strftime
+
+# Fetches a channel list from a local HTTP and a local FTP stand-in, first
+# into an empty directory and then again with everything unchanged.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_bulktransfer.py
+
+from Tools.BulkTransfer import DOWNLOADED, UNCHANGED, FTPFetcher, HTTPFetcher, swapFiles
+
+served = tempfile.mkdtemp()
+requests = []
+for x in range(40):
+	open(os.path.join(served, "userbouquet.%d.tv" % x), "w").write("#NAME %d\n" % x * 100)
+open(os.path.join(served, "lamedb"), "w").write("eDVB services /4/\n" * 1000)
+
+
+class HTTPStandIn(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"  # Keep-alive.
+
+	def do_GET(self):
+		requests.append(("http", self.client_address[1]))
+		path = os.path.join(served, self.path.split("=", 1)[-1])
+		mtime = int(os.stat(path).st_mtime)
+		since = parsedate_tz(self.headers.get("If-Modified-Since", ""))
+		if since and mktime_tz(since) >= mtime:
+			self.send_response(304)
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+		data = open(path, "rb").read()
+		self.send_response(200)
+		self.send_header("Content-Length", str(len(data)))
+		self.send_header("Last-Modified", formatdate(mtime, usegmt=True))
+		self.end_headers()
+		self.wfile.write(data)
+
+	def log_message(self, *args):
+		pass
+
+
+class FTPStandIn(StreamRequestHandler):
+	# Just enough of RFC 959 for ftplib in passive mode.
+	def reply(self, line):
+		self.wfile.write(line + "\r\n")
+
+	def handle(self):
+		requests.append(("ftp", self.client_address[1]))
+		self.reply("220 ready")
+		data = None
+		for line in iter(self.rfile.readline, ""):
+			command, argument = (line.strip().split(" ", 1) + [""])[:2]
+			path = os.path.join(served, argument)
+			if command in ("USER", "PASS", "CWD", "TYPE"):
+				self.reply(command == "USER" and "331 password" or "230 ok")
+			elif command == "SIZE":
+				self.reply("213 %d" % os.stat(path).st_size)
+			elif command == "MDTM":
+				self.reply("213 %s" % strftime("%Y%m%d%H%M%S", gmtime(os.stat(path).st_mtime)))
+			elif command == "PASV":
+				data = socket.socket()
+				data.bind(("127.0.0.1", 0))
+				data.listen(1)
+				port = data.getsockname()[1]
+				self.reply("227 passive (127,0,0,1,%d,%d)" % (port >> 8, port & 255))
+			elif command == "RETR":
+				connection = data.accept()[0]
+				self.reply("150 sending")
+				connection.sendall(open(path, "rb").read())
+				connection.close()
+				data.close()
+				self.reply("226 done")
+			elif command == "QUIT":
+				self.reply("221 bye")
+				break
+			else:
+				self.reply("502 not implemented")
+
+
+def serve(server):
+	thread = threading.Thread(target=server.serve_forever)
+	thread.daemon = True
+	thread.start()
+	return server.server_address[1]
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+
+def test_fetcher(name, fetcher, files):
+	local = tempfile.mkdtemp()
+	try:
+		connections = set()
+		for run, expected in ((1, DOWNLOADED), (2, UNCHANGED)):
+			staging = tempfile.mkdtemp(dir=local)
+			del requests[:]
+			results = fetcher.fetch(files, staging, local)
+			swapFiles(staging, local, results.keys(), ("userbouquet.", "lamedb"))
+			os.rmdir(staging)
+			new = set(requests) - connections
+			connections |= new
+			print("[test_bulktransfer] %s run %d: %d files, %d new connections" % (name, run, len(results), len(new)))
+			if sorted(results.values()) != [expected] * len(files) or len(os.listdir(local)) != len(files):
+				raise tests.TestError("%s run %d: expected every file to be %s" % (name, run, expected))
+			for file in results:
+				if open(os.path.join(local, file)).read() != open(os.path.join(served, file)).read():
+					raise tests.TestError("%s: %s differs" % (name, file))
+			if run == 1 and len(new) > fetcher.concurrency:
+				raise tests.TestError("%s: %d connections for concurrency %d" % (name, len(new), fetcher.concurrency))
+			if run == 2 and new:
+				raise tests.TestError("%s: pooled connections were not reused" % name)
+		fetcher.close()
+	finally:
+		shutil.rmtree(local, True)
+
+
+files = sorted(os.listdir(served))
+ThreadingTCPServer.allow_reuse_address = True
+ThreadingTCPServer.daemon_threads = True
+port = serve(ThreadingHTTPServer(("127.0.0.1", 0), HTTPStandIn))
+test_fetcher("http", HTTPFetcher("http://127.0.0.1:%d" % port, concurrency=3), [("/file?file=%s" % x, x) for x in files])
+port = serve(ThreadingTCPServer(("127.0.0.1", 0), FTPStandIn))
+test_fetcher("ftp", FTPFetcher("127.0.0.1", port, directory="/", concurrency=3), files)
+shutil.rmtree(served, True)
@@ -0,0 +1,79 @@
+from __future__ import print_function
+import os
+import re
+import shutil
+import tempfile
+import time
+import tests
+
+# Lists a directory with files, sub directories and symbolic links, with and
+# without scandir(), filters it by a pattern and checks that the listing is
+# kept until the directory changes.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_directorylisting.py
+
+from Components import DirectoryListing as listingModule
+from Components.DirectoryListing import DirectoryCache
+
+FILES = ["b.ts", "a.mp3", "c.jpg", "Z.MKV", "dangling"]
+DIRECTORIES = ["music", "Movies", "linked"]
+
+
+def expect(what, found, expected):
+	if found != expected:
+		raise tests.TestError("expected %s %s, found %s" % (what, expected, found))
+
+
+def age(path):
+	then = time.time() - 60
+	os.utime(path, (then, then))
+
+
+directory = tempfile.mkdtemp()
+try:
+	for name in FILES[:-1]:
+		open(os.path.join(directory, name), "w").close()
+	os.mkdir(os.path.join(directory, "music"))
+	os.mkdir(os.path.join(directory, "Movies"))
+	os.symlink(os.path.join(directory, "music"), os.path.join(directory, "linked"))
+	os.symlink(os.path.join(directory, "nowhere"), os.path.join(directory, "dangling"))
+	path = directory + "/"
+	pattern = re.compile(r"(?i)^.*\.(ts|mkv)$")
+
+	for scandir in (listingModule.scandir, None):
+		listingModule.scandir = scandir
+		age(directory)
+		cache = DirectoryCache()
+		listing = cache.getListing(path)
+		expect("directories", listing.directories, sorted(DIRECTORIES))
+		expect("files", listing.files, sorted(FILES))
+		expect("links", listing.links, set(["linked"]))
+		expect("matching files", listing.getFiles(pattern), ["Z.MKV", "b.ts"])
+		if cache.getListing(path) is not listing:
+			raise tests.TestError("an unchanged directory was read again")
+
+		# A new file changes the modification time of the directory.
+		open(os.path.join(directory, "d.ts"), "w").close()
+		changed = cache.getListing(path)
+		expect("matching files", changed.getFiles(pattern), ["Z.MKV", "b.ts", "d.ts"])
+		if cache.getListing(path) is changed:
+			raise tests.TestError("a directory changed just now was kept")
+		os.remove(os.path.join(directory, "d.ts"))
+		print("[test_directorylisting] listed with %s" % (scandir and "scandir" or "listdir and lstat"))
+
+	cache = DirectoryCache(size=1)
+	age(directory)
+	age(os.path.join(directory, "music"))
+	listing = cache.getListing(path)
+	cache.getListing(os.path.join(directory, "music") + "/")
+	if cache.getListing(path) is listing:
+		raise tests.TestError("the least recently used listing was kept")
+	try:
+		cache.getListing(os.path.join(directory, "nowhere") + "/")
+		raise tests.TestError("a missing directory was listed")
+	except OSError:
+		pass
+	print("[test_directorylisting] ok")
+finally:
+	shutil.rmtree(directory, True)
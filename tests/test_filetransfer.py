@@ -0,0 +1,120 @@
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import threading
+import time
+import tests
+
+# Copies and moves a recording with its sidecar files, makes a transfer fail
+# half way and aborts a rate limited one, and checks that nothing is left
+# half done.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_filetransfer.py
+
+from Tools import FileTransfer as transferModule
+from Tools.FileTransfer import FileTransfer, TransferAborted
+
+EXTENSIONS = ("", ".ap", ".sc", ".cuts", ".meta")
+SIZE = 12 * 1024 * 1024 + 123
+
+
+def makeRecording(directory, name="rec.ts"):
+	data = os.urandom(SIZE)
+	for extension in EXTENSIONS:
+		with open(os.path.join(directory, name + extension), "wb") as fd:
+			fd.write(extension and extension * 100 or data)
+	return [(os.path.join(directory, name + x), name + x) for x in EXTENSIONS]
+
+
+def fileList(recording, destination):
+	return [(source, os.path.join(destination, name)) for source, name in recording]
+
+
+def read(path):
+	with open(path, "rb") as fd:
+		return fd.read()
+
+
+def expectFiles(directory, names):
+	found = sorted(os.listdir(directory))
+	if found != sorted(names):
+		raise tests.TestError("expected %s in %s, found %s" % (sorted(names), directory, found))
+
+
+source = tempfile.mkdtemp()
+destination = tempfile.mkdtemp()
+try:
+	recording = makeRecording(source)
+	names = [name for path, name in recording]
+	originals = dict((name, read(path)) for path, name in recording)
+	with open(os.path.join(destination, "rec.ts.meta"), "wb") as fd:
+		fd.write("old meta")
+
+	# A copy that fails after the .ts was written leaves the old .meta and nothing else.
+	class FailingTransfer(FileTransfer):
+		def copyItem(self, source, destination):
+			if source.endswith(".cuts"):
+				raise IOError(5, "Input/output error")
+			FileTransfer.copyItem(self, source, destination)
+
+	try:
+		FailingTransfer(fileList(recording, destination)).run()
+		raise tests.TestError("the failing copy did not raise")
+	except IOError:
+		pass
+	expectFiles(destination, ["rec.ts.meta"])
+	if read(os.path.join(destination, "rec.ts.meta")) != "old meta":
+		raise tests.TestError("the replaced .meta was not restored")
+
+	# Copy, first with read() and write() only, then with what the kernel offers.
+	for methods in ((transferModule.readWrite,), transferModule.COPY_METHODS):
+		transferModule.COPY_METHODS = methods
+		transfer = FileTransfer(fileList(recording, destination))
+		transfer.run()
+		expectFiles(destination, names)
+		for name in names:
+			if read(os.path.join(destination, name)) != originals[name]:
+				raise tests.TestError("%s differs after the copy" % name)
+		if transfer.done != transfer.total or transfer.total != SIZE + sum([len(x) * 100 for x in EXTENSIONS]):
+			raise tests.TestError("copied %d of %d bytes" % (transfer.done, transfer.total))
+		print("[test_filetransfer] copied with %s" % ", ".join([x.__name__ for x in methods]))
+
+	# A rate limited copy takes its time and can be aborted.
+	transfer = FileTransfer([(recording[0][0], os.path.join(destination, "limited.ts"))], rateLimit=8 * 1024 * 1024)
+	start = time.time()
+	transfer.run()
+	elapsed = time.time() - start
+	print("[test_filetransfer] rate limited copy took %.2f seconds" % elapsed)
+	if elapsed < 0.9:
+		raise tests.TestError("the rate limit was ignored")
+	os.remove(os.path.join(destination, "limited.ts"))
+	transfer = FileTransfer([(recording[0][0], os.path.join(destination, "limited.ts"))], rateLimit=4 * 1024 * 1024)
+	threading.Timer(0.5, transfer.abort).start()
+	try:
+		transfer.run()
+		raise tests.TestError("the aborted copy did not raise")
+	except TransferAborted:
+		pass
+	expectFiles(destination, names)
+
+	# Moving within the file system renames, directories are merged.
+	os.mkdir(os.path.join(source, "series"))
+	os.mkdir(os.path.join(destination, "series"))
+	series = makeRecording(os.path.join(source, "series"), "episode.ts")
+	inode = os.stat(recording[0][0]).st_ino
+	shutil.rmtree(destination)
+	os.mkdir(destination)
+	os.mkdir(os.path.join(destination, "series"))
+	transfer = FileTransfer(fileList(recording, destination) + [(os.path.join(source, "series"), os.path.join(destination, "series"))], move=True)
+	transfer.run()
+	expectFiles(source, [])
+	expectFiles(destination, names + ["series"])
+	expectFiles(os.path.join(destination, "series"), [name for path, name in series])
+	if os.stat(os.path.join(destination, "rec.ts")).st_ino != inode:
+		raise tests.TestError("the move copied instead of renaming")
+	print("[test_filetransfer] ok")
+finally:
+	shutil.rmtree(source, True)
+	shutil.rmtree(destination, True)
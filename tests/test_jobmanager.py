@@ -0,0 +1,99 @@
+from __future__ import print_function
+import tests
+import __builtin__
+__builtin__._ = lambda x: x
+
+# Runs jobs with tasks that finish when the test says so and checks which
+# jobs the job manager starts in which order.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_jobmanager.py
+
+from Components.Task import Job, JobManager, PythonTask, Task
+
+
+class WaitTask(Task):
+	def _run(self):
+		pass
+
+
+class WaitPythonTask(PythonTask):
+	def _run(self):
+		pass
+
+
+def makeJob(name, resources=None, python=False, priority=None):
+	job = Job(name)
+	(python and WaitPythonTask or WaitTask)(job, name)
+	job.resources = resources
+	if priority is not None:
+		job.priority = priority
+	return job
+
+
+def finish(job, failed=False):
+	task = job.tasks[job.current_task]
+	if failed:
+		task.postconditions.append(NeverMet())
+	task.finish()
+
+
+class NeverMet(object):
+	RECOVERABLE = False
+
+	def check(self, task):
+		return False
+
+
+def expect(manager, running, waiting):
+	names = [job.name for job in manager.running_jobs], [job.name for job in manager.active_jobs]
+	if names != (running, waiting):
+		raise tests.TestError("expected %s running and %s waiting, got %s and %s" % (running, waiting, names[0], names[1]))
+
+
+manager = JobManager()
+done = []
+copyA = makeJob("copyA", ("mount:/media/hdd",))
+manager.AddJob(copyA, onSuccess=done.append)
+manager.AddJob(makeJob("epg", python=True))
+manager.AddJob(makeJob("copyA2", ("mount:/media/hdd",), priority=Job.PRIORITY_LOW))
+manager.AddJob(makeJob("copyB", ("mount:/media/usb",)))
+manager.AddJob(makeJob("copyA3", ("mount:/media/hdd",), priority=Job.PRIORITY_HIGH))
+manager.AddJob(makeJob("burn"))
+expect(manager, ["copyA", "epg", "copyB", "burn"], ["copyA2", "copyA3"])
+finish(manager.running_jobs[1])  # epg
+expect(manager, ["copyA", "copyB", "burn"], ["copyA2", "copyA3"])
+finish(copyA)
+if done != [copyA]:
+	raise tests.TestError("onSuccess was not called")
+expect(manager, ["copyB", "burn", "copyA3"], ["copyA2"])
+
+# A failed job gives its lane to the next one.
+manager.AddJob(makeJob("burn2"), onFail=lambda job, task, problems: False)
+expect(manager, ["copyB", "burn", "copyA3"], ["copyA2", "burn2"])
+burn = manager.running_jobs[1]
+burn.onFail = lambda job, task, problems: False
+finish(burn, failed=True)
+if manager.failed_jobs != [burn]:
+	raise tests.TestError("the failed job was not recorded")
+expect(manager, ["copyB", "copyA3", "burn2"], ["copyA2"])
+
+# Throughput of all running jobs.
+manager.running_jobs[0].tasks[0].bytes_done = 50
+manager.running_jobs[0].tasks[0].bytes_total = 100
+manager.running_jobs[0].started -= 10
+metrics = manager.getMetrics()
+print("[test_jobmanager] metrics", metrics)
+if metrics["done"] != 50 or metrics["total"] != 100 or not 4 < metrics["rate"] < 6 or not 9 < metrics["eta"] < 11:
+	raise tests.TestError("wrong metrics %s" % metrics)
+
+# At most max_jobs run, whatever the lanes allow.
+manager.setLimit("mount", 4)
+expect(manager, ["copyB", "copyA3", "burn2", "copyA2"], [])
+manager.max_jobs = 4
+manager.AddJob(makeJob("copyC", ("mount:/media/net",)))
+expect(manager, ["copyB", "copyA3", "burn2", "copyA2"], ["copyC"])
+for job in manager.running_jobs[:]:
+	finish(job)
+expect(manager, ["copyC"], [])
+print("[test_jobmanager] ok")
@@ -0,0 +1,89 @@
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import time
+import tests
+
+# Builds the package index of two feed lists and a status file, searches it
+# and checks the upgradable packages, that an unchanged index is read from
+# disk and that a changed feed list is read again.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_packageindex.py
+
+from Components import PackageIndex as indexModule
+from Components.PackageIndex import PackageIndex, compareVersions
+
+PACKAGE = "Package: %s\nVersion: %s\nDescription: %s\n continued\nArchitecture: all\n\n"
+
+# (older, newer) as opkg sees them.
+for a, b in (("1.0", "1.0-r0"), ("1.0-r0", "1.0-r1"), ("1.9", "1.10"), ("2.0", "1:0.1"), ("1.0~rc1", "1.0"), ("1.0", "1.0+git1"), ("1.0", "1.0a"), ("2.0-r0", "2.0-r0.1")):
+	if compareVersions(a, b) >= 0 or compareVersions(b, a) <= 0:
+		raise tests.TestError("%s should be older than %s" % (a, b))
+if compareVersions("1.0", "1.0") or compareVersions("1.0~rc1", "1.0~rc1") or compareVersions("01.0", "1.0"):
+	raise tests.TestError("equal versions differ")
+
+directory = tempfile.mkdtemp()
+try:
+	lists = os.path.join(directory, "lists")
+	os.mkdir(lists)
+	with open(os.path.join(lists, "3rd-party"), "w") as fd:
+		for x in range(5000):
+			fd.write(PACKAGE % ("enigma2-plugin-extensions-test%04d" % x, "1.%d" % x, "Test plugin %d" % x))
+		fd.write(PACKAGE % ("enigma2-plugin-softcams-oscam", "11700-r2", "OScam softcam"))
+	with open(os.path.join(lists, "oe"), "w") as fd:
+		fd.write(PACKAGE % ("enigma2-plugin-softcams-oscam", "11700-r1", "older"))
+		fd.write(PACKAGE % ("busybox", "1.31.1-r0", "Tiny versions of many common UNIX utilities"))
+		fd.write(PACKAGE % ("openssl", "1.1.1k-r0", "Secure Socket Layer"))
+	status = os.path.join(directory, "status")
+	with open(status, "w") as fd:
+		fd.write("Package: busybox\nVersion: 1.31.1-r0\nStatus: install user installed\nArchitecture: all\n\n")
+		fd.write("Package: openssl\nVersion: 1.1.1j-r0\nStatus: install user installed\n\n")
+		fd.write("Package: enigma2-plugin-softcams-oscam\nVersion: 11700-r1\nStatus: install ok installed\n\n")
+		fd.write("Package: removed\nVersion: 1.0\nStatus: deinstall ok config-files\n")
+	indexFile = os.path.join(directory, "index")
+
+	start = time.time()
+	index = PackageIndex(lists, [status], indexFile)
+	packages = index.getPackages("enigma2-plugin-softcams-")
+	print("[test_packageindex] built in %.3f seconds" % (time.time() - start))
+	if packages != [("enigma2-plugin-softcams-oscam", "11700-r2", "OScam softcam continued")]:
+		raise tests.TestError("wrong packages %s" % packages)
+	if len(index.getPackages("enigma2-plugin-extensions-")) != 5000 or len(index.getPackages()) != 5003:
+		raise tests.TestError("wrong number of packages")
+	found = [x[0] for x in index.search("SSL")]
+	if found != ["openssl"] or [x[0] for x in index.search("unix utilities", descriptions=True)] != ["busybox"]:
+		raise tests.TestError("wrong search results %s" % found)
+	if index.getInstalled() != {"busybox": "1.31.1-r0", "openssl": "1.1.1j-r0", "enigma2-plugin-softcams-oscam": "11700-r1"}:
+		raise tests.TestError("wrong installed packages %s" % index.getInstalled())
+	upgradable = index.getUpgradable()
+	if upgradable != {"openssl": ("1.1.1j-r0", "1.1.1k-r0"), "enigma2-plugin-softcams-oscam": ("11700-r1", "11700-r2")}:
+		raise tests.TestError("wrong upgradable packages %s" % upgradable)
+
+	# Unchanged feed lists are read from the index.
+	parsed = []
+	parse = indexModule.parseControlFile
+
+	def countingParse(path):
+		parsed.append(path)
+		return parse(path)
+	indexModule.parseControlFile = countingParse
+	start = time.time()
+	index = PackageIndex(lists, [status], indexFile)
+	if len(index.getPackages()) != 5003 or [x for x in parsed if x != status]:
+		raise tests.TestError("the unchanged feed lists were parsed again: %s" % parsed)
+	print("[test_packageindex] loaded in %.3f seconds" % (time.time() - start))
+
+	# A changed feed list and status are read again.
+	with open(os.path.join(lists, "oe"), "a") as fd:
+		fd.write(PACKAGE % ("openssl", "1.1.1l-r0", "Secure Socket Layer"))
+	os.utime(os.path.join(lists, "oe"), (time.time() + 10, time.time() + 10))
+	with open(status, "a") as fd:
+		fd.write("\nPackage: curl\nVersion: 7.0\nStatus: install ok installed\n")
+	if index.getAvailable("openssl") != ("1.1.1l-r0", "Secure Socket Layer continued") or index.getInstalled().get("curl") != "7.0":
+		raise tests.TestError("the changes were not read")
+	indexModule.parseControlFile = parse
+	print("[test_packageindex] ok")
+finally:
+	shutil.rmtree(directory, True)
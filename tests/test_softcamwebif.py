@@ -0,0 +1,146 @@
+from __future__ import print_function
+import re
+import threading
+import tests
+from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+from hashlib import md5
+from SocketServer import ThreadingMixIn
+
+# Asks a local HTTP stand-in of the OScam web interface with digest
+# authentication for its status, polls it and checks that the connection is
+# kept, the authentication is negotiated once and subscribers only hear of
+# changes.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_softcamwebif.py
+
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, Deferred
+
+from Components.SoftcamWebif import WebifClient, WebifError
+
+USER = "admin"
+PASSWORD = "secret"
+REALM = "Forbidden"
+NONCE = "4f1b2c"
+CLIENT = '<client type="%s" name="%s" protocol="%s"><request caid="0963" srvid="0001" ecmtime="120">1:Channel</request><times login="0" online="1"/><connection ip="127.0.0.1" port="0">OK</connection></client>'
+state = {"clients": [("c", "dvbapi", "dvbapi"), ("r", "card", "internal")], "challenges": 0, "ports": set(), "requests": 0}
+
+
+def status():
+	clients = "".join([CLIENT % x for x in state["clients"]])
+	return '<?xml version="1.0" encoding="UTF-8"?><oscam version="1.20" starttime="0"><status>%s</status><log><![CDATA[12:00:00 1 c client <a> connected\n]]></log></oscam>' % clients
+
+
+class WebifStandIn(BaseHTTPRequestHandler):
+	protocol_version = "HTTP/1.1"  # Keep-alive.
+
+	def do_GET(self):
+		state["ports"].add(self.client_address[1])
+		state["requests"] += 1
+		fields = {}
+		for name, value in re.findall(r'(\w+)="?([^",]*)"?', self.headers.get("Authorization", "")):
+			fields[name] = value
+		ha1 = md5("%s:%s:%s" % (USER, REALM, PASSWORD)).hexdigest()
+		ha2 = md5("GET:%s" % self.path).hexdigest()
+		expected = md5("%s:%s:%s:%s:auth:%s" % (ha1, NONCE, fields.get("nc"), fields.get("cnonce"), ha2)).hexdigest()
+		if fields.get("response") != expected or fields.get("uri") != self.path:
+			state["challenges"] += 1
+			self.send_response(401)
+			self.send_header("WWW-Authenticate", 'Digest realm="%s", qop="auth", nonce="%s", opaque="x"' % (REALM, NONCE))
+			self.send_header("Content-Length", "0")
+			self.end_headers()
+			return
+		data = status()
+		self.send_response(200)
+		self.send_header("Content-Type", "text/xml")
+		self.send_header("Content-Length", str(len(data)))
+		self.end_headers()
+		for start in range(0, len(data), 64):  # The parser gets it in pieces.
+			self.wfile.write(data[start:start + 64])
+			self.wfile.flush()
+
+	def log_message(self, *args):
+		pass
+
+
+class ThreadingServer(ThreadingMixIn, HTTPServer):
+	daemon_threads = True
+
+
+server = ThreadingServer(("127.0.0.1", 0), WebifStandIn)
+thread = threading.Thread(target=server.serve_forever)
+thread.daemon = True
+thread.start()
+client = WebifClient("http://127.0.0.1:%d" % server.server_address[1], USER, PASSWORD)
+PATH = "/oscamapi.html?part=status&appendlog=1"
+errors = []
+
+
+def sleep(seconds):
+	deferred = Deferred()
+	reactor.callLater(seconds, deferred.callback, None)
+	return deferred
+
+
+def clientNames(document):
+	return [x.attrib["name"] for x in document.records["client"]]
+
+
+@inlineCallbacks
+def run():
+	document = yield client.request(PATH, records=("client",), texts=("log",))
+	if clientNames(document) != ["dvbapi", "card"] or document.records["client"][0].find("request").text != "1:Channel":
+		raise tests.TestError("wrong clients %s" % clientNames(document))
+	if document.root.get("version") != "1.20" or "<a> connected" not in document.getText("log") or "status" not in document.attributes:
+		raise tests.TestError("wrong status %s %s" % (document.root, document.getText("log")))
+	body = yield client.request(PATH)
+	if not body.startswith("<?xml"):
+		raise tests.TestError("the raw body was not returned")
+
+	# Two subscribers, one poll, each hears of changes only.
+	seen = ([], [])
+	client.subscribe(PATH, seen[0].append, errors.append, clientNames, 0.1, records=("client",), texts=("log",))
+	client.subscribe(PATH, seen[1].append, errors.append, lambda document: len(document.records["client"]), 0.1, records=("client",))
+	yield sleep(0.6)
+	requests = state["requests"]
+	state["clients"].append(("p", "proxy", "cccam"))
+	yield sleep(0.6)
+	client.unsubscribe(PATH, seen[0].append)
+	client.unsubscribe(PATH, seen[1].append)
+	print("[test_softcamwebif] %d requests, %d challenges, %d connections, seen %s" % (state["requests"], state["challenges"], len(state["ports"]), seen))
+	if seen != ([["dvbapi", "card"], ["dvbapi", "card", "proxy"]], [2, 3]):
+		raise tests.TestError("the subscribers saw %s" % (seen,))
+	if state["requests"] - requests < 3:
+		raise tests.TestError("the page was not polled")
+	if state["challenges"] != 1:
+		raise tests.TestError("the authentication was negotiated %d times" % state["challenges"])
+	if len(state["ports"]) != 1:
+		raise tests.TestError("%d connections were used" % len(state["ports"]))
+
+	# Wrong credentials fail.
+	try:
+		yield WebifClient(client.url, USER, "wrong").request(PATH)
+		raise tests.TestError("wrong credentials were accepted")
+	except WebifError as err:
+		print("[test_softcamwebif] expected error:", err)
+	yield sleep(0.3)
+	if state["requests"] - requests > 20 or client.polls:
+		raise tests.TestError("the poll did not stop")
+
+
+def done(result):
+	if result is not None:
+		errors.append(result)
+	reactor.stop()
+
+
+reactor.callWhenRunning(lambda: run().addBoth(done))
+reactor.callLater(30, reactor.stop)
+reactor.run()
+server.shutdown()
+if errors:
+	if hasattr(errors[0], "raiseException"):
+		errors[0].raiseException()
+	raise tests.TestError("failed: %s" % errors)
+print("[test_softcamwebif] ok")
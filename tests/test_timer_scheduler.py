@@ -0,0 +1,93 @@
+from __future__ import print_function
+import enigma
+import time
+import tests
+
+# benchmark for the timer.Timer scheduler: a lot of waiting timers (think of
+# AutoTimer generated record timers plus power timers), every poll has to find
+# the next one to activate.
+#
+# run with
+# PYTHONPATH=.:..:../lib/python/ python test_timer_scheduler.py
+
+import timer
+
+class BenchTimerEntry(timer.TimerEntry):
+	def __init__(self, begin, end):
+		timer.TimerEntry.__init__(self, begin, end)
+		self.activations = 0
+		self.first_activation = None
+
+	def activate(self):
+		self.activations += 1
+		if self.first_activation is None:
+			self.first_activation = time.time()
+		return True
+
+	def getNextActivation(self):
+		if self.state == self.StateEnded:
+			return self.end
+		return {self.StatePrepared: self.begin - self.prepare_time,
+				self.StateRunning: self.begin,
+				self.StateEnded: self.end}[self.state + 1]
+
+def test_timer_scheduler(count=1000, timer_length=1800, sim_length=86400 * 2):
+	at = time.time()
+	t = timer.Timer()
+	t.MaxWaitTime = 86400 * 1000
+
+	entries = [ ]
+	for x in range(count):
+		begin = at + 600 + (x * 3600 * 24 * 14) / count
+		entry = BenchTimerEntry(begin, begin + timer_length)
+		if x % 10 == 0:
+			entry.disable()
+		entries.append(entry)
+
+	start = time.clock()
+	for entry in entries:
+		t.addTimerEntry(entry, noRecalc=1)
+	t.calcNextActivation()
+	add_time = time.clock() - start
+
+	# move some of the timers around, like the timer edit screens do
+	start = time.clock()
+	for entry in entries[::7]:
+		entry.begin += 300
+		entry.end += 300
+		t.timeChanged(entry)
+	change_time = time.clock() - start
+
+	# and some without telling the timer, like plugins do
+	silent = [x for x in entries[3::50] if not x.disabled]
+	for entry in silent:
+		entry.begin -= (entry.begin - at - 600) / 2
+		entry.end = entry.begin + timer_length
+
+	start = time.clock()
+	for x in range(count):
+		t.calcNextActivation()
+	poll_time = time.clock() - start
+
+	start = time.clock()
+	enigma.run(sim_length)
+	run_time = time.clock() - start
+
+	print("[test_timer_scheduler] %d timers: add %.3fs, %d x timeChanged %.3fs, %d x calcNextActivation %.3fs, run %.3fs" % (count, add_time, len(entries[::7]), change_time, count, poll_time, run_time))
+
+	ended = [x for x in entries if x.state == timer.TimerEntry.StateEnded and not x.disabled]
+	expected = [x for x in entries if not x.disabled and x.end < at + sim_length]
+	if len(ended) != len(expected):
+		raise tests.TestError("%d timers ended, expected %d" % (len(ended), len(expected)))
+	for x in ended:
+		if x.activations != 3:
+			raise tests.TestError("timer activated %d times" % x.activations)
+	for x in silent:
+		if x.first_activation is not None and x.first_activation > x.begin - x.prepare_time + 1:
+			raise tests.TestError("silently moved timer activated %ds late" % (x.first_activation - x.begin + x.prepare_time))
+	if [x for x in t.timer_list if x.state == timer.TimerEntry.StateEnded]:
+		raise tests.TestError("ended timer left in timer_list")
+
+from events import log
+
+log(test_timer_scheduler, test_name="test_timer_scheduler", base_time=1200000000, count=1000)
@@ -1,5 +1,7 @@
 from __future__ import print_function
 from bisect import insort
+from heapq import heappush, heappop
+from itertools import count
 from time import time, localtime, mktime
 from enigma import eTimer, eActionMap
 import datetime
@@ -163,6 +165,16 @@ class Timer:
 		self.timer_list = [ ]
 		self.processed_timers = [ ]
 
+		# timer_list (sorted) and processed_timers stay the real lists everybody
+		# uses, the heap only answers "which timer is next" for the scheduler.
+		# heap items are [nextActivation, seq, entry], replaced items get their
+		# entry set to None and are dropped when they come to the top.
+		self.timer_heap = [ ]
+		self.timer_heap_items = { }
+		self.timer_heap_list = self.timer_list
+		self.timer_heap_seq = count()
+		self.timer_heap_disabled = { }
+
 		self.timer = eTimer()
 		self.timer.callback.append(self.calcNextActivation)
 		self.lastActivation = time()
@@ -197,6 +209,7 @@ class Timer:
 			entry.state = TimerEntry.StateEnded
 		else:
 			insort(self.timer_list, entry)
+			self.scheduleEntry(entry)
 			if not noRecalc:
 				self.calcNextActivation()
 
@@ -221,6 +234,86 @@ class Timer:
 #		else:
 #			print("no NAV")
 
+	# (re)insert entry into the activation heap, any older item of it becomes invalid
+	def scheduleEntry(self, entry):
+		self.timer_heap_disabled.pop(id(entry), None)
+		item = self.timer_heap_items.get(id(entry))
+		if item is not None:
+			item[2] = None
+		item = [entry.getNextActivation(), next(self.timer_heap_seq), entry]
+		self.timer_heap_items[id(entry)] = item
+		heappush(self.timer_heap, item)
+
+	def unscheduleEntry(self, entry):
+		self.timer_heap_disabled.pop(id(entry), None)
+		item = self.timer_heap_items.pop(id(entry), None)
+		if item is not None:
+			item[2] = None
+
+	def rebuildTimerHeap(self):
+		self.timer_heap = [ ]
+		self.timer_heap_items = { }
+		self.timer_heap_list = self.timer_list
+		self.timer_heap_disabled = { }
+		self.timer_list.sort()
+		for entry in self.timer_list:
+			self.scheduleEntry(entry)
+
+	# re-queue entries whose activation time changed behind our back, e.g.
+	# a plugin that moved a timer without calling timeChanged().
+	def checkActivationTimes(self):
+		if self.timer_heap_list is not self.timer_list or len(self.timer_heap_items) + len(self.timer_heap_disabled) != len(self.timer_list):
+			self.rebuildTimerHeap()
+			return
+		changed = [item[2] for item in self.timer_heap_items.values() if item[2].getNextActivation() != item[0]]
+		if changed:
+			# the timer list order is probably broken too, resort it
+			self.timer_list.sort()
+			for entry in changed:
+				self.scheduleEntry(entry)
+
+	# the timer_list entry which has to be activated next, or None.
+	def getNextTimerEntry(self, skipActivated=False):
+		if self.timer_heap_list is not self.timer_list or len(self.timer_heap_items) + len(self.timer_heap_disabled) != len(self.timer_list):
+			# timer_list was replaced or changed without us, e.g. by a plugin
+			self.rebuildTimerHeap()
+		heap = self.timer_heap
+		skipped = [ ]
+		entry = None
+		while heap:
+			item = heap[0]
+			if item[2] is None:
+				heappop(heap)
+				continue
+			entry = item[2]
+			if entry.disabled:
+				heappop(heap)
+				self.unscheduleEntry(entry)
+				self.timer_heap_disabled[id(entry)] = entry
+				entry = None
+				continue
+			when = entry.getNextActivation()
+			if when != item[0]:
+				# the timer list order is probably broken too, resort it
+				self.timer_list.sort()
+				self.scheduleEntry(entry)
+				entry = None
+				continue
+			if skipActivated and getattr(entry, "currentlyActivated", False):
+				skipped.append(heappop(heap))
+				entry = None
+				continue
+			break
+		for item in skipped:
+			heappush(heap, item)
+		return entry
+
+	# give disabled timers which got enabled without a timeChanged() a chance
+	def checkDisabledEntries(self):
+		for entry in list(self.timer_heap_disabled.values()):
+			if not entry.disabled:
+				self.scheduleEntry(entry)
+
 	def setNextActivation(self, now, when):
 		delay = int((when - now) * 1000)
 		self.timer.start(delay, 1)
@@ -242,12 +335,12 @@ class Timer:
 
 		min = int(now) + self.MaxWaitTime
 
-		self.timer_list and self.timer_list.sort() #  resort/refresh list, try to fix hanging timers
+		self.checkDisabledEntries()
 
 		# calculate next activation point
-		timer_list = [ t for t in self.timer_list if not t.disabled ]
-		if timer_list:
-			w = timer_list[0].getNextActivation()
+		entry = self.getNextTimerEntry()
+		if entry is not None:
+			w = entry.getNextActivation()
 			if w < min:
 				min = w
 
@@ -267,6 +360,7 @@ class Timer:
 			except:
 				print("[timer] Failed to remove, not in list")
 				return
+			self.unscheduleEntry(timer)
 		# give the timer a chance to re-enqueue
 		if timer.state == TimerEntry.StateEnded:
 			timer.state = TimerEntry.StateWaiting
@@ -279,6 +373,7 @@ class Timer:
 
 	def doActivate(self, w):
 		self.timer_list.remove(w)
+		self.unscheduleEntry(w)
 
 		# when activating a timer which has already passed,
 		# simply abort the timer. don't run trough all the stages.
@@ -295,6 +390,7 @@ class Timer:
 		if w.state < TimerEntry.StateEnded:
 			# no, sort it into active list
 			insort(self.timer_list, w)
+			self.scheduleEntry(w)
 		else:
 			# yes. Process repeated, and re-add.
 			if w.repeated:
@@ -307,6 +403,7 @@ class Timer:
 		self.stateChanged(w)
 
 	def processActivation(self):
+		self.checkActivationTimes()
 		t = int(time()) + 1
 # We keep on processing the first entry until it goes into the future.
 #
@@ -323,10 +420,10 @@ class Timer:
 # Since this tag is only for use here, we remove it after use.
 #
 		while True:
-			timer_list = [ tmr for tmr in self.timer_list if (not tmr.disabled and not getattr(tmr, "currentlyActivated", False)) ]
-			if timer_list and timer_list[0].getNextActivation() < t:
-				timer_list[0].currentlyActivated = True
-				self.doActivate(timer_list[0])
-				del timer_list[0].currentlyActivated
+			entry = self.getNextTimerEntry(skipActivated=True)
+			if entry is not None and entry.getNextActivation() < t:
+				entry.currentlyActivated = True
+				self.doActivate(entry)
+				del entry.currentlyActivated
 			else:
 				break